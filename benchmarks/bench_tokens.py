@@ -0,0 +1,102 @@
+"""Benchmark deeprepo.tokens counting on large contexts.
+
+Usage:
+    python benchmarks/bench_tokens.py                    # ~100k-token synthetic context
+    python benchmarks/bench_tokens.py /path/to/repo      # a real checkout, truncated
+    python benchmarks/bench_tokens.py --tokens 200000 --repeat 10
+
+Reports, for the active backend (tiktoken or the heuristic fallback), the
+cost of a first count, of a repeated (memoized) count, of counting an RLM
+transcript that grows by one message per turn, and of truncating to a
+budget. Each figure is the best of ``--repeat`` runs.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from deeprepo import tokens
+from deeprepo.codebase_loader import load_codebase
+from deeprepo.rate_limit import estimate_request_tokens
+
+
+def _synthetic_context(target_tokens: int) -> str:
+    rng = random.Random(0)
+    words = "the project cache loader refresh context budget token module state".split()
+    parts = []
+    total = 0
+    while total < target_tokens:
+        i = len(parts)
+        lines = [
+            f"def func_{i}_{j}(x, y=None):\n    return helper(x[{j}], y) + {rng.randint(0, 999)}\n"
+            for j in range(5)
+        ]
+        prose = " ".join(rng.choice(words) for _ in range(60))
+        parts.append(f"## src/mod_{i}.py\n" + "".join(lines) + f"\n# {prose}\n")
+        total += tokens.count_tokens(parts[-1])
+    return "".join(parts)
+
+
+def _repo_context(path: str, target_tokens: int) -> str:
+    data = load_codebase(path)
+    parts = [f"## {name}\n{content}\n" for name, content in sorted(data["codebase"].items())]
+    return tokens.truncate_to_tokens("".join(parts), target_tokens)
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", help="Repository to read (default: synthetic text)")
+    parser.add_argument("--tokens", type=int, default=100_000, help="Context size in tokens")
+    parser.add_argument("--turns", type=int, default=20, help="Transcript messages")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    text = _repo_context(args.path, args.tokens) if args.path else _synthetic_context(args.tokens)
+    n_tokens = tokens.count_tokens(text)
+    print(f"Backend: {tokens.tokenizer_name()}")
+    print(f"Context: {len(text):,} chars, {n_tokens:,} tokens ({len(text) / n_tokens:.2f} chars/token)")
+
+    def _cold():
+        tokens.use_tokenizer(tokens.tokenizer_name())  # Clears the memo
+        tokens.count_tokens(text)
+
+    cold_s = _best(_cold, args.repeat)
+    tokens.count_tokens(text)
+    warm_s = _best(lambda: tokens.count_tokens(text), args.repeat)
+
+    step = len(text) // args.turns
+    messages = [
+        {"role": "user", "content": text[i * step:(i + 1) * step]} for i in range(args.turns)
+    ]
+
+    def _transcript():
+        # What compaction and rate limiting do: re-measure the whole history each
+        # turn. Only the newest message is counted; older ones hit the memo.
+        tokens.use_tokenizer(tokens.tokenizer_name())
+        for turn in range(1, len(messages) + 1):
+            estimate_request_tokens(messages[:turn], max_tokens=0)
+
+    transcript_s = _best(_transcript, args.repeat)
+    truncate_s = _best(lambda: tokens.truncate_to_tokens(text, n_tokens // 2), args.repeat)
+
+    print(f"  first count:             {cold_s * 1000:8.2f} ms")
+    print(f"  repeated count (memo):   {warm_s * 1000:8.3f} ms")
+    print(f"  {args.turns}-turn transcript:      {transcript_s * 1000:8.2f} ms total")
+    print(f"  truncate to half:        {truncate_s * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,7 @@ def run_baseline(
     verbose: bool = True,
     root_model: str = "claude-opus-4-6",
     domain: str = "code",
+    data: dict | None = None,
 ) -> dict:
     """
     Run a single-model baseline analysis.
@@ -45,6 +46,7 @@ def run_baseline(
         codebase_path: Local path to the codebase (or git URL)
         max_chars: Maximum characters to include in prompt
         verbose: Print progress
+        data: Already-loaded domain data for ``codebase_path``; skips the loader
 
     Returns:
         dict with analysis, usage, included_files, excluded_files
@@ -77,10 +79,11 @@ def run_baseline(
 
     try:
         # Load codebase
-        data = domain_config.loader(actual_path)
+        if data is None:
+            data = domain_config.loader(actual_path)
         codebase = data[domain_config.data_variable_name]
         metadata = data["metadata"]
-        file_tree = data["file_tree"]
+        file_tree = data.get("prompt_tree", data["file_tree"])
 
         if verbose:
             print(f"Loaded {metadata['total_files']} files, {metadata['total_chars']:,} chars")
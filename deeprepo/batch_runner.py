@@ -0,0 +1,158 @@
+"""Run many RLM analyses concurrently on one event loop.
+
+Used by ``deeprepo analyze-many``. All runs share one ``BatchBudget``, which
+caps concurrent sub-LLM calls across every repository and stops the batch
+once the combined spend reaches a cost ceiling. Runs also share the on-disk
+sub-LLM cache (see ``deeprepo.cache``), so repeated prompts across repos
+are only paid for once.
+"""
+
+import asyncio
+import time
+from collections.abc import Callable, Iterable
+
+from .llm_clients import DEFAULT_SUB_MODEL, TokenUsage
+
+DEFAULT_PARALLEL_RUNS = 4
+DEFAULT_MAX_SUB_CONCURRENT = 16
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised for sub-LLM calls attempted after the batch cost ceiling was hit."""
+
+
+class BatchBudget:
+    """Global sub-LLM concurrency cap and cost ceiling shared by a batch of runs.
+
+    Pass it as ``sub_limiter`` (it is an async context manager held around
+    each sub-LLM call) and its ``stop_reason`` as the engine ``stop_check``.
+    """
+
+    def __init__(
+        self,
+        max_sub_concurrent: int = DEFAULT_MAX_SUB_CONCURRENT,
+        max_cost: float | None = None,
+    ):
+        self.max_sub_concurrent = max_sub_concurrent
+        self.max_cost = max_cost
+        self._semaphore = asyncio.Semaphore(max_sub_concurrent)
+        self._usages: list[TokenUsage] = []
+
+    def track(self, usage: TokenUsage) -> TokenUsage:
+        """Count ``usage`` towards the ceiling; returns it for convenience."""
+        self._usages.append(usage)
+        return usage
+
+    @property
+    def spent(self) -> float:
+        return sum(usage.total_cost for usage in self._usages)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.max_cost is not None and self.spent >= self.max_cost
+
+    def stop_reason(self) -> str | None:
+        if self.exhausted:
+            return f"batch cost ceiling ${self.max_cost:.2f} reached (spent ${self.spent:.2f})"
+        return None
+
+    async def __aenter__(self):
+        if self.exhausted:
+            raise BudgetExceededError(self.stop_reason())
+        await self._semaphore.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+        return False
+
+
+def parse_manifest(text: str) -> list[str]:
+    """One repository path or git URL per line; blank lines and ``#`` comments are ignored."""
+    repos = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            repos.append(line)
+    return repos
+
+
+async def run_many(
+    repos: Iterable[str],
+    *,
+    domain: str = "code",
+    root_model: str = "claude-sonnet-4-6",
+    sub_model: str = DEFAULT_SUB_MODEL,
+    max_turns: int = 20,
+    use_cache: bool = True,
+    sandbox: bool = False,
+    parallel: int = DEFAULT_PARALLEL_RUNS,
+    budget: BatchBudget | None = None,
+    on_complete: Callable[[str, dict | None, dict], dict | None] | None = None,
+) -> list[dict]:
+    """Analyse ``repos`` with up to ``parallel`` runs in flight.
+
+    ``on_complete(repo, result, entry)`` is called as each repository
+    finishes (``result`` is None if the run failed or was skipped); any dict
+    it returns is merged into that repo's summary entry. Returns one summary
+    entry per repo, in input order.
+    """
+    from .rlm_scaffold import run_analysis_async
+
+    repos = list(repos)
+    budget = budget or BatchBudget()
+    slots = asyncio.Semaphore(max(1, parallel))
+
+    async def _run_one(repo: str) -> dict:
+        async with slots:
+            entry: dict = {"repo": repo}
+            result = None
+            if budget.exhausted:
+                entry.update(status="skipped", error=budget.stop_reason())
+            else:
+                usage = budget.track(TokenUsage())
+                t0 = time.perf_counter()
+                try:
+                    result = await run_analysis_async(
+                        repo,
+                        verbose=False,
+                        max_turns=max_turns,
+                        root_model=root_model,
+                        sub_model=sub_model,
+                        use_cache=use_cache,
+                        domain=domain,
+                        usage=usage,
+                        sub_limiter=budget,
+                        stop_check=budget.stop_reason,
+                        sandbox=sandbox,
+                    )
+                    entry["status"] = result["status"]
+                    entry["turns"] = result["turns"]
+                except Exception as exc:
+                    entry.update(status="error", error=f"{type(exc).__name__}: {exc}")
+                entry["elapsed_seconds"] = round(time.perf_counter() - t0, 2)
+                entry["total_cost"] = usage.total_cost
+
+            if on_complete is not None:
+                extra = on_complete(repo, result, entry)
+                if extra:
+                    entry.update(extra)
+            return entry
+
+    return list(await asyncio.gather(*(_run_one(repo) for repo in repos)))
+
+
+def summarize(entries: list[dict], budget: BatchBudget, wall_seconds: float) -> dict:
+    """Aggregate per-repo entries into the batch summary written by analyze-many."""
+    counts: dict[str, int] = {}
+    for entry in entries:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return {
+        "repos": len(entries),
+        "status_counts": counts,
+        "total_cost": budget.spent,
+        "max_cost": budget.max_cost,
+        "max_sub_concurrent": budget.max_sub_concurrent,
+        "wall_seconds": round(wall_seconds, 2),
+        "results": entries,
+    }
@@ -1,13 +1,60 @@
-"""Content-hash cache for sub-LLM query results."""
+"""Content-hash cache for sub-LLM query results.
+
+Entries live in a single SQLite database (WAL mode) under ``CACHE_DIR``,
+keyed by a SHA-256 of model + system + prompt. Least-recently-used entries
+are evicted once the database grows past ``CACHE_MAX_BYTES``. Caches written
+by older versions (one JSON file per entry) are migrated on a background
+thread after first use, one batch per transaction; until an entry has been
+migrated, looking it up is a miss.
+
+The same database holds the per-file import specs behind the loader's import
+graph (``import_specs``), keyed by content hash; rows unused for
+``IMPORT_SPECS_EXPIRY_DAYS`` are dropped.
+"""
 
 import hashlib
 import json
 import os
+import shutil
+import sqlite3
+import threading
 import time
+from collections.abc import Iterable
+
+from . import tracing
 
 
 CACHE_DIR = os.path.expanduser("~/.cache/deeprepo")
+CACHE_DB_NAME = "cache.sqlite3"
 CACHE_EXPIRY_DAYS = 7
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_EVICT_TARGET = 0.9  # Evict down to this fraction of CACHE_MAX_BYTES
+IMPORT_SPECS_EXPIRY_DAYS = 30
+
+# SQLite caps bound parameters per statement; stay well below the old 999 limit.
+_SQL_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS import_specs (
+    key TEXT PRIMARY KEY,
+    specs TEXT NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS import_specs_accessed_at ON import_specs (accessed_at);
+"""
+
+_connections: dict[str, sqlite3.Connection] = {}
+_lock = threading.RLock()
+_migrations: list[threading.Thread] = []
 
 
 def _cache_key(prompt: str, system: str, model: str) -> str:
@@ -16,52 +63,310 @@ def _cache_key(prompt: str, system: str, model: str) -> str:
     return hashlib.sha256(content.encode()).hexdigest()
 
 
-def get_cached(prompt: str, system: str, model: str) -> str | None:
-    """Return cached result if it exists and hasn't expired."""
-    key = _cache_key(prompt, system, model)
-    cache_file = os.path.join(CACHE_DIR, f"{key}.json")
+def _db_path() -> str:
+    return os.path.join(CACHE_DIR, CACHE_DB_NAME)
+
+
+def _connect() -> sqlite3.Connection:
+    """Return the shared connection for the current CACHE_DIR, creating it if needed."""
+    path = _db_path()
+    with _lock:
+        conn = _connections.get(path)
+        if conn is not None:
+            return conn
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(
+            path,
+            timeout=30,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _connections[path] = conn
+        _start_migration(CACHE_DIR, path)
+        return conn
+
+
+def _close_connections() -> None:
+    with _lock:
+        for conn in _connections.values():
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _connections.clear()
+
+
+def _legacy_entry_names(cache_dir: str) -> list[str]:
+    try:
+        return [name for name in os.listdir(cache_dir) if name.endswith(".json")]
+    except OSError:
+        return []
+
+
+def _start_migration(cache_dir: str, db_path: str) -> None:
+    """Import legacy JSON entries in the background, if there are any."""
+    if not _legacy_entry_names(cache_dir):
+        return
+    thread = threading.Thread(
+        target=_migrate_in_background,
+        args=(cache_dir, db_path),
+        name="deeprepo-cache-migration",
+        daemon=True,  # Whatever is left is migrated by the next process
+    )
+    _migrations[:] = [migration for migration in _migrations if migration.is_alive()]
+    _migrations.append(thread)
+    thread.start()
 
-    if not os.path.exists(cache_file):
-        return None
 
+def _migrate_in_background(cache_dir: str, db_path: str) -> None:
+    # A connection of its own: lookups on the shared one are never blocked
+    # by the import, only by SQLite's per-batch write lock.
     try:
-        with open(cache_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if time.time() - data["timestamp"] > CACHE_EXPIRY_DAYS * 86400:
-            os.remove(cache_file)
-            return None
-        return data["result"]
-    except (json.JSONDecodeError, KeyError, OSError):
-        return None
+        conn = sqlite3.connect(db_path, timeout=30)
+    except sqlite3.Error:
+        return
+    try:
+        _migrate_json_entries(conn, cache_dir)
+    except (sqlite3.Error, OSError):
+        pass
+    finally:
+        conn.close()
+
+
+def wait_for_migration(timeout: float | None = None) -> None:
+    """Block until background migrations of legacy entries have finished."""
+    with _lock:
+        migrations = list(_migrations)
+    for migration in migrations:
+        migration.join(timeout)
+
+
+def _migrate_json_entries(conn: sqlite3.Connection, cache_dir: str) -> int:
+    """Import legacy ``<key>.json`` entries from ``cache_dir``, deleting each file after.
+
+    Each batch of ``_SQL_CHUNK`` files is committed on its own.
+    """
+    names = _legacy_entry_names(cache_dir)
+    cutoff = time.time() - CACHE_EXPIRY_DAYS * 86400
+    migrated = 0
+    for start in range(0, len(names), _SQL_CHUNK):
+        rows = []
+        paths = []
+        for name in names[start:start + _SQL_CHUNK]:
+            file_path = os.path.join(cache_dir, name)
+            paths.append(file_path)
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                timestamp = float(data["timestamp"])
+                result = data["result"]
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError, OSError):
+                continue
+            if timestamp < cutoff or not isinstance(result, str):
+                continue
+            rows.append((
+                name[: -len(".json")],
+                data.get("model", ""),
+                result,
+                _entry_size(result),
+                timestamp,
+                timestamp,
+            ))
+
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO entries "
+                "(key, model, result, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        migrated += len(rows)
+        for file_path in paths:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+    return migrated
+
+
+def _entry_size(result: str) -> int:
+    return len(result.encode("utf-8", errors="replace"))
+
+
+def get_cached(prompt: str, system: str, model: str) -> str | None:
+    """Return cached result if it exists and hasn't expired."""
+    return get_many([prompt], system, model)[0]
 
 
 def set_cached(prompt: str, system: str, model: str, result: str) -> None:
     """Store a result in the cache."""
+    set_many([(prompt, result)], system, model)
+
+
+def get_many(prompts: list[str], system: str, model: str) -> list[str | None]:
+    """Resolve many prompts in one pass. Returns results aligned with ``prompts``."""
+    keys = [_cache_key(prompt, system, model) for prompt in prompts]
+    if not keys:
+        return []
+
+    found: dict[str, str] = {}
+    expired: list[str] = []
+    now = time.time()
+    cutoff = now - CACHE_EXPIRY_DAYS * 86400
+    unique_keys = list(dict.fromkeys(keys))
+
     try:
-        os.makedirs(CACHE_DIR, exist_ok=True)
-        key = _cache_key(prompt, system, model)
-        cache_file = os.path.join(CACHE_DIR, f"{key}.json")
-
-        data = {
-            "timestamp": time.time(),
-            "model": model,
-            "prompt_hash": key,
-            "result": result,
-        }
-        with open(cache_file, "w", encoding="utf-8") as f:
-            json.dump(data, f)
-    except OSError:
+        with _lock, tracing.span("cache.get", tracing.CACHE, prompts=len(unique_keys)):
+            conn = _connect()
+            for start in range(0, len(unique_keys), _SQL_CHUNK):
+                chunk = unique_keys[start:start + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, result, created_at FROM entries WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, result, created_at in rows:
+                    if created_at < cutoff:
+                        expired.append(key)
+                    else:
+                        found[key] = result
+
+            with conn:
+                if found:
+                    conn.executemany(
+                        "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                        [(now, key) for key in found],
+                    )
+                if expired:
+                    conn.executemany(
+                        "DELETE FROM entries WHERE key = ?",
+                        [(key,) for key in expired],
+                    )
+    except (sqlite3.Error, OSError):
+        return [None] * len(keys)
+
+    return [found.get(key) for key in keys]
+
+
+def set_many(entries: Iterable[tuple[str, str]], system: str, model: str) -> None:
+    """Store many ``(prompt, result)`` pairs in a single transaction."""
+    now = time.time()
+    rows = [
+        (_cache_key(prompt, system, model), model, result, _entry_size(result), now, now)
+        for prompt, result in entries
+    ]
+    if not rows:
+        return
+
+    try:
+        with _lock, tracing.span("cache.set", tracing.CACHE, entries=len(rows)):
+            conn = _connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries "
+                    "(key, model, result, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            _evict_if_needed(conn)
+    except (sqlite3.Error, OSError):
+        return
+
+
+def get_import_specs(keys: Iterable[str]) -> dict[str, list[str]]:
+    """Cached import specs for the given content keys (missing keys are absent)."""
+    unique_keys = list(dict.fromkeys(keys))
+    if not unique_keys:
+        return {}
+
+    found: dict[str, list[str]] = {}
+    now = time.time()
+    stale: list[str] = []
+    try:
+        with _lock, tracing.span("cache.get", tracing.CACHE, import_specs=len(unique_keys)):
+            conn = _connect()
+            for start in range(0, len(unique_keys), _SQL_CHUNK):
+                chunk = unique_keys[start:start + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, specs, accessed_at FROM import_specs WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, specs, accessed_at in rows:
+                    found[key] = json.loads(specs)
+                    if accessed_at < now - 86400:
+                        stale.append(key)
+            # Refresh access times at most daily so warm loads stay read-only.
+            if stale:
+                with conn:
+                    conn.executemany(
+                        "UPDATE import_specs SET accessed_at = ? WHERE key = ?",
+                        [(now, key) for key in stale],
+                    )
+    except (sqlite3.Error, OSError, ValueError):
+        return {}
+    return found
+
+
+def set_import_specs(specs: dict[str, list[str]]) -> None:
+    """Store import specs by content key, dropping rows unused for a long time."""
+    if not specs:
+        return
+    now = time.time()
+    rows = [(key, json.dumps(value), now) for key, value in specs.items()]
+    try:
+        with _lock, tracing.span("cache.set", tracing.CACHE, import_specs=len(rows)):
+            conn = _connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO import_specs (key, specs, accessed_at) VALUES (?, ?, ?)",
+                    rows,
+                )
+                conn.execute(
+                    "DELETE FROM import_specs WHERE accessed_at < ?",
+                    (now - IMPORT_SPECS_EXPIRY_DAYS * 86400,),
+                )
+    except (sqlite3.Error, OSError):
         return
 
 
+def _evict_if_needed(conn: sqlite3.Connection) -> int:
+    """Drop least-recently-used entries once the cache exceeds CACHE_MAX_BYTES."""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if (page_count - free_pages) * page_size <= CACHE_MAX_BYTES:
+        return 0
+
+    live_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    excess = live_bytes - int(CACHE_MAX_BYTES * CACHE_EVICT_TARGET)
+    if excess <= 0:
+        return 0
+
+    victims: list[tuple[str]] = []
+    freed = 0
+    for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC"):
+        victims.append((key,))
+        freed += size
+        if freed >= excess:
+            break
+
+    with conn:
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+    return len(victims)
+
+
 def clear_cache() -> int:
     """Delete all cached results. Returns number of entries deleted."""
-    import shutil
-
     if not os.path.exists(CACHE_DIR):
         return 0
     try:
-        entries = len([f for f in os.listdir(CACHE_DIR) if f.endswith(".json")])
+        entries = cache_stats()["entries"]
+        wait_for_migration()
+        _close_connections()
         shutil.rmtree(CACHE_DIR)
         return entries
     except OSError:
@@ -73,13 +378,18 @@ def cache_stats() -> dict:
     if not os.path.exists(CACHE_DIR):
         return {"entries": 0, "size_mb": 0.0}
     try:
-        files = [f for f in os.listdir(CACHE_DIR) if f.endswith(".json")]
+        with _lock:
+            conn = _connect()
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        db_path = _db_path()
         total_size = sum(
-            os.path.getsize(os.path.join(CACHE_DIR, f)) for f in files
+            os.path.getsize(path)
+            for path in (db_path, f"{db_path}-wal")
+            if os.path.exists(path)
         )
         return {
-            "entries": len(files),
+            "entries": entries,
             "size_mb": round(total_size / 1024 / 1024, 2),
         }
-    except OSError:
+    except (sqlite3.Error, OSError):
         return {"entries": 0, "size_mb": 0.0}
@@ -0,0 +1,261 @@
+"""Syntax-aware chunking and map-reduce for files too big for one sub-LLM call.
+
+A file is cut at the coarsest boundaries that keep every chunk under the
+character budget: top-level definitions for Python (via ``ast``), headings
+and unindented blocks for other text, then nested definitions, then blank
+lines, and only as a last resort in the middle of a block. ``map_reduce``
+sends one prompt per chunk through ``llm_batch`` and merges the partial
+answers, in further ``llm_batch`` rounds if they do not fit in one prompt.
+
+``make_repl_helpers`` builds the ``chunk_file``/``llm_map_reduce`` functions
+of the REPL namespace (in-process and in the sandbox worker). Their budget
+is in tokens and is turned into characters per file from that file's own
+token density. They also read files the loader replaced with a
+``[FILE TOO LARGE ...]`` placeholder back from disk, via
+``metadata["root_path"]``.
+"""
+
+import ast
+import os
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+
+from .tokens import chars_for_tokens
+
+CHARS_PER_TOKEN = 4  # Only for character budgets chosen without the text at hand
+DEFAULT_CONTEXT_TOKENS = 32_000
+MAX_CHUNK_TOKENS = 16_000  # Smaller chunks get more focused answers
+MAX_MAP_REDUCE_CHARS = 2_000_000  # Oversize files are read up to this much
+
+# Context windows of the sub-models in SUB_MODEL_PRICING, in tokens.
+SUB_MODEL_CONTEXT_TOKENS = {
+    "minimax/minimax-m2.5": 196_000,
+    "deepseek/deepseek-chat-v3-0324": 64_000,
+    "qwen/qwen-2.5-coder-32b-instruct": 32_000,
+    "meta-llama/llama-3.3-70b-instruct": 128_000,
+    "google/gemini-2.0-flash-001": 1_000_000,
+}
+
+TOO_LARGE_PREFIX = "[FILE TOO LARGE"
+
+
+def chunk_tokens_for_model(model) -> int:
+    """Chunk budget in tokens for a sub-model, leaving room for the answer."""
+    context = SUB_MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+    return min(MAX_CHUNK_TOKENS, context // 4)
+
+
+DEFAULT_CHUNK_TOKENS = chunk_tokens_for_model(None)
+DEFAULT_CHUNK_CHARS = DEFAULT_CHUNK_TOKENS * CHARS_PER_TOKEN
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """A contiguous slice of a file; line numbers are 1-based and inclusive."""
+
+    path: str
+    index: int
+    count: int
+    start_line: int
+    end_line: int
+    text: str
+
+    @property
+    def label(self) -> str:
+        name = self.path or "text"
+        return f"{name} (part {self.index + 1}/{self.count}, lines {self.start_line}-{self.end_line})"
+
+
+def _python_levels(text: str) -> list[set[int]] | None:
+    """Boundary line indexes (0-based), coarse to fine, from the Python AST."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    lines = text.splitlines()
+
+    def _start(node: ast.stmt) -> int:
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+        # Keep the comment block directly above a definition with it.
+        while start > 0 and lines[start - 1].lstrip().startswith("#"):
+            start -= 1
+        return start
+
+    # Statement starts by nesting depth: module level, then class/def bodies.
+    levels: list[set[int]] = []
+    body = list(tree.body)
+    while body:
+        levels.append({_start(node) for node in body})
+        body = [
+            child
+            for node in body
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+            for child in node.body
+        ]
+    return levels
+
+
+def _text_levels(lines: list[str], path: str) -> list[set[int]]:
+    """Boundaries for non-Python text: headings/unindented blocks, then paragraphs."""
+    is_markdown = path.lower().endswith((".md", ".markdown", ".rst"))
+    blocks, paragraphs = set(), set()
+    for i, line in enumerate(lines):
+        after_blank = i > 0 and not lines[i - 1].strip()
+        if not line.strip():
+            continue
+        if is_markdown and line.startswith("#"):
+            blocks.add(i)
+        elif not is_markdown and after_blank and not line[0].isspace():
+            blocks.add(i)
+        if after_blank:
+            paragraphs.add(i)
+    return [blocks, paragraphs]
+
+
+def chunk_text(text: str, path: str = "", max_chars: int = DEFAULT_CHUNK_CHARS) -> list[Chunk]:
+    """Split ``text`` into chunks of at most ``max_chars``, at syntax boundaries."""
+    max_chars = max(max_chars, 1)
+    lines = text.splitlines(keepends=True)
+    if not lines:
+        return [Chunk(path, 0, 1, 1, 1, text)]
+
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    def size(start: int, end: int) -> int:
+        return offsets[end] - offsets[start]
+
+    levels = _python_levels(text) if path.endswith(".py") or not path else None
+    if levels is None:
+        levels = _text_levels([line.rstrip("\n") for line in lines], path)
+    levels.append(set(range(len(lines))))  # Any line break
+
+    def spans(start: int, end: int, depth: int) -> list[tuple[int, int]]:
+        if size(start, end) <= max_chars:
+            return [(start, end)]
+        if depth == len(levels):
+            return [(start, end)]  # A single overlong line; split by characters below
+        cuts = [start] + sorted(b for b in levels[depth] if start < b < end) + [end]
+        packed: list[tuple[int, int]] = []
+        current: tuple[int, int] | None = None
+        for unit_start, unit_end in zip(cuts, cuts[1:]):
+            if size(unit_start, unit_end) > max_chars:
+                if current:
+                    packed.append(current)
+                    current = None
+                packed.extend(spans(unit_start, unit_end, depth + 1))
+            elif current and size(current[0], unit_end) > max_chars:
+                packed.append(current)
+                current = (unit_start, unit_end)
+            else:
+                current = (current[0] if current else unit_start, unit_end)
+        if current:
+            packed.append(current)
+        return packed
+
+    pieces: list[tuple[int, int, str]] = []
+    for start, end in spans(0, len(lines), 0):
+        body = "".join(lines[start:end])
+        for offset in range(0, len(body), max_chars):
+            pieces.append((start + 1, end, body[offset:offset + max_chars]))
+    return [
+        Chunk(path, i, len(pieces), start, max(start, end), body)
+        for i, (start, end, body) in enumerate(pieces)
+    ]
+
+
+def _map_prompt(instruction: str, chunk: Chunk) -> str:
+    if chunk.count == 1:
+        return f"{instruction}\n\n## {chunk.path or 'Text'}\n\n{chunk.text}"
+    return (
+        f"{instruction}\n\n"
+        f"You are seeing only {chunk.label}. Report what this part shows; "
+        f"do not guess about the rest of the file.\n\n"
+        f"## {chunk.label}\n\n{chunk.text}"
+    )
+
+
+def _reduce_prompt(instruction: str, path: str, notes: list[str]) -> str:
+    parts = "\n\n".join(f"### Notes {i + 1}\n{note}" for i, note in enumerate(notes))
+    return (
+        f"{instruction}\n\n"
+        f"The file {path or '(text)'} was analysed in consecutive parts. Merge the "
+        f"notes below into one answer for the whole file: combine overlapping points, "
+        f"keep specifics (names, line numbers), and mention parts whose notes are "
+        f"errors.\n\n{parts}"
+    )
+
+
+def _group_notes(notes: list[str], max_chars: int) -> list[list[str]]:
+    """Pack notes into groups that fit one prompt, at least two per group."""
+    limit = max(max_chars // 2, 1)
+    notes = [note if len(note) <= limit else note[:limit] + "\n[...truncated]" for note in notes]
+    groups: list[list[str]] = []
+    for note in notes:
+        if groups and (
+            len(groups[-1]) < 2 or sum(map(len, groups[-1])) + len(note) <= max_chars
+        ):
+            groups[-1].append(note)
+        else:
+            groups.append([note])
+    if len(groups) > 1 and len(groups[-1]) == 1:
+        groups[-2].extend(groups.pop())
+    return groups
+
+
+def map_reduce(
+    text: str,
+    instruction: str,
+    batch: Callable[[list[str]], list[str]],
+    *,
+    path: str = "",
+    max_chars: int = DEFAULT_CHUNK_CHARS,
+) -> str:
+    """Answer ``instruction`` about ``text`` with one sub-LLM call per chunk, then merge."""
+    chunks = chunk_text(text, path, max_chars)
+    notes = batch([_map_prompt(instruction, chunk) for chunk in chunks])
+    while len(notes) > 1:
+        groups = _group_notes(notes, max_chars)
+        notes = batch([_reduce_prompt(instruction, path, group) for group in groups])
+    return notes[0]
+
+
+def read_document(documents: Mapping[str, str], metadata: dict, path: str) -> str:
+    """Content of ``path``, re-reading files the loader skipped as too large."""
+    text = documents[path]
+    root = metadata.get("root_path")
+    if not text.startswith(TOO_LARGE_PREFIX) or not root:
+        return text
+    root = os.path.realpath(root)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        raise ValueError(f"{path} is outside the analysed directory")
+    with open(full, encoding="utf-8", errors="replace") as handle:
+        content = handle.read(MAX_MAP_REDUCE_CHARS + 1)
+    if len(content) > MAX_MAP_REDUCE_CHARS:
+        content = content[:MAX_MAP_REDUCE_CHARS]
+        content += f"\n[... truncated after {MAX_MAP_REDUCE_CHARS:,} chars]"
+    return content
+
+
+def make_repl_helpers(
+    documents: Mapping[str, str],
+    metadata: dict,
+    batch: Callable[[list[str]], list[str]],
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+) -> dict[str, Callable]:
+    """``chunk_file`` and ``llm_map_reduce`` bound to one REPL's data."""
+
+    def chunk_file(path: str) -> list[Chunk]:
+        """Split a file into chunks sized for one sub-LLM call each."""
+        text = read_document(documents, metadata, path)
+        return chunk_text(text, path, chars_for_tokens(text, max_tokens))
+
+    def llm_map_reduce(path: str, instruction: str) -> str:
+        """Analyse a file of any size: chunk it, llm_batch the chunks, merge the answers."""
+        text = read_document(documents, metadata, path)
+        max_chars = chars_for_tokens(text, max_tokens)
+        return map_reduce(text, instruction, batch, path=path, max_chars=max_chars)
+
+    return {"chunk_file": chunk_file, "llm_map_reduce": llm_map_reduce}
@@ -4,6 +4,7 @@ CLI for deeprepo.
 Usage:
     deeprepo analyze /path/to/repo
     deeprepo analyze https://github.com/user/repo
+    deeprepo analyze-many repos.txt --parallel 8 --max-cost 50
     deeprepo baseline /path/to/repo
     deeprepo compare /path/to/repo
 """
@@ -15,6 +16,7 @@ import os
 import shutil
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from . import __version__
@@ -55,54 +57,181 @@ def cmd_analyze(args):
 
     get_domain(args.domain)  # Validate domain before deeper runtime imports/calls.
     from .rlm_scaffold import run_analysis
+    from .tracing import Tracer
 
     root_model = ROOT_MODEL_MAP.get(args.root_model, args.root_model)
 
-    result = run_analysis(
-        codebase_path=args.path,
-        verbose=not args.quiet,
-        max_turns=args.max_turns,
+    tracer = Tracer()
+    with tracer.activate():
+        result = run_analysis(
+            codebase_path=args.path,
+            verbose=not args.quiet,
+            max_turns=args.max_turns,
+            root_model=root_model,
+            sub_model=args.sub_model,
+            use_cache=not args.no_cache,
+            domain=args.domain,
+            sandbox=args.sandbox,
+            parallel_tool_calls=args.parallel_tools,
+        )
+
+    _write_analysis_outputs(
+        result,
+        repo=args.path,
+        domain=args.domain,
         root_model=root_model,
         sub_model=args.sub_model,
-        use_cache=not args.no_cache,
-        domain=args.domain,
+        output_dir=args.output_dir,
+        tracer=tracer,
     )
+    print(f"\n{result['usage'].summary()}")
 
-    # Save output
-    output_dir = Path(args.output_dir)
+
+def _repo_name(repo: str) -> str:
+    return Path(repo).name if not repo.startswith("http") else repo.split("/")[-1]
+
+
+def _write_analysis_outputs(
+    result: dict,
+    *,
+    repo: str,
+    domain: str,
+    root_model: str,
+    sub_model: str,
+    output_dir: str,
+    repo_name: str | None = None,
+    quiet: bool = False,
+    tracer=None,
+) -> tuple[Path, Path]:
+    """Write the analysis markdown and metrics JSON for one RLM run.
+
+    With a ``tracer`` (see ``deeprepo.tracing``), per-phase seconds are added
+    to the metrics and the spans are written to a ``_trace.json`` beside them.
+    """
+    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     timestamp = time.strftime("%Y%m%d_%H%M%S")
-    repo_name = Path(args.path).name if not args.path.startswith("http") else args.path.split("/")[-1]
-    domain_prefix = f"deeprepo_{args.domain}" if args.domain != "code" else "deeprepo"
+    repo_name = repo_name or _repo_name(repo)
+    domain_prefix = f"deeprepo_{domain}" if domain != "code" else "deeprepo"
 
     # Save analysis
     analysis_path = output_dir / f"{domain_prefix}_{repo_name}_{timestamp}.md"
     analysis_path.write_text(result["analysis"])
-    print(f"\n📄 Analysis saved to: {analysis_path}")
+    if not quiet:
+        print(f"\n📄 Analysis saved to: {analysis_path}")
 
     # Save metrics
     metrics = {
         "mode": "rlm",
-        "domain": args.domain,
+        "domain": domain,
         "root_model": root_model,
-        "sub_model": args.sub_model,
-        "repo": args.path,
+        "sub_model": sub_model,
+        "repo": repo,
         "turns": result["turns"],
         "root_calls": result["usage"].root_calls,
         "sub_calls": result["usage"].sub_calls,
         "root_input_tokens": result["usage"].root_input_tokens,
         "root_output_tokens": result["usage"].root_output_tokens,
+        "root_cache_read_tokens": result["usage"].root_cache_read_tokens,
+        "root_cache_write_tokens": result["usage"].root_cache_write_tokens,
         "sub_input_tokens": result["usage"].sub_input_tokens,
         "sub_output_tokens": result["usage"].sub_output_tokens,
+        "sub_memo_hits": result["usage"].sub_memo_hits,
+        "sub_coalesced": result["usage"].sub_coalesced,
+        "sub_cache_hits": result["usage"].sub_cache_hits,
+        "sub_cache_misses": result["usage"].sub_cache_misses,
         "root_cost": result["usage"].root_cost,
         "sub_cost": result["usage"].sub_cost,
         "total_cost": result["usage"].total_cost,
     }
+    if tracer is not None:
+        metrics["phase_seconds"] = tracer.phase_seconds()
     metrics_path = output_dir / f"{domain_prefix}_{repo_name}_{timestamp}_metrics.json"
     metrics_path.write_text(json.dumps(metrics, indent=2))
-    print(f"📊 Metrics saved to: {metrics_path}")
-    print(f"\n{result['usage'].summary()}")
+    if not quiet:
+        print(f"📊 Metrics saved to: {metrics_path}")
+
+    if tracer is not None:
+        trace_path = output_dir / f"{domain_prefix}_{repo_name}_{timestamp}_trace.json"
+        tracer.write(trace_path, repo=repo, domain=domain, root_model=root_model, sub_model=sub_model)
+        if not quiet:
+            print(f"⏱️  Trace saved to: {trace_path}")
+    return analysis_path, metrics_path
+
+
+def cmd_analyze_many(args):
+    """Run RLM analysis over every repository listed in a manifest file."""
+    import asyncio
+
+    from .domains import get_domain
+
+    get_domain(args.domain)  # Validate domain before deeper runtime imports/calls.
+    from .batch_runner import BatchBudget, parse_manifest, run_many, summarize
+
+    root_model = ROOT_MODEL_MAP.get(args.root_model, args.root_model)
+    repos = parse_manifest(Path(args.manifest).read_text(encoding="utf-8"))
+    if not repos:
+        print(f"No repositories listed in {args.manifest}")
+        sys.exit(1)
+
+    # Repos with the same basename (e.g. two checkouts of "api") get a suffix
+    # so their output files don't collide.
+    names: dict[str, str] = {}
+    seen: dict[str, int] = {}
+    for repo in repos:
+        base = _repo_name(repo.rstrip("/"))
+        seen[base] = seen.get(base, 0) + 1
+        names[repo] = base if seen[base] == 1 else f"{base}_{seen[base]}"
+
+    def _on_complete(repo: str, result: dict | None, entry: dict) -> dict | None:
+        if not args.quiet:
+            cost = entry.get("total_cost", 0.0)
+            detail = entry.get("error") or f"{entry.get('turns', 0)} turns"
+            print(f"[{entry['status']}] {repo} — {detail}, ${cost:.4f}")
+        if result is None:
+            return None
+        analysis_path, metrics_path = _write_analysis_outputs(
+            result,
+            repo=repo,
+            domain=args.domain,
+            root_model=root_model,
+            sub_model=args.sub_model,
+            output_dir=args.output_dir,
+            repo_name=names[repo],
+            quiet=True,
+        )
+        return {"analysis_path": str(analysis_path), "metrics_path": str(metrics_path)}
+
+    budget = BatchBudget(max_sub_concurrent=args.max_sub_concurrent, max_cost=args.max_cost)
+    if not args.quiet:
+        print(f"Analyzing {len(repos)} repositories ({args.parallel} at a time)...")
+
+    t0 = time.perf_counter()
+    entries = asyncio.run(
+        run_many(
+            repos,
+            domain=args.domain,
+            root_model=root_model,
+            sub_model=args.sub_model,
+            max_turns=args.max_turns,
+            use_cache=not args.no_cache,
+            sandbox=args.sandbox,
+            parallel=args.parallel,
+            budget=budget,
+            on_complete=_on_complete,
+        )
+    )
+    summary = summarize(entries, budget, time.perf_counter() - t0)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    summary_path = output_dir / f"deeprepo_batch_{time.strftime('%Y%m%d_%H%M%S')}_summary.json"
+    summary_path.write_text(json.dumps(summary, indent=2))
+
+    counts = ", ".join(f"{count} {status}" for status, count in sorted(summary["status_counts"].items()))
+    print(f"\n📦 {len(entries)} repositories: {counts}. Total cost: ${summary['total_cost']:.4f}")
+    print(f"📊 Batch summary saved to: {summary_path}")
 
 
 def cmd_baseline(args):
@@ -152,8 +281,15 @@ def cmd_baseline(args):
     print(f"\n{result['usage'].summary()}")
 
 
+def _timed(fn, *args, **kwargs):
+    """Call ``fn`` and return ``(result, elapsed_seconds)``."""
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
 def cmd_compare(args):
-    """Run both RLM and baseline, then compare."""
+    """Run RLM and baseline concurrently on one load of the input, then compare."""
     from .domains import get_domain
 
     domain_config = get_domain(args.domain)
@@ -177,28 +313,59 @@ def cmd_compare(args):
         print(f"Cloned to {actual_path}")
 
     try:
-        print(f"\nRunning RLM analysis (root: {rlm_model})...")
-        print("=" * 60)
+        # Both pipelines read the same input: load it once and share it.
+        data, load_seconds = _timed(domain_config.loader, actual_path)
+        print(f"Loaded {data['metadata']['total_files']} files in {load_seconds:.1f}s")
+        documents = data[domain_config.data_variable_name]
+        # The RLM's REPL code may modify its documents dict; the baseline gets
+        # its own (shallow) copy. Lazy codebases are read-only and shared.
+        baseline_data = data
+        if isinstance(documents, dict):
+            baseline_data = {**data, domain_config.data_variable_name: dict(documents)}
 
-        rlm_result = run_analysis(
-            codebase_path=actual_path,
-            verbose=not args.quiet,
-            max_turns=args.max_turns,
-            root_model=rlm_model,
-            sub_model=args.sub_model,
-            use_cache=not args.no_cache,
-            domain=args.domain,
+        print(
+            f"\nRunning RLM analysis (root: {rlm_model}) and baseline analysis "
+            f"(root: {baseline_model}) concurrently..."
         )
-
-        print(f"\n\nRunning baseline analysis (root: {baseline_model})...")
         print("=" * 60)
 
-        baseline_result = run_baseline(
+        # The two pipelines share nothing but input and mostly wait on the
+        # network, so the baseline runs on a worker thread meanwhile. The RLM
+        # stays on this thread: its REPL timeout needs SIGALRM, which only
+        # the main thread receives, and Ctrl-C must reach it. The baseline
+        # runs quietly so the RLM's progress output stays readable; the
+        # comparison below reports on both.
+        t0 = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="deeprepo-compare")
+        baseline_future = pool.submit(
+            _timed,
+            run_baseline,
             codebase_path=actual_path,
-            verbose=not args.quiet,
+            verbose=False,
             root_model=baseline_model,
             domain=args.domain,
+            data=baseline_data,
         )
+        try:
+            rlm_result, rlm_seconds = _timed(
+                run_analysis,
+                codebase_path=actual_path,
+                verbose=not args.quiet,
+                max_turns=args.max_turns,
+                root_model=rlm_model,
+                sub_model=args.sub_model,
+                use_cache=not args.no_cache,
+                domain=args.domain,
+                data=data,
+            )
+        except BaseException:
+            # Don't hold an interrupted or failed run up for the baseline.
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        # Wait for the baseline before the clone is removed.
+        baseline_result, baseline_seconds = baseline_future.result()
+        pool.shutdown()
+        concurrent_seconds = time.perf_counter() - t0
     finally:
         if is_temp:
             shutil.rmtree(actual_path, ignore_errors=True)
@@ -210,6 +377,7 @@ def cmd_compare(args):
     repo_name = Path(args.path).name
     rlm_prefix = f"deeprepo_{args.domain}" if args.domain != "code" else "deeprepo"
     baseline_prefix = f"baseline_{args.domain}" if args.domain != "code" else "baseline"
+    compare_prefix = f"compare_{args.domain}" if args.domain != "code" else "compare"
 
     (output_dir / f"{rlm_prefix}_{repo_name}_{timestamp}.md").write_text(rlm_result["analysis"])
     (output_dir / f"{baseline_prefix}_{repo_name}_{timestamp}.md").write_text(
@@ -228,12 +396,15 @@ def cmd_compare(args):
         "sub_calls": rlm_result["usage"].sub_calls,
         "root_input_tokens": rlm_result["usage"].root_input_tokens,
         "root_output_tokens": rlm_result["usage"].root_output_tokens,
+        "root_cache_read_tokens": rlm_result["usage"].root_cache_read_tokens,
+        "root_cache_write_tokens": rlm_result["usage"].root_cache_write_tokens,
         "sub_input_tokens": rlm_result["usage"].sub_input_tokens,
         "sub_output_tokens": rlm_result["usage"].sub_output_tokens,
         "root_cost": rlm_result["usage"].root_cost,
         "sub_cost": rlm_result["usage"].sub_cost,
         "total_cost": rlm_result["usage"].total_cost,
         "analysis_chars": len(rlm_result["analysis"]),
+        "elapsed_seconds": rlm_seconds,
     }
     baseline_metrics = {
         "mode": "baseline",
@@ -257,6 +428,31 @@ def cmd_compare(args):
     (output_dir / f"{baseline_prefix}_{repo_name}_{timestamp}_metrics.json").write_text(
         json.dumps(baseline_metrics, indent=2)
     )
+    # Both pipelines run one after the other, from the same load. A second
+    # load is not counted: with a warm loader snapshot it costs little, and
+    # guessing its cost would overstate the saving.
+    sequential_seconds = load_seconds + rlm_seconds + baseline_seconds
+    wall_seconds = load_seconds + concurrent_seconds
+    compare_metrics = {
+        "mode": "compare",
+        "domain": args.domain,
+        "repo": args.path,
+        "rlm_root_model": rlm_model,
+        "baseline_root_model": baseline_model,
+        "load_seconds": round(load_seconds, 3),
+        "rlm_seconds": round(rlm_seconds, 3),
+        "baseline_seconds": round(baseline_seconds, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        # Time the two pipelines spent running at the same time.
+        "overlap_seconds": round(rlm_seconds + baseline_seconds - concurrent_seconds, 3),
+        "sequential_seconds": round(sequential_seconds, 3),
+        "saved_seconds": round(sequential_seconds - wall_seconds, 3),
+        "rlm_total_cost": rlm_result["usage"].total_cost,
+        "baseline_total_cost": baseline_result["usage"].total_cost,
+    }
+    (output_dir / f"{compare_prefix}_{repo_name}_{timestamp}_metrics.json").write_text(
+        json.dumps(compare_metrics, indent=2)
+    )
 
     # Print comparison
     print("\n" + "=" * 60)
@@ -272,11 +468,17 @@ def cmd_compare(args):
     print(f"{'Sub-LLM calls':<30} {rlm_result['usage'].sub_calls:<25} {'N/A':<25}")
     print(f"{'Sub tokens (in/out)':<30} {rlm_result['usage'].sub_input_tokens:,}/{rlm_result['usage'].sub_output_tokens:,} {'':<5} {'N/A':<25}")
     print(f"{'REPL turns':<30} {rlm_result['turns']:<25} {'1':<25}")
+    print(f"{'Elapsed (s)':<30} {rlm_seconds:<25.1f} {baseline_seconds:<25.1f}")
     print(f"{'Analysis length (chars)':<30} {len(rlm_result['analysis']):,}{'':<19} {len(baseline_result['analysis']):,}")
 
     if baseline_result.get("excluded_files"):
         print(f"{'Files excluded (context limit)':<30} {'0':<25} {len(baseline_result['excluded_files']):<25}")
 
+    print(
+        f"\nWall time: {wall_seconds:.1f}s (load {load_seconds:.1f}s, shared), "
+        f"{compare_metrics['saved_seconds']:.1f}s less than running both pipelines "
+        f"one after the other on the same load"
+    )
     print(f"\nOutputs saved to: {output_dir}/")
 
 
@@ -355,36 +557,75 @@ def main():
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
 
     # Common arguments
-    common = argparse.ArgumentParser(add_help=False)
-    common.add_argument("path", help="Path to data directory or git URL")
-    common.add_argument("-o", "--output-dir", default="outputs", help="Output directory")
-    common.add_argument("-q", "--quiet", action="store_true", help="Suppress verbose output")
-    common.add_argument(
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("-o", "--output-dir", default="outputs", help="Output directory")
+    options.add_argument("-q", "--quiet", action="store_true", help="Suppress verbose output")
+    options.add_argument(
         "--domain",
         default="code",
         help="Analysis domain (default: code). Use 'list-domains' to see options.",
     )
-    common.add_argument(
+    options.add_argument(
         "--root-model",
         default="sonnet",
         help="Root model: opus, sonnet (default), minimax, or a full model string like claude-opus-4-6",
     )
-    common.add_argument(
+    options.add_argument(
         "--sub-model",
         default=DEFAULT_SUB_MODEL,
         help=f"Sub-LLM model for file analysis (default: {DEFAULT_SUB_MODEL}). Any OpenRouter model string.",
     )
-    common.add_argument(
+    options.add_argument(
         "--no-cache",
         action="store_true",
         help="Bypass sub-LLM result cache (forces fresh API calls)",
     )
+    common = argparse.ArgumentParser(add_help=False, parents=[options])
+    common.add_argument("path", help="Path to data directory or git URL")
 
     # analyze command
     p_analyze = subparsers.add_parser("analyze", parents=[common], help="Run RLM analysis")
     p_analyze.add_argument("--max-turns", type=int, default=20, help="Max REPL turns")
+    p_analyze.add_argument(
+        "--sandbox",
+        action="store_true",
+        help="Run model-written REPL code in an isolated worker process with CPU/memory limits",
+    )
+    p_analyze.add_argument(
+        "--parallel-tools",
+        action="store_true",
+        help="Run independent execute_python calls from one response concurrently",
+    )
     p_analyze.set_defaults(func=cmd_analyze)
 
+    # analyze-many command
+    p_many = subparsers.add_parser(
+        "analyze-many", parents=[options], help="Run RLM analysis on every repo in a manifest"
+    )
+    p_many.add_argument("manifest", help="File listing one repo path or git URL per line (# comments allowed)")
+    p_many.add_argument("--max-turns", type=int, default=20, help="Max REPL turns per repo")
+    p_many.add_argument(
+        "--sandbox",
+        action="store_true",
+        help="Run model-written REPL code in an isolated worker process with CPU/memory limits",
+    )
+    p_many.add_argument(
+        "--parallel", type=int, default=4, help="Repositories analyzed at the same time (default: 4)"
+    )
+    p_many.add_argument(
+        "--max-sub-concurrent",
+        type=int,
+        default=16,
+        help="Sub-LLM calls in flight across all repos (default: 16)",
+    )
+    p_many.add_argument(
+        "--max-cost",
+        type=float,
+        default=None,
+        help="Stop starting new turns and repos once total spend reaches this many USD",
+    )
+    p_many.set_defaults(func=cmd_analyze_many)
+
     # baseline command
     p_baseline = subparsers.add_parser("baseline", parents=[common], help="Run single-model baseline")
     p_baseline.set_defaults(func=cmd_baseline)
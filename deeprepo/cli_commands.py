@@ -1,5 +1,6 @@
 """Command handlers for new deeprepo CLI commands."""
 
+from dataclasses import replace
 from datetime import datetime, timezone
 import hashlib
 import logging
@@ -9,9 +10,11 @@ import re
 import shutil
 import subprocess
 import sys
+import time
 
 from .config_manager import ProjectState
 from . import terminal_ui as ui
+from .tokens import count_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +33,8 @@ def cmd_init(args, *, quiet=None):
     """Run context domain analysis and generate .deeprepo/ directory."""
     from .config_manager import ConfigManager, ProjectConfig
     from .context_generator import ContextGenerator
+    from .git_changes import git_snapshot
+    from .incremental import seed_findings
     from .rlm_scaffold import run_analysis
 
     project_path = getattr(args, "path", ".") or "."
@@ -94,6 +99,9 @@ def cmd_init(args, *, quiet=None):
         ui.print_msg("Analyzing project with context domain...")
         ui.print_msg()
 
+    # Snapshot before analysing so edits made during the run show up as changes.
+    snapshot = git_snapshot(Path(project_path))
+    file_hashes, file_stats = scan_file_hashes(Path(project_path))
     result = run_analysis(
         codebase_path=project_path,
         verbose=not quiet,
@@ -103,12 +111,13 @@ def cmd_init(args, *, quiet=None):
         use_cache=True,
         domain="context",
     )
-
     state = cm.load_state()
     state.analysis_cost = result["usage"].total_cost
     state.analysis_turns = result["turns"]
     state.sub_llm_dispatches = result["usage"].sub_calls
     state.last_refresh = datetime.now(timezone.utc).isoformat()
+    state.file_hashes, state.file_stats = file_hashes, file_stats
+    state.last_commit, state.dirty_files = snapshot or ("", [])
     if not state.created_with:
         state.created_with = "init"
     if not state.original_intent:
@@ -118,6 +127,12 @@ def cmd_init(args, *, quiet=None):
     generated_files = generator.generate(result["analysis"], state)
     cm.save_state(state)
 
+    # Give the first incremental refresh stored findings to reuse. The
+    # analysis is saved first: seeding is optional and may fail.
+    seed_usage = seed_findings(
+        project_path, replace(config, sub_model=sub_model), file_hashes, verbose=not quiet
+    )
+
     analysis_status = result.get("status", "completed")
 
     if not quiet:
@@ -147,6 +162,11 @@ def cmd_init(args, *, quiet=None):
                 turns=result["turns"],
                 max_turns=max_turns,
             )
+        if seed_usage.total_cost:
+            ui.print_msg(
+                f"Recording findings for incremental refreshes cost another "
+                f"${seed_usage.total_cost:.4f}"
+            )
 
     return {
         "status": "success",
@@ -155,6 +175,7 @@ def cmd_init(args, *, quiet=None):
             "project_name": config.project_name,
             "project_path": project_path,
             "cost": result["usage"].total_cost,
+            "seed_cost": seed_usage.total_cost,
             "turns": result["turns"],
             "sub_dispatches": result["usage"].sub_calls,
             "analysis_status": analysis_status,
@@ -313,7 +334,7 @@ def cmd_context(args, *, quiet=False):
     if copy_flag:
         try:
             _copy_to_clipboard(content)
-            token_est = len(content) // 4
+            token_est = count_tokens(content)
             if not quiet:
                 ui.print_context_copied(token_est)
             return {
@@ -328,7 +349,7 @@ def cmd_context(args, *, quiet=False):
             }
         except Exception:
             logger.debug("Clipboard copy failed in cmd_context", exc_info=True)
-            token_est = len(content) // 4
+            token_est = count_tokens(content)
             if not quiet:
                 ui.print_msg("Could not copy to clipboard. Printing to stdout instead:")
                 ui.print_msg()
@@ -346,7 +367,7 @@ def cmd_context(args, *, quiet=False):
 
     if not quiet:
         ui.print_msg(content)
-    token_est = len(content) // 4
+    token_est = count_tokens(content)
     return {
         "status": "success",
         "message": "Context output",
@@ -651,6 +672,7 @@ def cmd_refresh(args, *, quiet=None):
 
     engine = RefreshEngine(project_path, config, state)
 
+    changes = None
     if not full:
         changes = engine.get_changes()
         changed_count = (
@@ -680,7 +702,7 @@ def cmd_refresh(args, *, quiet=None):
         ui.print_msg(f"Running {mode} refresh...")
         ui.print_msg()
 
-    result = engine.refresh(full=full)
+    result = engine.refresh(full=full, changes=changes)
     cm.save_state(state)
     refresh_status = result.get("status", "refreshed")
 
@@ -705,6 +727,11 @@ def cmd_refresh(args, *, quiet=None):
                 turns=result["turns"],
                 max_turns=config.max_turns,
             )
+        if result.get("seed_cost"):
+            ui.print_msg(
+                f"Recording findings for incremental refreshes cost another "
+                f"${result['seed_cost']:.4f}"
+            )
 
     if refresh_status in ("completed", "refreshed"):
         message = f"Refreshed {result['changed_files']} files"
@@ -721,6 +748,7 @@ def cmd_refresh(args, *, quiet=None):
         "data": {
             "changed_files": result["changed_files"],
             "cost": result["cost"],
+            "seed_cost": result.get("seed_cost", 0.0),
             "turns": result["turns"],
             "refresh_status": refresh_status,
         },
@@ -737,9 +765,25 @@ def _parse_stack_string(stack_str: str) -> dict:
 
 
 def get_changed_files(project_path: Path, state: ProjectState) -> dict:
-    """Compare current file hashes against .state.json."""
-    current_hashes = compute_file_hashes(project_path)
+    """Compare current file hashes against .state.json.
+
+    In a git work tree with a recorded ``state.last_commit`` only the paths git
+    reports as changed are hashed (see ``git_changes.detect_changes``).
+    Otherwise files whose (size, mtime_ns, inode) matches ``state.file_stats``
+    reuse the stored hash instead of being re-read. The returned dict also
+    carries ``current_hashes`` and ``current_stats`` so callers can persist
+    them, and ``backend`` ("git" or "scan").
+    """
+    from .git_changes import detect_changes
+
+    git_changes = detect_changes(project_path, state)
+    if git_changes is not None:
+        return git_changes
+
     old_hashes = state.file_hashes or {}
+    current_hashes, current_stats = scan_file_hashes(
+        project_path, old_hashes, state.file_stats or {}
+    )
 
     modified: list[str] = []
     added: list[str] = []
@@ -759,15 +803,74 @@ def get_changed_files(project_path: Path, state: ProjectState) -> dict:
         "modified": sorted(modified),
         "added": sorted(added),
         "deleted": sorted(deleted),
+        "current_hashes": current_hashes,
+        "current_stats": current_stats,
+        "backend": "scan",
     }
 
 
 def compute_file_hashes(project_path: Path) -> dict[str, str]:
     """SHA-256 hash files using codebase_loader-compatible include rules."""
-    from .codebase_loader import ALL_EXTENSIONS, EXTENSIONLESS_FILES, SKIP_DIRS
+    return scan_file_hashes(project_path)[0]
+
+
+# A file modified within this window of the scan could change again inside the
+# same mtime tick without its stat signature moving, so it is always rehashed
+# next time (the same "racily clean" rule git applies to its index).
+_RACY_WINDOW_NS = 2_000_000_000
+
 
+def _hash_file(file_path: Path) -> str | None:
+    try:
+        with open(file_path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    except (OSError, PermissionError):
+        logger.debug("Failed to hash file during status/refresh diff scan", exc_info=True)
+        return None
+
+
+def _stat_signature(file_path: Path) -> list[int] | None:
+    """``[size, mtime_ns, inode]``, or None if unreadable or too recently modified to trust."""
+    try:
+        st = file_path.stat()
+    except OSError:
+        return None
+    if time.time_ns() - st.st_mtime_ns <= _RACY_WINDOW_NS:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def scan_file_hashes(
+    project_path: Path,
+    known_hashes: dict[str, str] | None = None,
+    known_stats: dict[str, list[int]] | None = None,
+    workers: int | None = None,
+) -> tuple[dict[str, str], dict[str, list[int]]]:
+    """Hash tracked files, reusing ``known_hashes`` where the stat signature is unchanged.
+
+    Returns ``(hashes, stats)`` where ``stats`` maps each path to
+    ``[size, mtime_ns, inode]``. Files that do need hashing are read on a
+    thread pool.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .codebase_loader import (
+        ALL_EXTENSIONS,
+        DEFAULT_LOAD_WORKERS,
+        EXTENSIONLESS_FILES,
+        PARALLEL_LOAD_MIN_FILES,
+        SKIP_DIRS,
+    )
+
+    project_path = Path(project_path)
+    known_hashes = known_hashes or {}
+    known_stats = known_stats or {}
     skip_dirs = set(SKIP_DIRS) | {".deeprepo"}
+    scan_started_ns = time.time_ns()
+
     hashes: dict[str, str] = {}
+    stats: dict[str, list[int]] = {}
+    to_hash: list[tuple[str, Path]] = []
 
     for dirpath, dirnames, filenames in os.walk(project_path):
         dirnames[:] = [dirname for dirname in dirnames if dirname not in skip_dirs]
@@ -780,15 +883,34 @@ def compute_file_hashes(project_path: Path) -> dict[str, str]:
                 continue
 
             try:
-                digest = hashlib.sha256(file_path.read_bytes()).hexdigest()
+                st = file_path.stat()
             except (OSError, PermissionError):
-                logger.debug("Failed to hash file during status/refresh diff scan", exc_info=True)
+                logger.debug("Failed to stat file during status/refresh diff scan", exc_info=True)
                 continue
 
             relative = str(file_path.relative_to(project_path))
-            hashes[relative] = digest
+            signature = [st.st_size, st.st_mtime_ns, st.st_ino]
+            if scan_started_ns - st.st_mtime_ns > _RACY_WINDOW_NS:
+                stats[relative] = signature
+            if known_stats.get(relative) == signature and relative in known_hashes:
+                hashes[relative] = known_hashes[relative]
+            else:
+                to_hash.append((relative, file_path))
+
+    workers = workers if workers is not None else DEFAULT_LOAD_WORKERS
+    if workers > 1 and len(to_hash) >= PARALLEL_LOAD_MIN_FILES:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            digests = list(pool.map(_hash_file, (path for _, path in to_hash)))
+    else:
+        digests = [_hash_file(path) for _, path in to_hash]
+
+    for (relative, _), digest in zip(to_hash, digests):
+        if digest is None:
+            stats.pop(relative, None)
+            continue
+        hashes[relative] = digest
 
-    return hashes
+    return dict(sorted(hashes.items())), stats
 
 
 def _format_age(hours: float) -> str:
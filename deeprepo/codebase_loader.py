@@ -3,15 +3,33 @@ Codebase Loader for deeprepo.
 
 Loads a codebase (from local path or git URL) into a structured format:
 - file_tree: visual directory structure
+- prompt_tree: the same tree fitted to a token budget for the root prompt
 - metadata: stats about the repo
 - codebase: dict mapping filepath → content (stored in REPL, NOT in model context)
 """
 
+import mmap
 import os
 import subprocess
 import tempfile
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from collections import Counter
+from typing import Callable, NamedTuple
+
+from .file_tree import PROMPT_TREE_TOKENS, build_trees
+from .import_graph import (
+    ImportGraph,
+    build_import_graph,
+    content_digest,
+    go_module_path,
+    most_imported,
+    strongly_connected_components,
+)
+from .snapshot import Snapshot, SnapshotEntry, write_snapshot_async
 
 # File extensions to include in analysis
 CODE_EXTENSIONS = {
@@ -56,6 +74,34 @@ SKIP_DIRS = {
 # Max file size to include (500KB — skip giant generated files)
 MAX_FILE_SIZE = 500_000
 
+# Thread pool size for file ingestion. Reads are I/O-bound, so oversubscribe cores.
+DEFAULT_LOAD_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Below this many files the pool overhead outweighs the overlap it buys.
+PARALLEL_LOAD_MIN_FILES = 64
+
+# Once loaded text exceeds this many chars, switch to a lazy, mmap-backed
+# codebase instead of keeping every file's decoded string alive for the run.
+LAZY_LOAD_THRESHOLD_CHARS = 256_000_000
+
+# Decoded file strings kept alive by a LazyCodebase (LRU).
+LAZY_DECODED_CACHE_SIZE = 512
+
+
+class _LoadedFile(NamedTuple):
+    """Result of ingesting one file: content plus the stats computed alongside it."""
+
+    rel_path: str
+    ext: str
+    content: str
+    chars: int
+    lines: int
+    loaded: bool  # False for placeholders (too large / read error)
+    has_main_guard: bool
+    digest: str | None = None  # Content hash (loaded files only)
+    signature: tuple[int, int] | None = None  # (size, mtime_ns) when it was read
+    reused: bool = False  # Restored from the previous snapshot instead of read
+
 
 def clone_repo(url: str, target_dir: str | None = None) -> str:
     """Clone a git repo and return the path."""
@@ -73,14 +119,114 @@ def clone_repo(url: str, target_dir: str | None = None) -> str:
     return target_dir
 
 
-def load_codebase(path: str) -> dict:
+class LazyCodebase(Mapping):
+    """Read-only ``{filepath: content}`` mapping that decodes files on access.
+
+    Files are mmap'd and decoded the first time they are looked up; the most
+    recently used ``cache_size`` strings are kept, everything else is left
+    on disk. Placeholders (too large / read error) are stored eagerly.
+    Content reflects the file at access time, not at load time.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        entries: dict[str, str | None],
+        cache_size: int = LAZY_DECODED_CACHE_SIZE,
+    ):
+        self._root = Path(root)
+        self._entries = entries  # rel_path -> placeholder text, or None if lazy
+        self._cache_size = max(cache_size, 1)
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str) -> str:
+        placeholder = self._entries[key]
+        if placeholder is not None:
+            return placeholder
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        try:
+            content = _read_mapped(self._root / key)
+        except OSError as e:
+            return f"[READ ERROR: {e}]"
+
+        with self._lock:
+            self._cache[key] = content
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return content
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __repr__(self) -> str:
+        return f"<LazyCodebase {self._root.name}: {len(self._entries)} files>"
+
+
+def _read_mapped(filepath: Path) -> str:
+    """Decode a file through mmap, matching ``Path.read_text`` newline handling.
+
+    The decoder reads the mapped pages directly; no intermediate ``bytes``
+    copy of the file is made.
+    """
+    with open(filepath, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            text = str(mapped, "utf-8", "replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def load_codebase(
+    path: str,
+    workers: int | None = None,
+    progress: Callable[[int, int], None] | None = None,
+    lazy: bool | None = None,
+    snapshot: bool = True,
+    tree_tokens: int = PROMPT_TREE_TOKENS,
+) -> dict:
     """
     Load a codebase from a local path.
-    
+
+    Files are stat'ed, read and decoded on a thread pool so I/O overlaps
+    across files; per-file stats (chars, lines, ``__main__`` guard, content
+    hash) are computed in the same pass instead of re-scanning every string
+    afterwards. The import graph is then built from cached per-file specs
+    (see ``deeprepo.import_graph``), so only changed files are re-parsed.
+
+    Unless disabled, the result is also stored as a snapshot (see
+    ``deeprepo.snapshot``): later loads only re-read files whose size or
+    mtime changed, and reuse the tree and metadata when nothing did.
+
+    Args:
+        path: Local directory to load
+        workers: Ingestion threads (default: DEFAULT_LOAD_WORKERS; 1 = serial)
+        progress: Optional callback invoked as ``progress(done, total)``
+        lazy: Return a LazyCodebase instead of a dict. ``None`` (default)
+            switches to lazy once loaded text exceeds LAZY_LOAD_THRESHOLD_CHARS.
+        snapshot: Read and update the persistent load snapshot. Lazy loads
+            never use one.
+        tree_tokens: Token budget for ``prompt_tree``. ``file_tree`` always
+            lists every file.
+
     Returns:
         {
-            "codebase": {filepath: content, ...},
+            "codebase": {filepath: content, ...} (or a LazyCodebase),
             "file_tree": "visual tree string",
+            "prompt_tree": "file_tree fitted to tree_tokens, for the root prompt",
             "metadata": {
                 "total_files": int,
                 "total_chars": int,
@@ -88,108 +234,265 @@ def load_codebase(path: str) -> dict:
                 "file_types": {".py": count, ...},
                 "largest_files": [(path, chars), ...],
                 "entry_points": [paths...],
+                "import_graph": {path: [imported repo paths...], ...},
             }
         }
     """
     root = Path(path).resolve()
+    candidates = _collect_candidates(root)
+    go_module = _read_go_module(root)
+
+    use_snapshot = snapshot and lazy is not True
+    settings = {"max_file_size": MAX_FILE_SIZE, "go_module": go_module, "tree_tokens": tree_tokens}
+    previous = Snapshot.read(root, settings) if use_snapshot else None
+    ingest = partial(_ingest_file, snapshot=previous)
+    entries: dict[str, SnapshotEntry] = {}
+    fresh: dict[str, str] = {}  # digest -> content of files read from disk
+    placeholders: dict[str, str] = {}
+    reread = 0
+
     codebase = {}
+    lazy_entries: dict[str, str | None] = {}  # rel_path -> placeholder or None
+    spilled = lazy is True
     file_types = Counter()
     file_sizes = []
-
-    for dirpath, dirnames, filenames in os.walk(root):
-        # Skip excluded directories (modifies in-place to prevent recursion)
-        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
-
-        for filename in sorted(filenames):
-            filepath = Path(dirpath) / filename
-            ext = filepath.suffix.lower()
-
-            if ext not in ALL_EXTENSIONS and filename not in EXTENSIONLESS_FILES:
-                continue
-
-            rel_path = str(filepath.relative_to(root))
-
-            try:
-                size = filepath.stat().st_size
-                if size > MAX_FILE_SIZE:
-                    codebase[rel_path] = f"[FILE TOO LARGE: {size:,} bytes, skipped]"
-                    continue
-
-                content = filepath.read_text(encoding="utf-8", errors="replace")
-                codebase[rel_path] = content
-                file_types[ext] += 1
-                file_sizes.append((rel_path, len(content)))
-            except (OSError, UnicodeDecodeError) as e:
-                codebase[rel_path] = f"[READ ERROR: {e}]"
-
-    if not codebase:
+    main_guard_files = []
+    digests: dict[str, str] = {}
+    total_chars = 0
+    total_lines = 0
+
+    for done, loaded in enumerate(_ingest_files(candidates, workers, ingest), start=1):
+        lazy_entries[loaded.rel_path] = None if loaded.loaded else loaded.content
+        if not spilled:
+            codebase[loaded.rel_path] = loaded.content
+            if lazy is None and total_chars + loaded.chars > LAZY_LOAD_THRESHOLD_CHARS:
+                # Too big to keep resident: drop decoded strings, decode on access.
+                spilled = True
+                codebase.clear()
+                fresh.clear()  # Lazy codebases are not snapshotted
+        if not loaded.loaded:
+            placeholders[loaded.rel_path] = loaded.content
+        elif use_snapshot and not spilled:
+            size, mtime_ns = loaded.signature
+            entries[loaded.rel_path] = SnapshotEntry(
+                size, mtime_ns, loaded.digest, loaded.ext,
+                loaded.chars, loaded.lines, loaded.has_main_guard,
+            )
+            if not loaded.reused:
+                fresh[loaded.digest] = loaded.content
+        reread += loaded.loaded and not loaded.reused
+        total_chars += loaded.chars
+        total_lines += loaded.lines
+        if loaded.loaded:
+            file_types[loaded.ext] += 1
+            file_sizes.append((loaded.rel_path, loaded.chars))
+        if loaded.has_main_guard:
+            main_guard_files.append(loaded.rel_path)
+        if loaded.loaded:
+            digests[loaded.rel_path] = loaded.digest
+        if progress is not None:
+            progress(done, len(candidates))
+
+    if spilled:
+        codebase = LazyCodebase(root, lazy_entries)
+
+    if not lazy_entries:
         raise ValueError(
             f"No supported files found in {root}. "
             f"Check the path and ensure it contains source code files."
         )
 
-    # Build file tree
-    file_tree = _build_tree(root, codebase.keys())
+    if (
+        previous is not None
+        and not spilled
+        and not reread
+        and entries.keys() == previous.entries.keys()
+        and placeholders == previous.placeholders
+    ):
+        # Nothing changed since the snapshot: its tree and metadata still hold.
+        previous.touch()  # Not rewritten, but still in use
+        return {
+            "codebase": codebase,
+            "file_tree": previous.file_tree,
+            "prompt_tree": previous.prompt_tree,
+            "metadata": _metadata_from_snapshot(previous.metadata),
+        }
+
+    # Build the full tree and the one fitted to the prompt budget
+    file_tree, prompt_tree = build_trees(root.name, codebase.keys(), tree_tokens)
 
     # Identify likely entry points
-    entry_points = _find_entry_points(codebase)
+    entry_points = _find_entry_points(codebase, main_guard_files=main_guard_files)
 
     # Sort largest files
     file_sizes.sort(key=lambda x: x[1], reverse=True)
 
     metadata = {
         "repo_name": root.name,
+        "root_path": str(root),
         "total_files": len(codebase),
-        "total_chars": sum(len(v) for v in codebase.values()),
-        "total_lines": sum(v.count("\n") for v in codebase.values()),
+        "total_chars": total_chars,
+        "total_lines": total_lines,
         "file_types": dict(file_types.most_common()),
         "largest_files": file_sizes[:15],
         "entry_points": entry_points,
+        "import_graph": build_import_graph(codebase, digests, go_module=go_module),
     }
 
+    if use_snapshot and not spilled:
+        # Compressing the new content is left to a background thread.
+        write_snapshot_async(
+            root, settings, entries, fresh, placeholders, file_tree, prompt_tree, metadata,
+            previous=previous,
+        )
+
     return {
         "codebase": codebase,
         "file_tree": file_tree,
+        "prompt_tree": prompt_tree,
         "metadata": metadata,
     }
 
 
-def _build_tree(root: Path, filepaths: list[str], max_depth: int = 4) -> str:
-    """Build a visual directory tree string."""
-    lines = [f"{root.name}/"]
-    dirs_seen = set()
-
-    sorted_paths = sorted(filepaths)
-    for filepath in sorted_paths:
-        parts = Path(filepath).parts
-        depth = len(parts) - 1
-
-        if depth > max_depth:
-            # Show truncated path
-            dir_key = "/".join(parts[:max_depth])
-            if dir_key not in dirs_seen:
-                dirs_seen.add(dir_key)
-                indent = "  " * max_depth
-                lines.append(f"{indent}... ({filepath})")
-            continue
-
-        # Add directory entries
-        for i in range(depth):
-            dir_key = "/".join(parts[: i + 1])
-            if dir_key not in dirs_seen:
-                dirs_seen.add(dir_key)
-                indent = "  " * (i + 1)
-                lines.append(f"{indent}{parts[i]}/")
-
-        # Add file entry
-        indent = "  " * len(parts)
-        lines.append(f"{indent}{parts[-1]}")
+def _metadata_from_snapshot(metadata: dict) -> dict:
+    """Undo the JSON round trip: tuples for largest files, an ImportGraph for the graph."""
+    return {
+        **metadata,
+        "largest_files": [tuple(item) for item in metadata["largest_files"]],
+        "import_graph": ImportGraph(metadata["import_graph"]),
+    }
 
-    return "\n".join(lines)
+
+def _read_go_module(root: Path) -> str | None:
+    """Module path from the repo's top-level go.mod, if there is one."""
+    try:
+        return go_module_path((root / "go.mod").read_text(encoding="utf-8", errors="replace"))
+    except OSError:
+        return None
 
 
-def _find_entry_points(codebase: dict) -> list[str]:
-    """Identify likely entry points in the codebase."""
+def _collect_candidates(root: Path) -> list[tuple[str, str, str]]:
+    """Walk the tree and return (filepath, rel_path, ext) for supported files.
+
+    Plain string paths: building a ``Path`` per file cost more than the walk
+    itself, which matters once a snapshot makes reading the files cheap.
+    """
+    candidates = []
+    top = str(root)
+    prefix = os.path.join(top, "")
+    for dirpath, dirnames, filenames in os.walk(top):
+        # Skip excluded directories (modifies in-place to prevent recursion)
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        rel_prefix = "" if dirpath == top else dirpath[len(prefix):] + os.sep
+        dir_prefix = os.path.join(dirpath, "")
+
+        for filename in sorted(filenames):
+            dot = filename.rfind(".")
+            ext = filename[dot:].lower() if dot > 0 else ""  # Same as Path.suffix
+
+            if ext not in ALL_EXTENSIONS and filename not in EXTENSIONLESS_FILES:
+                continue
+
+            candidates.append((dir_prefix + filename, rel_prefix + filename, ext))
+    return candidates
+
+
+def _ingest_files(
+    candidates: list[tuple[str, str, str]],
+    workers: int | None,
+    ingest: Callable[[tuple[str, str, str]], _LoadedFile] | None = None,
+):
+    """Yield _LoadedFile results in walk order, reading on a thread pool."""
+    ingest = ingest or _ingest_file
+    if workers is None:
+        workers = DEFAULT_LOAD_WORKERS
+    if workers <= 1 or len(candidates) < PARALLEL_LOAD_MIN_FILES:
+        for candidate in candidates:
+            yield ingest(candidate)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deeprepo-load") as pool:
+        # map() preserves input order, keeping codebase key order deterministic.
+        yield from pool.map(ingest, candidates, chunksize=16)
+
+
+def _ingest_file(
+    candidate: tuple[str, str, str],
+    snapshot: Snapshot | None = None,
+) -> _LoadedFile:
+    """Stat, read and decode one file, computing its stats in the same pass.
+
+    A file whose stat signature matches ``snapshot`` is restored from it
+    instead of being read.
+    """
+    filepath, rel_path, ext = candidate
+    try:
+        stat = os.stat(filepath)
+        size = stat.st_size
+        if size > MAX_FILE_SIZE:
+            placeholder = f"[FILE TOO LARGE: {size:,} bytes, skipped]"
+            return _placeholder(rel_path, ext, placeholder)
+
+        entry = snapshot.lookup(rel_path, size, stat.st_mtime_ns) if snapshot else None
+        content = snapshot.restore(entry) if entry else None
+        if content is not None:
+            return _LoadedFile(
+                rel_path=rel_path,
+                ext=ext,
+                content=content,
+                chars=entry.chars,
+                lines=entry.lines,
+                loaded=True,
+                has_main_guard=entry.has_main_guard,
+                digest=entry.digest,
+                signature=(size, stat.st_mtime_ns),
+                reused=True,
+            )
+
+        with open(filepath, encoding="utf-8", errors="replace") as handle:
+            content = handle.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return _placeholder(rel_path, ext, f"[READ ERROR: {e}]")
+
+    return _LoadedFile(
+        rel_path=rel_path,
+        ext=ext,
+        content=content,
+        chars=len(content),
+        lines=content.count("\n"),
+        loaded=True,
+        has_main_guard=_has_main_guard(rel_path, content),
+        digest=content_digest(content),
+        signature=(size, stat.st_mtime_ns),
+    )
+
+
+def _placeholder(rel_path: str, ext: str, text: str) -> _LoadedFile:
+    return _LoadedFile(
+        rel_path=rel_path,
+        ext=ext,
+        content=text,
+        chars=len(text),
+        lines=text.count("\n"),
+        loaded=False,
+        has_main_guard=False,
+    )
+
+
+def _has_main_guard(filepath: str, content: str) -> bool:
+    """Check for a Python ``if __name__ == "__main__"`` style entry point."""
+    return filepath.endswith(".py") and '__name__' in content and '__main__' in content
+
+
+def _find_entry_points(
+    codebase: dict,
+    main_guard_files: list[str] | None = None,
+) -> list[str]:
+    """Identify likely entry points in the codebase.
+
+    ``main_guard_files`` lets callers that already scanned file contents
+    (see ``_ingest_file``) skip the second pass over every string.
+    """
     entry_patterns = [
         "main.py", "app.py", "index.py", "server.py", "run.py",
         "index.js", "index.ts", "main.js", "main.ts", "app.js", "app.ts",
@@ -207,10 +510,14 @@ def _find_entry_points(codebase: dict) -> list[str]:
             found.append(filepath)
 
     # Also look for files with if __name__ == "__main__"
-    for filepath, content in codebase.items():
-        if filepath.endswith(".py") and '__name__' in content and '__main__' in content:
-            if filepath not in found:
-                found.append(filepath)
+    if main_guard_files is None:
+        main_guard_files = [
+            filepath for filepath, content in codebase.items()
+            if _has_main_guard(filepath, content)
+        ]
+    for filepath in main_guard_files:
+        if filepath not in found:
+            found.append(filepath)
 
     return sorted(found)
 
@@ -239,4 +546,17 @@ def format_metadata_for_prompt(metadata: dict) -> str:
         for ep in metadata["entry_points"]:
             lines.append(f"  {ep}")
 
+    import_graph = metadata.get("import_graph")
+    if import_graph:
+        hubs = most_imported(import_graph)
+        if hubs:
+            lines.append("")
+            lines.append("Most imported files (fan-in):")
+            for path, importers in hubs:
+                lines.append(f"  {path}: {importers}")
+        cycles = strongly_connected_components(import_graph)
+        if cycles:
+            lines.append("")
+            lines.append(f"Import cycles: {len(cycles)} (largest: {len(cycles[0])} files)")
+
     return "\n".join(lines)
@@ -0,0 +1,158 @@
+"""Adaptive (AIMD) concurrency limit for sub-LLM batches.
+
+The right number of parallel OpenRouter calls depends on the model and on
+time of day, so instead of a fixed semaphore the limit is tuned from
+feedback the way TCP tunes its congestion window:
+
+- additive increase: every success with a healthy latency adds
+  ``1 / limit``, i.e. roughly +1 per full window of completed calls;
+- multiplicative decrease: a retryable failure (429/5xx/timeout, as
+  classified by ``utils._is_retryable``) multiplies the limit by
+  ``backoff``, at most once per cooldown so a burst of 429s from calls
+  already in flight only counts once.
+
+``SubModelClient.batch()`` runs each batch on a fresh event loop, so the
+limiter keeps its state behind a ``threading.Lock`` and wakes waiters on
+whichever loop they are awaiting on. One instance can therefore persist
+across every batch of an analysis run.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+DEFAULT_INITIAL_CONCURRENCY = 5
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_BACKOFF = 0.5
+DEFAULT_LATENCY_TOLERANCE = 2.0  # Latency above this multiple of the average is "unhealthy"
+LATENCY_SMOOTHING = 0.1          # EWMA weight of each new latency sample
+MIN_COOLDOWN_SECONDS = 1.0
+
+
+class AdaptiveConcurrencyLimiter:
+    """Async context manager whose slot count grows and shrinks with API health."""
+
+    def __init__(
+        self,
+        initial: int = DEFAULT_INITIAL_CONCURRENCY,
+        min_limit: int = DEFAULT_MIN_CONCURRENCY,
+        max_limit: int = DEFAULT_MAX_CONCURRENCY,
+        backoff: float = DEFAULT_BACKOFF,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+    ):
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("Expected 1 <= min_limit <= initial <= max_limit")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+
+        self._lock = threading.Lock()
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._latency_avg: float | None = None
+        self._last_decrease = float("-inf")
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._in_flight < self.limit:
+                self._in_flight += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                    granted = False
+                except ValueError:
+                    granted = True
+            # If the slot was already handed over, give it back. When the
+            # hand-off callback hasn't run yet it sees the cancelled future
+            # and releases the slot itself.
+            if granted and future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            granted = self._grant_locked()
+        self._wake(granted)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def record_success(self, latency_seconds: float) -> None:
+        """Grow the limit if ``latency_seconds`` is within tolerance of the running average."""
+        with self._lock:
+            average = self._latency_avg
+            healthy = average is None or latency_seconds <= self.latency_tolerance * average
+            if average is None:
+                self._latency_avg = latency_seconds
+            else:
+                self._latency_avg = average + LATENCY_SMOOTHING * (latency_seconds - average)
+            if healthy and self._limit < self.max_limit:
+                previous = self.limit
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+                if self.limit > previous:
+                    self.increases += 1
+            granted = self._grant_locked()
+        self._wake(granted)
+
+    def record_overload(self, exc: BaseException | None = None) -> None:
+        """Shrink the limit after a rate-limit or server error."""
+        now = time.monotonic()
+        with self._lock:
+            cooldown = max(MIN_COOLDOWN_SECONDS, self._latency_avg or 0.0)
+            if now - self._last_decrease < cooldown:
+                return
+            self._last_decrease = now
+            previous = self.limit
+            self._limit = max(float(self.min_limit), self._limit * self.backoff)
+            if self.limit < previous:
+                self.decreases += 1
+
+    def _grant_locked(self) -> list[tuple[asyncio.AbstractEventLoop, asyncio.Future]]:
+        """Hand free slots to queued waiters. Caller holds ``self._lock``."""
+        granted = []
+        while self._waiters and self._in_flight < self.limit:
+            granted.append(self._waiters.popleft())
+            self._in_flight += 1
+        return granted
+
+    def _wake(self, granted: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]]) -> None:
+        for loop, future in granted:
+            try:
+                loop.call_soon_threadsafe(self._hand_over, future)
+            except RuntimeError:
+                # The waiter's loop has closed; nobody will use this slot.
+                self.release()
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        if future.done():
+            self.release()
+        else:
+            future.set_result(None)
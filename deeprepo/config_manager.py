@@ -35,6 +35,8 @@ class ProjectState:
     last_refresh: str = ""
     last_commit: str = ""
     file_hashes: dict[str, str] = field(default_factory=dict)
+    file_stats: dict[str, list[int]] = field(default_factory=dict)
+    dirty_files: list[str] = field(default_factory=list)
     analysis_cost: float = 0.0
     analysis_turns: int = 0
     sub_llm_dispatches: int = 0
@@ -80,7 +82,7 @@ class ConfigManager:
         self.save_state(state)
 
         (self.deeprepo_dir / ".gitignore").write_text(
-            ".state.json\nmodules/\n",
+            ".state.json\nfindings.json\nmodules/\n",
             encoding="utf-8",
         )
 
@@ -3,6 +3,7 @@ Content Loader for deeprepo.
 
 Loads a content corpus from a local path into a structured format:
 - file_tree: visual directory structure
+- prompt_tree: the same tree fitted to a token budget for the root prompt
 - metadata: stats about the corpus
 - documents: dict mapping filepath -> content (stored in REPL, NOT in model context)
 """
@@ -12,6 +13,8 @@ import re
 from collections import Counter
 from pathlib import Path
 
+from .file_tree import PROMPT_TREE_TOKENS, build_trees
+
 # File extensions to include in content analysis
 CONTENT_EXTENSIONS = {
     # Primary content
@@ -38,14 +41,20 @@ _FRONT_MATTER_DATE_PATTERN = re.compile(
 )
 
 
-def load_content(path: str) -> dict:
+def load_content(path: str, tree_tokens: int = PROMPT_TREE_TOKENS) -> dict:
     """
     Load a content corpus from a local path.
 
+    Args:
+        path: Local directory to load
+        tree_tokens: Token budget for ``prompt_tree``. ``file_tree`` always
+            lists every file.
+
     Returns:
         {
             "documents": {filepath: content, ...},
             "file_tree": "visual tree string",
+            "prompt_tree": "file_tree fitted to tree_tokens, for the root prompt",
             "metadata": {
                 "corpus_name": str,
                 "total_files": int,
@@ -111,7 +120,7 @@ def load_content(path: str) -> dict:
             f"Check the path and ensure it contains content documents."
         )
 
-    file_tree = _build_tree(root, documents.keys())
+    file_tree, prompt_tree = build_trees(root.name, documents.keys(), tree_tokens)
     document_sizes.sort(key=lambda x: x[1], reverse=True)
 
     categories = sorted(content_categories) if content_categories else ["uncategorized"]
@@ -126,6 +135,7 @@ def load_content(path: str) -> dict:
 
     metadata = {
         "corpus_name": root.name,
+        "root_path": str(root),
         "total_files": len(documents),
         "total_documents": len(documents),
         "total_chars": sum(len(v) for v in documents.values()),
@@ -139,6 +149,7 @@ def load_content(path: str) -> dict:
     return {
         "documents": documents,
         "file_tree": file_tree,
+        "prompt_tree": prompt_tree,
         "metadata": metadata,
     }
 
@@ -153,40 +164,6 @@ def _extract_front_matter_months(text: str) -> set[str]:
     return {match.group(1) for match in _FRONT_MATTER_DATE_PATTERN.finditer(text)}
 
 
-def _build_tree(root: Path, filepaths, max_depth: int = 4) -> str:
-    """Build a visual directory tree string."""
-    lines = [f"{root.name}/"]
-    dirs_seen = set()
-
-    sorted_paths = sorted(filepaths)
-    for filepath in sorted_paths:
-        parts = Path(filepath).parts
-        depth = len(parts) - 1
-
-        if depth > max_depth:
-            # Show truncated path
-            dir_key = "/".join(parts[:max_depth])
-            if dir_key not in dirs_seen:
-                dirs_seen.add(dir_key)
-                indent = "  " * max_depth
-                lines.append(f"{indent}... ({filepath})")
-            continue
-
-        # Add directory entries
-        for i in range(depth):
-            dir_key = "/".join(parts[: i + 1])
-            if dir_key not in dirs_seen:
-                dirs_seen.add(dir_key)
-                indent = "  " * (i + 1)
-                lines.append(f"{indent}{parts[i]}/")
-
-        # Add file entry
-        indent = "  " * len(parts)
-        lines.append(f"{indent}{parts[-1]}")
-
-    return "\n".join(lines)
-
-
 def format_content_metadata(metadata: dict) -> str:
     """Format content metadata into a concise string for the root model's context."""
     lines = [
@@ -6,6 +6,7 @@ import re
 
 from . import __version__
 from .config_manager import ProjectConfig, ProjectState
+from .tokens import count_tokens, truncate_to_tokens
 
 
 class ContextGenerator:
@@ -84,9 +85,8 @@ class ContextGenerator:
 
         token_estimate = self._estimate_tokens(result)
         if token_estimate > self.config.context_max_tokens:
-            max_chars = max(self.config.context_max_tokens * 4, 0)
             result = (
-                result[:max_chars].rstrip()
+                truncate_to_tokens(result, self.config.context_max_tokens).rstrip()
                 + "\n\n[Truncated to fit token budget]\n"
             )
 
@@ -217,5 +217,5 @@ class ContextGenerator:
         return "\n".join(parts).strip()
 
     def _estimate_tokens(self, text: str) -> int:
-        """Rough token estimate."""
-        return len(text) // 4
+        """Token count of ``text`` (see ``deeprepo.tokens``)."""
+        return count_tokens(text)
@@ -10,13 +10,17 @@ A content corpus has been loaded into your Python REPL environment. You do NOT s
 
 ## Available Variables
 - `documents` — dict mapping relative file paths to document contents (strings)
-- `file_tree` — string showing directory structure with indentation
+- `file_tree` — string showing the full directory structure with indentation (the tree in the first message may summarize large directories as file counts)
 - `metadata` — dict with corpus stats (total_documents, total_words, document_types, content_categories, date_range, largest_documents)
+- `repl_history` — dict mapping turn number to the full output of that turn (older outputs in the conversation may be shortened to a digest; read them back from here)
 
 ## Available Functions
 - `print(x)` — display output (truncated to 8192 chars per turn)
 - `llm_query(prompt: str) -> str` — send one focused task to a sub-LLM worker (synchronous)
 - `llm_batch(prompts: list[str]) -> list[str]` — send multiple tasks in PARALLEL (preferred for speed/cost)
+- `llm_stream(prompts: list[str])` — like llm_batch, but yields `(index, result)` pairs as each one finishes
+- `llm_map_reduce(path: str, instruction: str) -> str` — review a document too long for one prompt (including `[FILE TOO LARGE]` ones) section by section and get one merged answer
+- `search(regex: str, glob: str | None = None) -> list[str]` — paths of documents matching `regex`; `grep(regex, glob=None)` returns the matching lines as `(path, line, text)`. Both use a prebuilt index, so prefer them to looping over `documents`
 - `set_answer(text: str)` — set your final analysis text AND mark it as ready in one call. **Always use this to submit your final answer** (avoids string-escaping failures).
 
 ## How to Execute Code
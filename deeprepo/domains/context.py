@@ -15,13 +15,18 @@ CONTEXT_ROOT_SYSTEM_PROMPT = """You are the root orchestrator in a Recursive Lan
 ## Situation
 The project is loaded into your Python REPL:
 - `codebase`: dict[path -> file contents]
-- `file_tree`: directory tree string
-- `metadata`: repo stats and entry points
+- `file_tree`: full directory tree string (the tree below may summarize large directories as file counts)
+- `metadata`: repo stats, entry points and `import_graph` (path -> repo files it imports, for Python, JS/TS, Go and Rust)
+- `repl_history`: dict[turn -> full output of that turn] (older outputs may be shown as digests)
 
 Use available functions:
 - `print(x)`
 - `llm_query(prompt: str) -> str`
 - `llm_batch(prompts: list[str]) -> list[str]` (preferred for parallel module analysis)
+- `llm_stream(prompts: list[str])` (yields `(index, result)` pairs as they finish)
+- `llm_map_reduce(path: str, instruction: str) -> str` (for files too big for one prompt)
+- `search(regex, glob=None) -> list[str]` / `grep(regex, glob=None) -> list[(path, line, text)]` (indexed; faster than scanning `codebase` yourself)
+- `fan_in(path) -> list[str]` / `fan_out(path) -> list[str]` (files importing / imported by `path`) and `import_cycles() -> list[list[str]]`, all from the precomputed import graph
 - `set_answer(text: str)` (always use this to finalize)
 
 You can run code with the `execute_python` tool. Prefer that tool from turn 1.
@@ -41,7 +46,7 @@ Your final answer must use this exact section structure:
 
 ## Workflow
 1. Start with `pyproject.toml`, `package.json`, and/or `Cargo.toml` to identify stack and project identity.
-2. Trace dependencies programmatically by scanning imports with regex.
+2. Read dependencies from the precomputed import graph (`metadata["import_graph"]`, `fan_in`, `fan_out`, `import_cycles`) instead of re-scanning imports; the most imported files and any cycles are already summarized above the file tree.
 3. Split the repo into major modules/directories and analyze them with `llm_batch()`.
 4. Synthesize worker outputs into one coherent project bible.
 5. Build final output with `lines.append(...)` and submit with `set_answer("\\n".join(lines))`.
@@ -101,6 +106,20 @@ Focus on system behavior, module responsibilities, dependencies, and coding conv
 that will help future AI sessions generate correct, style-consistent code."""
 
 
+
+CONTEXT_PATCH_SYSTEM_PROMPT = """You maintain an existing project documentation bible (PROJECT.md) for AI coding assistants.
+
+Some files changed since it was written. You receive the current document, the list of
+changed and deleted files, and fresh worker notes for the changed files and the files that
+import them or are imported by them.
+
+Update only the sections the changes actually affect. For each section you update, output the
+complete new section starting with its original `## ` heading, spelled exactly as before.
+Do not output sections that need no change. Keep the existing tone, structure, and level of
+detail; do not drop accurate content that the changes don't contradict.
+
+If no section needs to change, reply with exactly: NO_CHANGES"""
+
 CONTEXT_DOMAIN = DomainConfig(
     name="context",
     label="Project Context Generation",
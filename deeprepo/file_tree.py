@@ -0,0 +1,242 @@
+"""Directory trees for loaded codebases and corpora.
+
+Each loader renders the files it loaded twice:
+
+- ``file_tree`` lists every file, indented by directory. It lives in the
+  REPL namespace, where its size costs nothing until the model prints it.
+- ``prompt_tree`` is the same tree fitted to ``PROMPT_TREE_TOKENS``. It goes
+  into the first root prompt, which is resent on every turn, so directories
+  that do not fit are collapsed into one line with a file count and their
+  most common extensions::
+
+      vendor/ (12,408 files: 9,112 .go, 2,950 .md, 346 other)
+
+  A directory whose whole listing does not fit lists its largest entries
+  and summarizes the rest on a ``... N more`` line.
+
+Paths are inserted into a trie once (one dict lookup per path component)
+and each directory's entries are sorted on their own, so neither rendering
+sorts or re-joins full paths. The budgeted rendering expands directories
+breadth-first, shallow ones first, while the budget holds; small trees come
+out identical to ``file_tree``.
+"""
+
+import os
+from collections import Counter
+from collections.abc import Iterable
+
+from .tokens import count_tokens
+
+PROMPT_TREE_TOKENS = 4_000
+MAX_LISTED_DIRS = 50  # Per directory, once the full tree does not fit
+MAX_LISTED_FILES = 25
+SUMMARY_EXTENSIONS = 3
+MAX_CHARS_PER_TOKEN = 8  # Trees longer than budget * this cannot fit; skip counting
+
+_INDENT = "  "
+
+
+class _Dir:
+    """One directory in the trie."""
+
+    __slots__ = ("dirs", "files", "total", "expanded", "shown", "_extensions")
+
+    def __init__(self):
+        self.dirs: dict[str, _Dir] = {}
+        self.files: list[str] = []
+        self.total = 0  # Files in this directory and below
+        self.expanded = False
+        self.shown: set[str] | None = None  # Entries listed when only partly expanded
+        self._extensions: Counter | None = None
+
+    def entries(self) -> list[tuple[str, "_Dir | None"]]:
+        """(name, subdirectory or None for a file), in sorted full-path order."""
+        keyed = [(name + "/", name, child) for name, child in self.dirs.items()]
+        keyed.extend((name, name, None) for name in self.files)
+        keyed.sort(key=lambda item: item[0])
+        return [(name, child) for _, name, child in keyed]
+
+    def extensions(self) -> Counter:
+        if self._extensions is None:
+            counts = Counter(_extension(name) for name in self.files)
+            for child in self.dirs.values():
+                counts.update(child.extensions())
+            self._extensions = counts
+        return self._extensions
+
+
+def build_trees(
+    root_name: str, paths: Iterable[str], max_tokens: int | None = None
+) -> tuple[str, str]:
+    """Render ``paths`` as ``(file_tree, prompt_tree)``.
+
+    Args:
+        root_name: Name shown on the first line
+        paths: Relative file paths
+        max_tokens: Budget for the prompt tree (default: PROMPT_TREE_TOKENS)
+    """
+    if max_tokens is None:
+        max_tokens = PROMPT_TREE_TOKENS
+    trie = _build_trie(paths)
+    full = _render(root_name, trie, budgeted=False)
+    if len(full) <= max_tokens * MAX_CHARS_PER_TOKEN and count_tokens(full) <= max_tokens:
+        return full, full
+    _expand_within(root_name, trie, max_tokens)
+    return full, _render(root_name, trie, budgeted=True)
+
+
+def _build_trie(paths: Iterable[str]) -> _Dir:
+    root = _Dir()
+    for path in paths:
+        *parents, name = path.replace(os.sep, "/").split("/")
+        node = root
+        node.total += 1
+        for part in parents:
+            child = node.dirs.get(part)
+            if child is None:
+                child = node.dirs[part] = _Dir()
+            child.total += 1
+            node = child
+        node.files.append(name)
+    return root
+
+
+def _extension(name: str) -> str:
+    dot = name.rfind(".")
+    return name[dot:].lower() if dot > 0 else "no extension"
+
+
+def _describe(counts: Counter, total: int, noun: str = "files") -> str:
+    """'N files: a .py, b .md, c other'."""
+    common = counts.most_common(SUMMARY_EXTENSIONS)
+    parts = [f"{count:,} {ext}" for ext, count in common]
+    rest = total - sum(count for _, count in common)
+    if rest:
+        parts.append(f"{rest:,} other")
+    if total == 1:
+        noun = noun.removesuffix("s")
+    return f"{total:,} {noun}: {', '.join(parts)}"
+
+
+def _collapsed_line(depth: int, name: str, node: _Dir) -> str:
+    return f"{_INDENT * depth}{name}/ ({_describe(node.extensions(), node.total)})"
+
+
+def _listing(node: _Dir, depth: int, budgeted: bool) -> list[tuple[str, str, "_Dir | None"]]:
+    """Lines directly under an expanded ``node`` as (line, name, subdirectory or None).
+
+    Budgeted listings show at most MAX_LISTED_DIRS subdirectories and
+    MAX_LISTED_FILES files, or only the entries in ``node.shown`` if set,
+    and summarize the rest on one line each.
+    """
+    lines: list[tuple[str, str, _Dir | None]] = []
+    hidden_dirs: list[_Dir] = []
+    hidden_files: list[str] = []
+    n_dirs = n_files = 0
+    indent = _INDENT * depth
+    shown = node.shown
+    for name, child in node.entries():
+        if child is None:
+            n_files += 1
+            if budgeted and (n_files > MAX_LISTED_FILES if shown is None else name not in shown):
+                hidden_files.append(name)
+            else:
+                lines.append((f"{indent}{name}", name, None))
+            continue
+        n_dirs += 1
+        if not budgeted or child.expanded:
+            lines.append((f"{indent}{name}/", name, child))
+        elif n_dirs > MAX_LISTED_DIRS if shown is None else name not in shown:
+            hidden_dirs.append(child)
+        else:
+            lines.append((_collapsed_line(depth, name, child), name, child))
+    if hidden_dirs:
+        counts = Counter()
+        for child in hidden_dirs:
+            counts.update(child.extensions())
+        total = sum(child.total for child in hidden_dirs)
+        lines.append((
+            f"{indent}... {len(hidden_dirs):,} more directories ({_describe(counts, total)})", "", None
+        ))
+    if hidden_files:
+        counts = Counter(_extension(name) for name in hidden_files)
+        lines.append((f"{indent}... {_describe(counts, len(hidden_files), 'more files')}", "", None))
+    return lines
+
+
+def _render(root_name: str, trie: _Dir, budgeted: bool) -> str:
+    if budgeted and not trie.expanded:
+        return f"{root_name}/ ({_describe(trie.extensions(), trie.total)})"
+    out = [f"{root_name}/"]
+    stack = [iter(_listing(trie, 1, budgeted))]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            continue
+        line, _, child = item
+        out.append(line)
+        if child is not None and (child.expanded or not budgeted):
+            stack.append(iter(_listing(child, len(stack) + 1, budgeted)))
+    return "\n".join(out)
+
+
+def _line_cost(line: str) -> int:
+    return count_tokens(line) + 1  # The newline
+
+
+def _expand_within(root_name: str, trie: _Dir, max_tokens: int) -> None:
+    """Mark directories expanded, breadth-first, while the rendering fits ``max_tokens``."""
+    collapsed = _line_cost(f"{root_name}/ ({_describe(trie.extensions(), trie.total)})")
+    remaining = max_tokens - collapsed
+    # (directory, depth of its entries, its header line once expanded, cost while collapsed)
+    queue: list[tuple[_Dir, int, str, int]] = [(trie, 1, f"{root_name}/", collapsed)]
+    for node, depth, header, collapsed in queue:
+        if remaining <= 0:
+            break
+        fitted = _fit_listing(node, depth, remaining + collapsed - _line_cost(header))
+        if fitted is None:
+            continue
+        listing, costs = fitted
+        node.expanded = True
+        remaining -= _line_cost(header) + sum(costs) - collapsed
+        indent = _INDENT * depth
+        for (_, name, child), cost in zip(listing, costs):
+            if child is not None:
+                queue.append((child, depth + 1, f"{indent}{name}/", cost))
+
+
+def _fit_listing(node: _Dir, depth: int, budget: int) -> tuple[list, list[int]] | None:
+    """``node``'s budgeted listing and line costs, within ``budget`` tokens.
+
+    If the whole listing does not fit, sets ``node.shown`` to as many of
+    its largest entries (subdirectories by file count, then files) as fit
+    beside the summary lines for the rest; None if not even those fit.
+    """
+
+    def _costed() -> tuple[list, list[int]]:
+        listing = _listing(node, depth, budgeted=True)
+        return listing, [_line_cost(line) for line, _, _ in listing]
+
+    fitted = _costed()
+    if sum(fitted[1]) <= budget:
+        return fitted
+    largest = sorted(node.dirs, key=lambda name: (-node.dirs[name].total, name))
+    ranked = largest[:MAX_LISTED_DIRS] + sorted(node.files)[:MAX_LISTED_FILES]
+    # Binary search for the longest prefix of ``ranked`` that still fits;
+    # listing none of them would only be a longer way of collapsing ``node``.
+    best = None
+    low, high = 1, len(ranked)
+    while low <= high:
+        middle = (low + high) // 2
+        node.shown = set(ranked[:middle])
+        fitted = _costed()
+        if sum(fitted[1]) <= budget:
+            best, low = middle, middle + 1
+        else:
+            high = middle - 1
+    if best is None:
+        node.shown = None
+        return None
+    node.shown = set(ranked[:best])
+    return _costed()
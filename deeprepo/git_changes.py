@@ -0,0 +1,218 @@
+"""Git-backed change detection for status and refresh.
+
+Instead of walking and hashing the whole tree, ask git which paths differ
+from the commit recorded in ``ProjectState.last_commit`` (``git diff``) and
+which are untracked or dirty (``git status --porcelain``). Only those
+candidates are hashed; every other file keeps its stored hash.
+
+The loader does not read ``.gitignore``, so files git ignores are still
+analysed, but ``git diff``/``git status`` never report them. Those files (and
+stored paths git no longer tracks) are listed separately and re-checked by
+stat signature, hashing only the ones whose signature moved.
+
+The backend only answers when the stored state came from a git snapshot;
+otherwise callers fall back to ``cli_commands.scan_file_hashes``.
+"""
+
+import logging
+import os
+import subprocess
+from pathlib import Path
+
+from .config_manager import ProjectState
+
+logger = logging.getLogger(__name__)
+
+GIT_TIMEOUT_SECONDS = 10
+
+
+def _git(project_path: Path, *args: str) -> str | None:
+    """Run a git command in ``project_path``; return stdout or None on any failure."""
+    try:
+        completed = subprocess.run(
+            ["git", *args],
+            cwd=project_path,
+            capture_output=True,
+            text=True,
+            timeout=GIT_TIMEOUT_SECONDS,
+            check=False,
+        )
+    except (OSError, subprocess.SubprocessError):
+        logger.debug("git %s failed", args[0] if args else "", exc_info=True)
+        return None
+    if completed.returncode != 0:
+        return None
+    return completed.stdout
+
+
+def git_head(project_path: Path) -> str | None:
+    """Return the HEAD commit sha, or None outside a git work tree (or before the first commit)."""
+    out = _git(Path(project_path), "rev-parse", "--verify", "--quiet", "HEAD")
+    return out.strip() if out else None
+
+
+def _is_included(relative: str) -> bool:
+    """Apply codebase_loader include rules to a repo-relative POSIX path."""
+    from .codebase_loader import ALL_EXTENSIONS, EXTENSIONLESS_FILES, SKIP_DIRS
+
+    parts = relative.split("/")
+    skip_dirs = set(SKIP_DIRS) | {".deeprepo"}
+    if any(part in skip_dirs for part in parts[:-1]):
+        return False
+    filename = parts[-1]
+    return Path(filename).suffix.lower() in ALL_EXTENSIONS or filename in EXTENSIONLESS_FILES
+
+
+def _ignored_paths(project_path: Path) -> set[str] | None:
+    """Included files under ``project_path`` that git ignores.
+
+    Ignored directories are reported once by git and walked here with the
+    loader's skip rules, so ``node_modules/`` and friends cost nothing.
+    """
+    from .codebase_loader import SKIP_DIRS
+
+    out = _git(
+        project_path, "ls-files", "-z", "--others", "--ignored", "--exclude-standard",
+        "--directory", "--", ".",
+    )
+    if out is None:
+        return None
+
+    skip_dirs = set(SKIP_DIRS) | {".deeprepo"}
+    paths: set[str] = set()
+    for entry in out.split("\0"):
+        if not entry.endswith("/"):
+            if entry and _is_included(entry):
+                paths.add(entry)
+            continue
+        if any(part in skip_dirs for part in entry.rstrip("/").split("/")):
+            continue
+        for dirpath, dirnames, filenames in os.walk(project_path / entry):
+            dirnames[:] = [dirname for dirname in dirnames if dirname not in skip_dirs]
+            relative_dir = Path(dirpath).relative_to(project_path).as_posix()
+            for filename in filenames:
+                relative = f"{relative_dir}/{filename}"
+                if _is_included(relative):
+                    paths.add(relative)
+    return paths
+
+
+def _tracked_paths(project_path: Path) -> set[str] | None:
+    out = _git(project_path, "ls-files", "-z", "--", ".")
+    if out is None:
+        return None
+    return {path for path in out.split("\0") if path}
+
+
+def _dirty_paths(project_path: Path, rev: str) -> set[str] | None:
+    """Paths under ``project_path`` that differ from ``rev`` or are untracked."""
+    diff = _git(project_path, "diff", "--name-only", "-z", "--no-renames", "--relative", rev, "--")
+    prefix = _git(project_path, "rev-parse", "--show-prefix")
+    status = _git(project_path, "status", "--porcelain", "-z", "--untracked-files=all", "--", ".")
+    if diff is None or prefix is None or status is None:
+        return None
+
+    paths = {path for path in diff.split("\0") if path}
+
+    prefix = prefix.strip()
+    entries = iter(status.split("\0"))
+    for entry in entries:
+        if len(entry) < 4:
+            continue
+        code, path = entry[:2], entry[3:]
+        candidates = [path]
+        if "R" in code or "C" in code:
+            # Renames/copies carry the source path as the next NUL-separated field.
+            candidates.append(next(entries, ""))
+        for candidate in candidates:
+            if candidate.startswith(prefix):
+                paths.add(candidate[len(prefix):])
+
+    return {path for path in paths if path and _is_included(path)}
+
+
+def git_snapshot(project_path: Path) -> tuple[str, list[str]] | None:
+    """Return ``(head_sha, dirty_paths)`` to store alongside fresh file hashes."""
+    project_path = Path(project_path)
+    head = git_head(project_path)
+    if head is None:
+        return None
+    dirty = _dirty_paths(project_path, head)
+    if dirty is None:
+        return None
+    return head, sorted(dirty)
+
+
+def detect_changes(project_path: Path, state: ProjectState) -> dict | None:
+    """Classify changes since the recorded git snapshot, or None to fall back.
+
+    Candidates are paths that differ from ``state.last_commit`` now, plus the
+    paths that were already dirty when the snapshot was taken (a file edited
+    before the snapshot and later reverted won't show up in ``git diff``).
+    Files git does not see (ignored now, or stored but no longer tracked) are
+    compared by stat signature against ``state.file_stats`` instead.
+    Returns the same shape as ``cli_commands.get_changed_files``.
+    """
+    from .cli_commands import _hash_file, _stat_signature
+
+    project_path = Path(project_path)
+    old_hashes = state.file_hashes or {}
+    if not state.last_commit or not old_hashes:
+        return None
+    if _git(project_path, "cat-file", "-e", f"{state.last_commit}^{{commit}}") is None:
+        return None
+
+    candidates = _dirty_paths(project_path, state.last_commit)
+    ignored = _ignored_paths(project_path)
+    tracked = _tracked_paths(project_path)
+    if candidates is None or ignored is None or tracked is None:
+        return None
+    candidates |= {path for path in state.dirty_files or [] if _is_included(path)}
+    untracked_known = {
+        relative
+        for relative in (key.replace(os.sep, "/") for key in old_hashes)
+        if relative not in tracked and relative not in candidates
+    }
+    by_signature = (ignored | untracked_known) - candidates
+
+    old_stats = state.file_stats or {}
+    current_hashes = dict(old_hashes)
+    current_stats = dict(old_stats)
+    modified: list[str] = []
+    added: list[str] = []
+    deleted: list[str] = []
+
+    for relative in sorted(candidates | by_signature):
+        key = relative.replace("/", os.sep)
+        file_path = project_path / relative
+        if relative in by_signature and file_path.is_file():
+            signature = _stat_signature(file_path)
+            if signature is not None and key in old_hashes and old_stats.get(key) == signature:
+                continue  # Unchanged since the last scan
+        digest = _hash_file(file_path) if file_path.is_file() else None
+        if digest is None:
+            if key in current_hashes:
+                deleted.append(key)
+                current_hashes.pop(key)
+                current_stats.pop(key, None)
+            continue
+
+        current_stats.pop(key, None)
+        if relative in by_signature:
+            signature = _stat_signature(file_path)
+            if signature is not None:
+                current_stats[key] = signature
+        if key not in old_hashes:
+            added.append(key)
+        elif old_hashes[key] != digest:
+            modified.append(key)
+        current_hashes[key] = digest
+
+    return {
+        "modified": modified,
+        "added": added,
+        "deleted": deleted,
+        "current_hashes": current_hashes,
+        "current_stats": current_stats,
+        "backend": "git",
+    }
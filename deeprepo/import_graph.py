@@ -0,0 +1,453 @@
+"""Repository import graph, computed once at load time.
+
+``load_codebase`` extracts the import statements of every Python, JS/TS, Go
+and Rust file and resolves them against the other files of the repository.
+The result is stored as ``metadata["import_graph"]`` (``path -> sorted list
+of repo paths it imports``) and backs the REPL's ``fan_in``, ``fan_out`` and
+``import_cycles`` helpers, so the root model no longer spends turns
+re-deriving the graph with regexes.
+
+Extraction is split from resolution: the raw import specs of a file depend
+only on its content, so they are cached in the shared SQLite cache keyed by
+content hash and re-used by every later load. Resolution depends on which
+other files exist and is cheap, so it is always redone. Imports of
+third-party packages and the standard library do not resolve and are dropped.
+"""
+
+import hashlib
+import posixpath
+import re
+from collections.abc import Callable, Iterable, Mapping
+
+from . import cache
+
+SPEC_VERSION = 1  # Bump when extraction changes so cached specs are ignored
+
+PYTHON_EXTENSIONS = (".py",)
+JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+GO_EXTENSIONS = (".go",)
+RUST_EXTENSIONS = (".rs",)
+GRAPH_EXTENSIONS = PYTHON_EXTENSIONS + JS_EXTENSIONS + GO_EXTENSIONS + RUST_EXTENSIONS
+
+_PY_IMPORT_RE = re.compile(
+    r"^\s*(?:from\s+(\.*[\w.]*)\s+import\s+([\w*, ()]+)|import\s+([\w., ]+))", re.MULTILINE
+)
+_JS_IMPORT_RE = re.compile(
+    r"""(?:import\s[^'"]*?from\s*|import\s*|require\(\s*|export\s[^'"]*?from\s*)['"]([^'"]+)['"]"""
+)
+_GO_IMPORT_RE = re.compile(r'^\s*import\s+(?:[\w.]+\s+)?"([^"]+)"', re.MULTILINE)
+_GO_IMPORT_BLOCK_RE = re.compile(r"^\s*import\s*\(([^)]*)\)", re.MULTILINE)
+_GO_SPEC_RE = re.compile(r'"([^"]+)"')
+_GO_MODULE_RE = re.compile(r"^\s*module\s+(\S+)", re.MULTILINE)
+_RUST_USE_RE = re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?use\s+([^;]+);", re.MULTILINE)
+_RUST_MOD_RE = re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?mod\s+(\w+)\s*;", re.MULTILINE)
+_RUST_CRATE_ROOTS = ("lib.rs", "main.rs")
+_RUST_LOCAL_PREFIXES = ("crate::", "self::", "super::")
+
+
+class ImportGraph(dict):
+    """``path -> sorted list of repo paths it imports``; prints as a summary.
+
+    The root model is told to ``print(metadata)``; dumping thousands of edges
+    there would only flood the REPL output.
+    """
+
+    def __repr__(self) -> str:
+        edges = sum(len(targets) for targets in self.values())
+        return (
+            f"<import graph: {len(self)} files, {edges} edges; "
+            f"use fan_in(path), fan_out(path), import_cycles()>"
+        )
+
+
+def go_module_path(go_mod: str) -> str | None:
+    """The module path declared in a ``go.mod`` file."""
+    match = _GO_MODULE_RE.search(go_mod)
+    return match.group(1) if match else None
+
+
+# -- Extraction -------------------------------------------------------------
+
+def _expand_rust_use(tree: str) -> list[str]:
+    """Flatten ``a::{b, c::{d, e}}`` into ``a::b``, ``a::c::d``, ``a::c::e``."""
+    tree = "".join(tree.split())
+    if "{" not in tree:
+        return [tree.removesuffix("::*").removesuffix("::self")]
+    prefix, _, rest = tree.partition("{")
+    inner = rest[:rest.rfind("}")]
+    items, depth, start = [], 0, 0
+    for i, c in enumerate(inner):
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+        elif c == "," and depth == 0:
+            items.append(inner[start:i])
+            start = i + 1
+    items.append(inner[start:])
+    paths = []
+    for item in items:
+        if item:
+            paths.extend(_expand_rust_use(prefix + item))
+    return paths
+
+
+def _python_specs(content: str) -> list[str]:
+    specs = []
+    for match in _PY_IMPORT_RE.finditer(content):
+        from_module, names, plain = match.groups()
+        if plain:
+            specs.extend(name.split(" as ")[0].strip() for name in plain.split(","))
+        elif from_module is not None:
+            names = [
+                name.split(" as ")[0].strip()
+                for name in names.replace("(", " ").replace(")", " ").split(",")
+            ]
+            specs.append(f"{from_module}:{','.join(name for name in names if name)}")
+    return specs
+
+
+def _go_specs(content: str) -> list[str]:
+    specs = _GO_IMPORT_RE.findall(content)
+    for block in _GO_IMPORT_BLOCK_RE.findall(content):
+        specs.extend(_GO_SPEC_RE.findall(block))
+    return specs
+
+
+def _rust_specs(content: str) -> list[str]:
+    specs = [f"mod:{name}" for name in _RUST_MOD_RE.findall(content)]
+    for tree in _RUST_USE_RE.findall(content):
+        # `as` renames only change the local name; drop them before flattening.
+        tree = re.sub(r"\s+as\s+\w+", "", tree)
+        specs.extend(
+            f"use:{path}" for path in _expand_rust_use(tree) if path.startswith(_RUST_LOCAL_PREFIXES)
+        )
+    return specs
+
+
+def extract_import_specs(path: str, content: str) -> list[str]:
+    """Raw, unresolved import specs of one file (empty for other languages).
+
+    Python specs are dotted module names, or ``"<module>:<name>,..."`` for
+    ``from`` imports; JS/TS and Go specs are the quoted import paths; Rust
+    specs are ``"mod:<name>"`` or ``"use:<crate|self|super>::..."``.
+    """
+    if path.endswith(PYTHON_EXTENSIONS):
+        specs = _python_specs(content)
+    elif path.endswith(JS_EXTENSIONS):
+        specs = _JS_IMPORT_RE.findall(content)
+    elif path.endswith(GO_EXTENSIONS):
+        specs = _go_specs(content)
+    elif path.endswith(RUST_EXTENSIONS):
+        specs = _rust_specs(content)
+    else:
+        return []
+    return list(dict.fromkeys(specs))
+
+
+def content_digest(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8", errors="replace")).hexdigest()
+
+
+def _spec_key(path: str, digest: str) -> str:
+    language = posixpath.splitext(path)[1].lstrip(".")
+    if path.endswith(JS_EXTENSIONS):
+        language = "js"
+    return f"v{SPEC_VERSION}:{language}:{digest}"
+
+
+# -- Resolution -------------------------------------------------------------
+
+def _python_module_index(paths: Iterable[str]) -> dict[str, str]:
+    """Map dotted module names to repo paths, with and without a ``src/`` prefix."""
+    index: dict[str, str] = {}
+    for path in paths:
+        if not path.endswith(PYTHON_EXTENSIONS):
+            continue
+        parts = path[:-3].split("/")
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        if not parts:
+            continue
+        index.setdefault(".".join(parts), path)
+        if parts[0] == "src" and len(parts) > 1:
+            index.setdefault(".".join(parts[1:]), path)
+    return index
+
+
+def _resolve_python(path: str, specs: list[str], module_index: dict[str, str]) -> set[str]:
+    package = posixpath.dirname(path).replace("/", ".")
+    targets: set[str] = set()
+    for spec in specs:
+        candidates: list[str] = []
+        from_module, is_from, names = spec.partition(":")
+        if not is_from:
+            candidates = [spec]
+        else:
+            dots = len(from_module) - len(from_module.lstrip("."))
+            module = from_module[dots:]
+            if dots:
+                base = package.split(".") if package else []
+                base = base[: len(base) - (dots - 1)] if dots > 1 else base
+                module = ".".join(part for part in [*base, module] if part)
+            # `from pkg import mod` links to pkg/mod.py; only names that aren't
+            # submodules fall back to the package itself.
+            for name in names.split(","):
+                submodule = f"{module}.{name}" if module else name
+                if name and name != "*" and submodule in module_index:
+                    targets.add(module_index[submodule])
+                elif module:
+                    candidates.append(module)
+
+        for candidate in candidates:
+            # Walk up the dotted name so `import a.b.c` still links to a/b.py.
+            while candidate:
+                resolved = module_index.get(candidate)
+                if resolved:
+                    targets.add(resolved)
+                    break
+                candidate = candidate.rpartition(".")[0]
+    return targets
+
+
+def _resolve_js(path: str, specs: list[str], known: set[str]) -> set[str]:
+    targets: set[str] = set()
+    base_dir = posixpath.dirname(path)
+    for spec in specs:
+        if not spec.startswith("."):
+            continue
+        base = posixpath.normpath(posixpath.join(base_dir, spec))
+        options = [base, *(base + ext for ext in JS_EXTENSIONS)]
+        options += [f"{base}/index{ext}" for ext in JS_EXTENSIONS]
+        for option in options:
+            if option in known:
+                targets.add(option)
+                break
+    return targets
+
+
+def _go_package_index(paths: Iterable[str]) -> dict[str, list[str]]:
+    """Directory -> non-test Go files in it (a Go package is a directory)."""
+    index: dict[str, list[str]] = {}
+    for path in paths:
+        if path.endswith(GO_EXTENSIONS) and not path.endswith("_test.go"):
+            index.setdefault(posixpath.dirname(path), []).append(path)
+    return index
+
+
+def _resolve_go(specs: list[str], packages: dict[str, list[str]], go_module: str | None) -> set[str]:
+    targets: set[str] = set()
+    for spec in specs:
+        directory = None
+        if go_module and (spec == go_module or spec.startswith(go_module + "/")):
+            directory = spec[len(go_module):].lstrip("/")
+        elif not go_module and "/" in spec:
+            # Without go.mod, match the longest proper suffix that is a package
+            # directory; a bare "fmt"-style import is always the standard library.
+            parts = spec.split("/")
+            for i in range(1, len(parts)):
+                suffix = "/".join(parts[i:])
+                if suffix in packages:
+                    directory = suffix
+                    break
+        if directory is not None:
+            targets.update(packages.get(directory, ()))
+    return targets
+
+
+def _rust_module_dir(path: str) -> str:
+    """Directory holding the child modules of the module defined by ``path``."""
+    if posixpath.basename(path) in (*_RUST_CRATE_ROOTS, "mod.rs"):
+        return posixpath.dirname(path)
+    return path[: -len(".rs")]
+
+
+def _rust_crate_dir(path: str, known: set[str]) -> str:
+    directory = posixpath.dirname(path)
+    while True:
+        if any(posixpath.join(directory, root) in known for root in _RUST_CRATE_ROOTS):
+            return directory
+        if not directory:
+            return posixpath.dirname(path)
+        directory = posixpath.dirname(directory)
+
+
+def _rust_module_file(base: str, segments: list[str], known: set[str]) -> str | None:
+    """The file of the longest module prefix of ``segments`` under ``base``."""
+    for end in range(len(segments), 0, -1):
+        stem = posixpath.join(base, *segments[:end])
+        for option in (f"{stem}.rs", f"{stem}/mod.rs"):
+            if option in known:
+                return option
+    return None
+
+
+def _resolve_rust(path: str, specs: list[str], known: set[str]) -> set[str]:
+    targets: set[str] = set()
+    for spec in specs:
+        kind, _, rest = spec.partition(":")
+        if kind == "mod":
+            resolved = _rust_module_file(_rust_module_dir(path), [rest], known)
+        else:
+            segments = rest.split("::")
+            head = segments.pop(0)
+            if head == "crate":
+                base = _rust_crate_dir(path, known)
+            else:
+                base = _rust_module_dir(path)
+                if head == "super":
+                    base = posixpath.dirname(base)
+                while segments and segments[0] == "super":
+                    segments.pop(0)
+                    base = posixpath.dirname(base)
+            resolved = _rust_module_file(base, segments, known) if segments else None
+        if resolved:
+            targets.add(resolved)
+    return targets
+
+
+def resolve_import_specs(
+    specs_by_path: Mapping[str, list[str]],
+    paths: Iterable[str],
+    go_module: str | None = None,
+) -> ImportGraph:
+    """Resolve raw specs against the repo's ``paths`` into an ``ImportGraph``."""
+    known = set(paths)
+    module_index = _python_module_index(known)
+    go_packages = _go_package_index(known)
+    graph = ImportGraph()
+    for path, specs in specs_by_path.items():
+        if path.endswith(PYTHON_EXTENSIONS):
+            targets = _resolve_python(path, specs, module_index)
+        elif path.endswith(JS_EXTENSIONS):
+            targets = _resolve_js(path, specs, known)
+        elif path.endswith(GO_EXTENSIONS):
+            targets = _resolve_go(specs, go_packages, go_module)
+        elif path.endswith(RUST_EXTENSIONS):
+            targets = _resolve_rust(path, specs, known)
+        else:
+            continue
+        targets.discard(path)
+        graph[path] = sorted(targets)
+    return graph
+
+
+def build_import_graph(
+    codebase: Mapping[str, str],
+    digests: Mapping[str, str] | None = None,
+    go_module: str | None = None,
+    use_cache: bool = True,
+) -> ImportGraph:
+    """Import graph of every supported source file in ``codebase``.
+
+    ``digests`` holds content hashes already computed by the loader; missing
+    ones are computed here. Specs found in the cache skip extraction, so
+    unchanged files are never re-parsed across loads.
+    """
+    paths = [path for path in codebase if path.endswith(GRAPH_EXTENSIONS)]
+    digests = digests or {}
+    keys = {}
+    for path in paths:
+        digest = digests.get(path)
+        keys[path] = _spec_key(path, digest or content_digest(codebase[path]))
+
+    cached = cache.get_import_specs(keys.values()) if use_cache else {}
+    specs_by_path: dict[str, list[str]] = {}
+    fresh: dict[str, list[str]] = {}
+    for path in paths:
+        specs = cached.get(keys[path])
+        if specs is None:
+            specs = fresh[keys[path]] = extract_import_specs(path, codebase[path])
+        specs_by_path[path] = specs
+    if use_cache and fresh:
+        cache.set_import_specs(fresh)
+
+    return resolve_import_specs(specs_by_path, codebase, go_module)
+
+
+# -- Queries ----------------------------------------------------------------
+
+def reverse_edges(graph: Mapping[str, Iterable[str]]) -> dict[str, list[str]]:
+    """``path -> sorted list of files importing it``."""
+    importers: dict[str, list[str]] = {}
+    for source in sorted(graph):
+        for target in graph[source]:
+            importers.setdefault(target, []).append(source)
+    return importers
+
+
+def most_imported(graph: Mapping[str, Iterable[str]], limit: int = 10) -> list[tuple[str, int]]:
+    """The ``limit`` files with the highest fan-in, as ``(path, importers)``."""
+    counts = {path: len(sources) for path, sources in reverse_edges(graph).items()}
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def strongly_connected_components(graph: Mapping[str, Iterable[str]]) -> list[list[str]]:
+    """Import cycles: components with more than one file, largest first.
+
+    Iterative Tarjan, so deep import chains cannot hit the recursion limit.
+    """
+    index: dict[str, int] = {}
+    lowlink: dict[str, int] = {}
+    on_stack: set[str] = set()
+    stack: list[str] = []
+    components: list[list[str]] = []
+
+    for root in sorted(graph):
+        if root in index:
+            continue
+        work = [(root, iter(graph.get(root, ())))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph.get(child, ()))))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        components.append(sorted(component))
+
+    return sorted(components, key=lambda c: (-len(c), c))
+
+
+def make_graph_helpers(graph: Mapping[str, list[str]] | None) -> dict[str, Callable]:
+    """``fan_in``, ``fan_out`` and ``import_cycles`` over one REPL's import graph."""
+    graph = graph or {}
+    importers: dict[str, list[str]] | None = None
+
+    def fan_in(path: str) -> list[str]:
+        """Repo files that import ``path``."""
+        nonlocal importers
+        if importers is None:
+            importers = reverse_edges(graph)
+        return list(importers.get(path, ()))
+
+    def fan_out(path: str) -> list[str]:
+        """Repo files that ``path`` imports."""
+        return list(graph.get(path, ()))
+
+    def import_cycles() -> list[list[str]]:
+        """Groups of files that import each other (strongly connected components)."""
+        return strongly_connected_components(graph)
+
+    return {"fan_in": fan_in, "fan_out": fan_out, "import_cycles": import_cycles}
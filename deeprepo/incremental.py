@@ -0,0 +1,341 @@
+"""Incremental context refresh: re-analyse only what changed.
+
+Per-file sub-LLM findings are persisted in ``.deeprepo/findings.json`` keyed
+by content hash. Full runs (``init``, full ``refresh``) seed the store with
+the most imported files, the likeliest neighbours of a future change. On
+refresh, changed files and their import neighbours are re-analysed with one
+``llm_batch``-style dispatch, and the root model is asked to patch only the
+affected ``##`` sections of PROJECT.md.
+"""
+
+import json
+import logging
+import re
+from pathlib import Path
+
+from .import_graph import most_imported
+from .llm_clients import SubModelClient, TokenUsage, create_root_client
+
+logger = logging.getLogger(__name__)
+
+FINDINGS_FILENAME = "findings.json"
+FINDINGS_VERSION = 1
+
+# Above this many changed files a full RLM pass is both cheaper to reason
+# about and more likely to produce a coherent document.
+MAX_INCREMENTAL_FILES = 40
+# Neighbours are context for the changed files, not the main work.
+MAX_NEIGHBOUR_FILES = 20
+# Findings stored after a full run, most imported files first.
+MAX_SEEDED_FILES = 50
+MAX_FILE_CHARS = 40_000
+
+_FRONTMATTER_RE = re.compile(r"^---\n.*?\n---\n", re.DOTALL)
+_HEADING_RE = re.compile(r"^##\s+(.+?)\s*$")
+
+
+class FindingsStore:
+    """Per-file sub-LLM findings, persisted in ``.deeprepo/findings.json``."""
+
+    def __init__(self, deeprepo_dir: Path):
+        self.path = Path(deeprepo_dir) / FINDINGS_FILENAME
+        self.files: dict[str, dict] = {}
+
+    def load(self) -> "FindingsStore":
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return self
+        if isinstance(data, dict) and data.get("version") == FINDINGS_VERSION:
+            self.files = dict(data.get("files") or {})
+        return self
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"version": FINDINGS_VERSION, "files": self.files}
+        self.path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    def get(self, path: str, file_hash: str) -> str | None:
+        """Return the stored finding for ``path`` if it matches ``file_hash``."""
+        entry = self.files.get(path)
+        if entry and entry.get("hash") == file_hash:
+            return entry.get("finding")
+        return None
+
+    def put(self, path: str, file_hash: str, finding: str) -> None:
+        self.files[path] = {"hash": file_hash, "finding": finding}
+
+    def discard(self, paths) -> None:
+        for path in paths:
+            self.files.pop(path, None)
+
+
+def import_edges(graph) -> dict[str, set[str]]:
+    """``path -> set of repo paths it imports`` from a loader's ``import_graph``."""
+    return {path: set(targets) for path, targets in graph.items()}
+
+
+def find_neighbours(edges: dict[str, set[str]], paths) -> set[str]:
+    """Files that import, or are imported by, any of ``paths`` (excluding ``paths``)."""
+    paths = set(paths)
+    neighbours: set[str] = set()
+    for source, targets in edges.items():
+        if source in paths:
+            neighbours |= targets
+        elif targets & paths:
+            neighbours.add(source)
+    return neighbours - paths
+
+
+def split_sections(markdown: str) -> tuple[str, list[tuple[str, str]]]:
+    """Split markdown into a preamble and ordered ``(heading, body)`` pairs."""
+    preamble: list[str] = []
+    sections: list[tuple[str, list[str]]] = []
+    for line in markdown.splitlines():
+        match = _HEADING_RE.match(line)
+        if match:
+            sections.append((match.group(1), []))
+        elif sections:
+            sections[-1][1].append(line)
+        else:
+            preamble.append(line)
+    return (
+        "\n".join(preamble).strip(),
+        [(heading, "\n".join(lines).strip()) for heading, lines in sections],
+    )
+
+
+def merge_sections(document: str, patch: str) -> tuple[str, list[str]]:
+    """Replace sections of ``document`` with same-named sections from ``patch``.
+
+    Sections not present in the document are appended. Returns the merged
+    markdown and the list of headings that were changed.
+    """
+    preamble, sections = split_sections(document)
+    _, patched = split_sections(patch)
+    replacements = dict(patched)
+    updated: list[str] = []
+
+    merged: list[tuple[str, str]] = []
+    for heading, body in sections:
+        if heading in replacements:
+            new_body = replacements.pop(heading)
+            if new_body != body:
+                updated.append(heading)
+            merged.append((heading, new_body))
+        else:
+            merged.append((heading, body))
+    for heading, body in patched:
+        if heading in replacements:
+            merged.append((heading, body))
+            updated.append(heading)
+            replacements.pop(heading)
+
+    parts = [preamble] if preamble else []
+    parts += [f"## {heading}\n{body}".rstrip() for heading, body in merged]
+    return "\n\n".join(parts) + "\n", updated
+
+
+class IncrementalRefresher:
+    """Re-analyse changed files and patch PROJECT.md section by section."""
+
+    def __init__(
+        self,
+        project_path: str,
+        config,
+        usage: TokenUsage | None = None,
+        root_client=None,
+        sub_client=None,
+        verbose: bool = True,
+    ):
+        self.project_path = Path(project_path).resolve()
+        self.deeprepo_dir = self.project_path / ".deeprepo"
+        self.config = config
+        self.usage = usage or TokenUsage()
+        self._root_client = root_client
+        self._sub_client = sub_client
+        self.verbose = verbose
+
+    @property
+    def root_client(self):
+        if self._root_client is None:
+            self.usage.set_root_pricing(self.config.root_model)
+            self._root_client = create_root_client(usage=self.usage, model=self.config.root_model)
+        return self._root_client
+
+    @property
+    def sub_client(self):
+        if self._sub_client is None:
+            self._sub_client = SubModelClient(
+                usage=self.usage, model=self.config.sub_model, use_cache=True
+            )
+        return self._sub_client
+
+    def can_refresh(self, changes: dict) -> bool:
+        """Whether an incremental pass is possible for this change set."""
+        changed = len(changes["modified"]) + len(changes["added"]) + len(changes["deleted"])
+        return (
+            0 < changed <= MAX_INCREMENTAL_FILES
+            and (self.deeprepo_dir / "PROJECT.md").is_file()
+        )
+
+    def run(self, changes: dict, current_hashes: dict[str, str]) -> dict:
+        """Analyse the change set and return the patched PROJECT.md body.
+
+        Returns a dict shaped like ``run_analysis`` output (``analysis``,
+        ``status``, ``turns``, ``usage``) plus ``reanalysed`` and
+        ``updated_sections``.
+        """
+        from .codebase_loader import load_codebase
+        from .domains.context import (
+            CONTEXT_PATCH_SYSTEM_PROMPT,
+            CONTEXT_SUB_SYSTEM_PROMPT,
+        )
+
+        project_md = (self.deeprepo_dir / "PROJECT.md").read_text(encoding="utf-8")
+        document = _FRONTMATTER_RE.sub("", project_md, count=1).strip()
+
+        changed = sorted(set(changes["modified"]) | set(changes["added"]))
+        deleted = sorted(changes["deleted"])
+
+        loaded = load_codebase(str(self.project_path))
+        codebase = loaded["codebase"]
+        edges = import_edges(loaded["metadata"]["import_graph"])
+        neighbours = sorted(find_neighbours(edges, [*changed, *deleted]))[:MAX_NEIGHBOUR_FILES]
+        targets = [path for path in [*changed, *neighbours] if path in codebase]
+
+        store = FindingsStore(self.deeprepo_dir).load()
+        store.discard(deleted)
+
+        # Unchanged neighbours reuse their stored finding when the hash still matches.
+        findings: dict[str, str] = {}
+        dispatch: list[str] = []
+        for path in targets:
+            stored = None
+            if path not in changed and path in current_hashes:
+                stored = store.get(path, current_hashes[path])
+            if stored is not None:
+                findings[path] = stored
+            else:
+                dispatch.append(path)
+
+        prompts = [
+            self._finding_prompt(path, codebase[path], edges, changed, deleted)
+            for path in dispatch
+        ]
+        if self.verbose and prompts:
+            print(f"Re-analysing {len(prompts)} file(s) ({len(changed)} changed)...")
+        results = self.sub_client.batch(prompts, system=CONTEXT_SUB_SYSTEM_PROMPT) if prompts else []
+
+        for path, result in zip(dispatch, results):
+            if result.startswith("[ERROR"):
+                previous = store.files.get(path, {}).get("finding")
+                if previous:
+                    findings[path] = previous
+                continue
+            findings[path] = result
+            if path in current_hashes:
+                store.put(path, current_hashes[path], result)
+        store.save()
+
+        patch = self.root_client.complete(
+            messages=[{
+                "role": "user",
+                "content": self._patch_prompt(document, changed, deleted, findings),
+            }],
+            system=CONTEXT_PATCH_SYSTEM_PROMPT,
+        )
+        if patch.strip() == "NO_CHANGES":
+            analysis, updated = document + "\n", []
+        else:
+            analysis, updated = merge_sections(document, patch)
+
+        return {
+            "analysis": analysis,
+            "status": "completed",
+            "turns": 1,
+            "usage": self.usage,
+            "reanalysed": dispatch,
+            "updated_sections": updated,
+        }
+
+    def seed(self, current_hashes: dict[str, str]) -> list[str]:
+        """Store findings for the most imported files after a full analysis.
+
+        Incremental refreshes reuse stored findings for unchanged import
+        neighbours; without a seed the first refresh has none. Files whose
+        stored finding still matches their hash are skipped, and findings
+        for files that no longer exist are dropped. Returns the analysed paths.
+        """
+        from .codebase_loader import load_codebase
+        from .domains.context import CONTEXT_SUB_SYSTEM_PROMPT
+
+        store = FindingsStore(self.deeprepo_dir).load()
+        store.discard([path for path in store.files if path not in current_hashes])
+
+        loaded = load_codebase(str(self.project_path))
+        codebase = loaded["codebase"]
+        graph = loaded["metadata"]["import_graph"]
+        edges = import_edges(graph)
+        dispatch = [
+            path
+            for path, _ in most_imported(graph, MAX_SEEDED_FILES)
+            if path in codebase
+            and path in current_hashes
+            and store.get(path, current_hashes[path]) is None
+        ]
+
+        prompts = [self._finding_prompt(path, codebase[path], edges, [], []) for path in dispatch]
+        if self.verbose and prompts:
+            print(f"Recording findings for {len(prompts)} most imported file(s)...")
+        results = self.sub_client.batch(prompts, system=CONTEXT_SUB_SYSTEM_PROMPT) if prompts else []
+
+        seeded = []
+        for path, result in zip(dispatch, results):
+            if not result.startswith("[ERROR"):
+                store.put(path, current_hashes[path], result)
+                seeded.append(path)
+        store.save()
+        return seeded
+
+    @staticmethod
+    def _finding_prompt(path, content, edges, changed, deleted) -> str:
+        if len(content) > MAX_FILE_CHARS:
+            content = content[:MAX_FILE_CHARS] + "\n... [truncated]"
+        related = sorted(
+            other for other in [*changed, *deleted]
+            if other != path and (other in edges.get(path, ()) or path in edges.get(other, ()))
+        )
+        note = ""
+        if path not in changed and related:
+            note = f"This file is unchanged but is linked by imports to changed files: {', '.join(related)}.\n"
+        return f"Document this file: {path}\n{note}\n```\n{content}\n```"
+
+    @staticmethod
+    def _patch_prompt(document, changed, deleted, findings) -> str:
+        lines = ["<project_md>", document, "</project_md>", "", "Changed files:"]
+        lines += [f"- {path}" for path in changed] or ["- (none)"]
+        lines += ["", "Deleted files:"]
+        lines += [f"- {path}" for path in deleted] or ["- (none)"]
+        lines += ["", "<worker_notes>"]
+        for path, finding in findings.items():
+            lines += [f'<file path="{path}">', finding.strip(), "</file>"]
+        lines += ["</worker_notes>", "", "Return the updated sections only, or NO_CHANGES."]
+        return "\n".join(lines)
+
+
+def seed_findings(
+    project_path: str, config, current_hashes: dict[str, str], verbose: bool = True
+) -> TokenUsage:
+    """Run ``IncrementalRefresher.seed()`` after a full analysis has been saved.
+
+    Seeding is optional, so a failure is logged and otherwise ignored. Its
+    sub-LLM calls are charged to a usage of their own, which is returned,
+    so that the analysis keeps its own cost.
+    """
+    usage = TokenUsage()
+    try:
+        IncrementalRefresher(project_path, config, usage=usage, verbose=verbose).seed(current_hashes)
+    except Exception:
+        logger.warning("Could not record findings for incremental refreshes", exc_info=True)
+    return usage
@@ -8,13 +8,23 @@ Sub-LLM workers: MiniMax M2.5 via OpenRouter (OpenAI-compatible)
 import os
 import time
 import asyncio
+import contextlib
+import contextvars
+import queue
 import sys
+import threading
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import CancelledError
 from dataclasses import dataclass, field
 
 import anthropic
 import openai
 from dotenv import load_dotenv
 
+from deeprepo import tracing
+from deeprepo.concurrency import AdaptiveConcurrencyLimiter
+from deeprepo.memo import FOLLOW, HIT, PromptMemo, follow, memo_key
+from deeprepo.rate_limit import estimate_request_tokens, get_rate_limiter
 from deeprepo.utils import async_retry_with_backoff, retry_with_backoff
 
 
@@ -35,6 +45,71 @@ SUB_MODEL_PRICING = {
 
 DEFAULT_SUB_MODEL = "minimax/minimax-m2.5"
 
+# Tail-latency bounds for sub-LLM batches (see SubModelClient.astream).
+DEFAULT_BATCH_DEADLINE_SECONDS = 300.0
+HEDGE_MIN_SAMPLES = 3           # Finished calls needed before judging stragglers
+HEDGE_LATENCY_MULTIPLIER = 3.0  # Hedge calls slower than this multiple of the median
+HEDGE_MAX_FRACTION = 0.1        # At most this share of a batch is hedged (min 1)
+HEDGE_POLL_SECONDS = 1.0
+
+# Anthropic prompt caching: reads are billed at 10% of the input price,
+# writes (the first time a prefix is cached) at 125%.
+CACHE_READ_PRICE_MULTIPLIER = 0.1
+CACHE_WRITE_PRICE_MULTIPLIER = 1.25
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _with_cache_breakpoint(block):
+    """Copy of a content block (or plain string content) marked as a cache breakpoint."""
+    if isinstance(block, str):
+        return [{"type": "text", "text": block, "cache_control": CACHE_CONTROL}]
+    if isinstance(block, dict):
+        return {**block, "cache_control": CACHE_CONTROL}
+    return block
+
+
+def _add_cache_breakpoints(kwargs: dict) -> None:
+    """Mark the tool definitions, system prompt and conversation so far as cacheable.
+
+    Anthropic caches the request prefix up to each breakpoint, so on the next
+    turn everything except the newest user message is billed as a cache read.
+    Breakpoints go on copies; the caller's ``messages`` list is left untouched
+    so old breakpoints don't pile up past the API's limit of four.
+    """
+    if kwargs.get("tools"):
+        tools = list(kwargs["tools"])
+        tools[-1] = _with_cache_breakpoint(tools[-1])
+        kwargs["tools"] = tools
+    if kwargs.get("system"):
+        kwargs["system"] = _with_cache_breakpoint(kwargs["system"])
+
+    messages = list(kwargs["messages"])
+    if messages:
+        last = dict(messages[-1])
+        content = last.get("content")
+        if isinstance(content, str) and content:
+            last["content"] = _with_cache_breakpoint(content)
+        elif isinstance(content, list) and content:
+            content = list(content)
+            content[-1] = _with_cache_breakpoint(content[-1])
+            last["content"] = content
+        messages[-1] = last
+    kwargs["messages"] = messages
+
+
+def _request_token_estimate(kwargs: dict) -> int:
+    """Estimated tokens for a root request built by ``_request_kwargs``.
+
+    Tokenizes the whole request, so callers skip it when the provider's
+    rate limiter is disabled (the default).
+    """
+    return estimate_request_tokens(
+        kwargs.get("system"),
+        kwargs["messages"],
+        kwargs.get("tools"),
+        max_tokens=kwargs["max_tokens"],
+    )
+
 
 @dataclass
 class TokenUsage:
@@ -45,6 +120,20 @@ class TokenUsage:
     sub_output_tokens: int = 0
     root_calls: int = 0
     sub_calls: int = 0
+    # Root input tokens served from / written to the Anthropic prompt cache.
+    # Not included in root_input_tokens, which the API reports separately.
+    root_cache_read_tokens: int = 0
+    root_cache_write_tokens: int = 0
+    # Duplicate requests sent for slow batch prompts, and prompts given up on
+    # at the batch deadline.
+    sub_hedged_calls: int = 0
+    sub_deadline_misses: int = 0
+    # Where sub-LLM prompts were answered from: the per-run memo, a request
+    # already in flight for the same prompt, the persistent cache, or the API.
+    sub_memo_hits: int = 0
+    sub_coalesced: int = 0
+    sub_cache_hits: int = 0
+    sub_cache_misses: int = 0
     root_latency_ms: list[float] = field(default_factory=list)
     sub_latency_ms: list[float] = field(default_factory=list)
 
@@ -82,8 +171,12 @@ class TokenUsage:
 
     @property
     def root_cost(self) -> float:
+        cached_input = (
+            self.root_cache_read_tokens * CACHE_READ_PRICE_MULTIPLIER
+            + self.root_cache_write_tokens * CACHE_WRITE_PRICE_MULTIPLIER
+        )
         return (
-            (self.root_input_tokens / 1_000_000) * self.root_input_price
+            ((self.root_input_tokens + cached_input) / 1_000_000) * self.root_input_price
             + (self.root_output_tokens / 1_000_000) * self.root_output_price
         )
 
@@ -99,14 +192,34 @@ class TokenUsage:
         return self.root_cost + self.sub_cost
 
     def summary(self) -> str:
+        cache = ""
+        if self.root_cache_read_tokens or self.root_cache_write_tokens:
+            cache = (
+                f" (+ cache {self.root_cache_read_tokens:,} read / "
+                f"{self.root_cache_write_tokens:,} written)"
+            )
+        dedup = ""
+        if self.sub_memo_hits or self.sub_coalesced or self.sub_cache_hits:
+            dedup = (
+                f"Sub dedup: {self.sub_memo_hits} memo hits, "
+                f"{self.sub_coalesced} coalesced, {self.sub_cache_hits} cache hits, "
+                f"{self.sub_cache_misses} misses\n"
+            )
+        tail = ""
+        if self.sub_hedged_calls or self.sub_deadline_misses:
+            tail = (
+                f" ({self.sub_hedged_calls} hedged, "
+                f"{self.sub_deadline_misses} past deadline)"
+            )
         return (
             f"=== Token Usage & Cost ===\n"
             f"Root ({self.root_model_label}): {self.root_calls} calls, "
-            f"{self.root_input_tokens:,} in / {self.root_output_tokens:,} out, "
+            f"{self.root_input_tokens:,} in{cache} / {self.root_output_tokens:,} out, "
             f"${self.root_cost:.4f}\n"
             f"Sub ({self.sub_model_label}): {self.sub_calls} calls, "
             f"{self.sub_input_tokens:,} in / {self.sub_output_tokens:,} out, "
-            f"${self.sub_cost:.4f}\n"
+            f"${self.sub_cost:.4f}{tail}\n"
+            f"{dedup}"
             f"Total cost: ${self.total_cost:.4f}"
         )
 
@@ -114,6 +227,8 @@ class TokenUsage:
 class RootModelClient:
     """Claude Opus 4.6 / Sonnet 4.5 via Anthropic API — the strategic orchestrator."""
 
+    provider = "anthropic"
+
     def __init__(self, usage: TokenUsage, model: str = "claude-opus-4-6"):
         load_dotenv()
         api_key = os.environ.get("ANTHROPIC_API_KEY")
@@ -125,6 +240,11 @@ class RootModelClient:
         self.model = model
         self.usage = usage
 
+    @property
+    def rate_limiter(self):
+        """Process-wide limiter shared by every client of this provider."""
+        return get_rate_limiter(self.provider)
+
     def complete(
         self,
         messages: list[dict],
@@ -134,28 +254,26 @@ class RootModelClient:
         tools: list[dict] | None = None,
         tool_choice: dict | None = None,
         stream: bool = False,
+        cache_prompt: bool = False,
     ) -> str:
         """Send a message to the root model and return the text response.
 
         When tools is provided, returns the full Anthropic response object
         instead of a string, so the caller can inspect tool_use blocks.
         When stream=True, tokens are displayed on stderr in real-time.
+        When cache_prompt=True, the tools, system prompt and messages are
+        marked for Anthropic prompt caching (worth it for multi-turn loops
+        that resend the same prefix, not for one-off calls).
         """
+        kwargs = self._request_kwargs(
+            messages, system, max_tokens, temperature, tools, tool_choice, cache_prompt
+        )
+        rate_limiter = self.rate_limiter
+        reservation = rate_limiter.acquire(
+            _request_token_estimate(kwargs) if rate_limiter.enabled else 0
+        )
         t0 = time.time()
 
-        kwargs = {
-            "model": self.model,
-            "max_tokens": max_tokens,
-            "messages": messages,
-            "temperature": temperature,
-        }
-        if system:
-            kwargs["system"] = system
-        if tools:
-            kwargs["tools"] = tools
-        if tool_choice is not None:
-            kwargs["tool_choice"] = tool_choice
-
         if stream:
             @retry_with_backoff()
             def _stream_call():
@@ -184,11 +302,50 @@ class RootModelClient:
                     f"Anthropic API error on {self.model} after retries: {e}"
                 ) from e
 
+        return self._finish(response, t0, tools, reservation)
+
+    def _request_kwargs(
+        self,
+        messages: list[dict],
+        system: str,
+        max_tokens: int,
+        temperature: float,
+        tools: list[dict] | None,
+        tool_choice: dict | None,
+        cache_prompt: bool = False,
+    ) -> dict:
+        kwargs = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": messages,
+            "temperature": temperature,
+        }
+        if system:
+            kwargs["system"] = system
+        if tools:
+            kwargs["tools"] = tools
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        if cache_prompt:
+            _add_cache_breakpoints(kwargs)
+        return kwargs
+
+    def _finish(self, response, t0: float, tools: list[dict] | None, reservation=None):
+        """Record usage and shape the return value for complete()."""
         latency_ms = (time.time() - t0) * 1000
         self.usage.root_calls += 1
         self.usage.root_input_tokens += response.usage.input_tokens
         self.usage.root_output_tokens += response.usage.output_tokens
+        cache_read = getattr(response.usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(response.usage, "cache_creation_input_tokens", None) or 0
+        self.usage.root_cache_read_tokens += cache_read
+        self.usage.root_cache_write_tokens += cache_write
         self.usage.root_latency_ms.append(latency_ms)
+        if reservation is not None:
+            # Cache reads don't count towards Anthropic's input-token rate limit.
+            reservation.settle(
+                response.usage.input_tokens + cache_write + response.usage.output_tokens
+            )
 
         if tools:
             return response
@@ -200,9 +357,66 @@ class RootModelClient:
         return "\n".join(text_parts)
 
 
+class AsyncRootModelClient(RootModelClient):
+    """Anthropic root client whose ``complete`` is a coroutine.
+
+    Holds one ``AsyncAnthropic`` client for its lifetime so a whole run shares
+    a single connection pool on the caller's event loop.
+    """
+
+    def __init__(self, usage: TokenUsage, model: str = "claude-opus-4-6"):
+        super().__init__(usage=usage, model=model)
+        self.async_client = anthropic.AsyncAnthropic(api_key=self.client.api_key)
+
+    async def complete(
+        self,
+        messages: list[dict],
+        system: str = "",
+        max_tokens: int = 8192,
+        temperature: float = 0.0,
+        tools: list[dict] | None = None,
+        tool_choice: dict | None = None,
+        stream: bool = False,
+        cache_prompt: bool = False,
+    ):
+        """Async counterpart of RootModelClient.complete()."""
+        kwargs = self._request_kwargs(
+            messages, system, max_tokens, temperature, tools, tool_choice, cache_prompt
+        )
+        rate_limiter = self.rate_limiter
+        reservation = await rate_limiter.aacquire(
+            _request_token_estimate(kwargs) if rate_limiter.enabled else 0
+        )
+        t0 = time.time()
+
+        async def _stream_call():
+            async with self.async_client.messages.stream(**kwargs) as stream_resp:
+                async for text in stream_resp.text_stream:
+                    sys.stderr.write(text)
+                    sys.stderr.flush()
+                sys.stderr.write("\n")
+                return await stream_resp.get_final_message()
+
+        try:
+            if stream:
+                response = await async_retry_with_backoff(_stream_call)
+            else:
+                response = await async_retry_with_backoff(
+                    self.async_client.messages.create, **kwargs
+                )
+        except Exception as e:
+            raise RuntimeError(
+                f"Anthropic API error on {self.model} after retries: {e}"
+            ) from e
+
+        return self._finish(response, t0, tools, reservation)
+
+
 class OpenRouterRootClient:
     """MiniMax M2.5 (or other models) via OpenRouter — OpenAI-compatible API."""
 
+    provider = "openrouter"
+
     def __init__(self, usage: TokenUsage, model: str = "minimax/minimax-m2.5"):
         load_dotenv()
         api_key = os.environ.get("OPENROUTER_API_KEY")
@@ -217,6 +431,11 @@ class OpenRouterRootClient:
         self.model = model
         self.usage = usage
 
+    @property
+    def rate_limiter(self):
+        """Process-wide limiter shared by every client of this provider."""
+        return get_rate_limiter(self.provider)
+
     def complete(
         self,
         messages: list[dict],
@@ -226,11 +445,42 @@ class OpenRouterRootClient:
         tools: list[dict] | None = None,
         tool_choice: dict | None = None,
         stream: bool = False,
+        cache_prompt: bool = False,
     ) -> str:
         """Send a message to the root model and return the text response."""
+        kwargs = self._request_kwargs(
+            messages, system, max_tokens, temperature, tools, tool_choice, cache_prompt
+        )
+        rate_limiter = self.rate_limiter
+        reservation = rate_limiter.acquire(
+            _request_token_estimate(kwargs) if rate_limiter.enabled else 0
+        )
         t0 = time.time()
 
-        # OpenAI SDK: system prompt goes as first message, not a separate param
+        @retry_with_backoff()
+        def _call():
+            return self.client.chat.completions.create(**kwargs)
+
+        try:
+            response = _call()
+        except Exception as e:
+            raise RuntimeError(f"OpenRouter API error on {self.model} after retries: {e}") from e
+
+        return self._finish(response, t0, tools, reservation)
+
+    def _request_kwargs(
+        self,
+        messages: list[dict],
+        system: str,
+        max_tokens: int,
+        temperature: float,
+        tools: list[dict] | None,
+        tool_choice: dict | None,
+        cache_prompt: bool = False,
+    ) -> dict:
+        # OpenAI SDK: system prompt goes as first message, not a separate param.
+        # cache_prompt is accepted for interface parity; these models cache
+        # (or don't) on the provider side without explicit breakpoints.
         api_messages = []
         if system:
             api_messages.append({"role": "system", "content": system})
@@ -261,21 +511,19 @@ class OpenRouterRootClient:
                 if isinstance(tool_choice, dict) and tool_choice.get("type") == "any"
                 else tool_choice
             )
+        return kwargs
 
-        @retry_with_backoff()
-        def _call():
-            return self.client.chat.completions.create(**kwargs)
-
-        try:
-            response = _call()
-        except Exception as e:
-            raise RuntimeError(f"OpenRouter API error on {self.model} after retries: {e}") from e
-
+    def _finish(self, response, t0: float, tools: list[dict] | None, reservation=None):
+        """Record usage and shape the return value for complete()."""
         latency_ms = (time.time() - t0) * 1000
         self.usage.root_calls += 1
         if response.usage:
             self.usage.root_input_tokens += response.usage.prompt_tokens or 0
             self.usage.root_output_tokens += response.usage.completion_tokens or 0
+            if reservation is not None:
+                reservation.settle(
+                    (response.usage.prompt_tokens or 0) + (response.usage.completion_tokens or 0)
+                )
         self.usage.root_latency_ms.append(latency_ms)
 
         if tools:
@@ -284,6 +532,46 @@ class OpenRouterRootClient:
         return response.choices[0].message.content or ""
 
 
+class AsyncOpenRouterRootClient(OpenRouterRootClient):
+    """OpenRouter root client whose ``complete`` is a coroutine."""
+
+    def __init__(self, usage: TokenUsage, model: str = "minimax/minimax-m2.5"):
+        super().__init__(usage=usage, model=model)
+        self.async_client = openai.AsyncOpenAI(
+            api_key=self.client.api_key,
+            base_url="https://openrouter.ai/api/v1",
+        )
+
+    async def complete(
+        self,
+        messages: list[dict],
+        system: str = "",
+        max_tokens: int = 8192,
+        temperature: float = 0.0,
+        tools: list[dict] | None = None,
+        tool_choice: dict | None = None,
+        stream: bool = False,
+        cache_prompt: bool = False,
+    ):
+        """Async counterpart of OpenRouterRootClient.complete()."""
+        kwargs = self._request_kwargs(
+            messages, system, max_tokens, temperature, tools, tool_choice, cache_prompt
+        )
+        rate_limiter = self.rate_limiter
+        reservation = await rate_limiter.aacquire(
+            _request_token_estimate(kwargs) if rate_limiter.enabled else 0
+        )
+        t0 = time.time()
+        try:
+            response = await async_retry_with_backoff(
+                self.async_client.chat.completions.create, **kwargs
+            )
+        except Exception as e:
+            raise RuntimeError(f"OpenRouter API error on {self.model} after retries: {e}") from e
+
+        return self._finish(response, t0, tools, reservation)
+
+
 # Models that use OpenRouter instead of Anthropic API
 OPENROUTER_ROOT_MODELS = {"minimax/minimax-m2.5"}
 
@@ -295,15 +583,26 @@ def create_root_client(usage: TokenUsage, model: str = "claude-opus-4-6"):
     return RootModelClient(usage=usage, model=model)
 
 
+def create_async_root_client(usage: TokenUsage, model: str = "claude-opus-4-6"):
+    """Factory: async variant of create_root_client()."""
+    if model in OPENROUTER_ROOT_MODELS:
+        return AsyncOpenRouterRootClient(usage=usage, model=model)
+    return AsyncRootModelClient(usage=usage, model=model)
+
+
 class SubModelClient:
     """MiniMax M2.5 via OpenRouter — the cheap, fast worker."""
 
+    provider = "openrouter"
+
     def __init__(
         self,
         usage: TokenUsage,
         model: str = DEFAULT_SUB_MODEL,
         base_url: str = "https://openrouter.ai/api/v1",
         use_cache: bool = True,
+        limiter=None,
+        batch_deadline: float | None = DEFAULT_BATCH_DEADLINE_SECONDS,
     ):
         load_dotenv()
         api_key = os.environ.get("OPENROUTER_API_KEY")
@@ -317,25 +616,68 @@ class SubModelClient:
         self.usage = usage
         self.usage.set_sub_pricing(model)
         self.use_cache = use_cache
+        # Optional async context manager held around every async API call,
+        # shared between clients to enforce a process-wide concurrency cap.
+        self.limiter = limiter
+        # Adaptive limit for batches; persists across every batch of a run.
+        self.concurrency = AdaptiveConcurrencyLimiter()
+        self.batch_deadline = batch_deadline
+        # Answers and in-flight requests of this client (i.e. this run).
+        self.memo = PromptMemo()
         self._lock = asyncio.Lock()
 
+    @property
+    def rate_limiter(self):
+        """Process-wide limiter shared by every client of this provider."""
+        return get_rate_limiter(self.provider)
+
     def query(self, prompt: str, system: str = "", max_tokens: int = 4096) -> str:
         """Synchronous single query to the sub-LLM."""
+        key = memo_key(prompt, system)
+        while True:
+            state, value = self.memo.claim(key)
+            if state == HIT:
+                self.usage.sub_memo_hits += 1
+                return value
+            if state != FOLLOW:
+                break
+            self.usage.sub_coalesced += 1
+            try:
+                return value.result()
+            except CancelledError:
+                continue  # The leader's request was cancelled; take over.
+        try:
+            result = self._query(prompt, system=system, max_tokens=max_tokens)
+        except BaseException as exc:
+            self.memo.settle(key, error=exc)
+            raise
+        self.memo.settle(key, result)
+        return result
+
+    def _query(self, prompt: str, system: str, max_tokens: int) -> str:
         # Check cache first
         if self.use_cache:
             from deeprepo.cache import get_cached
 
             cached = get_cached(prompt, system, self.model)
             if cached is not None:
+                self.usage.sub_cache_hits += 1
                 return cached
 
+        self.usage.sub_cache_misses += 1
+        rate_limiter = self.rate_limiter
+        reservation = rate_limiter.acquire(
+            estimate_request_tokens(system, prompt, max_tokens=max_tokens)
+            if rate_limiter.enabled
+            else 0
+        )
         t0 = time.time()
         messages = []
         if system:
             messages.append({"role": "system", "content": system})
         messages.append({"role": "user", "content": prompt})
 
-        @retry_with_backoff()
+        @retry_with_backoff(on_error=self.concurrency.record_overload)
         def _call():
             return self.client.chat.completions.create(
                 model=self.model,
@@ -345,7 +687,8 @@ class SubModelClient:
             )
 
         try:
-            response = _call()
+            with tracing.span("sub-llm", tracing.SUB, prompt_chars=len(prompt)):
+                response = _call()
         except Exception as e:
             raise RuntimeError(f"Sub-LLM API error on {self.model} after retries: {e}") from e
 
@@ -354,6 +697,9 @@ class SubModelClient:
         if response.usage:
             self.usage.sub_input_tokens += response.usage.prompt_tokens or 0
             self.usage.sub_output_tokens += response.usage.completion_tokens or 0
+            reservation.settle(
+                (response.usage.prompt_tokens or 0) + (response.usage.completion_tokens or 0)
+            )
         self.usage.sub_latency_ms.append(latency_ms)
 
         result = response.choices[0].message.content or ""
@@ -372,22 +718,41 @@ class SubModelClient:
         system: str = "",
         max_tokens: int = 4096,
         lock: asyncio.Lock | None = None,
+        on_error=None,
+        on_sent=None,
     ) -> str:
-        """Async single query for use in batch."""
-        t0 = time.time()
+        """Async single query for use in batch.
+
+        ``on_sent`` is called once the local limits have let the request
+        through, so callers can time the API call alone.
+        """
         messages = []
         if system:
             messages.append({"role": "system", "content": system})
         messages.append({"role": "user", "content": prompt})
 
+        queued = time.time()
         try:
-            response = await async_retry_with_backoff(
-                self.async_client.chat.completions.create,
-                model=self.model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=0.0,
-            )
+            with tracing.span("sub-llm", tracing.SUB, prompt_chars=len(prompt)) as span_args:
+                async with self.limiter or contextlib.nullcontext():
+                    rate_limiter = self.rate_limiter
+                    reservation = await rate_limiter.aacquire(
+                        estimate_request_tokens(system, prompt, max_tokens=max_tokens)
+                        if rate_limiter.enabled
+                        else 0
+                    )
+                    t0 = time.time()
+                    span_args["queued_ms"] = round((t0 - queued) * 1000, 3)
+                    if on_sent is not None:
+                        on_sent()
+                    response = await async_retry_with_backoff(
+                        self.async_client.chat.completions.create,
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=0.0,
+                        on_error=on_error or self.concurrency.record_overload,
+                    )
         except Exception as e:
             raise RuntimeError(f"Sub-LLM API error on {self.model} after retries: {e}") from e
 
@@ -398,60 +763,369 @@ class SubModelClient:
             if response.usage:
                 self.usage.sub_input_tokens += response.usage.prompt_tokens or 0
                 self.usage.sub_output_tokens += response.usage.completion_tokens or 0
+                reservation.settle(
+                    (response.usage.prompt_tokens or 0) + (response.usage.completion_tokens or 0)
+                )
             self.usage.sub_latency_ms.append(latency_ms)
 
         return response.choices[0].message.content or ""
 
-    def batch(
+    async def _cache_writer(self, queue: asyncio.Queue, system: str) -> None:
+        """Drain ``(prompt, result)`` pairs into the cache until a ``None`` sentinel.
+
+        Whatever has queued up while the previous write was in flight is
+        flushed together in one transaction, off the event loop.
+        """
+        from deeprepo.cache import set_many
+
+        done = False
+        while not done:
+            pending = [await queue.get()]
+            while not queue.empty():
+                pending.append(queue.get_nowait())
+            if pending[-1] is None:
+                done = True
+                pending.pop()
+            entries = [item for item in pending if item is not None]
+            if entries:
+                await asyncio.to_thread(set_many, entries, system, self.model)
+
+    async def aquery(self, prompt: str, system: str = "", max_tokens: int = 4096) -> str:
+        """Async single query to the sub-LLM, memo- and cache-aware like query()."""
+        key = memo_key(prompt, system)
+        while True:
+            state, value = self.memo.claim(key)
+            if state == HIT:
+                self.usage.sub_memo_hits += 1
+                return value
+            if state != FOLLOW:
+                break
+            self.usage.sub_coalesced += 1
+            try:
+                return await follow(value)
+            except CancelledError:
+                continue  # The leader's request was cancelled; take over.
+        try:
+            result = await self._aquery(prompt, system=system, max_tokens=max_tokens)
+        except BaseException as exc:
+            self.memo.settle(key, error=exc)
+            raise
+        self.memo.settle(key, result)
+        return result
+
+    async def _aquery(self, prompt: str, system: str, max_tokens: int) -> str:
+        if self.use_cache:
+            from deeprepo.cache import get_cached
+
+            cached = await asyncio.to_thread(get_cached, prompt, system, self.model)
+            if cached is not None:
+                self.usage.sub_cache_hits += 1
+                return cached
+
+        self.usage.sub_cache_misses += 1
+        result = await self._async_query(prompt, system=system, max_tokens=max_tokens)
+
+        # Write to cache (don't cache errors)
+        if self.use_cache and not result.startswith("[ERROR"):
+            from deeprepo.cache import set_cached
+
+            await asyncio.to_thread(set_cached, prompt, system, self.model, result)
+
+        return result
+
+    async def astream(
         self,
         prompts: list[str],
         system: str = "",
         max_tokens: int = 4096,
-        max_concurrent: int = 5,
-    ) -> list[str]:
+        max_concurrent: int | None = None,
+        deadline: float | None = None,
+    ) -> AsyncIterator[tuple[int, str]]:
+        """Yield ``(index, result)`` for each prompt as soon as it is answered.
+
+        Each distinct prompt is sent at most once per client: repeats are
+        answered from ``self.memo``, duplicates within the batch share one
+        request, and prompts already in flight elsewhere (another batch,
+        thread or ``llm_query``) wait for that request. Then come persistent
+        cache hits, then API results in completion order. Concurrency follows
+        ``abatch()``. Two things bound the batch's tail latency:
+
+        - hedging: once a few calls have finished, a prompt running longer
+          than ``HEDGE_LATENCY_MULTIPLIER`` times the batch's median latency
+          gets a second, identical request; whichever answers first wins and
+          the other is cancelled. At most ``HEDGE_MAX_FRACTION`` of the batch
+          is hedged, so stragglers cost a few extra calls, not a second batch.
+        - ``deadline`` (seconds, default ``self.batch_deadline``; None for
+          no limit): prompts still unanswered when it passes are cancelled
+          and yielded as ``[ERROR: TimeoutError: ...]`` strings.
+
+        Errors are yielded as ``[ERROR: ...]`` strings like in ``abatch()``.
+        Breaking out of the loop early cancels the remaining calls.
         """
-        Parallel batch query — the key RLM advantage.
-        Sends multiple prompts concurrently to the sub-LLM.
+        loop = asyncio.get_running_loop()
+        if deadline is None:
+            deadline = self.batch_deadline
+        expires = loop.time() + deadline if deadline is not None else None
+
+        # Group duplicate prompts, then settle each group from the memo, by
+        # following a request already in flight, or by leading a new one.
+        groups: dict[tuple[str, str], list[int]] = {}
+        for index, prompt in enumerate(prompts):
+            groups.setdefault(memo_key(prompt, system), []).append(index)
+        leaders: dict[tuple[str, str], str] = {}  # key -> prompt text to send
+        followed: dict[tuple[str, str], object] = {}
+        for key, indices in groups.items():
+            state, value = self.memo.claim(key)
+            if state == HIT:
+                self.usage.sub_memo_hits += len(indices)
+                for index in indices:
+                    yield index, value
+            elif state == FOLLOW:
+                self.usage.sub_coalesced += len(indices)
+                followed[key] = value
+            else:
+                self.usage.sub_coalesced += len(indices) - 1
+                leaders[key] = prompts[indices[0]]
+
+        # Keys this batch still owes its followers an answer for.
+        owed = set(leaders)
+        try:
+            # Pre-check the persistent cache for the prompts we lead
+            if self.use_cache and leaders:
+                from deeprepo.cache import get_many
+
+                lead_keys = list(leaders)
+                cached_results = await asyncio.to_thread(
+                    get_many, [leaders[key] for key in lead_keys], system, self.model
+                )
+                for key, cached in zip(lead_keys, cached_results):
+                    if cached is not None:
+                        self.usage.sub_cache_hits += 1
+                        del leaders[key]
+                        owed.discard(key)
+                        self.memo.settle(key, cached)
+                        for index in groups[key]:
+                            yield index, cached
+            self.usage.sub_cache_misses += len(leaders)
+
+            if not leaders and not followed:
+                return
+
+            dispatch = self._dispatch(
+                leaders, followed, system, max_tokens, max_concurrent, expires, deadline
+            )
+            async with contextlib.aclosing(dispatch):
+                async for key, result in dispatch:
+                    if key in owed:
+                        owed.discard(key)
+                        self.memo.settle(key, result)
+                    for index in groups[key]:
+                        yield index, result
+        finally:
+            for key in owed:
+                self.memo.settle(key, error=RuntimeError("sub-LLM batch was cancelled"))
+
+    async def _dispatch(
+        self,
+        leaders: dict,
+        followed: dict,
+        system: str,
+        max_tokens: int,
+        max_concurrent: int | None,
+        expires: float | None,
+        deadline: float | None,
+    ) -> AsyncIterator[tuple[object, str]]:
+        """Send the ``leaders`` prompts and await ``followed`` futures.
+
+        Yields ``(key, result)`` in completion order; see ``astream()`` for
+        hedging and the deadline.
         """
-        # Pre-check cache for all prompts
-        merged_results: list[str | None] = [None] * len(prompts)
-        uncached_indices: list[int] = []
+        loop = asyncio.get_running_loop()
+        lock = asyncio.Lock()
+        adaptive = max_concurrent is None
+        limiter = self.concurrency if adaptive else asyncio.Semaphore(max_concurrent)
+        write_queue: asyncio.Queue | None = asyncio.Queue() if self.use_cache else None
+        # Primary request start times (after waiting for a slot) and the
+        # latencies of finished calls, for spotting stragglers.
+        started: dict = {}
+        latencies: list[float] = []
+
+        async def _limited_query(key, primary: bool) -> str:
+            async with limiter:
+                errors: list[BaseException] = []
+
+                def _on_error(exc: BaseException) -> None:
+                    errors.append(exc)
+                    self.concurrency.record_overload(exc)
+
+                # Time the API call only: waiting on a local RPM/TPM limit is
+                # not the API being slow, and must not shrink the limit or
+                # get a call hedged.
+                sent: list[float] = []
+
+                def _on_sent() -> None:
+                    sent.append(time.monotonic())
+                    if primary:
+                        started[key] = loop.time()
+
+                result = await self._async_query(
+                    leaders[key],
+                    system=system,
+                    max_tokens=max_tokens,
+                    lock=lock,
+                    on_error=_on_error,
+                    on_sent=_on_sent,
+                )
+                latency = time.monotonic() - sent[0]
+                latencies.append(latency)
+                # Latency that includes retry back-off says nothing about
+                # how the API copes with the current load.
+                if adaptive and not errors:
+                    self.concurrency.record_success(latency)
+            return result
+
+        attempts: dict[asyncio.Future, object] = {
+            asyncio.create_task(_limited_query(key, primary=True)): key for key in leaders
+        }
+        for key, future in followed.items():
+            attempts[follow(future)] = key
+        remaining = set(leaders) | set(followed)
+        hedged: set = set()
+        hedge_budget = max(1, int(len(leaders) * HEDGE_MAX_FRACTION))
+        writer = (
+            asyncio.create_task(self._cache_writer(write_queue, system))
+            if write_queue is not None
+            else None
+        )
 
-        if self.use_cache:
-            from deeprepo.cache import get_cached
+        def _hedge_after() -> float | None:
+            if len(hedged) >= hedge_budget or len(latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(latencies)
+            return ordered[len(ordered) // 2] * HEDGE_LATENCY_MULTIPLIER
 
-            for i, prompt in enumerate(prompts):
-                cached = get_cached(prompt, system, self.model)
-                if cached is not None:
-                    merged_results[i] = cached
-                else:
-                    uncached_indices.append(i)
-        else:
-            uncached_indices = list(range(len(prompts)))
+        try:
+            while remaining:
+                now = loop.time()
+                threshold = _hedge_after()
+                if threshold is not None:
+                    for key in sorted(remaining - hedged, key=lambda k: started.get(k, now)):
+                        if key in started and now - started[key] >= threshold:
+                            hedged.add(key)
+                            self.usage.sub_hedged_calls += 1
+                            attempts[asyncio.create_task(_limited_query(key, primary=False))] = key
+                            if len(hedged) >= hedge_budget:
+                                break
+
+                timeout = None
+                if threshold is not None and len(hedged) < hedge_budget:
+                    waiting = [
+                        started[k] + threshold - now for k in remaining - hedged if k in started
+                    ]
+                    # Re-check at least every HEDGE_POLL_SECONDS for prompts
+                    # that have not got a slot yet.
+                    timeout = max(min(waiting, default=HEDGE_POLL_SECONDS), 0.0)
+                if expires is not None:
+                    until_deadline = expires - now
+                    if until_deadline <= 0:
+                        break
+                    timeout = until_deadline if timeout is None else min(timeout, until_deadline)
+
+                done, _ = await asyncio.wait(
+                    attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    key = attempts.pop(task)
+                    if key not in remaining:
+                        continue
+                    exc = asyncio.CancelledError() if task.cancelled() else task.exception()
+                    if exc is not None and key in attempts.values():
+                        continue  # The other attempt may still succeed.
+                    remaining.discard(key)
+                    for other, other_key in list(attempts.items()):
+                        if other_key == key:
+                            other.cancel()
+                            del attempts[other]
+                    if exc is not None:
+                        yield key, f"[ERROR: {type(exc).__name__}: {exc}]"
+                        continue
+                    result = task.result()
+                    # Hand finished answers to the writer right away so a
+                    # crash later in the batch doesn't lose them.
+                    if write_queue is not None and key in leaders and not result.startswith("[ERROR"):
+                        write_queue.put_nowait((leaders[key], result))
+                    yield key, result
+
+            if remaining:
+                self.usage.sub_deadline_misses += len(remaining)
+                for key in list(remaining):
+                    remaining.discard(key)
+                    yield key, (
+                        f"[ERROR: TimeoutError: no answer within the batch deadline of "
+                        f"{deadline:g}s]"
+                    )
+        finally:
+            for task in attempts:
+                task.cancel()
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+            if writer is not None:
+                write_queue.put_nowait(None)
+                await writer
+
+    async def abatch(
+        self,
+        prompts: list[str],
+        system: str = "",
+        max_tokens: int = 4096,
+        max_concurrent: int | None = None,
+        deadline: float | None = None,
+    ) -> list[str]:
+        """Async parallel batch query on the caller's event loop.
 
-        # If all cached, return immediately
-        if not uncached_indices:
-            assert all(r is not None for r in merged_results)
-            return [r for r in merged_results if r is not None]
+        With ``max_concurrent=None`` the number of calls in flight follows
+        ``self.concurrency`` (AIMD on latency and 429/5xx responses);
+        an int pins a fixed limit for this batch instead. Stragglers are
+        hedged and ``deadline`` bounds the whole batch (see ``astream()``).
 
-        # Send only uncached prompts to API
-        uncached_prompts = [prompts[i] for i in uncached_indices]
+        Cache lookups and writes run in worker threads so the loop is never
+        blocked on SQLite.
+        """
+        merged_results: list[str | None] = [None] * len(prompts)
+        async for index, result in self.astream(
+            prompts,
+            system=system,
+            max_tokens=max_tokens,
+            max_concurrent=max_concurrent,
+            deadline=deadline,
+        ):
+            merged_results[index] = result
 
-        async def _run_batch():
-            lock = asyncio.Lock()
-            semaphore = asyncio.Semaphore(max_concurrent)
+        assert all(r is not None for r in merged_results)
+        return [r for r in merged_results if r is not None]
 
-            async def _limited_query(prompt: str) -> str:
-                async with semaphore:
-                    return await self._async_query(
-                        prompt,
-                        system=system,
-                        max_tokens=max_tokens,
-                        lock=lock,
-                    )
+    def batch(
+        self,
+        prompts: list[str],
+        system: str = "",
+        max_tokens: int = 4096,
+        max_concurrent: int | None = None,
+        deadline: float | None = None,
+    ) -> list[str]:
+        """
+        Parallel batch query — the key RLM advantage.
+        Sends multiple prompts concurrently to the sub-LLM.
 
-            tasks = [_limited_query(p) for p in uncached_prompts]
-            return await asyncio.gather(*tasks, return_exceptions=True)
+        Synchronous wrapper around abatch(); async callers should await
+        abatch() directly instead.
+        """
+        coro = self.abatch(
+            prompts,
+            system=system,
+            max_tokens=max_tokens,
+            max_concurrent=max_concurrent,
+            deadline=deadline,
+        )
 
         # Detect if we're already in an async context (Jupyter/FastAPI/etc.).
         try:
@@ -460,33 +1134,68 @@ class SubModelClient:
             loop = None
 
         if loop is None:
-            api_results = asyncio.run(_run_batch())
-        else:
-            import concurrent.futures
+            return asyncio.run(coro)
 
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(asyncio.run, _run_batch())
-                api_results = future.result()
+        import concurrent.futures
 
-        # Convert exceptions to error strings
-        processed = []
-        for r in api_results:
-            if isinstance(r, Exception):
-                processed.append(f"[ERROR: {type(r).__name__}: {r}]")
-            else:
-                processed.append(r)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(contextvars.copy_context().run, asyncio.run, coro)
+            return future.result()
 
-        # Merge API results back + write to cache
-        if self.use_cache:
-            from deeprepo.cache import set_cached
+    def stream(
+        self,
+        prompts: list[str],
+        system: str = "",
+        max_tokens: int = 4096,
+        max_concurrent: int | None = None,
+        deadline: float | None = None,
+    ) -> Iterator[tuple[int, str]]:
+        """Synchronous counterpart of astream(): ``(index, result)`` as they finish.
 
-            for idx, api_result in zip(uncached_indices, processed):
-                merged_results[idx] = api_result
-                if not api_result.startswith("[ERROR"):
-                    set_cached(prompts[idx], system, self.model, api_result)
-        else:
-            for idx, api_result in zip(uncached_indices, processed):
-                merged_results[idx] = api_result
+        The batch runs on its own event loop in a background thread; closing
+        the iterator early (e.g. ``break``) cancels the calls still in flight.
+        """
+        items: queue.Queue = queue.Queue()
+        handle: dict = {}
+        done = object()
+
+        async def _pump() -> None:
+            handle["loop"] = asyncio.get_running_loop()
+            handle["task"] = asyncio.current_task()
+            async for item in self.astream(
+                prompts,
+                system=system,
+                max_tokens=max_tokens,
+                max_concurrent=max_concurrent,
+                deadline=deadline,
+            ):
+                items.put(item)
 
-        assert all(r is not None for r in merged_results)
-        return [r for r in merged_results if r is not None]
+        def _run() -> None:
+            try:
+                asyncio.run(_pump())
+            except asyncio.CancelledError:
+                pass
+            except BaseException as exc:
+                items.put(exc)
+            finally:
+                items.put(done)
+
+        thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(_run,),
+            name="deeprepo-llm-stream",
+            daemon=True,
+        )
+        thread.start()
+        try:
+            while True:
+                item = items.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            if thread.is_alive() and "task" in handle:
+                handle["loop"].call_soon_threadsafe(handle["task"].cancel)
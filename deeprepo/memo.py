@@ -0,0 +1,122 @@
+"""Per-run memo and request coalescing for sub-LLM prompts.
+
+``deeprepo.cache`` persists answers across runs, but it is only consulted
+before a batch is dispatched: the same prompt appearing twice in one batch,
+or re-sent by a later turn (or a concurrently running block) while the
+first request is still in flight, would go to the API again. ``PromptMemo``
+sits in front of the persistent cache for the lifetime of one client:
+
+- answered prompts are remembered in memory (errors are not);
+- the first caller of an unanswered prompt becomes its *leader* and every
+  later caller *follows* the leader's future instead of sending its own
+  request (single-flight).
+
+Keys ignore trailing whitespace and blank-line runs so that prompts built
+from slightly different f-strings still coalesce. Futures are
+``concurrent.futures.Future`` objects, so followers can wait from any
+thread or, through ``follow()``, any event loop. Followers never cancel the
+shared future; should it be cancelled anyway, the next ``claim()`` of its
+key leads a new request.
+"""
+
+import asyncio
+import re
+import threading
+from concurrent.futures import CancelledError, Future
+
+HIT = "hit"
+FOLLOW = "follow"
+LEAD = "lead"
+
+_TRAILING_SPACE = re.compile(r"[ \t]+$", re.MULTILINE)
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Prompt text with insignificant whitespace differences removed."""
+    text = _TRAILING_SPACE.sub("", prompt.replace("\r\n", "\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def memo_key(prompt: str, system: str) -> tuple[str, str]:
+    return system, normalize_prompt(prompt)
+
+
+class PromptMemo:
+    """Thread-safe memo of answered prompts plus futures for in-flight ones."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: dict[tuple[str, str], str] = {}
+        self._inflight: dict[tuple[str, str], Future] = {}
+
+    def claim(self, key: tuple[str, str]) -> tuple[str, object]:
+        """Return ``(HIT, result)``, ``(FOLLOW, future)`` or ``(LEAD, future)``.
+
+        A leader must call ``settle()`` for its key exactly once, whether the
+        request succeeds or not, or its followers wait forever. A follower
+        whose future turns out cancelled should claim the key again.
+        """
+        with self._lock:
+            if key in self._results:
+                return HIT, self._results[key]
+            future = self._inflight.get(key)
+            if future is not None and not future.cancelled():
+                return FOLLOW, future
+            future = Future()
+            self._inflight[key] = future
+            return LEAD, future
+
+    def settle(
+        self,
+        key: tuple[str, str],
+        result: str | None = None,
+        error: BaseException | None = None,
+    ) -> None:
+        """Publish a leader's outcome; successful answers are remembered."""
+        with self._lock:
+            future = self._inflight.pop(key, None)
+            if error is None and not result.startswith("[ERROR"):
+                self._results[key] = result
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+def follow(future: Future) -> asyncio.Future:
+    """Wait for a leader's ``future`` on the running event loop.
+
+    Unlike ``asyncio.wrap_future()``, cancelling the returned future (a
+    follower hitting its deadline or closing its stream early) leaves
+    ``future`` untouched, so the leader and its other followers still get
+    the answer. If ``future`` itself is cancelled, the returned future
+    raises ``concurrent.futures.CancelledError`` rather than cancelling the
+    follower.
+    """
+    loop = asyncio.get_running_loop()
+    waiter = loop.create_future()
+
+    def _copy(source: Future) -> None:
+        if waiter.done():
+            return
+        if source.cancelled():
+            waiter.set_exception(CancelledError("the request this prompt followed was cancelled"))
+        elif source.exception() is not None:
+            waiter.set_exception(source.exception())
+        else:
+            waiter.set_result(source.result())
+
+    def _relay(source: Future) -> None:
+        try:
+            loop.call_soon_threadsafe(_copy, source)
+        except RuntimeError:
+            pass  # The follower's loop has closed; nobody is waiting.
+
+    future.add_done_callback(_relay)
+    return waiter
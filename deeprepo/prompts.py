@@ -13,13 +13,19 @@ A codebase has been loaded into your Python REPL environment. You do NOT see the
 
 ## Available Variables
 - `codebase` — dict mapping relative file paths to file contents (strings)
-- `file_tree` — string showing the directory structure with indentation
-- `metadata` — dict with repo stats: total_files, total_chars, total_lines, file_types, largest_files, entry_points
+- `file_tree` — string showing the full directory structure with indentation (the tree in the first message may summarize large directories as file counts)
+- `metadata` — dict with repo stats: total_files, total_chars, total_lines, file_types, largest_files, entry_points, import_graph (path -> repo files it imports)
+- `repl_history` — dict mapping turn number to the full output of that turn (older outputs in the conversation may be shortened to a digest; read them back from here)
 
 ## Available Functions
 - `print(x)` — display output (truncated to 8192 chars per turn)
 - `llm_query(prompt: str) -> str` — send a focused task to a sub-LLM worker (synchronous)
 - `llm_batch(prompts: list[str]) -> list[str]` — send multiple tasks in PARALLEL (faster, use this when possible)
+- `llm_stream(prompts: list[str])` — like llm_batch, but iterate `for i, result in llm_stream(prompts):` to handle each result as soon as it arrives
+- `llm_map_reduce(path: str, instruction: str) -> str` — analyse a file too big for one prompt (including `[FILE TOO LARGE]` ones): it is split at function/class boundaries, each part goes through llm_batch, and the answers are merged. `chunk_file(path)` returns the parts (`.text`, `.start_line`, `.end_line`) if you want to build prompts yourself
+- `search(regex: str, glob: str | None = None) -> list[str]` — paths of files whose content matches `regex` (optionally only paths matching a glob like `"*.py"`). Backed by a prebuilt index: use it instead of looping over `codebase.items()` with `re.search`
+- `grep(regex: str, glob: str | None = None) -> list[Hit]` — matching lines as `(path, line, text)` tuples, e.g. `grep(r"def \\w+_handler", glob="src/*")`
+- `fan_in(path: str) -> list[str]` / `fan_out(path: str) -> list[str]` — files that import `path` / that `path` imports, from the precomputed import graph (Python, JS/TS, Go, Rust); `import_cycles()` lists groups of files that import each other
 - `set_answer(text: str)` — set your final analysis text AND mark it as ready in one call. **Always use this to submit your final answer** (avoids string-escaping issues with direct assignment).
 
 ## How to Execute Code
@@ -0,0 +1,178 @@
+"""Process-wide, per-provider rate limiting for LLM API calls.
+
+Every client (root and sub, sync and async) reserves capacity from the
+limiter for its provider before sending a request, so several analyses
+sharing one API key stay under the key's requests-per-minute and
+tokens-per-minute limits instead of discovering them through 429s and
+backoff.
+
+Limits come from the environment and are off unless set::
+
+    DEEPREPO_ANTHROPIC_RPM / DEEPREPO_ANTHROPIC_TPM
+    DEEPREPO_OPENROUTER_RPM / DEEPREPO_OPENROUTER_TPM
+
+Token counts are only known after the response arrives, so a request
+reserves an estimate up front and ``Reservation.settle()`` corrects the
+bucket with the real usage afterwards.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections.abc import Callable
+
+from .tokens import count_structure_tokens
+
+DEFAULT_OUTPUT_ESTIMATE = 1024  # Tokens reserved for the reply until usage is known
+
+
+class TokenBucket:
+    """A bucket holding up to one minute of allowance, refilled continuously.
+
+    Reservations may drive the level negative; the deficit is the time the
+    caller must wait, which queues concurrent callers in arrival order.
+    """
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._updated = now
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount`` and return how many seconds to wait before using it."""
+        self._refill(now)
+        # A single request larger than the whole bucket would otherwise never fit.
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def credit(self, amount: float, now: float) -> None:
+        """Return (or, when negative, additionally charge) ``amount``."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class Reservation:
+    """Capacity taken for one request; ``settle`` it with the real token count."""
+
+    def __init__(self, limiter: "ProviderRateLimiter", tokens: int):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.settled = False
+
+    def settle(self, actual_tokens: int) -> None:
+        if self.settled:
+            return
+        self.settled = True
+        self.limiter._credit_tokens(self.tokens - actual_tokens)
+
+
+class ProviderRateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one provider.
+
+    ``None`` for either limit disables that bucket. Thread-safe, and usable
+    from any event loop, since waiting happens outside the lock.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: float | None = None,
+        tpm: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self._clock = clock
+        self._lock = threading.Lock()
+        now = clock()
+        self._requests = TokenBucket(rpm, now) if rpm else None
+        self._tokens = TokenBucket(tpm, now) if tpm else None
+        self.waited_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self._requests is not None or self._tokens is not None
+
+    def reserve(self, tokens: int) -> tuple[Reservation, float]:
+        """Take capacity for one request without blocking; returns (reservation, delay)."""
+        reservation = Reservation(self, tokens)
+        if not self.enabled:
+            return reservation, 0.0
+        with self._lock:
+            now = self._clock()
+            delay = 0.0
+            if self._requests is not None:
+                delay = max(delay, self._requests.reserve(1, now))
+            if self._tokens is not None:
+                delay = max(delay, self._tokens.reserve(tokens, now))
+            self.waited_seconds += delay
+        return reservation, delay
+
+    def acquire(self, tokens: int) -> Reservation:
+        """Block the calling thread until the request may be sent."""
+        reservation, delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return reservation
+
+    async def aacquire(self, tokens: int) -> Reservation:
+        """Async counterpart of acquire()."""
+        reservation, delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return reservation
+
+    def _credit_tokens(self, amount: int) -> None:
+        if self._tokens is None or amount == 0:
+            return
+        with self._lock:
+            self._tokens.credit(amount, self._clock())
+
+
+def estimate_request_tokens(*parts, max_tokens: int = DEFAULT_OUTPUT_ESTIMATE) -> int:
+    """Token estimate for a request: the prompt parts plus the expected reply."""
+    prompt = sum(count_structure_tokens(part) for part in parts)
+    return prompt + min(max_tokens, DEFAULT_OUTPUT_ESTIMATE)
+
+
+def _env_limit(name: str) -> float | None:
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {raw!r}") from None
+    return value if value > 0 else None
+
+
+_limiters: dict[str, ProviderRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> ProviderRateLimiter:
+    """Return the process-wide limiter for ``provider``, configured from the environment."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            prefix = f"DEEPREPO_{provider.upper()}"
+            limiter = ProviderRateLimiter(
+                provider,
+                rpm=_env_limit(f"{prefix}_RPM"),
+                tpm=_env_limit(f"{prefix}_TPM"),
+            )
+            _limiters[provider] = limiter
+        return limiter
+
+
+def reset_rate_limiters() -> None:
+    """Forget configured limiters so the next lookup re-reads the environment."""
+    with _limiters_lock:
+        _limiters.clear()
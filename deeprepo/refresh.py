@@ -16,57 +16,48 @@ class RefreshEngine:
 
     def get_changes(self) -> dict:
         """Compare current file hashes against ``state.file_hashes``."""
-        from .cli_commands import compute_file_hashes, get_changed_files
+        from .cli_commands import get_changed_files
+        from .git_changes import git_snapshot
 
-        current_hashes = compute_file_hashes(self.project_path)
+        snapshot = git_snapshot(self.project_path)
         changes = get_changed_files(self.project_path, self.state)
+        changes["git_snapshot"] = snapshot
 
-        unchanged_count = len(current_hashes) - len(changes["modified"]) - len(
+        unchanged_count = len(changes["current_hashes"]) - len(changes["modified"]) - len(
             changes["added"]
         )
         changes["unchanged_count"] = max(unchanged_count, 0)
-        changes["current_hashes"] = current_hashes
 
         return changes
 
-    def refresh(self, full: bool = False) -> dict:
-        """Run diff-aware or full refresh."""
-        from .cli_commands import compute_file_hashes
-        from .context_generator import ContextGenerator
-        from .rlm_scaffold import run_analysis
+    def refresh(
+        self, full: bool = False, incremental: bool = True, changes: dict | None = None
+    ) -> dict:
+        """Run diff-aware or full refresh.
+
+        A diff-aware refresh re-analyses only the changed files and their import
+        neighbours and patches PROJECT.md in place. It falls back to a
+        whole-project analysis when ``incremental`` is off, PROJECT.md is
+        missing, or too many files changed. ``changes`` lets a caller that
+        already ran ``get_changes`` skip a second scan.
+        """
+        from .cli_commands import scan_file_hashes
+        from .git_changes import git_snapshot
+        from .incremental import IncrementalRefresher
 
         if full:
-            result = run_analysis(
-                codebase_path=str(self.project_path),
-                verbose=True,
-                max_turns=self.config.max_turns,
-                root_model=self.config.root_model,
-                sub_model=self.config.sub_model,
-                use_cache=True,
-                domain="context",
+            snapshot = git_snapshot(self.project_path)
+            hashes, stats = scan_file_hashes(
+                self.project_path, self.state.file_hashes, self.state.file_stats
             )
-
-            generator = ContextGenerator(str(self.project_path), self.config)
-            generator.generate(result["analysis"], self.state)
-
-            self.state.file_hashes = compute_file_hashes(self.project_path)
-            self.state.last_refresh = datetime.now(timezone.utc).isoformat()
-            self.state.analysis_cost = result["usage"].total_cost
-            self.state.analysis_turns = result["turns"]
-            self.state.sub_llm_dispatches = result["usage"].sub_calls
-            analysis_status = result.get("status", "completed")
-            refresh_status = (
-                "refreshed" if analysis_status == "completed" else analysis_status
-            )
-
-            return {
-                "changed_files": len(self.state.file_hashes),
-                "cost": result["usage"].total_cost,
-                "turns": result["turns"],
-                "status": refresh_status,
-            }
-
-        changes = self.get_changes()
+            result = self._run_full_analysis()
+            self._record_files(hashes, stats, snapshot)
+            refresh_result = self._finish(result, len(self.state.file_hashes))
+            refresh_result["seed_cost"] = self._seed(hashes)
+            return refresh_result
+
+        if changes is None:
+            changes = self.get_changes()
         changed_count = (
             len(changes["modified"]) + len(changes["added"]) + len(changes["deleted"])
         )
@@ -78,7 +69,41 @@ class RefreshEngine:
                 "status": "up_to_date",
             }
 
-        result = run_analysis(
+        refresher = IncrementalRefresher(str(self.project_path), self.config)
+        if incremental and refresher.can_refresh(changes):
+            result = refresher.run(changes, changes["current_hashes"])
+            mode = "incremental"
+        else:
+            result = self._run_full_analysis()
+            mode = "full"
+
+        self._record_files(
+            changes["current_hashes"], changes["current_stats"], changes["git_snapshot"]
+        )
+        refresh_result = self._finish(result, changed_count)
+        refresh_result["mode"] = mode
+        if mode == "full":
+            refresh_result["seed_cost"] = self._seed(changes["current_hashes"])
+        return refresh_result
+
+    def _record_files(self, hashes: dict, stats: dict, snapshot) -> None:
+        self.state.file_hashes = hashes
+        self.state.file_stats = stats
+        self.state.last_commit, self.state.dirty_files = snapshot or ("", [])
+
+    def _seed(self, hashes: dict) -> float:
+        """Seed findings once the full analysis is written; returns the seeding cost.
+
+        Kept out of ``cost`` in the result, which is the analysis alone.
+        """
+        from .incremental import seed_findings
+
+        return seed_findings(str(self.project_path), self.config, hashes).total_cost
+
+    def _run_full_analysis(self) -> dict:
+        from .rlm_scaffold import run_analysis
+
+        return run_analysis(
             codebase_path=str(self.project_path),
             verbose=True,
             max_turns=self.config.max_turns,
@@ -88,10 +113,13 @@ class RefreshEngine:
             domain="context",
         )
 
+    def _finish(self, result: dict, changed_count: int) -> dict:
+        """Write the new context files and record the run in state."""
+        from .context_generator import ContextGenerator
+
         generator = ContextGenerator(str(self.project_path), self.config)
         generator.generate(result["analysis"], self.state)
 
-        self.state.file_hashes = changes["current_hashes"]
         self.state.last_refresh = datetime.now(timezone.utc).isoformat()
         self.state.analysis_cost = result["usage"].total_cost
         self.state.analysis_turns = result["turns"]
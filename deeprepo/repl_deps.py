@@ -0,0 +1,193 @@
+"""Static read/write analysis of REPL code blocks.
+
+When the root model emits several ``execute_python`` calls in one response,
+each one usually just builds prompts and fires its own ``llm_batch``. This
+module decides which of those blocks can safely share the REPL namespace at
+the same time.
+
+The analysis is deliberately conservative. A block's *writes* are the
+module-level names it binds or deletes plus any name it mutates through a
+subscript, attribute or non-read-only method call; its *reads* are every
+name it loads. Two blocks conflict when one writes a name the other touches.
+A block is a *barrier* (runs alone) when it cannot be parsed or calls a name
+defined in an earlier turn, since that function may touch anything.
+"""
+
+import ast
+from dataclasses import dataclass
+
+ANSWER_NAME = "answer"
+
+# Methods that never mutate their receiver (str/dict/list/set/module helpers).
+READ_ONLY_METHODS = frozenset({
+    "copy", "count", "endswith", "find", "format", "get", "index", "isdigit",
+    "items", "join", "keys", "lower", "lstrip", "partition", "replace",
+    "rfind", "rsplit", "rstrip", "split", "splitlines", "startswith", "strip",
+    "title", "upper", "values", "difference", "intersection", "issubset",
+    "issuperset", "union", "most_common",
+})
+
+
+@dataclass(frozen=True)
+class BlockAccess:
+    """Names one code block reads and writes in the shared namespace."""
+
+    reads: frozenset
+    writes: frozenset
+    barrier: bool = False
+
+    @property
+    def sets_answer(self) -> bool:
+        return ANSWER_NAME in self.writes
+
+    def conflicts_with(self, other: "BlockAccess") -> bool:
+        if self.barrier or other.barrier:
+            return True
+        return bool(
+            self.writes & (other.reads | other.writes)
+            or other.writes & self.reads
+        )
+
+
+def _root_name(node: ast.AST) -> str | None:
+    """``a`` for ``a``, ``a.b``, ``a[0].c`` and so on."""
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+class _AccessVisitor(ast.NodeVisitor):
+    def __init__(self, safe_callables: frozenset, module_names: frozenset):
+        self.safe_callables = safe_callables
+        self.module_names = module_names
+        self.reads: set[str] = set()
+        self.writes: set[str] = set()
+        self.defined: set[str] = set()  # Callables bound by this block itself
+        self.called: set[str] = set()
+        self.depth = 0  # >0 inside a function, lambda or comprehension scope
+        self.global_decls: set[str] = set()
+
+    def _bind(self, name: str) -> None:
+        if self.depth == 0 or name in self.global_decls:
+            self.writes.add(name)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if isinstance(node.ctx, ast.Load):
+            self.reads.add(node.id)
+        else:
+            self._bind(node.id)
+
+    def visit_Global(self, node: ast.Global) -> None:
+        self.global_decls.update(node.names)
+        self.writes.update(node.names)
+
+    def visit_NamedExpr(self, node: ast.NamedExpr) -> None:
+        # Walrus targets leak out of comprehensions into the enclosing scope.
+        self.writes.add(node.target.id)
+        self.visit(node.value)
+
+    def _mutate(self, target: ast.AST) -> None:
+        name = _root_name(target)
+        if name is not None and name not in self.module_names:
+            self.writes.add(name)
+            self.reads.add(name)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        if not isinstance(node.ctx, ast.Load):
+            self._mutate(node)
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node: ast.Subscript) -> None:
+        if not isinstance(node.ctx, ast.Load):
+            self._mutate(node)
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+        if isinstance(func, ast.Name):
+            self.called.add(func.id)
+            if func.id == "set_answer":
+                self.writes.add(ANSWER_NAME)
+        elif isinstance(func, ast.Attribute) and func.attr not in READ_ONLY_METHODS:
+            self._mutate(func.value)
+        self.generic_visit(node)
+
+    def _visit_scope(self, node: ast.AST, name: str | None = None) -> None:
+        if name is not None:
+            self._bind(name)
+            self.defined.add(name)
+        for decorator in getattr(node, "decorator_list", []):
+            self.visit(decorator)
+        outer_globals = self.global_decls
+        self.global_decls = set(outer_globals)
+        self.depth += 1
+        for child in ast.iter_child_nodes(node):
+            if child not in getattr(node, "decorator_list", []):
+                self.visit(child)
+        self.depth -= 1
+        self.global_decls = outer_globals
+
+    def visit_FunctionDef(self, node) -> None:
+        self._visit_scope(node, node.name)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self._visit_scope(node, node.name)
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        self._visit_scope(node)
+
+    def _visit_comprehension(self, node) -> None:
+        self._visit_scope(node)
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = _visit_comprehension
+
+
+def analyze_block(
+    code: str,
+    safe_callables: frozenset = frozenset(),
+    module_names: frozenset = frozenset(),
+) -> BlockAccess:
+    """Static read/write sets of ``code``.
+
+    ``safe_callables`` are names that may be called without touching the
+    namespace (builtins, ``llm_batch``...); ``module_names`` are namespace
+    entries whose attributes are functions rather than state (``re``, ``os``).
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return BlockAccess(frozenset(), frozenset(), barrier=True)
+
+    visitor = _AccessVisitor(frozenset(safe_callables), frozenset(module_names))
+    visitor.visit(tree)
+    opaque = visitor.called - visitor.defined - visitor.safe_callables
+    return BlockAccess(
+        reads=frozenset(visitor.reads),
+        writes=frozenset(visitor.writes),
+        barrier=bool(opaque),
+    )
+
+
+def plan_waves(accesses: list[BlockAccess]) -> list[list[int]]:
+    """Group consecutive, mutually independent blocks into waves.
+
+    Waves run one after another and blocks within a wave may run
+    concurrently, so the result is equivalent to running every block in
+    order. A block that sets the answer ends its wave, so the caller can
+    still skip the remaining blocks once the answer is ready.
+    """
+    waves: list[list[int]] = []
+    current: list[int] = []
+    for index, access in enumerate(accesses):
+        if current and any(accesses[i].conflicts_with(access) for i in current):
+            waves.append(current)
+            current = []
+        current.append(index)
+        if access.sets_answer:
+            waves.append(current)
+            current = []
+    if current:
+        waves.append(current)
+    return waves
@@ -0,0 +1,592 @@
+"""Out-of-process REPL for model-written code.
+
+``RLMEngine._execute_code`` runs code with ``exec`` in the host process and
+can only interrupt it with SIGALRM on the main thread; on worker threads a
+runaway loop keeps running. With ``RLMEngine(sandbox=...)`` each analysis
+instead gets a ``SandboxSession``: a long-lived worker process that owns the
+REPL namespace, so variables persist between turns exactly as before.
+
+- The codebase is written once into a ``SharedMemory`` segment and exposed
+  in the worker as a read-only mapping that decodes files on access, so it
+  is never pickled per call.
+- Each ``exec`` runs under an ``RLIMIT_CPU`` budget and the worker under an
+  ``RLIMIT_AS`` ceiling (where the platform supports them). The host also
+  enforces a wall-clock limit by killing the worker and starting a fresh one.
+- ``llm_query``/``llm_batch`` in the worker are proxies: the call is sent
+  back over the pipe and served by the host's sub client.
+- ``SandboxPool`` keeps spawned workers idle and already imported, so a run
+  doesn't pay interpreter start-up on its first turn or after a restart.
+
+This module must stay cheap to import: it is the entry point of every worker.
+"""
+
+import ast
+import atexit
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import signal
+import struct
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from types import SimpleNamespace
+
+from .chunking import DEFAULT_CHUNK_TOKENS, make_repl_helpers
+from .import_graph import make_graph_helpers
+from .search_index import TrigramIndex, make_search_helpers
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_CPU_SECONDS = 120
+DEFAULT_WALL_SECONDS = 600
+DEFAULT_MEMORY_BYTES = 4 * 1024**3
+STARTUP_TIMEOUT_SECONDS = 60
+MAX_CAPTURE_CHARS = 1_000_000  # Cap on output sent back per execution
+_HEADER = struct.Struct("<Q")  # Length of the JSON index at the start of the segment
+
+
+class SandboxError(RuntimeError):
+    """The sandbox worker could not be started or stopped responding."""
+
+
+@dataclass(frozen=True)
+class SandboxLimits:
+    """Per-execution CPU budget, wall-clock limit and worker address-space cap."""
+
+    cpu_seconds: int = DEFAULT_CPU_SECONDS
+    wall_seconds: float = DEFAULT_WALL_SECONDS
+    memory_bytes: int | None = DEFAULT_MEMORY_BYTES
+
+
+def parse_repl_code(code: str) -> ast.Module:
+    """Parse REPL code, rejecting import statements (shared by both executors)."""
+    parsed = ast.parse(code, mode="exec")
+    if any(isinstance(node, (ast.Import, ast.ImportFrom)) for node in ast.walk(parsed)):
+        raise PermissionError(
+            "Import statements are blocked in the REPL. "
+            "Use preloaded modules: re, json, collections, os.path."
+        )
+    return parsed
+
+
+# ---------------------------------------------------------------------------
+# Shared-memory codebase
+# ---------------------------------------------------------------------------
+
+def write_shared_documents(documents: Mapping[str, str]) -> SharedMemory:
+    """Copy ``documents`` into a new shared memory segment; the caller unlinks it."""
+    index: dict[str, list[int]] = {}
+    blobs: list[bytes] = []
+    offset = 0
+    for path, content in documents.items():
+        data = content.encode("utf-8", errors="surrogatepass")
+        index[path] = [offset, len(data)]
+        blobs.append(data)
+        offset += len(data)
+    index_bytes = json.dumps(index).encode("utf-8")
+
+    size = _HEADER.size + len(index_bytes) + offset
+    shm = SharedMemory(create=True, size=max(size, 1))
+    _HEADER.pack_into(shm.buf, 0, len(index_bytes))
+    position = _HEADER.size
+    shm.buf[position:position + len(index_bytes)] = index_bytes
+    position += len(index_bytes)
+    for data in blobs:
+        shm.buf[position:position + len(data)] = data
+        position += len(data)
+    return shm
+
+
+class SharedDocuments(Mapping):
+    """Read-only ``{path: content}`` view over a segment from write_shared_documents()."""
+
+    def __init__(self, shm: SharedMemory):
+        self._shm = shm
+        (index_length,) = _HEADER.unpack_from(shm.buf, 0)
+        start = _HEADER.size
+        self._index = json.loads(bytes(shm.buf[start:start + index_length]))
+        self._base = start + index_length
+
+    def __getitem__(self, path: str) -> str:
+        offset, length = self._index[path]
+        start = self._base + offset
+        return bytes(self._shm.buf[start:start + length]).decode("utf-8", errors="surrogatepass")
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, path) -> bool:
+        return path in self._index
+
+    def copy(self) -> dict[str, str]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"<codebase: {len(self)} files>"
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
+
+class _CPULimitExceeded(BaseException):
+    """Raised from SIGXCPU; BaseException so REPL code can't swallow it with ``except Exception``."""
+
+
+def _on_sigxcpu(signum, frame):
+    del signum, frame
+    raise _CPULimitExceeded()
+
+
+def _cpu_used() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _set_cpu_budget(seconds: int | None) -> None:
+    if resource is None or not hasattr(resource, "RLIMIT_CPU"):
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = resource.RLIM_INFINITY if seconds is None else int(_cpu_used() + seconds) + 1
+    if hard != resource.RLIM_INFINITY and (soft == resource.RLIM_INFINITY or soft > hard):
+        soft = hard
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (OSError, ValueError):
+        pass
+
+
+def _apply_memory_limit(memory_bytes: int | None) -> None:
+    if memory_bytes is None or resource is None or not hasattr(resource, "RLIMIT_AS"):
+        return
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    except (OSError, ValueError):
+        pass
+
+
+class _WorkerREPL:
+    """The namespace and exec loop living inside a worker process."""
+
+    def __init__(self, conn, init: dict):
+        self.conn = conn
+        self.cpu_seconds = init["cpu_seconds"]
+        self.shm = SharedMemory(name=init["shm_name"])
+        self.answer = {"content": "", "ready": False}
+        self.executing = False
+
+        def llm_query(prompt: str) -> str:
+            """Send a focused task to a sub-LLM worker."""
+            return self._rpc("query", prompt)
+
+        def llm_batch(prompts: list[str]) -> list[str]:
+            """Send multiple tasks to sub-LLM workers in parallel."""
+            return self._rpc("batch", list(prompts))
+
+        def llm_stream(prompts: list[str]):
+            """Like llm_batch, but yield (index, result) pairs as they finish."""
+            stream_id = self._rpc("stream_open", list(prompts))
+            exhausted = False
+            try:
+                while True:
+                    item = self._rpc("stream_next", stream_id)
+                    if item is None:
+                        exhausted = True
+                        return
+                    yield tuple(item)
+            finally:
+                # Outside exec the host is not serving calls; it closes any
+                # stream left open when the exec finished.
+                if not exhausted and self.executing:
+                    self._rpc("stream_close", stream_id)
+
+        def set_answer(text: str) -> None:
+            """Set the final analysis and mark it as ready."""
+            self.answer["content"] = text
+            self.answer["ready"] = True
+
+        documents = SharedDocuments(self.shm)
+        builtins_module = __builtins__ if isinstance(__builtins__, dict) else vars(__builtins__)
+        self.namespace = {
+            init["data_var_name"]: documents,
+            "file_tree": init["file_tree"],
+            "metadata": init["metadata"],
+            "llm_query": llm_query,
+            "llm_batch": llm_batch,
+            "llm_stream": llm_stream,
+            **make_repl_helpers(documents, init["metadata"], llm_batch, init["chunk_tokens"]),
+            # Built while the host waits for the root model's first response.
+            **make_search_helpers(documents, TrigramIndex(documents).start()),
+            **make_graph_helpers(init["metadata"].get("import_graph")),
+            "set_answer": set_answer,
+            "answer": self.answer,
+            "repl_history": {},
+            "re": re,
+            "os": SimpleNamespace(path=os.path),
+            "json": json,
+            "collections": __import__("collections"),
+            "__builtins__": {name: builtins_module[name] for name in init["builtin_names"]},
+        }
+
+    def _rpc(self, kind: str, payload):
+        self.conn.send(("rpc", kind, payload))
+        ok, value = self.conn.recv()
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def execute(self, code: str) -> str:
+        stdout_capture = io.StringIO()
+        stderr_capture = io.StringIO()
+        old_stdout, old_stderr = sys.stdout, sys.stderr
+        try:
+            parsed = parse_repl_code(code)
+            sys.stdout, sys.stderr = stdout_capture, stderr_capture
+            _set_cpu_budget(self.cpu_seconds)
+            self.executing = True
+            try:
+                exec(compile(parsed, "<repl>", "exec"), self.namespace)
+            finally:
+                self.executing = False
+                _set_cpu_budget(None)
+                sys.stdout, sys.stderr = old_stdout, old_stderr
+        except _CPULimitExceeded:
+            stdout_capture.write(
+                f"\n[EXECUTION ERROR]\n"
+                f"Code execution exceeded its CPU budget of {self.cpu_seconds} seconds. "
+                f"Avoid infinite loops and long-running operations."
+            )
+        except SystemExit as exc:
+            stdout_capture.write(
+                f"\n[EXECUTION ERROR]\n"
+                f"Code called sys.exit({exc.code}). "
+                f"This is not allowed in the REPL - use set_answer() to submit results."
+            )
+        except KeyboardInterrupt:
+            stdout_capture.write("\n[EXECUTION ERROR]\nKeyboardInterrupt caught in REPL code.")
+        except BaseException:
+            stdout_capture.write(f"\n[EXECUTION ERROR]\n{traceback.format_exc()}")
+
+        output = stdout_capture.getvalue()
+        stderr_output = stderr_capture.getvalue()
+        if stderr_output:
+            output += f"\n[STDERR]\n{stderr_output}"
+        if len(output) > MAX_CAPTURE_CHARS:
+            output = output[:MAX_CAPTURE_CHARS] + f"\n[... {len(output) - MAX_CAPTURE_CHARS:,} more chars dropped]"
+        return output if output else "[No output]"
+
+
+def _worker_main(conn) -> None:
+    """Entry point of a sandbox worker: wait for a session, then serve exec requests."""
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    try:
+        message = conn.recv()
+    except (EOFError, OSError):
+        return
+    if message[0] != "init":
+        return
+    init = message[1]
+    _apply_memory_limit(init.get("memory_bytes"))
+    repl = _WorkerREPL(conn, init)
+    conn.send(("ready",))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message[0] == "exec":
+            _, code, history = message
+            repl.namespace["repl_history"].update(history)
+            output = repl.execute(code)
+            conn.send(("done", output, dict(repl.answer)))
+        elif message[0] == "close":
+            break
+    repl.shm.close()
+
+
+# ---------------------------------------------------------------------------
+# Host side
+# ---------------------------------------------------------------------------
+
+class _Worker:
+    """A spawned worker process and the host end of its pipe."""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe(duplex=True)
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(("close",))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=5)
+
+
+def _worker_context():
+    """Multiprocessing context for workers.
+
+    Prefer a fork server that has imported only this module: workers fork
+    from it in milliseconds, without the host's threads or open clients and
+    without re-importing the host's ``__main__`` (which ``spawn`` would do).
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class SandboxPool:
+    """Keeps ``size`` spawned, idle workers ready to take a session.
+
+    Workers are never reused across sessions: a session's worker is stopped
+    when the session closes, and ``acquire`` immediately spawns a
+    replacement so the next run finds one warm.
+    """
+
+    def __init__(self, size: int = 1):
+        self.size = size
+        self._context = _worker_context()
+        self._idle: list[_Worker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> "SandboxPool":
+        with self._lock:
+            while len(self._idle) < self.size:
+                self._idle.append(_Worker(self._context))
+        return self
+
+    def acquire(self) -> _Worker:
+        with self._lock:
+            if self._closed:
+                raise SandboxError("Sandbox pool has been shut down")
+            worker = None
+            while self._idle and worker is None:
+                candidate = self._idle.pop(0)
+                if candidate.alive():
+                    worker = candidate
+            if worker is None:
+                worker = _Worker(self._context)
+            while len(self._idle) < self.size:
+                self._idle.append(_Worker(self._context))
+            return worker
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+_default_pool: SandboxPool | None = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> SandboxPool:
+    """Process-wide pool with one warm worker, shut down at exit."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SandboxPool(size=1).start()
+            atexit.register(_default_pool.shutdown)
+        return _default_pool
+
+
+class SandboxSession:
+    """One analysis run's REPL, executed in a worker process."""
+
+    def __init__(
+        self,
+        documents: Mapping[str, str],
+        *,
+        file_tree: str,
+        metadata: dict,
+        data_var_name: str,
+        builtin_names: list[str],
+        sub_query: Callable[[str], str],
+        sub_batch: Callable[[list[str]], list[str]],
+        sub_stream: Callable[[list[str]], Iterator[tuple[int, str]]] | None = None,
+        pool: SandboxPool | None = None,
+        limits: SandboxLimits | None = None,
+        chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    ):
+        limits = limits or SandboxLimits()
+        self.pool = pool or get_default_pool()
+        self.limits = limits
+        self.sub_query = sub_query
+        self.sub_batch = sub_batch
+        self.sub_stream = sub_stream
+        # llm_stream iterators the worker has open, by id.
+        self._streams: dict[int, Iterator] = {}
+        self._stream_ids = itertools.count(1)
+        self.restarts = 0
+        self._shm = write_shared_documents(documents)
+        self._init = {
+            "shm_name": self._shm.name,
+            "data_var_name": data_var_name,
+            "file_tree": file_tree,
+            "metadata": metadata,
+            "builtin_names": sorted(builtin_names),
+            "cpu_seconds": limits.cpu_seconds,
+            "memory_bytes": limits.memory_bytes,
+            "chunk_tokens": chunk_tokens,
+        }
+        self._sent_history: set = set()
+        self._worker: _Worker | None = None
+        try:
+            self._start_worker()
+        except BaseException:
+            self._release_shm()
+            raise
+
+    def _start_worker(self) -> None:
+        worker = self.pool.acquire()
+        try:
+            worker.conn.send(("init", self._init))
+            if not worker.conn.poll(STARTUP_TIMEOUT_SECONDS):
+                raise SandboxError("Sandbox worker did not start in time")
+            message = worker.conn.recv()
+        except (EOFError, OSError, SandboxError) as exc:
+            worker.kill()
+            raise SandboxError(f"Sandbox worker failed to start: {exc}") from exc
+        if message[0] != "ready":
+            worker.kill()
+            raise SandboxError(f"Unexpected message from sandbox worker: {message[0]!r}")
+        self._worker = worker
+        self._sent_history = set()
+
+    def _restart(self) -> None:
+        self._close_streams()
+        if self._worker is not None:
+            self._worker.kill()
+            self._worker = None
+        self.restarts += 1
+        self._start_worker()
+
+    def execute(self, code: str, repl_history: dict | None = None) -> tuple[str, dict]:
+        """Run ``code`` in the worker. Returns ``(output, answer)``."""
+        if self._worker is None:
+            raise SandboxError("Sandbox session is closed")
+        history = {
+            turn: text for turn, text in (repl_history or {}).items()
+            if turn not in self._sent_history
+        }
+        conn = self._worker.conn
+        deadline = time.monotonic() + self.limits.wall_seconds
+        try:
+            conn.send(("exec", code, history))
+            self._sent_history.update(history)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not conn.poll(remaining):
+                    self._restart()
+                    return (
+                        f"\n[EXECUTION ERROR]\n"
+                        f"Code execution timed out after {self.limits.wall_seconds:g} seconds "
+                        f"and the REPL was restarted: variables from earlier turns are gone "
+                        f"(codebase, file_tree, metadata and repl_history are still available).",
+                        {},
+                    )
+                message = conn.recv()
+                if message[0] == "rpc":
+                    conn.send(self._serve_rpc(message[1], message[2]))
+                elif message[0] == "done":
+                    self._close_streams()
+                    return message[1], message[2]
+        except (EOFError, OSError) as exc:
+            self._restart()
+            return (
+                f"\n[EXECUTION ERROR]\n"
+                f"The REPL worker process died ({type(exc).__name__}) and was restarted: "
+                f"variables from earlier turns are gone.",
+                {},
+            )
+
+    def _serve_rpc(self, kind: str, payload) -> tuple[bool, object]:
+        try:
+            if kind == "query":
+                return True, self.sub_query(payload)
+            if kind == "batch":
+                return True, self.sub_batch(payload)
+            if kind == "stream_open":
+                if self.sub_stream is None:
+                    # Degrade to one batch delivered in index order.
+                    stream = iter(enumerate(self.sub_batch(payload)))
+                else:
+                    stream = iter(self.sub_stream(payload))
+                stream_id = next(self._stream_ids)
+                self._streams[stream_id] = stream
+                return True, stream_id
+            if kind == "stream_next":
+                return True, next(self._streams[payload], None)
+            if kind == "stream_close":
+                self._close_stream(payload)
+                return True, None
+            return False, f"Unknown sandbox call: {kind}"
+        except Exception as exc:
+            return False, f"{type(exc).__name__}: {exc}"
+
+    def _close_stream(self, stream_id: int) -> None:
+        stream = self._streams.pop(stream_id, None)
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+    def _close_streams(self) -> None:
+        for stream_id in list(self._streams):
+            self._close_stream(stream_id)
+
+    def close(self) -> None:
+        self._close_streams()
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+        self._release_shm()
+
+    def _release_shm(self) -> None:
+        if self._shm is None:
+            return
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = None
+
+    def __enter__(self) -> "SandboxSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
@@ -10,8 +10,9 @@ This implements the RLM pattern:
 6. Terminates when answer["ready"] = True or max turns reached
 """
 
-import ast
+import asyncio
 import builtins
+import contextvars
 import io
 import json
 import os
@@ -22,17 +23,33 @@ import sys
 import threading
 import time
 import traceback
-from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from types import SimpleNamespace
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Iterator
 
+from . import tracing
+from .chunking import chunk_tokens_for_model, make_repl_helpers
+from .import_graph import make_graph_helpers
 from .llm_clients import (
     DEFAULT_SUB_MODEL,
     RootModelClient,
     SubModelClient,
     TokenUsage,
+    create_async_root_client,
     create_root_client,
 )
+from .rate_limit import estimate_request_tokens
+from .repl_deps import analyze_block, plan_waves
+from .repl_sandbox import (
+    SandboxLimits,
+    SandboxPool,
+    SandboxSession,
+    get_default_pool,
+    parse_repl_code,
+)
+from .search_index import TrigramIndex, make_search_helpers
 
 if TYPE_CHECKING:
     from .domains.base import DomainConfig
@@ -40,8 +57,17 @@ if TYPE_CHECKING:
 
 MAX_OUTPUT_LENGTH = 8192  # Truncate REPL output to force model to use code
 MAX_TURNS = 20            # Maximum REPL iterations
-DEFAULT_MAX_CONCURRENT = 5  # Max parallel sub-LLM calls
 EXEC_TIMEOUT_SECONDS = 120  # Maximum execution time per code block
+# History compaction: once the transcript passes the threshold, REPL output
+# older than the last few turns is replaced by a short digest pointing at
+# repl_history[turn]. Compacting everything eligible at once (rather than
+# trimming to just under the threshold) leaves headroom, so it runs rarely
+# and the cached prompt prefix stays valid between compactions.
+COMPACT_THRESHOLD_TOKENS = 40_000
+COMPACT_KEEP_RECENT_TURNS = 2
+COMPACT_MIN_CHARS = 800      # Shorter outputs are kept verbatim
+COMPACT_PREVIEW_CHARS = 400
+COMPACTED_MARKER = "[Compacted output of turn"
 
 SAFE_BUILTIN_NAMES = {
     "__build_class__",
@@ -86,6 +112,14 @@ SAFE_BUILTIN_NAMES = {
     "zip",
 }
 
+# Namespace entries that are safe to call from concurrently running blocks,
+# and those whose attributes are functions rather than state (see repl_deps).
+REPL_HELPER_NAMES = {
+    "llm_query", "llm_batch", "llm_stream", "chunk_file", "llm_map_reduce", "search", "grep",
+    "fan_in", "fan_out", "import_cycles", "set_answer",
+}
+REPL_MODULE_NAMES = {"re", "os", "json", "collections"}
+
 SAFE_BUILTINS = {
     name: getattr(builtins, name)
     for name in SAFE_BUILTIN_NAMES
@@ -97,8 +131,13 @@ EXECUTE_CODE_TOOL = {
         "Execute Python code in the REPL environment. "
         "The code has access to: codebase (dict of filepath->content), "
         "file_tree (string), metadata (dict), llm_query(prompt) -> str, "
-        "llm_batch(prompts) -> list[str], and set_answer(text) to submit "
-        "the final analysis."
+        "llm_batch(prompts) -> list[str], llm_stream(prompts) yielding "
+        "(index, result) pairs as each prompt finishes, chunk_file(path) and "
+        "llm_map_reduce(path, instruction) for files too big for one prompt, "
+        "search(regex, glob=None) -> matching paths and grep(regex, glob=None) -> "
+        "[(path, line, text)] backed by a prebuilt index, fan_in(path)/fan_out(path)/"
+        "import_cycles() over the precomputed import graph, repl_history (dict of turn -> full "
+        "output of that turn), and set_answer(text) to submit the final analysis."
     ),
     "input_schema": {
         "type": "object",
@@ -117,6 +156,106 @@ EXECUTE_CODE_TOOL = {
 }
 
 
+class _ThreadRoutedStream:
+    """sys.stdout/sys.stderr stand-in that sends each thread's writes to its own target.
+
+    contextlib.redirect_stdout swaps the process-wide stream, which mixes up
+    output when several REPL blocks execute at once in different threads
+    (concurrent analyses, or async engines running code via to_thread).
+    Threads without a target write to the stream that was installed before.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._local = threading.local()
+
+    def set_target(self, stream):
+        previous = getattr(self._local, "target", None)
+        self._local.target = stream
+        return previous
+
+    def _stream(self):
+        return getattr(self._local, "target", None) or self.fallback
+
+    def write(self, text):
+        return self._stream().write(text)
+
+    def flush(self):
+        return self._stream().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream(), name)
+
+
+_routing_lock = threading.Lock()
+_routing_users = 0
+
+
+@contextmanager
+def _route_output(stdout, stderr):
+    """Capture this thread's stdout/stderr without affecting other threads."""
+    global _routing_users
+    with _routing_lock:
+        if not isinstance(sys.stdout, _ThreadRoutedStream):
+            sys.stdout = _ThreadRoutedStream(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadRoutedStream):
+            sys.stderr = _ThreadRoutedStream(sys.stderr)
+        out_proxy, err_proxy = sys.stdout, sys.stderr
+        _routing_users += 1
+
+    previous_out = out_proxy.set_target(stdout)
+    previous_err = err_proxy.set_target(stderr)
+    try:
+        yield
+    finally:
+        out_proxy.set_target(previous_out)
+        err_proxy.set_target(previous_err)
+        with _routing_lock:
+            _routing_users -= 1
+            # Uninstall once nobody is capturing, unless something else has
+            # replaced the streams in the meantime.
+            if _routing_users == 0:
+                if sys.stdout is out_proxy:
+                    sys.stdout = out_proxy.fallback
+                if sys.stderr is err_proxy:
+                    sys.stderr = err_proxy.fallback
+
+
+@dataclass
+class _RunState:
+    """Mutable state of one analyze() run, shared by the sync and async loops."""
+
+    domain: "DomainConfig"
+    namespace: dict
+    answer: dict
+    messages: list[dict]
+    trajectory: list[dict] = field(default_factory=list)
+    turn: int = 0
+    tool_choice: dict | None = None
+    response: object = None
+    response_text: str = ""
+    tool_use_info: list[dict] = field(default_factory=list)
+    root_time: float = 0.0
+    stop_reason: str = ""
+    # id() of each message that feeds REPL output back -> the turn it came from
+    feedback_turns: dict[int, int] = field(default_factory=dict)
+    sandbox: SandboxSession | None = None
+
+
+def _digest_output(output, turn: int) -> str | None:
+    """Short stand-in for a long REPL output, or None to keep it as is."""
+    if not isinstance(output, str) or len(output) < COMPACT_MIN_CHARS:
+        return None
+    if output.startswith(COMPACTED_MARKER):
+        return None
+    preview = output[:COMPACT_PREVIEW_CHARS].rstrip()
+    return (
+        f"{COMPACTED_MARKER} {turn}: {len(output):,} chars, "
+        f"{output.count(chr(10)) + 1} lines. Full text: repl_history[{turn}]]\n"
+        f"{preview}\n..."
+    )
+
+
 class RLMEngine:
     """
     The RLM execution engine.
@@ -133,6 +272,12 @@ class RLMEngine:
         max_turns: int = MAX_TURNS,
         max_output_length: int = MAX_OUTPUT_LENGTH,
         verbose: bool = True,
+        stop_check: Callable[[], str | None] | None = None,
+        compact_threshold_tokens: int | None = COMPACT_THRESHOLD_TOKENS,
+        compact_keep_recent_turns: int = COMPACT_KEEP_RECENT_TURNS,
+        sandbox: SandboxPool | bool | None = None,
+        sandbox_limits: SandboxLimits | None = None,
+        parallel_tool_calls: bool = False,
     ):
         self.root_client = root_client
         self.sub_client = sub_client
@@ -140,14 +285,31 @@ class RLMEngine:
         self.max_turns = max_turns
         self.max_output_length = max_output_length
         self.verbose = verbose
-
-    def analyze(self, path: str, domain: "DomainConfig") -> dict:
+        # Called before each turn; a non-empty return value ends the run early
+        # (e.g. a shared cost budget ran out) and is used as the reason.
+        self.stop_check = stop_check
+        # None disables history compaction.
+        self.compact_threshold_tokens = compact_threshold_tokens
+        self.compact_keep_recent_turns = compact_keep_recent_turns
+        # Run REPL code in a worker process (see repl_sandbox) instead of
+        # exec() in this one. True uses the shared default pool.
+        self.sandbox = get_default_pool() if sandbox is True else (sandbox or None)
+        self.sandbox_limits = sandbox_limits or SandboxLimits()
+        # Run independent execute_python blocks of one response concurrently
+        # (see repl_deps). Their llm_batch calls share the sub client's
+        # adaptive concurrency limit. Ignored with a sandbox, whose single
+        # worker runs one block at a time.
+        self.parallel_tool_calls = parallel_tool_calls
+
+    def analyze(self, path: str, domain: "DomainConfig", data: dict | None = None) -> dict:
         """
         Run RLM analysis on domain data.
         
         Args:
             path: Local path to analyze
             domain: Domain configuration
+            data: Output of ``domain.loader(path)`` if the caller already
+                loaded it (e.g. to share one load between pipelines)
             
         Returns:
             {
@@ -159,9 +321,62 @@ class RLMEngine:
             }
         """
         # 1. Load data using domain's loader
-        if self.verbose:
-            print(f"Loading {domain.label.lower()} from {path}...")
-        data = domain.loader(path)
+        if data is None:
+            if self.verbose:
+                print(f"Loading {domain.label.lower()} from {path}...")
+            with tracing.span("load", tracing.LOAD, path=path):
+                data = domain.loader(path)
+        run = self._start_run(data, domain)
+
+        # 2. Run the REPL loop
+        try:
+            while run.turn < self.max_turns and not self._should_stop(run):
+                with tracing.span(f"turn {run.turn + 1}", tracing.TURN, turn=run.turn + 1):
+                    request = self._next_root_request(run)
+
+                    # Get root model's response with tool definition
+                    t0 = time.time()
+                    with tracing.span("root", tracing.ROOT, turn=run.turn):
+                        response = self.root_client.complete(**request)
+                    code_blocks = self._handle_root_response(run, response, time.time() - t0)
+
+                    if not code_blocks:
+                        if run.answer["ready"]:
+                            break
+                        continue
+
+                    # Execute the code blocks in the REPL, wave by wave
+                    outputs = []
+                    for wave in self._plan_code_blocks(run, code_blocks):
+                        for i in wave:
+                            self._log_code_block(i, code_blocks, code_blocks[i])
+                        if len(wave) == 1:
+                            wave_outputs = [self._run_code(run, code_blocks[wave[0]])]
+                        else:
+                            with ThreadPoolExecutor(max_workers=len(wave)) as executor:
+                                # Each block runs in a copy of this context so
+                                # its spans land in the active trace.
+                                futures = [
+                                    executor.submit(
+                                        contextvars.copy_context().run,
+                                        self._run_code, run, code_blocks[i],
+                                    )
+                                    for i in wave
+                                ]
+                                wave_outputs = [future.result() for future in futures]
+                        if self._after_wave(run, wave, code_blocks, wave_outputs, outputs):
+                            break
+
+                    if self._finish_turn(run, code_blocks, outputs):
+                        break
+        finally:
+            self._close_sandbox(run)
+
+        # 3. Return results
+        return self._finish_run(run)
+
+    def _start_run(self, data: dict, domain: "DomainConfig") -> "_RunState":
+        """Build the namespace and opening prompt for loaded domain data."""
         documents = data[domain.data_variable_name]
         file_tree = data["file_tree"]
         metadata = data["metadata"]
@@ -169,8 +384,13 @@ class RLMEngine:
         if self.verbose:
             print(f"Loaded {metadata['total_files']} files, {metadata['total_chars']:,} chars")
 
-        # 2. Build the REPL namespace (what the root model's code can access)
+        # Build the REPL namespace (what the root model's code can access)
         answer = {"content": "", "ready": False}
+        # Index the documents for search()/grep() while the root model
+        # writes its first response; the sandbox worker builds its own.
+        search_index = TrigramIndex(documents)
+        if self.sandbox is None:
+            search_index.start()
         repl_namespace = self._build_namespace(
             documents,
             file_tree,
@@ -178,160 +398,302 @@ class RLMEngine:
             answer,
             data_var_name=domain.data_variable_name,
             sub_system_prompt=domain.sub_system_prompt,
+            search_index=search_index,
         )
 
-        # 3. Format the initial prompt (metadata + file tree, NOT file contents)
+        # Format the initial prompt (metadata + file tree, NOT file contents).
+        # Loaders fit a copy of the tree to a token budget for this prompt;
+        # the REPL keeps the full one.
         metadata_str = domain.format_metadata(metadata)
         user_prompt = domain.user_prompt_template.format(
             metadata_str=metadata_str,
-            file_tree=file_tree,
+            file_tree=data.get("prompt_tree", file_tree),
         )
 
-        # 4. Run the REPL loop
-        messages = [{"role": "user", "content": user_prompt}]
-        trajectory = []
-        turn = 0
+        sandbox = None
+        if self.sandbox is not None:
+            sub_system = domain.sub_system_prompt
+            sandbox = SandboxSession(
+                documents,
+                file_tree=file_tree,
+                metadata=metadata,
+                data_var_name=domain.data_variable_name,
+                builtin_names=sorted(SAFE_BUILTIN_NAMES),
+                sub_query=lambda prompt: self._sub_query(prompt, system=sub_system),
+                sub_batch=lambda prompts: self._sub_batch(prompts, system=sub_system),
+                sub_stream=lambda prompts: self._sub_stream(prompts, system=sub_system),
+                pool=self.sandbox,
+                limits=self.sandbox_limits,
+                chunk_tokens=self._chunk_tokens(),
+            )
+
+        return _RunState(
+            domain=domain,
+            namespace=repl_namespace,
+            answer=answer,
+            messages=[{"role": "user", "content": user_prompt}],
+            sandbox=sandbox,
+        )
 
-        while turn < self.max_turns:
-            turn += 1
+    def _run_code(self, run: "_RunState", code: str) -> str:
+        """Execute one code block in the run's sandbox, or in-process without one."""
+        with tracing.span("exec", tracing.REPL, turn=run.turn, sandbox=run.sandbox is not None):
+            if run.sandbox is None:
+                return self._execute_code(code, run.namespace)
+            output, answer = run.sandbox.execute(code, run.namespace.get("repl_history"))
+        run.answer.update(answer)
+        return output
+
+    def _close_sandbox(self, run: "_RunState") -> None:
+        if run.sandbox is not None:
+            run.sandbox.close()
+            run.sandbox = None
+
+    def _should_stop(self, run: "_RunState") -> bool:
+        if self.stop_check is None:
+            return False
+        reason = self.stop_check()
+        if reason:
+            run.stop_reason = reason
             if self.verbose:
-                print(f"\n{'='*60}")
-                print(f"REPL Turn {turn}/{self.max_turns}")
-                print(f"{'='*60}")
-
-            # Inject turn-budget countdown into the next model call.
-            self._inject_turn_countdown(messages, turn)
-
-            # Pre-flight: ensure no empty text content blocks
-            self._validate_messages(messages)
-
-            tool_choice = self._tool_choice_for_turn(turn)
-
-            # Get root model's response with tool definition
-            t0 = time.time()
-            response = self.root_client.complete(
-                messages=messages,
-                system=domain.root_system_prompt,
-                tools=[EXECUTE_CODE_TOOL],
-                tool_choice=tool_choice,
-                stream=self.verbose,
-            )
-            root_time = time.time() - t0
+                print(f"\nStopping before turn {run.turn + 1}: {reason}")
+            return True
+        return False
+
+    def _next_root_request(self, run: "_RunState") -> dict:
+        """Advance to the next turn and return kwargs for root_client.complete()."""
+        run.turn += 1
+        turn = run.turn
+        if self.verbose:
+            print(f"\n{'='*60}")
+            print(f"REPL Turn {turn}/{self.max_turns}")
+            print(f"{'='*60}")
+
+        # Inject turn-budget countdown into the next model call.
+        self._inject_turn_countdown(run.messages, turn)
+
+        self._compact_history(run)
 
-            # Extract code — prefer tool_use blocks, fall back to text parsing
-            code_blocks, tool_use_info = self._extract_code_from_response(response)
-            response_text = self._get_response_text(response)
+        # Pre-flight: ensure no empty text content blocks
+        self._validate_messages(run.messages)
+
+        run.tool_choice = self._tool_choice_for_turn(turn)
+        return {
+            "messages": run.messages,
+            "system": run.domain.root_system_prompt,
+            "tools": [EXECUTE_CODE_TOOL],
+            "tool_choice": run.tool_choice,
+            "stream": self.verbose,
+            "cache_prompt": True,
+        }
 
+    def _handle_root_response(self, run: "_RunState", response, root_time: float) -> list[str]:
+        """Extract code from a root response; nudge the model if there is none."""
+        # Extract code — prefer tool_use blocks, fall back to text parsing
+        code_blocks, tool_use_info = self._extract_code_from_response(response)
+        response_text = self._get_response_text(response)
+        run.response = response
+        run.response_text = response_text
+        run.tool_use_info = tool_use_info
+        run.root_time = root_time
+
+        if self.verbose:
+            print(f"Root model responded in {root_time:.1f}s ({len(response_text)} chars)")
+            if tool_use_info:
+                print(f"  [tool_use] {len(tool_use_info)} execute_python call(s)")
+            else:
+                print("  [text] Using legacy code extraction")
+
+        if not code_blocks:
             if self.verbose:
-                print(f"Root model responded in {root_time:.1f}s ({len(response_text)} chars)")
-                if tool_use_info:
-                    print(f"  [tool_use] {len(tool_use_info)} execute_python call(s)")
-                else:
-                    print("  [text] Using legacy code extraction")
+                print("No code blocks found in response. Checking if model is done...")
+            if run.answer["ready"]:
+                return []
+            # Prompt model to use the tool
+            self._append_assistant_message(
+                run.messages, response, strip_tool_use=True
+            )
+            run.messages.append({
+                "role": "user",
+                "content": (
+                    "Please use the execute_python tool to write and run Python code "
+                    "to continue your analysis. Use the REPL to explore the codebase."
+                ),
+            })
+        return code_blocks
 
-            if not code_blocks:
-                if self.verbose:
-                    print("No code blocks found in response. Checking if model is done...")
-                if answer["ready"]:
-                    break
-                # Prompt model to use the tool
-                self._append_assistant_message(
-                    messages, response, strip_tool_use=True
+    def _log_code_block(self, index: int, code_blocks: list[str], code: str) -> None:
+        if self.verbose:
+            # Show first 200 chars of code
+            preview = code[:200] + ("..." if len(code) > 200 else "")
+            print(f"\nExecuting code block {index+1}/{len(code_blocks)}:")
+            print(f"  {preview}")
+
+    def _plan_code_blocks(self, run: "_RunState", code_blocks: list[str]) -> list[list[int]]:
+        """Split a turn's code blocks into waves; blocks in a wave run concurrently."""
+        if not self.parallel_tool_calls or run.sandbox is not None or len(code_blocks) < 2:
+            return [[i] for i in range(len(code_blocks))]
+        safe_callables = SAFE_BUILTIN_NAMES | REPL_HELPER_NAMES
+        waves = plan_waves([
+            analyze_block(code, safe_callables, REPL_MODULE_NAMES) for code in code_blocks
+        ])
+        if self.verbose and len(waves) < len(code_blocks):
+            sizes = ", ".join(str(len(wave)) for wave in waves)
+            print(f"  [parallel] {len(code_blocks)} blocks in {len(waves)} wave(s): {sizes}")
+        return waves
+
+    def _after_wave(
+        self,
+        run: "_RunState",
+        wave: list[int],
+        code_blocks: list[str],
+        wave_outputs: list[str],
+        outputs: list[str],
+    ) -> bool:
+        """Collect a wave's outputs. Returns True when the remaining blocks should be skipped."""
+        outputs.extend(wave_outputs)
+        # Only the last block of a wave can set the answer (see plan_waves).
+        for output in wave_outputs[:-1]:
+            self._log_output(output)
+        return self._after_code_block(run, wave[-1], code_blocks, wave_outputs[-1])
+
+    def _log_output(self, output: str) -> None:
+        if self.verbose:
+            preview = output[:300] + ("..." if len(output) > 300 else "")
+            print(f"  Output: {preview}")
+
+    def _after_code_block(
+        self, run: "_RunState", index: int, code_blocks: list[str], output: str
+    ) -> bool:
+        """Log a block's output. Returns True when the remaining blocks should be skipped."""
+        if run.answer["ready"]:
+            if self.verbose:
+                skipped = len(code_blocks) - index - 1
+                print(
+                    f"  Answer marked ready - skipping remaining {skipped} block(s)"
                 )
-                messages.append({
-                    "role": "user",
-                    "content": (
-                        "Please use the execute_python tool to write and run Python code "
-                        "to continue your analysis. Use the REPL to explore the codebase."
-                    ),
-                })
-                continue
+            return True
 
-            # Execute each code block in the REPL
-            all_output = []
-            for i, code in enumerate(code_blocks):
-                if self.verbose:
-                    # Show first 200 chars of code
-                    preview = code[:200] + ("..." if len(code) > 200 else "")
-                    print(f"\nExecuting code block {i+1}/{len(code_blocks)}:")
-                    print(f"  {preview}")
+        self._log_output(output)
+        return False
 
-                output = self._execute_code(code, repl_namespace)
-                all_output.append(output)
+    def _finish_turn(self, run: "_RunState", code_blocks: list[str], outputs: list[str]) -> bool:
+        """Record the turn and feed REPL output back. Returns True when the run is done."""
+        all_output = list(outputs)
+        tool_use_info = run.tool_use_info
+        response = run.response
+
+        # Pad outputs so each tool_use receives a corresponding tool_result.
+        while len(all_output) < len(tool_use_info):
+            all_output.append("[Execution skipped: answer already finalized]")
+
+        # Combine outputs
+        combined_output = "\n".join(all_output)
+        if len(combined_output) > self.max_output_length:
+            combined_output = (
+                combined_output[:self.max_output_length]
+                + f"\n\n[OUTPUT TRUNCATED at {self.max_output_length} chars. "
+                f"Total was {len(combined_output)} chars. Use code to filter/search.]"
+            )
 
-                if answer["ready"]:
-                    if self.verbose:
-                        skipped = len(code_blocks) - i - 1
-                        print(
-                            f"  Answer marked ready - skipping remaining {skipped} block(s)"
-                        )
-                    break
+        # Record trajectory
+        run.trajectory.append({
+            "turn": run.turn,
+            "root_response": run.response_text,
+            "code_blocks": code_blocks,
+            "repl_output": combined_output,
+            "answer_ready": run.answer["ready"],
+            "root_latency_s": run.root_time,
+            "used_tool_use": bool(tool_use_info),
+            "tool_choice": run.tool_choice,
+        })
+
+        # Check if answer is ready
+        if run.answer["ready"]:
+            if self.verbose:
+                print(f"\n✅ Answer marked as ready after turn {run.turn}")
+            return True
 
-                if self.verbose:
-                    preview = output[:300] + ("..." if len(output) > 300 else "")
-                    print(f"  Output: {preview}")
-
-            # Pad outputs so each tool_use receives a corresponding tool_result.
-            while len(all_output) < len(tool_use_info):
-                all_output.append("[Execution skipped: answer already finalized]")
-
-            # Combine outputs
-            combined_output = "\n".join(all_output)
-            if len(combined_output) > self.max_output_length:
-                combined_output = (
-                    combined_output[:self.max_output_length]
-                    + f"\n\n[OUTPUT TRUNCATED at {self.max_output_length} chars. "
-                    f"Total was {len(combined_output)} chars. Use code to filter/search.]"
-                )
+        # Keep the full output reachable from code even after compaction.
+        run.namespace.setdefault("repl_history", {})[run.turn] = "\n".join(all_output)
+        feedback_start = len(run.messages)
 
-            # Record trajectory
-            trajectory.append({
-                "turn": turn,
-                "root_response": response_text,
-                "code_blocks": code_blocks,
-                "repl_output": combined_output,
-                "answer_ready": answer["ready"],
-                "root_latency_s": root_time,
-                "used_tool_use": bool(tool_use_info),
-                "tool_choice": tool_choice,
+        # Feed REPL output back to root model
+        if tool_use_info:
+            # Tool_use path: send structured tool_result messages
+            self._append_tool_result_messages(
+                run.messages, response, tool_use_info, all_output
+            )
+        else:
+            # Text-only path: send as user message (legacy behavior)
+            self._append_assistant_message(
+                run.messages, response, strip_tool_use=True
+            )
+            run.messages.append({
+                "role": "user",
+                "content": (
+                    f"REPL Output:\n```\n{combined_output}\n```\n\n"
+                    "Continue your analysis. Remember to call set_answer(text) when done."
+                ),
             })
+        for message in run.messages[feedback_start:]:
+            if message.get("role") != "assistant":
+                run.feedback_turns[id(message)] = run.turn
+        return False
 
-            # Check if answer is ready
-            if answer["ready"]:
-                if self.verbose:
-                    print(f"\n✅ Answer marked as ready after turn {turn}")
-                break
+    def _compact_history(self, run: "_RunState") -> int:
+        """Replace stale REPL output with digests once the transcript is too long.
 
-            # Feed REPL output back to root model
-            if tool_use_info:
-                # Tool_use path: send structured tool_result messages
-                self._append_tool_result_messages(
-                    messages, response, tool_use_info, all_output
-                )
-            else:
-                # Text-only path: send as user message (legacy behavior)
-                self._append_assistant_message(
-                    messages, response, strip_tool_use=True
-                )
-                messages.append({
-                    "role": "user",
-                    "content": (
-                        f"REPL Output:\n```\n{combined_output}\n```\n\n"
-                        "Continue your analysis. Remember to call set_answer(text) when done."
-                    ),
-                })
+        Returns the number of outputs compacted.
+        """
+        if self.compact_threshold_tokens is None:
+            return 0
+        before = estimate_request_tokens(run.messages, max_tokens=0)
+        if before <= self.compact_threshold_tokens:
+            return 0
+
+        turns = sorted(set(run.feedback_turns.values()))
+        keep = set(turns[-self.compact_keep_recent_turns:]) if self.compact_keep_recent_turns else set()
+        compacted = 0
+        for message in run.messages:
+            turn = run.feedback_turns.get(id(message))
+            if turn is None or turn in keep:
+                continue
+            content = message.get("content")
+            if isinstance(content, str):
+                digest = _digest_output(content, turn)
+                if digest is not None:
+                    message["content"] = digest
+                    compacted += 1
+            elif isinstance(content, list):
+                for block in content:
+                    if not (isinstance(block, dict) and block.get("type") == "tool_result"):
+                        continue
+                    digest = _digest_output(block.get("content"), turn)
+                    if digest is not None:
+                        block["content"] = digest
+                        compacted += 1
+
+        if compacted and self.verbose:
+            after = estimate_request_tokens(run.messages, max_tokens=0)
+            print(
+                f"Compacted {compacted} older REPL output(s): "
+                f"~{before:,} -> ~{after:,} tokens"
+            )
+        return compacted
 
-        # 5. Return results
+    def _finish_run(self, run: "_RunState") -> dict:
+        answer = run.answer
         status = "completed"
         if not answer["ready"]:
-            if self.verbose:
+            if self.verbose and not run.stop_reason:
                 print(f"\n⚠️ Max turns ({self.max_turns}) reached without answer[\"ready\"] = True")
             if answer["content"]:
                 status = "partial"
                 if self.verbose:
                     print("Using partial answer from answer[\"content\"]")
             else:
-                salvaged = self._salvage_incomplete_analysis(trajectory, messages)
+                salvaged = self._salvage_incomplete_analysis(run.trajectory, run.messages)
                 if salvaged:
                     answer["content"] = salvaged
                     status = "partial"
@@ -344,11 +706,23 @@ class RLMEngine:
         return {
             "analysis": answer["content"],
             "status": status,
-            "turns": turn,
+            "turns": run.turn,
             "usage": self.usage,
-            "trajectory": trajectory,
+            "trajectory": run.trajectory,
         }
 
+    def _sub_query(self, prompt: str, system: str) -> str:
+        """Run one sub-LLM query on behalf of REPL code."""
+        return self.sub_client.query(prompt, system=system)
+
+    def _sub_batch(self, prompts: list[str], system: str) -> list[str]:
+        """Run a parallel sub-LLM batch on behalf of REPL code."""
+        return self.sub_client.batch(prompts, system=system)
+
+    def _sub_stream(self, prompts: list[str], system: str) -> Iterator[tuple[int, str]]:
+        """Run a parallel sub-LLM batch, yielding ``(index, result)`` as each finishes."""
+        return self.sub_client.stream(prompts, system=system)
+
     def _build_namespace(
         self,
         documents: dict,
@@ -357,6 +731,7 @@ class RLMEngine:
         answer: dict,
         data_var_name: str = "codebase",
         sub_system_prompt: str = "",
+        search_index: TrigramIndex | None = None,
     ) -> dict:
         """
         Build the Python namespace for the REPL.
@@ -364,20 +739,22 @@ class RLMEngine:
         This is what the root model's code can access:
         - codebase, file_tree, metadata (data)
         - llm_query, llm_batch (sub-LLM functions)
+        - search, grep (indexed regex search over the data)
+        - fan_in, fan_out, import_cycles (queries on metadata["import_graph"])
         - answer (output variable)
         - Restricted safe Python builtins
         """
         def llm_query(prompt: str) -> str:
             """Send a focused task to a sub-LLM worker."""
-            return self.sub_client.query(prompt, system=sub_system_prompt)
+            return self._sub_query(prompt, system=sub_system_prompt)
 
         def llm_batch(prompts: list[str]) -> list[str]:
             """Send multiple tasks to sub-LLM workers in parallel."""
-            return self.sub_client.batch(
-                prompts,
-                system=sub_system_prompt,
-                max_concurrent=DEFAULT_MAX_CONCURRENT,
-            )
+            return self._sub_batch(prompts, system=sub_system_prompt)
+
+        def llm_stream(prompts: list[str]) -> Iterator[tuple[int, str]]:
+            """Like llm_batch, but yield (index, result) pairs as they finish."""
+            return self._sub_stream(list(prompts), system=sub_system_prompt)
 
         def set_answer(text: str) -> None:
             """Set the final analysis and mark it as ready.
@@ -397,6 +774,13 @@ class RLMEngine:
             # Sub-LLM functions
             "llm_query": llm_query,
             "llm_batch": llm_batch,
+            "llm_stream": llm_stream,
+            # Chunked analysis of files too big for one sub-LLM call
+            **make_repl_helpers(documents, metadata, llm_batch, self._chunk_tokens()),
+            # Indexed search instead of scanning every file per pattern
+            **make_search_helpers(documents, search_index),
+            # Precomputed import graph (empty for domains whose loader has none)
+            **make_graph_helpers(metadata.get("import_graph")),
             # Answer helper
             "set_answer": set_answer,
             # Answer variable (Prime Intellect pattern)
@@ -412,6 +796,10 @@ class RLMEngine:
 
         return namespace
 
+    def _chunk_tokens(self) -> int:
+        """Chunk budget in tokens for chunk_file/llm_map_reduce, from the sub-model's context."""
+        return chunk_tokens_for_model(getattr(self.sub_client, "model", None))
+
     def _tool_choice_for_turn(self, turn: int) -> dict | None:
         """Force tool use on the final two turns."""
         if turn >= self.max_turns - 1:
@@ -985,17 +1373,9 @@ class RLMEngine:
             timer.start()
 
         try:
-            parsed = ast.parse(code, mode="exec")
-            if any(
-                isinstance(node, (ast.Import, ast.ImportFrom))
-                for node in ast.walk(parsed)
-            ):
-                raise PermissionError(
-                    "Import statements are blocked in the REPL. "
-                    "Use preloaded modules: re, json, collections, os.path."
-                )
+            parsed = parse_repl_code(code)
 
-            with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
+            with _route_output(stdout_capture, stderr_capture):
                 exec(compile(parsed, "<repl>", "exec"), namespace)
         except BaseException as exc:
             if isinstance(exc, TimeoutError) or timed_out:
@@ -1034,6 +1414,126 @@ class RLMEngine:
         return output if output else "[No output]"
 
 
+class AsyncRLMEngine(RLMEngine):
+    """RLM engine whose run is driven by one event loop.
+
+    Root calls are awaited on an async root client (see
+    ``create_async_root_client``), so several analyses can share one loop, e.g.
+    inside a FastAPI worker. REPL code still runs synchronously, but in a worker
+    thread; its ``llm_query``/``llm_batch`` calls are scheduled back onto the
+    engine's loop and reuse the sub client's ``AsyncOpenAI`` connection pool
+    instead of starting a fresh loop per batch.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def analyze(self, path: str, domain: "DomainConfig", data: dict | None = None) -> dict:
+        """Async counterpart of RLMEngine.analyze(); returns the same dict."""
+        self._loop = asyncio.get_running_loop()
+
+        if data is None:
+            if self.verbose:
+                print(f"Loading {domain.label.lower()} from {path}...")
+            with tracing.span("load", tracing.LOAD, path=path):
+                data = await asyncio.to_thread(domain.loader, path)
+        run = self._start_run(data, domain)
+
+        try:
+            while run.turn < self.max_turns and not self._should_stop(run):
+                with tracing.span(f"turn {run.turn + 1}", tracing.TURN, turn=run.turn + 1):
+                    request = self._next_root_request(run)
+
+                    t0 = time.time()
+                    with tracing.span("root", tracing.ROOT, turn=run.turn):
+                        response = await self.root_client.complete(**request)
+                    code_blocks = self._handle_root_response(run, response, time.time() - t0)
+
+                    if not code_blocks:
+                        if run.answer["ready"]:
+                            break
+                        continue
+
+                    outputs = []
+                    for wave in self._plan_code_blocks(run, code_blocks):
+                        for i in wave:
+                            self._log_code_block(i, code_blocks, code_blocks[i])
+                        wave_outputs = await asyncio.gather(*(
+                            asyncio.to_thread(self._run_code, run, code_blocks[i]) for i in wave
+                        ))
+                        if self._after_wave(run, wave, code_blocks, wave_outputs, outputs):
+                            break
+
+                    if self._finish_turn(run, code_blocks, outputs):
+                        break
+        finally:
+            await asyncio.to_thread(self._close_sandbox, run)
+
+        return self._finish_run(run)
+
+    def _run_on_loop(self, coro):
+        """Run ``coro`` on the engine loop from a REPL worker thread and wait for it."""
+        loop = self._loop
+        if loop is None:
+            coro.close()
+            raise RuntimeError("AsyncRLMEngine sub-LLM calls are only available during analyze()")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("Blocking sub-LLM call made on the engine's own event loop")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def _sub_query(self, prompt: str, system: str) -> str:
+        return self._run_on_loop(self.sub_client.aquery(prompt, system=system))
+
+    def _sub_batch(self, prompts: list[str], system: str) -> list[str]:
+        return self._run_on_loop(self.sub_client.abatch(prompts, system=system))
+
+    def _sub_stream(self, prompts: list[str], system: str) -> Iterator[tuple[int, str]]:
+        stream = self.sub_client.astream(prompts, system=system)
+
+        async def _next():
+            return await stream.__anext__()
+
+        try:
+            while True:
+                try:
+                    yield self._run_on_loop(_next())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._run_on_loop(stream.aclose())
+
+
+def _resolve_codebase_path(codebase_path: str, domain: str, domain_config, verbose: bool):
+    """Validate a local path or clone a git URL. Returns (path, is_temp)."""
+    # Validate path for local directories
+    if not codebase_path.startswith(("http://", "https://", "git@")):
+        from pathlib import Path
+        p = Path(codebase_path)
+        if not p.exists():
+            raise FileNotFoundError(f"Path not found: {codebase_path}")
+        if not p.is_dir():
+            raise ValueError(f"Path is not a directory: {codebase_path}")
+        return codebase_path, False
+
+    # Handle git URLs
+    if domain_config.clone_handler is None:
+        raise ValueError(
+            f"Domain '{domain}' does not support URL inputs."
+        )
+    if verbose:
+        print(f"Cloning {codebase_path}...")
+    actual_path = domain_config.clone_handler(codebase_path)
+    if verbose:
+        print(f"Cloned to {actual_path}")
+    return actual_path, True
+
+
 def run_analysis(
     codebase_path: str,
     verbose: bool = True,
@@ -1042,6 +1542,9 @@ def run_analysis(
     sub_model: str = DEFAULT_SUB_MODEL,
     use_cache: bool = True,
     domain: str = "code",
+    sandbox: bool = False,
+    parallel_tool_calls: bool = False,
+    data: dict | None = None,
 ) -> dict:
     """
     Convenience function to run a full RLM analysis.
@@ -1054,6 +1557,9 @@ def run_analysis(
         sub_model: OpenRouter model string for sub-LLM file analysis workers
         use_cache: Enable sub-LLM response cache for repeated prompts
         domain: Domain name from registry (default: "code")
+        sandbox: Run REPL code in an isolated worker process (see repl_sandbox)
+        parallel_tool_calls: Run independent code blocks of one response concurrently
+        data: Already-loaded domain data for ``codebase_path``; skips the loader
 
     Returns:
         dict with analysis, status, turns, usage, trajectory
@@ -1061,30 +1567,7 @@ def run_analysis(
     from .domains import get_domain
 
     domain_config = get_domain(domain)
-
-    # Validate path for local directories
-    actual_path = codebase_path
-    is_temp = False
-    if not codebase_path.startswith(("http://", "https://", "git@")):
-        from pathlib import Path
-        p = Path(codebase_path)
-        if not p.exists():
-            raise FileNotFoundError(f"Path not found: {codebase_path}")
-        if not p.is_dir():
-            raise ValueError(f"Path is not a directory: {codebase_path}")
-
-    # Handle git URLs
-    if codebase_path.startswith(("http://", "https://", "git@")):
-        if domain_config.clone_handler is None:
-            raise ValueError(
-                f"Domain '{domain}' does not support URL inputs."
-            )
-        if verbose:
-            print(f"Cloning {codebase_path}...")
-        actual_path = domain_config.clone_handler(codebase_path)
-        is_temp = True
-        if verbose:
-            print(f"Cloned to {actual_path}")
+    actual_path, is_temp = _resolve_codebase_path(codebase_path, domain, domain_config, verbose)
 
     try:
         # Set up clients
@@ -1100,9 +1583,11 @@ def run_analysis(
             usage=usage,
             max_turns=max_turns,
             verbose=verbose,
+            sandbox=sandbox,
+            parallel_tool_calls=parallel_tool_calls,
         )
 
-        result = engine.analyze(actual_path, domain=domain_config)
+        result = engine.analyze(actual_path, domain=domain_config, data=data)
 
         if verbose:
             print(f"\n{usage.summary()}")
@@ -1111,3 +1596,67 @@ def run_analysis(
     finally:
         if is_temp:
             shutil.rmtree(actual_path, ignore_errors=True)
+
+
+async def run_analysis_async(
+    codebase_path: str,
+    verbose: bool = False,
+    max_turns: int = MAX_TURNS,
+    root_model: str = "claude-opus-4-6",
+    sub_model: str = DEFAULT_SUB_MODEL,
+    use_cache: bool = True,
+    domain: str = "code",
+    *,
+    usage: TokenUsage | None = None,
+    sub_limiter=None,
+    stop_check: Callable[[], str | None] | None = None,
+    sandbox: bool = False,
+    parallel_tool_calls: bool = False,
+) -> dict:
+    """
+    Async counterpart of run_analysis() for callers that own an event loop.
+
+    Every await happens on the caller's loop: one async root client and one
+    ``AsyncOpenAI`` sub client serve the whole run, so many analyses can run
+    concurrently in one process. ``verbose`` defaults to False because
+    interleaved progress output from concurrent runs is rarely useful.
+
+    ``usage`` lets the caller watch spend while the run is in flight,
+    ``sub_limiter`` is shared across runs to cap concurrent sub-LLM calls
+    (see SubModelClient), and ``stop_check`` is passed to the engine.
+    """
+    from .domains import get_domain
+
+    domain_config = get_domain(domain)
+    actual_path, is_temp = await asyncio.to_thread(
+        _resolve_codebase_path, codebase_path, domain, domain_config, verbose
+    )
+
+    try:
+        usage = usage if usage is not None else TokenUsage()
+        usage.set_root_pricing(root_model)
+        root_client = create_async_root_client(usage=usage, model=root_model)
+        sub_client = SubModelClient(
+            usage=usage, model=sub_model, use_cache=use_cache, limiter=sub_limiter
+        )
+
+        engine = AsyncRLMEngine(
+            root_client=root_client,
+            sub_client=sub_client,
+            usage=usage,
+            max_turns=max_turns,
+            verbose=verbose,
+            stop_check=stop_check,
+            sandbox=sandbox,
+            parallel_tool_calls=parallel_tool_calls,
+        )
+
+        result = await engine.analyze(actual_path, domain=domain_config)
+
+        if verbose:
+            print(f"\n{usage.summary()}")
+
+        return result
+    finally:
+        if is_temp:
+            await asyncio.to_thread(shutil.rmtree, actual_path, ignore_errors=True)
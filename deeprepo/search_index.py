@@ -0,0 +1,303 @@
+"""Trigram index behind the REPL's ``search``/``grep`` helpers.
+
+Root-model code tends to find files with a full scan per pattern::
+
+    for path, content in codebase.items():
+        if re.search(pattern, content): ...
+
+On large repositories every such loop costs seconds of REPL time, and it is
+repeated for each pattern on each turn. ``TrigramIndex`` maps every
+three-character substring of the (case-folded) documents to the documents
+containing it. A query pulls the literal runs a regex requires out of the
+pattern, intersects the posting lists of their trigrams, and only runs the
+regex over those candidates. Patterns without a usable literal (``\\w+``,
+``.*``) fall back to a full scan, so results never depend on the index.
+
+Case-insensitive queries need care: ``re.IGNORECASE`` folds one character
+at a time and treats a few non-ASCII letters as equal (``ı``/``i``,
+``ſ``/``s``) that ``str.casefold()`` keeps apart or expands (``İ`` becomes
+two characters). The index therefore only answers ``IGNORECASE`` queries for
+ASCII literals and always returns the non-ASCII documents as candidates.
+
+The index covers the documents present when it was built. If REPL code adds
+or removes paths afterwards, queries scan every current path instead;
+content edited in place under an existing path is not re-indexed.
+
+The index is built in a background thread right after loading; until it is
+ready, queries scan everything instead of waiting for it.
+"""
+
+import fnmatch
+import re
+import threading
+from collections.abc import Callable, Mapping
+from typing import NamedTuple
+
+INDEX_MAX_CHARS = 64_000_000  # Above this the index would cost more memory than it saves
+DEFAULT_HIT_LIMIT = 1_000
+MAX_HIT_LINE_CHARS = 300
+
+_ESCAPE_LITERALS = {"n": "\n", "t": "\t", "r": "\r", "f": "\f", "v": "\v", "a": "\a"}
+
+
+class Hit(NamedTuple):
+    """One matching line; ``line`` is 1-based."""
+
+    path: str
+    line: int
+    text: str
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _group_end(pattern: str, start: int) -> int:
+    """Index just past the group or character class opening at ``start``."""
+    depth, i, n = 0, start, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            i += 1
+            if i < n and pattern[i] == "^":
+                i += 1
+            if i < n and pattern[i] == "]":
+                i += 1  # A leading "]" is a literal member of the class
+            while i < n and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            if depth == 0:
+                return i + 1
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return n
+
+
+def _split_alternatives(pattern: str) -> list[str]:
+    """Top-level ``|`` branches of a pattern."""
+    branches, start, i = [], 0, 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+        elif c in "([":
+            i = _group_end(pattern, i)
+        elif c == "|":
+            branches.append(pattern[start:i])
+            start = i = i + 1
+        else:
+            i += 1
+    branches.append(pattern[start:])
+    return branches
+
+
+def _required_runs(branch: str) -> list[str]:
+    """Literal strings every match of ``branch`` must contain.
+
+    Conservative: groups, classes, escapes like ``\\d`` and anything made
+    optional by a quantifier end the current run instead of being guessed at.
+    """
+    runs, current, i, n = [], "", 0, len(branch)
+    while i < n:
+        c = branch[i]
+        if c == "\\":
+            nxt = branch[i + 1:i + 2]
+            if nxt in ("x", "u", "U", "N") or nxt.isdigit():
+                return []  # Numeric escapes and backreferences: not worth decoding
+            literal = _ESCAPE_LITERALS.get(nxt) if nxt.isalnum() else nxt or None
+            i += 2
+        elif c in "([":
+            literal = None
+            i = _group_end(branch, i)
+        elif c in ".^$*+?{":
+            literal = None
+            i += 1
+        else:
+            literal = c
+            i += 1
+
+        quantifier = branch[i:i + 1]
+        if quantifier in ("*", "?", "{"):
+            literal = None  # The atom may be absent (or its count is unknown)
+            i = branch.find("}", i) + 1 if quantifier == "{" else i + 1
+            if i == 0:
+                i = n
+        elif quantifier == "+":
+            i += 1
+        if i < n and branch[i] in "?+" and quantifier in ("*", "?", "{", "+"):
+            i += 1  # Lazy or possessive modifier
+
+        if literal is None:
+            runs.append(current)
+            current = ""
+        else:
+            current += literal
+            if quantifier == "+":
+                runs.append(current)  # Repeats separate it from what follows
+                current = ""
+    runs.append(current)
+    return [run for run in runs if len(run) >= 3]
+
+
+def required_trigrams(pattern: str, flags: int = 0) -> list[set[str]] | None:
+    """Trigram sets, one per alternative, that a match must contain; None if any is empty.
+
+    Also None for ``IGNORECASE`` patterns with non-ASCII literals, whose
+    case-insensitive matches the case-folded trigrams cannot predict.
+    """
+    if flags & re.VERBOSE:
+        return None
+    alternatives = []
+    for branch in _split_alternatives(pattern):
+        grams = set()
+        for run in _required_runs(branch):
+            if flags & re.IGNORECASE and not run.isascii():
+                return None
+            grams |= _trigrams(run.casefold())
+        if not grams:
+            return None
+        alternatives.append(grams)
+    return alternatives
+
+
+class TrigramIndex:
+    """Inverted index from case-folded trigrams to the documents containing them."""
+
+    def __init__(self, documents: Mapping[str, str], max_chars: int = INDEX_MAX_CHARS):
+        self._documents = documents
+        self._paths = list(documents)
+        self._known = frozenset(self._paths)
+        self._max_chars = max_chars
+        self._postings: dict[str, list[int]] | None = None
+        self._non_ascii: list[int] = []  # Candidates for every IGNORECASE query
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "TrigramIndex":
+        """Build the index in a daemon thread (once); returns self."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._build, name="deeprepo-search-index", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until the build has finished; True if it has."""
+        self.start()
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def _build(self) -> None:
+        postings: dict[str, list[int]] = {}
+        non_ascii: list[int] = []
+        total = 0
+        try:
+            for doc_id, path in enumerate(self._paths):
+                text = self._documents[path]
+                total += len(text)
+                if total > self._max_chars:
+                    return  # Leave the index unusable; queries keep scanning
+                if not text.isascii():
+                    non_ascii.append(doc_id)
+                for gram in _trigrams(text.casefold()):
+                    posting = postings.get(gram)
+                    if posting is None:
+                        postings[gram] = [doc_id]
+                    else:
+                        posting.append(doc_id)
+            self._non_ascii = non_ascii
+            self._postings = postings
+        except Exception:
+            return  # E.g. an unreadable lazy file; queries keep scanning
+        finally:
+            self._ready.set()
+
+    def candidates(self, pattern: str, flags: int = 0) -> list[str]:
+        """Paths that may match ``pattern``, in load order (all of them if unsure)."""
+        self.start()
+        postings = self._postings if self.ready else None
+        if postings is not None and self._documents.keys() != self._known:
+            postings = None  # Paths were added or removed since the build
+        alternatives = required_trigrams(pattern, flags) if postings is not None else None
+        if alternatives is None:
+            return list(self._documents)
+        ids: set[int] = set(self._non_ascii) if flags & re.IGNORECASE else set()
+        for grams in alternatives:
+            lists = sorted((postings.get(gram, ()) for gram in grams), key=len)
+            found = set(lists[0])
+            for posting in lists[1:]:
+                if not found:
+                    break
+                found.intersection_update(posting)
+            ids |= found
+        return [self._paths[i] for i in sorted(ids)]
+
+
+def _line_hits(path: str, text: str, regex: re.Pattern, limit: int) -> list[Hit]:
+    hits: list[Hit] = []
+    line, pos, last = 1, 0, 0
+    for match in regex.finditer(text):
+        line += text.count("\n", pos, match.start())
+        pos = match.start()
+        if line == last:
+            continue
+        last = line
+        start = text.rfind("\n", 0, pos) + 1
+        end = text.find("\n", pos)
+        body = text[start:end if end != -1 else len(text)]
+        hits.append(Hit(path, line, body[:MAX_HIT_LINE_CHARS]))
+        if len(hits) >= limit:
+            break
+    return hits
+
+
+def make_search_helpers(
+    documents: Mapping[str, str],
+    index: TrigramIndex | None = None,
+) -> dict[str, Callable]:
+    """``search`` and ``grep`` bound to one REPL's documents."""
+    index = index or TrigramIndex(documents)
+
+    def _paths(regex: re.Pattern, glob: str | None) -> list[str]:
+        paths = index.candidates(regex.pattern, regex.flags)
+        if glob:
+            paths = [path for path in paths if fnmatch.fnmatchcase(path, glob)]
+        return paths
+
+    def search(pattern: str, glob: str | None = None, flags: int = 0) -> list[str]:
+        """Paths whose content matches the regex ``pattern`` (optionally only those matching ``glob``)."""
+        regex = re.compile(pattern, flags | re.MULTILINE)
+        return [path for path in _paths(regex, glob) if regex.search(documents.get(path, ""))]
+
+    def grep(
+        pattern: str,
+        glob: str | None = None,
+        flags: int = 0,
+        limit: int = DEFAULT_HIT_LIMIT,
+    ) -> list[Hit]:
+        """Matching lines as ``Hit(path, line, text)``, at most ``limit`` of them.
+
+        ``^``/``$`` match at line boundaries; pass ``flags=re.I`` to ignore case.
+        """
+        regex = re.compile(pattern, flags | re.MULTILINE)
+        hits: list[Hit] = []
+        for path in _paths(regex, glob):
+            if len(hits) >= limit:
+                break
+            hits.extend(_line_hits(path, documents.get(path, ""), regex, limit - len(hits)))
+        return hits
+
+    return {"search": search, "grep": grep}
@@ -0,0 +1,239 @@
+"""Persistent snapshots of loaded codebases.
+
+``init``, ``refresh``, ``analyze``, ``baseline`` and ``compare`` all start
+with ``load_codebase``, which re-reads and re-decodes every file, rebuilds
+the tree and re-derives metadata. A snapshot keeps what one load produced:
+each file's content and stats, the file trees and the metadata. The next load
+still walks and stats the repository, but only re-reads files whose
+``(size, mtime)`` signature changed; when none did, the tree and metadata
+are reused too.
+
+A snapshot is one binary file under ``CACHE_DIR/snapshots``::
+
+    header | zlib(JSON index) | blob | blob | ...
+
+The index maps paths to signatures and stats, and SHA-256 content digests
+to blob offsets. Blobs are zlib-compressed file contents stored once per
+digest, so duplicate files cost nothing. Rewriting a snapshot copies the
+compressed blobs of unchanged files as they are; only changed files are
+compressed, on a background thread so the load that produced them does
+not wait (the process does, at exit). Nothing is unpickled: a truncated,
+corrupt or foreign file fails validation and the load simply reads from disk.
+
+File timestamps are coarse on some filesystems, so an edit made right after
+a load could keep the old signature. Files modified within
+``RACY_WINDOW_NS`` of writing a snapshot are stored without a signature and
+re-read next time.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections.abc import Mapping
+from pathlib import Path
+from typing import NamedTuple
+
+from . import cache
+
+MAGIC = b"DRSNAP"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_DIRNAME = "snapshots"
+SNAPSHOT_EXPIRY_DAYS = 30
+RACY_WINDOW_NS = 2_000_000_000
+COMPRESS_LEVEL = 1  # Loads decompress every blob; favour speed over size
+
+_HEADER = struct.Struct("<6sHQ")  # magic, version, compressed index length
+_UNTRUSTED = -1
+
+_writers: list[threading.Thread] = []
+_writers_lock = threading.Lock()
+
+
+class SnapshotEntry(NamedTuple):
+    """Stat signature and load-time stats of one file in a snapshot."""
+
+    size: int
+    mtime_ns: int
+    digest: str
+    ext: str
+    chars: int
+    lines: int
+    has_main_guard: bool
+
+
+def snapshot_path(root: Path) -> Path:
+    key = hashlib.sha256(str(root).encode("utf-8")).hexdigest()[:24]
+    return Path(cache.CACHE_DIR) / SNAPSHOT_DIRNAME / f"{key}.snap"
+
+
+class Snapshot:
+    """A validated snapshot read back from disk."""
+
+    def __init__(self, path: Path, index: dict, data: bytes, blob_base: int):
+        self.path = path
+        self.entries = {path: SnapshotEntry(*entry) for path, entry in index["files"].items()}
+        self.placeholders: dict[str, str] = index["placeholders"]
+        self.file_tree: str = index["file_tree"]
+        self.prompt_tree: str = index["prompt_tree"]
+        self.metadata: dict = index["metadata"]
+        self._blobs: dict[str, list[int]] = index["blobs"]
+        self._data = memoryview(data)
+        self._base = blob_base
+
+    @classmethod
+    def read(cls, root: Path, settings: Mapping) -> "Snapshot | None":
+        """The snapshot for ``root`` if one exists and was written with ``settings``."""
+        path = snapshot_path(root)
+        try:
+            data = path.read_bytes()
+            magic, version, index_len = _HEADER.unpack_from(data)
+            if magic != MAGIC or version != SNAPSHOT_VERSION:
+                return None
+            start = _HEADER.size
+            index = json.loads(zlib.decompress(data[start:start + index_len]))
+            if index.get("root") != str(root) or index.get("settings") != dict(settings):
+                return None
+            return cls(path, index, data, start + index_len)
+        except (OSError, struct.error, zlib.error, ValueError, KeyError, TypeError):
+            return None
+
+    def touch(self) -> None:
+        """Bump the snapshot's mtime so ``_prune`` counts it as recently used."""
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def lookup(self, rel_path: str, size: int, mtime_ns: int) -> SnapshotEntry | None:
+        """The entry for ``rel_path`` if its signature still matches the file on disk."""
+        entry = self.entries.get(rel_path)
+        if entry is None or entry.size != size or entry.mtime_ns != mtime_ns:
+            return None
+        return entry
+
+    def blob(self, digest: str) -> bytes:
+        """The compressed content stored under ``digest`` (KeyError if absent)."""
+        offset, length = self._blobs[digest]
+        start = self._base + offset
+        return bytes(self._data[start:start + length])
+
+    def restore(self, entry: SnapshotEntry) -> str | None:
+        """The content of ``entry``; None if its blob is missing or damaged."""
+        try:
+            offset, length = self._blobs[entry.digest]
+            start = self._base + offset
+            return zlib.decompress(self._data[start:start + length]).decode("utf-8")
+        except (KeyError, ValueError, zlib.error):
+            return None
+
+
+def write_snapshot(
+    root: Path,
+    settings: Mapping,
+    entries: Mapping[str, SnapshotEntry],
+    contents: Mapping[str, str],
+    placeholders: Mapping[str, str],
+    file_tree: str,
+    prompt_tree: str,
+    metadata: dict,
+    previous: Snapshot | None = None,
+    path: Path | None = None,
+) -> Path | None:
+    """Atomically replace the snapshot for ``root``; None if it could not be written.
+
+    ``contents`` maps digests to the content of files read from disk; blobs
+    for the other digests are copied from ``previous``. ``path`` defaults to
+    ``snapshot_path(root)``.
+    """
+    racy_after = time.time_ns() - RACY_WINDOW_NS
+    files = {}
+    for rel_path, entry in entries.items():
+        if entry.mtime_ns >= racy_after:
+            entry = entry._replace(size=_UNTRUSTED)
+        files[rel_path] = list(entry)
+
+    offsets: dict[str, list[int]] = {}
+    chunks: list[bytes] = []
+    position = 0
+    for entry in entries.values():
+        if entry.digest in offsets:
+            continue
+        content = contents.get(entry.digest)
+        if content is not None:
+            blob = zlib.compress(content.encode("utf-8", errors="replace"), COMPRESS_LEVEL)
+        else:
+            blob = previous.blob(entry.digest)
+        offsets[entry.digest] = [position, len(blob)]
+        chunks.append(blob)
+        position += len(blob)
+
+    index = zlib.compress(json.dumps({
+        "root": str(root),
+        "settings": dict(settings),
+        "files": files,
+        "blobs": offsets,
+        "placeholders": dict(placeholders),
+        "file_tree": file_tree,
+        "prompt_tree": prompt_tree,
+        "metadata": metadata,
+    }, separators=(",", ":")).encode("utf-8"))
+
+    if path is None:
+        path = snapshot_path(root)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as handle:
+            handle.write(_HEADER.pack(MAGIC, SNAPSHOT_VERSION, len(index)))
+            handle.write(index)
+            for chunk in chunks:
+                handle.write(chunk)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return None
+    _prune(path.parent)
+    return path
+
+
+def write_snapshot_async(root: Path, *args, **kwargs) -> threading.Thread:
+    """Run ``write_snapshot`` on a non-daemon thread; see ``wait_for_writes``.
+
+    The target path is resolved before the thread starts, so the snapshot
+    lands under the ``CACHE_DIR`` that was current when the load finished.
+    """
+    kwargs.setdefault("path", snapshot_path(root))
+    thread = threading.Thread(
+        target=write_snapshot, args=(root, *args), kwargs=kwargs, name="deeprepo-snapshot"
+    )
+    with _writers_lock:
+        _writers[:] = [writer for writer in _writers if writer.is_alive()]
+        _writers.append(thread)
+    thread.start()
+    return thread
+
+
+def wait_for_writes(timeout: float | None = None) -> None:
+    """Block until snapshots being written in the background are on disk."""
+    with _writers_lock:
+        writers = list(_writers)
+    for writer in writers:
+        writer.join(timeout)
+
+
+def _prune(directory: Path) -> None:
+    """Drop snapshots of repositories that have not been loaded for a while."""
+    cutoff = time.time() - SNAPSHOT_EXPIRY_DAYS * 86400
+    try:
+        for candidate in directory.iterdir():
+            if candidate.stat().st_mtime < cutoff:
+                candidate.unlink()
+    except OSError:
+        pass
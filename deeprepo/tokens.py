@@ -0,0 +1,165 @@
+"""Token counting shared by every budget decision.
+
+COLD_START.md truncation, the TUI's prompt and context sizes, rate-limit
+reservations, history compaction and map-reduce chunk sizes all need token
+counts. A flat ``len(text) // 4`` undercounts symbol-dense code and
+overcounts prose, so they count here instead:
+
+- with ``tiktoken`` installed (``pip install 'deeprepo-cli[tokens]'``) text
+  is encoded with a real BPE (``cl100k_base`` unless ``DEEPREPO_TOKENIZER``
+  names another encoding);
+- otherwise, or when the encoding cannot be loaded offline, a regex
+  approximation of BPE pre-tokenization is used: common words are one token,
+  long identifiers, digit runs and symbol runs cost more.
+
+Counts are memoized per string, keyed by length and hash, so re-measuring
+the same transcript or document on every turn is a dictionary lookup.
+Set ``DEEPREPO_TOKENIZER=heuristic`` to force the fallback.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+
+DEFAULT_ENCODING = "cl100k_base"
+HEURISTIC = "heuristic"
+CACHE_MIN_CHARS = 64  # Shorter strings are cheaper to count than to cache
+CACHE_MAX_ENTRIES = 4096
+
+# Words split at camelCase humps; digits, whitespace and symbols as runs.
+_PIECES = re.compile(
+    r"(?P<word>[A-Z]?[a-z]+|[A-Z]+(?![a-z])|[^\W\d_]+)"
+    r"|(?P<num>\d+)|(?P<space>\s+)|(?P<sym>[^\w\s]+|_+)"
+)
+
+_UNLOADED = object()
+_lock = threading.Lock()
+_encoder = _UNLOADED
+_cache: OrderedDict[tuple[int, int], int] = OrderedDict()
+
+
+def _load_encoder(name: str):
+    if not name or name == HEURISTIC:
+        return None
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(name)
+    except Exception:  # Not installed, unknown name, or BPE file not downloadable
+        return None
+
+
+def _get_encoder():
+    global _encoder
+    if _encoder is _UNLOADED:
+        with _lock:
+            if _encoder is _UNLOADED:
+                _encoder = _load_encoder(os.environ.get("DEEPREPO_TOKENIZER", DEFAULT_ENCODING))
+    return _encoder
+
+
+def use_tokenizer(name: str | None) -> str:
+    """Switch the backend (an encoding name or ``"heuristic"``); ``None`` re-reads the env.
+
+    Returns the name of the backend now in use.
+    """
+    global _encoder
+    with _lock:
+        _encoder = _UNLOADED if name is None else _load_encoder(name)
+        _cache.clear()
+    return tokenizer_name()
+
+
+def tokenizer_name() -> str:
+    encoder = _get_encoder()
+    return HEURISTIC if encoder is None else encoder.name
+
+
+def _piece_cost(kind: str, piece: str) -> int:
+    if kind == "word":
+        if not piece.isascii():
+            return len(piece)  # Non-Latin scripts are close to one token per character
+        return 1 if len(piece) <= 8 else math.ceil(len(piece) / 4)
+    if kind == "num":
+        return math.ceil(len(piece) / 3)
+    if kind == "space":
+        return 0 if piece == " " else 1  # A single space merges into the next word
+    return math.ceil(len(piece) / 2)
+
+
+def _heuristic_count(text: str) -> int:
+    return sum(_piece_cost(m.lastgroup, m.group()) for m in _PIECES.finditer(text))
+
+
+def _count_uncached(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder is None:
+        return _heuristic_count(text)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in ``text``."""
+    if not text:
+        return 0
+    if len(text) < CACHE_MIN_CHARS:
+        return _count_uncached(text)
+    key = (len(text), hash(text))
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+    count = _count_uncached(text)
+    with _lock:
+        _cache[key] = count
+        if len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return count
+
+
+def count_structure_tokens(value) -> int:
+    """Tokens in a message list or other JSON-like value: strings plus a little framing.
+
+    Walks dicts and lists instead of serializing them, so each message's text
+    hits the per-string cache on later calls.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return count_tokens(value)
+    if isinstance(value, dict):
+        return sum(1 + count_tokens(str(k)) + count_structure_tokens(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(1 + count_structure_tokens(item) for item in value)
+    return count_tokens(str(value))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of ``text`` that fits in ``max_tokens``."""
+    max_tokens = max(max_tokens, 0)
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = _get_encoder()
+    if encoder is not None:
+        return encoder.decode(encoder.encode(text, disallowed_special=())[:max_tokens])
+    used = 0
+    for m in _PIECES.finditer(text):
+        cost = _piece_cost(m.lastgroup, m.group())
+        if used + cost > max_tokens:
+            if m.lastgroup == "word" and m.group().isascii():
+                # Keep the part of a long identifier that still fits.
+                return text[:m.start() + (max_tokens - used) * 4]
+            return text[:m.start()]
+        used += cost
+    return text
+
+
+def chars_for_tokens(text: str, max_tokens: int) -> int:
+    """Character budget holding about ``max_tokens`` of text as dense as ``text``."""
+    tokens = count_tokens(text)
+    if tokens == 0:
+        return max(max_tokens, 1) * 4
+    return max(1, max_tokens * len(text) // tokens)
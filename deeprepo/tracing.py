@@ -0,0 +1,210 @@
+"""Wall-clock spans for one analysis, exported as Chrome trace JSON.
+
+``TokenUsage`` keeps call counts and raw latencies, but not where a run's
+wall-clock time goes. A ``Tracer`` records one span per phase:
+
+- ``load``: reading the codebase;
+- ``turn``: one root turn, end to end;
+- ``root``: waiting for the root model;
+- ``repl``: executing one REPL code block (sub-LLM calls happen inside);
+- ``sub``: one sub-LLM request, including the wait for a concurrency slot;
+- ``cache``: one sub-LLM cache lookup or write.
+
+The active tracer lives in a ``ContextVar``, so instrumented code calls the
+module-level ``span()`` without threading a tracer through every signature;
+with no tracer active it is a no-op. Tasks and ``asyncio.to_thread`` inherit
+the context; plain threads must be started with ``contextvars.copy_context()``
+to stay in the trace.
+
+``Tracer.write()`` produces the Trace Event Format understood by Perfetto and
+``chrome://tracing``. Each thread or asyncio task gets its own lane, so
+overlapping sub-LLM calls of a batch are drawn side by side. A summary of
+per-phase time is stored under ``otherData``. Phases overlap, so time is
+counted as the union of the phase's spans, not their sum. For every turn it
+also lists the REPL time not spent waiting on sub-LLM calls or the cache,
+and the slowest sub-LLM call, which bounds the turn's batches.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import threading
+import time
+from pathlib import Path
+
+LOAD = "load"
+TURN = "turn"
+ROOT = "root"
+REPL = "repl"
+SUB = "sub"
+CACHE = "cache"
+PHASES = (LOAD, ROOT, REPL, SUB, CACHE)
+
+_current: contextvars.ContextVar["Tracer | None"] = contextvars.ContextVar(
+    "deeprepo_tracer", default=None
+)
+
+
+def _union(intervals: list[tuple[float, float]]) -> list[tuple[float, float]]:
+    merged: list[tuple[float, float]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _length(intervals: list[tuple[float, float]]) -> float:
+    return sum(end - start for start, end in intervals)
+
+
+def _clip(intervals, start: float, end: float) -> list[tuple[float, float]]:
+    return [(max(s, start), min(e, end)) for s, e in intervals if s < end and e > start]
+
+
+def _overlap(a: list[tuple[float, float]], b: list[tuple[float, float]]) -> float:
+    """Length of the intersection of two sorted, disjoint interval lists."""
+    total, i, j = 0.0, 0, 0
+    while i < len(a) and j < len(b):
+        total += max(0.0, min(a[i][1], b[j][1]) - max(a[i][0], b[j][0]))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return total
+
+
+class Tracer:
+    """Thread-safe recorder of completed spans for one run."""
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans: list[dict] = []
+        self._lanes: dict[tuple[int, int], tuple[int, str]] = {}
+
+    def _lane(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        thread = threading.current_thread()
+        key = (thread.ident, id(task) if task is not None else 0)
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is None:
+                label = thread.name if task is None else f"{thread.name} / {task.get_name()}"
+                lane = self._lanes[key] = (len(self._lanes) + 1, label)
+        return lane[0]
+
+    @contextlib.contextmanager
+    def span(self, name: str, cat: str, **args):
+        """Record the enclosed block; the yielded dict can take extra args."""
+        lane = self._lane()
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self._spans.append({
+                    "name": name,
+                    "cat": cat,
+                    "start": start - self._origin,
+                    "end": end - self._origin,
+                    "lane": lane,
+                    "args": args,
+                })
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Make this the tracer for the current context (and tasks/threads it starts)."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def spans(self, cat: str | None = None) -> list[dict]:
+        with self._lock:
+            return [dict(s) for s in self._spans if cat is None or s["cat"] == cat]
+
+    def _intervals(self, cat: str) -> list[tuple[float, float]]:
+        return _union([(s["start"], s["end"]) for s in self.spans(cat)])
+
+    def phase_seconds(self) -> dict[str, float]:
+        """Wall-clock seconds during which each phase had at least one span open."""
+        return {cat: round(_length(self._intervals(cat)), 6) for cat in PHASES}
+
+    def turn_breakdown(self) -> list[dict]:
+        """Per-turn wall time split into root, REPL, sub-LLM and cache time."""
+        by_cat = {cat: self._intervals(cat) for cat in PHASES}
+        waits = _union(by_cat[SUB] + by_cat[CACHE])
+        sub_spans = self.spans(SUB)
+        turns = []
+        for turn in sorted(self.spans(TURN), key=lambda s: s["start"]):
+            start, end = turn["start"], turn["end"]
+            clipped = {cat: _clip(by_cat[cat], start, end) for cat in PHASES}
+            repl = clipped[REPL]
+            calls = [s["end"] - s["start"] for s in sub_spans if start <= s["start"] < end]
+            turns.append({
+                "turn": turn["args"].get("turn"),
+                "wall_s": round(end - start, 6),
+                "root_s": round(_length(clipped[ROOT]), 6),
+                "repl_s": round(_length(repl), 6),
+                "repl_exclusive_s": round(_length(repl) - _overlap(repl, _clip(waits, start, end)), 6),
+                "sub_wait_s": round(_length(clipped[SUB]), 6),
+                "cache_s": round(_length(clipped[CACHE]), 6),
+                "sub_calls": len(calls),
+                "slowest_sub_call_s": round(max(calls, default=0.0), 6),
+            })
+        return turns
+
+    def to_chrome(self, **metadata) -> dict:
+        """The trace as a Trace Event Format document."""
+        with self._lock:
+            spans = list(self._spans)
+            lanes = sorted(self._lanes.values())
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": lane, "args": {"name": label}}
+            for lane, label in lanes
+        ]
+        for s in spans:
+            events.append({
+                "name": s["name"],
+                "cat": s["cat"],
+                "ph": "X",
+                "ts": round(s["start"] * 1e6, 3),
+                "dur": round((s["end"] - s["start"]) * 1e6, 3),
+                "pid": 1,
+                "tid": s["lane"],
+                "args": {k: v for k, v in s["args"].items() if v is not None},
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                **metadata,
+                "phase_seconds": self.phase_seconds(),
+                "turns": self.turn_breakdown(),
+            },
+        }
+
+    def write(self, path: str | Path, **metadata) -> Path:
+        path = Path(path)
+        path.write_text(json.dumps(self.to_chrome(**metadata), default=str))
+        return path
+
+
+def current_tracer() -> Tracer | None:
+    return _current.get()
+
+
+def span(name: str, cat: str, **args):
+    """Span on the active tracer, or a no-op context manager without one."""
+    tracer = _current.get()
+    if tracer is None:
+        return contextlib.nullcontext(args)
+    return tracer.span(name, cat, **args)
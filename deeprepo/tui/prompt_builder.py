@@ -8,6 +8,7 @@ import re
 from pathlib import Path
 
 from deeprepo.codebase_loader import ALL_EXTENSIONS, MAX_FILE_SIZE, SKIP_DIRS
+from deeprepo.tokens import count_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -298,10 +299,10 @@ class PromptBuilder:
         return "\n".join(parts).rstrip() + "\n"
 
     def _estimate_tokens(self, text: str) -> int:
-        """Rough token estimate using the char/4 heuristic."""
+        """Token count of ``text`` (see ``deeprepo.tokens``)."""
         if not text:
             return 0
-        return max(1, int(len(text) / 4))
+        return max(1, count_tokens(text))
 
     # Backward-compatible alias for spec typo.
     def _estimate_tons(self, text: str) -> int:
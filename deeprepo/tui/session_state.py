@@ -5,6 +5,7 @@ from datetime import datetime
 from pathlib import Path
 
 from deeprepo.config_manager import ConfigManager
+from deeprepo.tokens import count_tokens
 
 
 @dataclass
@@ -56,7 +57,7 @@ class SessionState:
         cold_start_path = cm.deeprepo_dir / "COLD_START.md"
         if cold_start_path.is_file():
             content = cold_start_path.read_text(encoding="utf-8", errors="ignore")
-            state.context_tokens = int(round(len(content.split()) * 1.3))
+            state.context_tokens = count_tokens(content)
             state.context_last_updated = datetime.fromtimestamp(
                 cold_start_path.stat().st_mtime
             )
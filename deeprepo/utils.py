@@ -34,8 +34,15 @@ def _is_retryable(exc: Exception) -> bool:
     return False
 
 
-def retry_with_backoff(max_retries: int = MAX_RETRIES, base_delay: float = BASE_DELAY):
-    """Decorator that retries a sync function with exponential backoff + jitter."""
+def retry_with_backoff(
+    max_retries: int = MAX_RETRIES,
+    base_delay: float = BASE_DELAY,
+    on_error=None,
+):
+    """Decorator that retries a sync function with exponential backoff + jitter.
+
+    ``on_error(exc)`` is called for every retryable failure, including the last.
+    """
 
     def decorator(func):
         @wraps(func)
@@ -47,6 +54,8 @@ def retry_with_backoff(max_retries: int = MAX_RETRIES, base_delay: float = BASE_
                 except Exception as exc:
                     if not _is_retryable(exc):
                         raise
+                    if on_error is not None:
+                        on_error(exc)
                     last_exception = exc
                     if attempt == max_retries:
                         raise
@@ -73,9 +82,13 @@ async def async_retry_with_backoff(
     *args,
     max_retries: int = MAX_RETRIES,
     base_delay: float = BASE_DELAY,
+    on_error=None,
     **kwargs,
 ):
-    """Async retry wrapper for coroutine callables with exponential backoff."""
+    """Async retry wrapper for coroutine callables with exponential backoff.
+
+    ``on_error(exc)`` is called for every retryable failure, including the last.
+    """
     last_exception = None
     for attempt in range(max_retries + 1):
         try:
@@ -83,6 +96,8 @@ async def async_retry_with_backoff(
         except Exception as exc:
             if not _is_retryable(exc):
                 raise
+            if on_error is not None:
+                on_error(exc)
             last_exception = exc
             if attempt == max_retries:
                 raise
@@ -0,0 +1,37 @@
+"""Shared fixtures.
+
+Nothing the tests load may write to the real user cache: ``CACHE_DIR``
+points at a throwaway directory from configuration onwards, since some
+test modules load a codebase (and cache its import specs) at import time,
+and every test then gets a fresh directory of its own.
+"""
+
+import shutil
+import tempfile
+
+import pytest
+
+from deeprepo import cache, snapshot
+
+_session_cache_dir = tempfile.mkdtemp(prefix="deeprepo-test-cache-")
+
+
+def pytest_configure(config):
+    cache.CACHE_DIR = _session_cache_dir
+
+
+def pytest_unconfigure(config):
+    snapshot.wait_for_writes()
+    cache.wait_for_migration()
+    cache._close_connections()
+    shutil.rmtree(_session_cache_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache_dir(tmp_path_factory, monkeypatch):
+    """Keep loader snapshots and cached import specs out of the real user cache."""
+    monkeypatch.setattr("deeprepo.cache.CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+    yield
+    snapshot.wait_for_writes()
+    cache.wait_for_migration()
+    cache._close_connections()
@@ -2,6 +2,7 @@
 
 import asyncio
 import os
+import time
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -15,12 +16,12 @@ def _fake_response(content: str):
     )
 
 
-def _build_client():
+def _build_client(fake_create=None, use_cache=False):
     async def _fake_create(*, model, messages, max_tokens, temperature):
         user_prompt = messages[-1]["content"]
         return _fake_response(f"ok:{user_prompt}")
 
-    create_mock = AsyncMock(side_effect=_fake_create)
+    create_mock = AsyncMock(side_effect=fake_create or _fake_create)
     async_client = MagicMock()
     async_client.chat.completions.create = create_mock
 
@@ -28,7 +29,7 @@ def _build_client():
     with patch.dict(os.environ, {"OPENROUTER_API_KEY": "test-key"}, clear=False), patch(
         "deeprepo.llm_clients.openai.OpenAI", return_value=MagicMock()
     ), patch("deeprepo.llm_clients.openai.AsyncOpenAI", return_value=async_client):
-        client = SubModelClient(usage=usage, use_cache=False)
+        client = SubModelClient(usage=usage, use_cache=use_cache)
 
     return client, usage, create_mock
 
@@ -58,3 +59,164 @@ def test_batch_inside_existing_event_loop():
     assert usage.sub_calls == 2
     assert usage.sub_input_tokens == 22
     assert usage.sub_output_tokens == 14
+
+
+def test_batch_writes_cache_as_results_finish(tmp_path, monkeypatch):
+    """Finished answers reach the cache before the rest of the batch completes."""
+    from deeprepo import cache
+
+    monkeypatch.setattr("deeprepo.cache.CACHE_DIR", str(tmp_path / "cache"))
+    seen_before_finish = []
+
+    async def _fake_create(*, model, messages, max_tokens, temperature):
+        prompt = messages[-1]["content"]
+        if prompt == "slow":
+            for _ in range(100):
+                if cache.get_cached("fast", "sys", model) is not None:
+                    seen_before_finish.append(True)
+                    break
+                await asyncio.sleep(0.01)
+            raise KeyboardInterrupt
+        return _fake_response(f"ok:{prompt}")
+
+    client, _, create_mock = _build_client(_fake_create, use_cache=True)
+    try:
+        client.batch(["fast", "slow"], system="sys", max_tokens=32, max_concurrent=2)
+    except KeyboardInterrupt:
+        pass
+
+    assert seen_before_finish == [True]
+    assert cache.get_cached("fast", "sys", client.model) == "ok:fast"
+
+    # A second run only dispatches the prompt that never finished.
+    create_mock.side_effect = None
+    create_mock.return_value = _fake_response("ok:slow")
+    create_mock.reset_mock()
+    results = client.batch(["fast", "slow"], system="sys", max_tokens=32)
+    assert results == ["ok:fast", "ok:slow"]
+    assert create_mock.await_count == 1
+    cache._close_connections()
+
+
+def test_abatch_runs_on_callers_loop():
+    """abatch() is awaited directly, without spinning up a nested loop."""
+    client, usage, create_mock = _build_client()
+
+    async def _run():
+        return await client.abatch(["p", "q"], system="sys", max_tokens=32, max_concurrent=2)
+
+    assert asyncio.run(_run()) == ["ok:p", "ok:q"]
+    assert usage.sub_calls == 2
+    assert create_mock.await_count == 2
+
+
+def test_batch_without_max_concurrent_uses_adaptive_limit():
+    """Healthy batches should raise the client's persistent concurrency limit."""
+    client, _, create_mock = _build_client()
+    start = client.concurrency.limit
+
+    for round_ in range(3):
+        client.batch([f"{round_}-{i}" for i in range(8)], system="sys")
+
+    assert create_mock.await_count == 24
+    assert client.concurrency.limit > start
+    assert client.concurrency.in_flight == 0
+
+
+def test_astream_yields_results_as_they_finish():
+    async def _fake_create(*, model, messages, max_tokens, temperature):
+        prompt = messages[-1]["content"]
+        await asyncio.sleep(0.2 if prompt == "slow" else 0)
+        return _fake_response(f"ok:{prompt}")
+
+    client, _, _ = _build_client(_fake_create)
+
+    async def _run():
+        return [item async for item in client.astream(["slow", "a", "b"], system="sys")]
+
+    items = asyncio.run(_run())
+
+    assert items[-1] == (0, "ok:slow")
+    assert sorted(items[:2]) == [(1, "ok:a"), (2, "ok:b")]
+
+
+def test_stragglers_are_hedged_and_first_answer_wins():
+    calls = {"straggler": 0}
+
+    async def _fake_create(*, model, messages, max_tokens, temperature):
+        prompt = messages[-1]["content"]
+        if prompt == "straggler":
+            calls["straggler"] += 1
+            if calls["straggler"] == 1:
+                await asyncio.sleep(30)  # The first attempt never comes back in time.
+        await asyncio.sleep(0.01)
+        return _fake_response(f"ok:{prompt}")
+
+    client, usage, create_mock = _build_client(_fake_create)
+    prompts = ["straggler"] + [f"p{i}" for i in range(5)]
+
+    t0 = time.monotonic()
+    results = client.batch(prompts, system="sys")
+
+    assert results == [f"ok:{p}" for p in prompts]
+    assert time.monotonic() - t0 < 5
+    assert calls["straggler"] == 2
+    assert usage.sub_hedged_calls == 1
+    assert create_mock.await_count == len(prompts) + 1
+    assert "1 hedged" in usage.summary()
+
+
+def test_batch_deadline_bounds_tail_latency():
+    async def _fake_create(*, model, messages, max_tokens, temperature):
+        if messages[-1]["content"] == "stuck":
+            await asyncio.sleep(30)
+        return _fake_response("ok")
+
+    client, usage, _ = _build_client(_fake_create)
+
+    t0 = time.monotonic()
+    results = client.batch(["a", "stuck", "b"], system="sys", deadline=0.3)
+
+    assert time.monotonic() - t0 < 5
+    assert results[0] == results[2] == "ok"
+    assert results[1].startswith("[ERROR: TimeoutError")
+    assert usage.sub_deadline_misses == 1
+
+
+def test_sync_stream_can_stop_early():
+    started = []
+
+    async def _fake_create(*, model, messages, max_tokens, temperature):
+        prompt = messages[-1]["content"]
+        started.append(prompt)
+        await asyncio.sleep(0 if prompt == "fast" else 30)
+        return _fake_response(f"ok:{prompt}")
+
+    client, _, _ = _build_client(_fake_create)
+
+    t0 = time.monotonic()
+    for index, result in client.stream(["slow", "fast"], system="sys", max_concurrent=2):
+        break
+
+    assert (index, result) == (1, "ok:fast")
+    assert time.monotonic() - t0 < 5
+
+
+def test_adaptive_latency_excludes_local_rate_limit_waits():
+    """Waiting on a local RPM/TPM limit is not API latency."""
+    from deeprepo.rate_limit import ProviderRateLimiter
+
+    class _SlowLimiter(ProviderRateLimiter):
+        async def aacquire(self, tokens):
+            await asyncio.sleep(0.2)
+            return await super().aacquire(tokens)
+
+    client, _, _ = _build_client()
+    recorded = []
+    client.concurrency.record_success = recorded.append
+
+    with patch("deeprepo.llm_clients.get_rate_limiter", return_value=_SlowLimiter("openrouter", rpm=6000)):
+        assert client.batch(["a", "b"], system="sys") == ["ok:a", "ok:b"]
+
+    assert len(recorded) == 2
+    assert max(recorded) < 0.1
@@ -0,0 +1,148 @@
+"""Tests for AsyncRLMEngine."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from deeprepo.domains.base import DomainConfig
+from deeprepo.llm_clients import TokenUsage
+from deeprepo.rlm_scaffold import AsyncRLMEngine
+
+
+def _tool_response(code: str, tool_id: str = "toolu_1"):
+    return SimpleNamespace(
+        content=[
+            SimpleNamespace(
+                type="tool_use",
+                id=tool_id,
+                name="execute_python",
+                input={"code": code},
+            )
+        ]
+    )
+
+
+def _domain() -> DomainConfig:
+    return DomainConfig(
+        name="test",
+        label="Test",
+        description="test domain",
+        loader=lambda path: {
+            "codebase": {"a.py": "x = 1\n", "b.py": "y = 2\n"},
+            "file_tree": "a.py\nb.py",
+            "metadata": {"total_files": 2, "total_chars": 12},
+        },
+        format_metadata=lambda metadata: str(metadata),
+        root_system_prompt="system",
+        sub_system_prompt="sub-system",
+        user_prompt_template="{metadata_str}\n{file_tree}",
+        baseline_system_prompt="baseline",
+        data_variable_name="codebase",
+    )
+
+
+def _engine(responses, sub_client=None) -> AsyncRLMEngine:
+    root = MagicMock()
+    root.complete = AsyncMock(side_effect=responses)
+    return AsyncRLMEngine(
+        root_client=root,
+        sub_client=sub_client or MagicMock(),
+        usage=TokenUsage(),
+        max_turns=4,
+        verbose=False,
+    )
+
+
+def test_async_engine_routes_sub_calls_through_engine_loop():
+    loops = []
+
+    async def _abatch(prompts, system="", max_concurrent=5):
+        loops.append(asyncio.get_running_loop())
+        return [f"{system}:{prompt}" for prompt in prompts]
+
+    async def _aquery(prompt, system=""):
+        loops.append(asyncio.get_running_loop())
+        return f"single:{prompt}"
+
+    sub = MagicMock()
+    sub.abatch = _abatch
+    sub.aquery = _aquery
+
+    engine = _engine(
+        [
+            _tool_response("print(llm_batch(sorted(codebase)))\nprint(llm_query('q'))"),
+            _tool_response("set_answer('done')", tool_id="toolu_2"),
+        ],
+        sub_client=sub,
+    )
+
+    async def _run():
+        result = await engine.analyze("/unused", _domain())
+        return result, asyncio.get_running_loop()
+
+    result, loop = asyncio.run(_run())
+
+    assert result["status"] == "completed"
+    assert result["analysis"] == "done"
+    assert result["turns"] == 2
+    assert "['sub-system:a.py', 'sub-system:b.py']" in result["trajectory"][0]["repl_output"]
+    assert "single:q" in result["trajectory"][0]["repl_output"]
+    assert loops == [loop, loop]
+    sub.batch.assert_not_called()
+    sub.query.assert_not_called()
+
+
+def test_concurrent_async_engines_keep_repl_output_separate():
+    def _responses(label: str):
+        code = (
+            "for i in range(200):\n"
+            f"    print('{label}')\n"
+        )
+        return [
+            _tool_response(code),
+            _tool_response(f"set_answer('{label}')", tool_id="toolu_2"),
+        ]
+
+    engines = [_engine(_responses(label)) for label in ("alpha", "beta")]
+
+    async def _run():
+        return await asyncio.gather(
+            *(engine.analyze("/unused", _domain()) for engine in engines)
+        )
+
+    results = asyncio.run(_run())
+
+    for label, result in zip(("alpha", "beta"), results):
+        assert result["analysis"] == label
+        lines = result["trajectory"][0]["repl_output"].split()
+        assert set(lines) == {label}
+        assert len(lines) == 200
+
+
+def test_async_engine_streams_sub_results_from_engine_loop():
+    loops = []
+
+    async def _astream(prompts, system=""):
+        loops.append(asyncio.get_running_loop())
+        for index in reversed(range(len(prompts))):
+            await asyncio.sleep(0)
+            yield index, f"{system}:{prompts[index]}"
+
+    sub = MagicMock()
+    sub.astream.side_effect = _astream
+    engine = _engine(
+        [
+            _tool_response("for i, r in llm_stream(sorted(codebase)):\n    print(i, r)"),
+            _tool_response("set_answer('done')", tool_id="toolu_2"),
+        ],
+        sub_client=sub,
+    )
+
+    async def _run():
+        result = await engine.analyze("/unused", _domain())
+        return result, asyncio.get_running_loop()
+
+    result, loop = asyncio.run(_run())
+
+    assert loops == [loop]
+    assert result["trajectory"][0]["repl_output"] == "1 sub-system:b.py\n0 sub-system:a.py\n"
@@ -0,0 +1,132 @@
+"""Tests for concurrent multi-repository analysis (analyze-many)."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from deeprepo.batch_runner import (
+    BatchBudget,
+    BudgetExceededError,
+    parse_manifest,
+    run_many,
+)
+from deeprepo.cli import cmd_analyze_many
+from deeprepo.llm_clients import TokenUsage
+
+
+def _result(usage: TokenUsage, analysis: str = "report") -> dict:
+    return {"analysis": analysis, "turns": 2, "usage": usage, "status": "completed"}
+
+
+def test_parse_manifest_skips_blanks_and_comments():
+    text = "# repos\n/src/a\n\n  https://github.com/u/b  # upstream\n   # indented comment\n"
+
+    assert parse_manifest(text) == ["/src/a", "https://github.com/u/b"]
+
+
+def test_batch_budget_stops_after_cost_ceiling():
+    budget = BatchBudget(max_sub_concurrent=2, max_cost=1.0)
+    usage = budget.track(TokenUsage())
+    assert budget.stop_reason() is None
+
+    usage.sub_input_tokens = 10_000_000  # well past $1 at any sub-model price
+
+    async def _enter():
+        async with budget:
+            pass
+
+    assert budget.exhausted
+    assert "cost ceiling" in budget.stop_reason()
+    with pytest.raises(BudgetExceededError):
+        asyncio.run(_enter())
+
+
+def test_run_many_bounds_parallel_runs_and_keeps_input_order():
+    active = 0
+    peak = 0
+
+    async def _fake_run(repo, *, usage, sub_limiter, stop_check, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01 if repo == "a" else 0)
+        active -= 1
+        if repo == "bad":
+            raise FileNotFoundError(repo)
+        return _result(usage, analysis=repo)
+
+    completed = []
+
+    def _on_complete(repo, result, entry):
+        completed.append(repo)
+        return {"written": result is not None}
+
+    with patch("deeprepo.rlm_scaffold.run_analysis_async", new=_fake_run):
+        entries = asyncio.run(
+            run_many(["a", "bad", "c", "d"], parallel=2, on_complete=_on_complete)
+        )
+
+    assert [entry["repo"] for entry in entries] == ["a", "bad", "c", "d"]
+    assert [entry["status"] for entry in entries] == ["completed", "error", "completed", "completed"]
+    assert entries[1]["error"] == "FileNotFoundError: bad"
+    assert [entry["written"] for entry in entries] == [True, False, True, True]
+    assert completed[0] != "a"  # results are reported as they finish
+    assert peak == 2
+
+
+def test_run_many_skips_remaining_repos_once_budget_is_spent():
+    budget = BatchBudget(max_cost=0.5)
+    seen_limiters = []
+
+    async def _fake_run(repo, *, usage, sub_limiter, stop_check, **kwargs):
+        seen_limiters.append(sub_limiter)
+        usage.sub_input_tokens = 10_000_000
+        return _result(usage)
+
+    with patch("deeprepo.rlm_scaffold.run_analysis_async", new=_fake_run):
+        entries = asyncio.run(run_many(["a", "b", "c"], parallel=1, budget=budget))
+
+    assert [entry["status"] for entry in entries] == ["completed", "skipped", "skipped"]
+    assert "cost ceiling" in entries[1]["error"]
+    assert seen_limiters == [budget]
+
+
+def test_cmd_analyze_many_writes_per_repo_files_and_summary(tmp_path):
+    manifest = tmp_path / "repos.txt"
+    manifest.write_text("/one/api\n/two/api\n", encoding="utf-8")
+    out_dir = tmp_path / "out"
+
+    async def _fake_run(repo, *, usage, **kwargs):
+        return _result(usage, analysis=f"analysis of {repo}")
+
+    args = SimpleNamespace(
+        manifest=str(manifest),
+        output_dir=str(out_dir),
+        quiet=True,
+        domain="code",
+        root_model="sonnet",
+        sub_model="sub/model",
+        no_cache=True,
+        max_turns=3,
+        parallel=2,
+        max_sub_concurrent=4,
+        max_cost=None,
+        sandbox=False,
+    )
+    with patch("deeprepo.rlm_scaffold.run_analysis_async", new=_fake_run):
+        cmd_analyze_many(args)
+
+    analyses = sorted(p.name for p in out_dir.glob("deeprepo_api*.md"))
+    assert len(analyses) == 2
+    assert analyses[0].startswith("deeprepo_api_2_") or analyses[1].startswith("deeprepo_api_2_")
+    assert len(list(out_dir.glob("deeprepo_api*_metrics.json"))) == 2
+
+    [summary_path] = out_dir.glob("deeprepo_batch_*_summary.json")
+    summary = json.loads(summary_path.read_text())
+    assert summary["repos"] == 2
+    assert summary["status_counts"] == {"completed": 2}
+    assert [entry["repo"] for entry in summary["results"]] == ["/one/api", "/two/api"]
+    assert all(entry["analysis_path"].endswith(".md") for entry in summary["results"])
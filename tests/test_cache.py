@@ -2,17 +2,23 @@
 
 import json
 import os
+import threading
 import time
 
 import pytest
 
 from deeprepo.cache import (
-    CACHE_DIR,
     _cache_key,
+    _close_connections,
+    _connect,
+    _migrate_json_entries,
     cache_stats,
     clear_cache,
     get_cached,
+    get_many,
     set_cached,
+    set_many,
+    wait_for_migration,
 )
 
 
@@ -22,6 +28,8 @@ def clean_cache(tmp_path, monkeypatch):
     test_cache_dir = str(tmp_path / "deeprepo_cache")
     monkeypatch.setattr("deeprepo.cache.CACHE_DIR", test_cache_dir)
     yield test_cache_dir
+    wait_for_migration()
+    _close_connections()
 
 
 def test_cache_miss_returns_none():
@@ -42,21 +50,21 @@ def test_cache_key_includes_model():
     assert key_a != key_b
 
 
-def test_cache_expiry(clean_cache):
-    """Expired entries are treated as cache misses."""
+def test_cache_expiry():
+    """Expired entries are treated as cache misses and removed."""
     set_cached("prompt", "system", "model/x", "old result")
 
     # Patch the stored timestamp to be 8 days ago
     key = _cache_key("prompt", "system", "model/x")
-    cache_file = os.path.join(clean_cache, f"{key}.json")
-    with open(cache_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    data["timestamp"] = time.time() - 8 * 86400
-    with open(cache_file, "w", encoding="utf-8") as f:
-        json.dump(data, f)
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "UPDATE entries SET created_at = ? WHERE key = ?",
+            (time.time() - 8 * 86400, key),
+        )
 
     assert get_cached("prompt", "system", "model/x") is None
-    assert not os.path.exists(cache_file)
+    assert conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0
 
 
 def test_clear_cache():
@@ -77,3 +85,68 @@ def test_cache_stats():
     stats = cache_stats()
     assert stats["entries"] == 2
     assert stats["size_mb"] >= 0
+
+
+def test_get_many_and_set_many_round_trip():
+    """Bulk helpers resolve hits and misses aligned with the input order."""
+    set_many([("p1", "r1"), ("p3", "r3")], "s", "m")
+
+    assert get_many(["p1", "p2", "p3", "p1"], "s", "m") == ["r1", None, "r3", "r1"]
+    assert get_many([], "s", "m") == []
+
+
+def test_legacy_json_entries_are_migrated(clean_cache):
+    """One-JSON-file-per-entry caches are imported into SQLite and deleted."""
+    os.makedirs(clean_cache)
+    key = _cache_key("prompt", "system", "model/x")
+    legacy_file = os.path.join(clean_cache, f"{key}.json")
+    with open(legacy_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {"timestamp": time.time(), "model": "model/x", "prompt_hash": key, "result": "legacy"},
+            f,
+        )
+
+    get_cached("prompt", "system", "model/x")  # Opens the database, starts the import
+    wait_for_migration()
+    assert get_cached("prompt", "system", "model/x") == "legacy"
+    assert not os.path.exists(legacy_file)
+    assert cache_stats()["entries"] == 1
+
+
+def test_legacy_migration_does_not_block_lookups(clean_cache, monkeypatch):
+    """Lookups run while the import is in progress; unmigrated keys are misses."""
+    os.makedirs(clean_cache)
+    key = _cache_key("prompt", "system", "model/x")
+    with open(os.path.join(clean_cache, f"{key}.json"), "w", encoding="utf-8") as f:
+        json.dump({"timestamp": time.time(), "model": "model/x", "result": "legacy"}, f)
+
+    release = threading.Event()
+
+    def _slow_migration(conn, cache_dir):
+        assert release.wait(5)
+        return _migrate_json_entries(conn, cache_dir)
+
+    monkeypatch.setattr("deeprepo.cache._migrate_json_entries", _slow_migration)
+    started = time.monotonic()
+    assert get_cached("prompt", "system", "model/x") is None
+    set_cached("other", "system", "model/x", "fresh")
+    assert get_cached("other", "system", "model/x") == "fresh"
+    assert time.monotonic() - started < 2
+
+    release.set()
+    wait_for_migration()
+    assert get_cached("prompt", "system", "model/x") == "legacy"
+
+
+def test_lru_eviction_when_over_size_limit(monkeypatch):
+    """Least-recently-used entries are evicted once the cache is too large."""
+    monkeypatch.setattr("deeprepo.cache.CACHE_MAX_BYTES", 40_000)
+    for i in range(40):
+        set_cached(f"p{i}", "s", "m", "x" * 2_000)
+        get_cached("p0", "s", "m")  # keep p0 hot
+
+    stats = cache_stats()
+    assert 0 < stats["entries"] < 40
+    assert get_cached("p0", "s", "m") is not None
+    assert get_cached("p1", "s", "m") is None
+    assert get_cached("p39", "s", "m") is not None
@@ -0,0 +1,139 @@
+"""Tests for syntax-aware chunking and map-reduce of large files."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from deeprepo.chunking import (
+    DEFAULT_CHUNK_TOKENS,
+    chunk_text,
+    chunk_tokens_for_model,
+    make_repl_helpers,
+    map_reduce,
+)
+from deeprepo.codebase_loader import load_codebase
+from deeprepo.llm_clients import TokenUsage
+from deeprepo.rlm_scaffold import RLMEngine
+from deeprepo.tokens import count_tokens
+
+
+def _python_module(functions: int, body_lines: int = 8) -> str:
+    parts = ['"""Module docstring."""\n\nimport os\n']
+    for i in range(functions):
+        body = "".join(f"    x{j} = os.path.join('a', '{i}-{j}')\n" for j in range(body_lines))
+        parts.append(f"\n\n# helper {i}\n@decorator\ndef func_{i}():\n{body}    return x0\n")
+    return "".join(parts)
+
+
+def test_python_chunks_break_between_definitions():
+    text = _python_module(12)
+    chunks = chunk_text(text, "mod.py", max_chars=1_200)
+
+    assert len(chunks) > 1
+    assert "".join(chunk.text for chunk in chunks) == text
+    assert all(len(chunk.text) <= 1_200 for chunk in chunks)
+    for chunk in chunks[1:]:
+        # Each later chunk opens with a definition's leading comment, never mid-body.
+        assert chunk.text.lstrip("\n").startswith("# helper")
+    assert chunks[0].start_line == 1
+    assert chunks[-1].end_line == text.count("\n")
+    assert [c.start_line for c in chunks[1:]] == [p.end_line + 1 for p in chunks[:-1]]
+    assert chunks[1].label.startswith(f"mod.py (part 2/{len(chunks)}, lines ")
+
+
+def test_oversize_class_is_split_at_its_methods():
+    methods = "".join(
+        f"    def method_{i}(self):\n" + "        value = 1\n" * 20 + "        return value\n\n"
+        for i in range(6)
+    )
+    text = f"class Big:\n{methods}"
+
+    chunks = chunk_text(text, "big.py", max_chars=1_000)
+
+    assert len(chunks) > 1
+    for chunk in chunks[1:]:
+        assert chunk.text.lstrip("\n").startswith("    def method_")
+
+
+def test_text_files_split_at_headings_and_long_lines_by_characters():
+    doc = "".join(f"# Section {i}\n\n" + "word " * 60 + "\n\n" for i in range(5))
+    chunks = chunk_text(doc, "notes.md", max_chars=400)
+    assert all(chunk.text.startswith("# Section") for chunk in chunks)
+
+    line = "x" * 2_500
+    chunks = chunk_text(line, "data.txt", max_chars=1_000)
+    assert [len(chunk.text) for chunk in chunks] == [1_000, 1_000, 500]
+    assert {(c.start_line, c.end_line) for c in chunks} == {(1, 1)}
+
+
+def test_map_reduce_merges_partial_answers_in_rounds():
+    calls = []
+
+    def _batch(prompts):
+        calls.append(prompts)
+        return [f"note{len(calls)}.{i}" for i in range(len(prompts))]
+
+    text = _python_module(40)
+    answer = map_reduce(text, "Summarize.", _batch, path="mod.py", max_chars=800)
+
+    assert len(calls[0]) == len(chunk_text(text, "mod.py", 800))
+    assert all("You are seeing only mod.py (part" in prompt for prompt in calls[0])
+    assert all("Merge the notes below" in prompt for prompt in calls[1])
+    assert len(calls[-1]) == 1
+    assert answer == f"note{len(calls)}.0"
+
+
+def test_small_text_is_a_single_plain_prompt():
+    prompts = []
+
+    def _batch(batch):
+        prompts.extend(batch)
+        return ["done"]
+
+    assert map_reduce("x = 1\n", "Explain.", _batch, path="a.py") == "done"
+    assert prompts == ["Explain.\n\n## a.py\n\nx = 1\n"]
+
+
+def test_repl_helpers_read_oversize_files_from_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr("deeprepo.codebase_loader.MAX_FILE_SIZE", 1_000)
+    (tmp_path / "small.py").write_text("x = 1\n")
+    (tmp_path / "huge.py").write_text(_python_module(30))
+    data = load_codebase(str(tmp_path))
+    assert data["codebase"]["huge.py"].startswith("[FILE TOO LARGE")
+
+    seen = []
+
+    def _batch(prompts):
+        seen.extend(prompts)
+        return ["ok"] * len(prompts)
+
+    helpers = make_repl_helpers(data["codebase"], data["metadata"], _batch, max_tokens=400)
+    chunks = helpers["chunk_file"]("huge.py")
+    assert len(chunks) > 1
+    assert "".join(c.text for c in chunks) == (tmp_path / "huge.py").read_text()
+    assert all(count_tokens(c.text) <= 440 for c in chunks)
+    assert helpers["llm_map_reduce"]("huge.py", "Find bugs.") == "ok"
+    assert any("def func_29" in prompt for prompt in seen)
+
+    with pytest.raises(KeyError):
+        helpers["chunk_file"]("missing.py")
+
+
+def test_chunk_budget_follows_sub_model_context():
+    assert chunk_tokens_for_model("qwen/qwen-2.5-coder-32b-instruct") == 8_000
+    assert chunk_tokens_for_model("minimax/minimax-m2.5") == 16_000
+    assert chunk_tokens_for_model("unknown/model") == DEFAULT_CHUNK_TOKENS
+
+
+def test_engine_namespace_routes_map_reduce_through_sub_batches():
+    sub = MagicMock()
+    sub.model = "qwen/qwen-2.5-coder-32b-instruct"
+    sub.batch.side_effect = lambda prompts, system: [f"{system}:{len(prompts)}"] * len(prompts)
+    engine = RLMEngine(root_client=MagicMock(), sub_client=sub, usage=TokenUsage(), verbose=False)
+
+    namespace = engine._build_namespace(
+        {"a.py": "x = 1\n"}, "a.py", {}, {"content": "", "ready": False}, sub_system_prompt="sub"
+    )
+
+    assert namespace["llm_map_reduce"]("a.py", "Explain.") == "sub:1"
+    assert namespace["chunk_file"]("a.py")[0].text == "x = 1\n"
@@ -1,6 +1,7 @@
 """Tests for log and status CLI commands."""
 
 import argparse
+import os
 import shutil
 from pathlib import Path
 
@@ -154,3 +155,47 @@ def test_compute_file_hashes_skips_deeprepo_dir(initialized_project: Path) -> No
     hashes = compute_file_hashes(initialized_project)
     for path in hashes:
         assert not path.startswith(".deeprepo")
+
+
+def test_scan_file_hashes_reuses_hash_when_stat_unchanged(initialized_project: Path) -> None:
+    from deeprepo.cli_commands import compute_file_hashes, scan_file_hashes
+
+    target = initialized_project / "src" / "utils.py"
+    old_ns = target.stat().st_mtime_ns - 10_000_000_000
+    os.utime(target, ns=(old_ns, old_ns))
+
+    hashes, stats = scan_file_hashes(initialized_project)
+    assert hashes == compute_file_hashes(initialized_project)
+    assert stats["src/utils.py"][1] == old_ns
+
+    # A matching stat signature means the stored hash is trusted without reading.
+    stale = dict(hashes, **{"src/utils.py": "stored-hash"})
+    reused, _ = scan_file_hashes(initialized_project, stale, stats)
+    assert reused["src/utils.py"] == "stored-hash"
+
+    # Any change to the signature forces a rehash.
+    os.utime(target, ns=(old_ns + 1, old_ns + 1))
+    rehashed, _ = scan_file_hashes(initialized_project, stale, stats)
+    assert rehashed["src/utils.py"] == hashes["src/utils.py"]
+
+
+def test_scan_file_hashes_skips_stats_for_recently_modified_files(initialized_project: Path) -> None:
+    from deeprepo.cli_commands import scan_file_hashes
+
+    (initialized_project / "fresh.py").write_text("# just written\n", encoding="utf-8")
+
+    hashes, stats = scan_file_hashes(initialized_project)
+    assert "fresh.py" in hashes
+    assert "fresh.py" not in stats
+
+
+def test_scan_file_hashes_parallel_matches_serial(initialized_project: Path) -> None:
+    from deeprepo.cli_commands import scan_file_hashes
+
+    for i in range(80):
+        (initialized_project / f"mod_{i}.py").write_text(f"x = {i}\n", encoding="utf-8")
+
+    serial, _ = scan_file_hashes(initialized_project, workers=1)
+    parallel, _ = scan_file_hashes(initialized_project, workers=8)
+    assert parallel == serial
+    assert len(serial) > 80
@@ -28,3 +28,102 @@ def test_deeprepo_dir_excluded_from_scan():
         assert not any(".deeprepo" in p for p in paths), (
             f".deeprepo/ files should be excluded, got: {paths}"
         )
+
+
+def _write_tree(root, n_files: int) -> None:
+    for i in range(n_files):
+        subdir = os.path.join(root, f"pkg{i % 7}")
+        os.makedirs(subdir, exist_ok=True)
+        with open(os.path.join(subdir, f"mod{i}.py"), "w") as f:
+            f.write(f"x = {i}\n" * (i % 5 + 1))
+    with open(os.path.join(root, "cli.py"), "w") as f:
+        f.write('if __name__ == "__main__":\n    pass\n')
+
+
+def test_parallel_load_matches_serial():
+    """Thread-pool ingestion must produce the same result as the serial path."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write_tree(tmpdir, 150)
+
+        serial = load_codebase(tmpdir, workers=1)
+        parallel = load_codebase(tmpdir, workers=8)
+
+        assert list(parallel["codebase"]) == list(serial["codebase"])
+        assert parallel["codebase"] == serial["codebase"]
+        assert parallel["file_tree"] == serial["file_tree"]
+        assert parallel["metadata"] == serial["metadata"]
+        assert "cli.py" in parallel["metadata"]["entry_points"]
+
+
+def test_load_reports_progress():
+    """The progress callback sees every file and ends at (total, total)."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write_tree(tmpdir, 80)
+        calls = []
+
+        data = load_codebase(tmpdir, workers=4, progress=lambda d, t: calls.append((d, t)))
+
+        total = data["metadata"]["total_files"]
+        assert len(calls) == total
+        assert calls[-1] == (total, total)
+
+
+def test_lazy_codebase_matches_eager_load():
+    """A lazy load decodes on access and returns the same text as an eager one."""
+    from deeprepo.codebase_loader import LazyCodebase
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write_tree(tmpdir, 20)
+        with open(os.path.join(tmpdir, "crlf.py"), "wb") as f:
+            f.write(b"a = 1\r\nb = 2\r\n")
+        with open(os.path.join(tmpdir, "empty.py"), "w") as f:
+            pass
+        with open(os.path.join(tmpdir, "latin1.py"), "wb") as f:
+            f.write("s = 'caf\u00e9'\n".encode("latin-1"))
+
+        eager = load_codebase(tmpdir, lazy=False)
+        lazy = load_codebase(tmpdir, lazy=True)
+
+        assert isinstance(lazy["codebase"], LazyCodebase)
+        assert list(lazy["codebase"]) == list(eager["codebase"])
+        assert dict(lazy["codebase"].items()) == eager["codebase"]
+        assert lazy["codebase"]["crlf.py"] == "a = 1\nb = 2\n"
+        assert lazy["codebase"]["latin1.py"] == "s = 'caf\ufffd'\n"
+        assert lazy["metadata"] == eager["metadata"]
+
+
+def test_lazy_codebase_bounds_decoded_cache():
+    """Only the most recently used decoded strings are kept alive."""
+    from pathlib import Path
+
+    from deeprepo.codebase_loader import LazyCodebase
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write_tree(tmpdir, 10)
+        paths = list(load_codebase(tmpdir, lazy=False)["codebase"])
+        mapping = LazyCodebase(Path(tmpdir), {p: None for p in paths}, cache_size=3)
+
+        for p in paths:
+            mapping[p]
+
+        assert len(mapping._cache) == 3
+        assert list(mapping._cache) == paths[-3:]
+        try:
+            mapping["new.py"] = "x"
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("LazyCodebase must be read-only")
+
+
+def test_load_switches_to_lazy_above_threshold(monkeypatch):
+    """With lazy=None the loader spills to a LazyCodebase once text is large."""
+    from deeprepo.codebase_loader import LazyCodebase
+
+    monkeypatch.setattr("deeprepo.codebase_loader.LAZY_LOAD_THRESHOLD_CHARS", 50)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _write_tree(tmpdir, 30)
+        data = load_codebase(tmpdir)
+
+        assert isinstance(data["codebase"], LazyCodebase)
+        assert data["metadata"]["total_files"] == len(data["codebase"])
@@ -0,0 +1,120 @@
+"""Tests for `deeprepo compare`: one load, both pipelines concurrently."""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from deeprepo.cli import cmd_compare
+from deeprepo.domains.base import DomainConfig
+from deeprepo.llm_clients import TokenUsage
+from deeprepo.rlm_scaffold import RLMEngine
+
+
+def _domain(loads: list) -> DomainConfig:
+    def _loader(path):
+        loads.append(path)
+        return {
+            "codebase": {"a.py": "x = 1\n"},
+            "file_tree": "a.py",
+            "metadata": {"total_files": 1, "total_chars": 6},
+        }
+
+    return DomainConfig(
+        name="code",
+        label="Codebase Analysis",
+        description="test",
+        loader=_loader,
+        format_metadata=lambda _metadata: "meta",
+        root_system_prompt="system",
+        sub_system_prompt="sub-system",
+        user_prompt_template="{metadata_str}\n{file_tree}",
+        baseline_system_prompt="baseline",
+        data_variable_name="codebase",
+    )
+
+
+def _args(tmp_path) -> SimpleNamespace:
+    return SimpleNamespace(
+        path=str(tmp_path),
+        domain="code",
+        root_model="sonnet",
+        baseline_model="sonnet",
+        sub_model="sub/model",
+        max_turns=3,
+        no_cache=True,
+        quiet=True,
+        output_dir=str(tmp_path / "out"),
+    )
+
+
+def _baseline_result() -> dict:
+    return {
+        "analysis": "baseline report",
+        "usage": TokenUsage(),
+        "included_files": ["a.py"],
+        "excluded_files": [],
+        "prompt_chars": 10,
+        "elapsed_seconds": 0.1,
+    }
+
+
+def test_compare_loads_once_and_overlaps_both_pipelines(tmp_path):
+    loads = []
+    both_running = threading.Barrier(2, timeout=5)
+    seen = {}
+
+    def _fake_analysis(*, codebase_path, data, **kwargs):
+        seen["rlm"] = data
+        both_running.wait()
+        time.sleep(0.1)
+        data["codebase"]["scratch.py"] = "REPL code may modify its documents"
+        return {"analysis": "rlm report", "turns": 2, "usage": TokenUsage(), "status": "completed"}
+
+    def _fake_baseline(*, codebase_path, data, **kwargs):
+        seen["baseline"] = data
+        both_running.wait()
+        time.sleep(0.1)
+        return _baseline_result()
+
+    with patch("deeprepo.domains.get_domain", return_value=_domain(loads)), patch(
+        "deeprepo.rlm_scaffold.run_analysis", new=_fake_analysis
+    ), patch("deeprepo.baseline.run_baseline", new=_fake_baseline):
+        cmd_compare(_args(tmp_path))
+
+    assert loads == [str(tmp_path)]
+    assert seen["rlm"]["metadata"] is seen["baseline"]["metadata"]
+    assert "scratch.py" not in seen["baseline"]["codebase"]
+
+    [metrics_path] = (tmp_path / "out").glob("compare_*_metrics.json")
+    metrics = json.loads(metrics_path.read_text())
+    assert metrics["rlm_seconds"] >= 0.1 and metrics["baseline_seconds"] >= 0.1
+    # Concurrent: wall time is close to the slower pipeline, not the sum.
+    assert metrics["overlap_seconds"] >= 0.08
+    assert metrics["wall_seconds"] < metrics["rlm_seconds"] + metrics["baseline_seconds"]
+    assert metrics["saved_seconds"] > 0
+    # The load is shared either way, so the saving is the overlap alone.
+    assert abs(metrics["saved_seconds"] - metrics["overlap_seconds"]) < 0.01
+    [rlm_metrics_path] = (tmp_path / "out").glob("deeprepo_*_metrics.json")
+    assert json.loads(rlm_metrics_path.read_text())["elapsed_seconds"] >= 0.1
+
+
+def test_repl_timeout_still_interrupts_code_under_compare(tmp_path):
+    def _looping_analysis(*, codebase_path, data, **kwargs):
+        engine = RLMEngine(
+            root_client=MagicMock(), sub_client=MagicMock(), usage=TokenUsage(), verbose=False
+        )
+        namespace = engine._build_namespace(data["codebase"], "", {}, {"content": "", "ready": False})
+        output = engine._execute_code("while True:\n    pass", namespace)
+        return {"analysis": output, "turns": 1, "usage": TokenUsage(), "status": "completed"}
+
+    with patch("deeprepo.domains.get_domain", return_value=_domain([])), patch(
+        "deeprepo.rlm_scaffold.run_analysis", new=_looping_analysis
+    ), patch("deeprepo.baseline.run_baseline", new=lambda **kwargs: _baseline_result()), patch(
+        "deeprepo.rlm_scaffold.EXEC_TIMEOUT_SECONDS", 1
+    ):
+        cmd_compare(_args(tmp_path))
+
+    [report] = (tmp_path / "out").glob("deeprepo_*.md")
+    assert "Code execution timed out after 1 seconds" in report.read_text()
@@ -0,0 +1,118 @@
+"""Tests for the adaptive sub-LLM concurrency limiter."""
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from deeprepo.concurrency import AdaptiveConcurrencyLimiter
+from deeprepo.utils import async_retry_with_backoff
+
+
+async def _run_tasks(limiter: AdaptiveConcurrencyLimiter, count: int, delay: float = 0.005) -> int:
+    active = 0
+    peak = 0
+
+    async def _task():
+        nonlocal active, peak
+        async with limiter:
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(delay)
+            active -= 1
+
+    await asyncio.gather(*(_task() for _ in range(count)))
+    return peak
+
+
+def test_limit_grows_additively_on_healthy_latency():
+    limiter = AdaptiveConcurrencyLimiter(initial=2, max_limit=4)
+
+    for _ in range(2):
+        limiter.record_success(1.0)
+    assert limiter.limit == 2  # +1/limit per success: 2.5, 2.9
+    limiter.record_success(1.0)
+    assert limiter.limit == 3
+    assert limiter.increases == 1
+
+    for _ in range(20):
+        limiter.record_success(1.0)
+    assert limiter.limit == 4  # capped at max_limit
+
+
+def test_slow_responses_hold_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial=2, latency_tolerance=2.0)
+    limiter.record_success(1.0)
+    before = limiter._limit
+
+    limiter.record_success(10.0)
+
+    assert limiter._limit == before
+
+
+def test_overload_halves_once_per_cooldown():
+    limiter = AdaptiveConcurrencyLimiter(initial=16)
+
+    limiter.record_overload()
+    limiter.record_overload()  # burst from the same window of in-flight calls
+    assert limiter.limit == 8
+    assert limiter.decreases == 1
+
+    limiter._last_decrease -= 60
+    limiter.record_overload()
+    assert limiter.limit == 4
+
+
+def test_limit_never_drops_below_min():
+    limiter = AdaptiveConcurrencyLimiter(initial=2, min_limit=2)
+    limiter.record_overload()
+    assert limiter.limit == 2
+
+
+def test_limiter_caps_in_flight_and_persists_across_event_loops():
+    limiter = AdaptiveConcurrencyLimiter(initial=3)
+
+    assert asyncio.run(_run_tasks(limiter, 10)) == 3
+
+    limiter.record_overload()
+    assert asyncio.run(_run_tasks(limiter, 10)) == 1
+    assert limiter.in_flight == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = AdaptiveConcurrencyLimiter(initial=1)
+
+    async def _run():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+        limiter.release()
+
+    asyncio.run(_run())
+    assert limiter.in_flight == 0
+
+
+def test_async_retry_reports_each_retryable_failure():
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+    seen = []
+    attempts = 0
+
+    async def _flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise openai.APITimeoutError(request=request)
+        return "ok"
+
+    result = asyncio.run(
+        async_retry_with_backoff(_flaky, base_delay=0, on_error=seen.append)
+    )
+
+    assert result == "ok"
+    assert len(seen) == 2
@@ -154,6 +154,7 @@ def test_gitignore_contents(tmp_path: Path) -> None:
 
     gitignore = (project_dir / ".deeprepo" / ".gitignore").read_text(encoding="utf-8")
     assert ".state.json" in gitignore
+    assert "findings.json" in gitignore
     assert "modules/" in gitignore
 
 
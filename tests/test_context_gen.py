@@ -7,6 +7,7 @@ import pytest
 
 from deeprepo.config_manager import ConfigManager, ProjectConfig, ProjectState
 from deeprepo.context_generator import ContextGenerator
+from deeprepo.tokens import HEURISTIC, use_tokenizer
 
 
 @pytest.fixture
@@ -191,7 +192,14 @@ def test_parse_sections() -> None:
     assert "bar content" in sections["Bar"]
 
 
-def test_estimate_tokens() -> None:
+@pytest.fixture
+def heuristic_tokenizer():
+    use_tokenizer(HEURISTIC)
+    yield
+    use_tokenizer(None)
+
+
+def test_estimate_tokens(heuristic_tokenizer) -> None:
     config = ProjectConfig()
     gen = ContextGenerator("/tmp/fake", config)
     assert gen._estimate_tokens("a" * 400) == 100
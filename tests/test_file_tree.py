@@ -0,0 +1,110 @@
+"""Tests for the trie-based file trees and the budgeted prompt tree."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from deeprepo.codebase_loader import load_codebase
+from deeprepo.domains import get_domain
+from deeprepo.file_tree import build_trees
+from deeprepo.llm_clients import TokenUsage
+from deeprepo.rlm_scaffold import RLMEngine
+from deeprepo.tokens import HEURISTIC, count_tokens, use_tokenizer
+
+
+@pytest.fixture(autouse=True)
+def heuristic_tokenizer():
+    use_tokenizer(HEURISTIC)
+    yield
+    use_tokenizer(None)
+
+
+def _big_repo_paths() -> list[str]:
+    paths = ["README.md", "setup.py"]
+    for pkg in range(120):
+        for i in range(40):
+            ext = (".py", ".md", ".json")[i % 3]
+            paths.append(f"pkg{pkg:03d}/mod{i % 4}/file{i}{ext}")
+    return paths
+
+
+def test_small_trees_list_every_file_in_path_order():
+    paths = ["src/b/c.py", "a-b.py", "src/a.py", "README.md", "src/b/d.md", "docs/x.md"]
+
+    full, prompt = build_trees("repo", paths)
+    assert full == (
+        "repo/\n"
+        "  README.md\n"
+        "  a-b.py\n"
+        "  docs/\n"
+        "    x.md\n"
+        "  src/\n"
+        "    a.py\n"
+        "    b/\n"
+        "      c.py\n"
+        "      d.md"
+    )
+    assert prompt == full
+
+
+def test_large_trees_are_collapsed_to_fit_the_budget():
+    paths = _big_repo_paths()
+
+    full, prompt = build_trees("big", paths, max_tokens=1500)
+    assert len(full.splitlines()) == 1 + len(paths) + 120 * 5
+    assert count_tokens(prompt) <= 1500
+    lines = prompt.splitlines()
+    # Breadth-first: every top-level entry is shown before nested ones are expanded.
+    assert lines[:4] == ["big/", "  README.md", "  pkg000/", "    mod0/ (10 files: 4 .py, 3 .md, 3 .json)"]
+    assert "  pkg049/ (40 files: 14 .py, 13 .md, 13 .json)" in lines
+    assert lines[-2:] == [
+        "  setup.py",
+        "  ... 70 more directories (2,800 files: 980 .py, 910 .md, 910 .json)",
+    ]
+
+    # Directories with too many entries list a few and summarize the rest.
+    _, wide_prompt = build_trees("wide", [f"f{i}.py" for i in range(500)], max_tokens=300)
+    assert wide_prompt.endswith("  ... 475 more files: 475 .py")
+    assert count_tokens(wide_prompt) <= 300
+
+    # A budget too small for any listing still describes the whole tree.
+    assert build_trees("big", paths, max_tokens=10)[1] == (
+        "big/ (4,802 files: 1,681 .py, 1,561 .md, 1,560 .json)"
+    )
+
+
+def test_loader_returns_budgeted_prompt_tree_and_full_repl_tree(tmp_path):
+    repo = tmp_path / "repo"
+    for i in range(60):
+        path = repo / "src" / f"module_{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"x = {i}\n")
+    (repo / "main.py").write_text("print('hi')\n")
+
+    data = load_codebase(str(repo), tree_tokens=40)
+    assert "module_59.py" in data["file_tree"]
+    assert data["prompt_tree"] == (
+        "repo/\n  main.py\n  src/\n    module_0.py\n    module_1.py\n    ... 58 more files: 58 .py"
+    )
+    # A different budget is a different snapshot setting.
+    assert load_codebase(str(repo))["prompt_tree"] == data["file_tree"]
+    assert load_codebase(str(repo), tree_tokens=40) == data
+
+    engine = RLMEngine(root_client=MagicMock(), sub_client=MagicMock(), usage=TokenUsage(), verbose=False)
+    run = engine._start_run(data, get_domain("code"))
+    assert "... 58 more files: 58 .py" in run.messages[0]["content"]
+    assert "module_59.py" not in run.messages[0]["content"]
+    assert run.namespace["file_tree"] == data["file_tree"]
+
+
+def test_directories_too_wide_to_list_show_their_largest_entries():
+    # 60 top-level directories: listing them all takes more than the budget.
+    paths = [f"dir{d:02d}/file{i}.py" for d in range(60) for i in range(d + 1)]
+
+    _, prompt = build_trees("wide", paths, max_tokens=120)
+    assert count_tokens(prompt) <= 120
+    assert prompt.splitlines() == [
+        "wide/",
+        *(f"  dir{d}/ ({d + 1} files: {d + 1} .py)" for d in range(53, 60)),
+        "  ... 53 more directories (1,431 files: 1,431 .py)",
+    ]
@@ -0,0 +1,128 @@
+"""Tests for git-backed change detection."""
+
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+from deeprepo.cli_commands import compute_file_hashes, get_changed_files, scan_file_hashes
+from deeprepo.config_manager import ProjectState
+from deeprepo.git_changes import detect_changes, git_snapshot
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    src = Path(__file__).parent / "fixtures" / "sample_project"
+    dst = tmp_path / "project"
+    shutil.copytree(src, dst, ignore=shutil.ignore_patterns("__pycache__"))
+    _git(dst, "init", "-q")
+    _git(dst, "add", "-A")
+    _git(dst, "commit", "-q", "-m", "initial")
+    return dst
+
+
+def _snapshot_state(repo: Path) -> ProjectState:
+    head, dirty = git_snapshot(repo)
+    return ProjectState(
+        file_hashes=compute_file_hashes(repo),
+        last_commit=head,
+        dirty_files=dirty,
+    )
+
+
+def test_detect_changes_classifies_git_candidates(repo: Path) -> None:
+    state = _snapshot_state(repo)
+
+    (repo / "src" / "main.py").write_text("# modified\n", encoding="utf-8")
+    (repo / "src" / "utils.py").unlink()
+    (repo / "new_file.py").write_text("# new\n", encoding="utf-8")
+    (repo / "notes.bin").write_text("not tracked by deeprepo\n", encoding="utf-8")
+
+    changes = get_changed_files(repo, state)
+
+    assert changes["backend"] == "git"
+    assert changes["modified"] == ["src/main.py"]
+    assert changes["added"] == ["new_file.py"]
+    assert changes["deleted"] == ["src/utils.py"]
+    assert changes["current_hashes"] == compute_file_hashes(repo)
+
+
+def test_detect_changes_sees_commits_since_snapshot(repo: Path) -> None:
+    state = _snapshot_state(repo)
+
+    (repo / "src" / "main.py").write_text("# committed change\n", encoding="utf-8")
+    _git(repo, "commit", "-q", "-am", "change")
+
+    changes = detect_changes(repo, state)
+
+    assert changes["modified"] == ["src/main.py"]
+
+
+def test_detect_changes_catches_revert_of_file_dirty_at_snapshot(repo: Path) -> None:
+    original = (repo / "src" / "main.py").read_text(encoding="utf-8")
+    (repo / "src" / "main.py").write_text("# dirty at snapshot\n", encoding="utf-8")
+    state = _snapshot_state(repo)
+    assert state.dirty_files == ["src/main.py"]
+
+    (repo / "src" / "main.py").write_text(original, encoding="utf-8")
+
+    changes = detect_changes(repo, state)
+
+    assert changes["modified"] == ["src/main.py"]
+
+
+def test_detect_changes_falls_back_outside_git(tmp_path: Path) -> None:
+    (tmp_path / "a.py").write_text("x = 1\n", encoding="utf-8")
+    state = ProjectState(file_hashes=compute_file_hashes(tmp_path), last_commit="deadbeef")
+
+    assert git_snapshot(tmp_path) is None
+    assert detect_changes(tmp_path, state) is None
+    assert get_changed_files(tmp_path, state)["backend"] == "scan"
+
+
+def test_detect_changes_falls_back_for_unknown_commit(repo: Path) -> None:
+    state = _snapshot_state(repo)
+    state.last_commit = "0" * 40
+
+    assert detect_changes(repo, state) is None
+
+
+def test_detect_changes_rechecks_files_git_ignores(repo: Path) -> None:
+    past_ns = time.time_ns() - 3600 * 10**9  # Outside the racy window
+    (repo / ".gitignore").write_text("generated/\nlocal_settings.py\n", encoding="utf-8")
+    (repo / "generated").mkdir()
+    for path in (repo / "generated" / "schema.py", repo / "local_settings.py"):
+        path.write_text("x = 1\n", encoding="utf-8")
+        os.utime(path, ns=(past_ns, past_ns))
+    _git(repo, "add", ".gitignore")
+    _git(repo, "commit", "-q", "-m", "ignore generated code")
+    head, dirty = git_snapshot(repo)
+    hashes, stats = scan_file_hashes(repo)
+    state = ProjectState(file_hashes=hashes, file_stats=stats, last_commit=head, dirty_files=dirty)
+    assert "generated/schema.py" in hashes
+
+    assert detect_changes(repo, state)["modified"] == []
+
+    (repo / "generated" / "schema.py").write_text("x = 2\n", encoding="utf-8")
+    (repo / "generated" / "models.py").write_text("y = 1\n", encoding="utf-8")
+    (repo / "local_settings.py").unlink()
+
+    changes = detect_changes(repo, state)
+    assert changes["modified"] == ["generated/schema.py"]
+    assert changes["added"] == ["generated/models.py"]
+    assert changes["deleted"] == ["local_settings.py"]
+    assert changes["current_hashes"] == compute_file_hashes(repo)
@@ -0,0 +1,129 @@
+"""Tests for REPL history compaction between root model turns."""
+
+from copy import deepcopy
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from deeprepo.domains.base import DomainConfig
+from deeprepo.llm_clients import TokenUsage
+from deeprepo.rlm_scaffold import COMPACTED_MARKER, RLMEngine
+
+
+def _domain() -> DomainConfig:
+    return DomainConfig(
+        name="code",
+        label="Codebase Analysis",
+        description="test",
+        loader=lambda _path: {
+            "codebase": {"a.py": "print('hi')"},
+            "file_tree": "a.py",
+            "metadata": {"total_files": 1, "total_chars": 10},
+        },
+        format_metadata=lambda _metadata: "meta",
+        root_system_prompt="system",
+        sub_system_prompt="sub",
+        user_prompt_template="{metadata_str}\n{file_tree}",
+        baseline_system_prompt="baseline",
+        data_variable_name="codebase",
+    )
+
+
+def _tool_response(turn: int, code: str):
+    return SimpleNamespace(
+        content=[
+            SimpleNamespace(
+                type="tool_use",
+                id=f"toolu_{turn}",
+                name="execute_python",
+                input={"code": code},
+            ),
+        ]
+    )
+
+
+def _tool_results(messages: list[dict]) -> list[str]:
+    return [
+        block["content"]
+        for message in messages
+        if isinstance(message.get("content"), list)
+        for block in message["content"]
+        if isinstance(block, dict) and block.get("type") == "tool_result"
+    ]
+
+
+def _run(responses, **engine_kwargs):
+    root = MagicMock()
+    captured = []
+
+    def _complete(**kwargs):
+        captured.append(deepcopy(kwargs["messages"]))
+        return responses[len(captured) - 1]
+
+    root.complete.side_effect = _complete
+    engine = RLMEngine(
+        root_client=root,
+        sub_client=MagicMock(),
+        usage=TokenUsage(),
+        max_turns=len(responses),
+        verbose=False,
+        **engine_kwargs,
+    )
+    result = engine.analyze("/unused", _domain())
+    return result, captured
+
+
+def test_old_outputs_become_digests_that_point_at_repl_history():
+    big = "print('\\n'.join(f'line {i} ' + 'x' * 60 for i in range(100)))"
+    responses = [_tool_response(turn, big) for turn in (1, 2, 3)] + [
+        _tool_response(4, "print(len(repl_history[1]), repl_history[1][:6])"),
+        _tool_response(5, "set_answer('done')"),
+    ]
+
+    result, captured = _run(responses, compact_threshold_tokens=3_000, compact_keep_recent_turns=2)
+
+    assert result["analysis"] == "done"
+    # Turn 4 sees turns 1-3; the transcript is over the threshold, so turn 1
+    # is compacted while the two most recent outputs stay verbatim.
+    turn4 = _tool_results(captured[3])
+    assert turn4[0].startswith(f"{COMPACTED_MARKER} 1:")
+    assert "repl_history[1]" in turn4[0]
+    assert "line 0" in turn4[0]
+    assert not turn4[1].startswith(COMPACTED_MARKER)
+    assert not turn4[2].startswith(COMPACTED_MARKER)
+
+    # The full output is still reachable from code.
+    full = result["trajectory"][0]["repl_output"]
+    assert result["trajectory"][3]["repl_output"].startswith(f"{len(full)} line 0")
+    # Untouched: the trajectory keeps every output in full.
+    assert "line 99" in result["trajectory"][0]["repl_output"]
+
+
+def test_compaction_is_skipped_below_threshold_and_when_disabled():
+    big = "print('y' * 5000)"
+    responses = [_tool_response(turn, big) for turn in (1, 2, 3, 4)] + [
+        _tool_response(5, "set_answer('done')"),
+    ]
+
+    _, captured = _run(responses, compact_threshold_tokens=None)
+    assert not any(r.startswith(COMPACTED_MARKER) for r in _tool_results(captured[-1]))
+
+    _, captured = _run(responses, compact_threshold_tokens=1_000_000)
+    assert not any(r.startswith(COMPACTED_MARKER) for r in _tool_results(captured[-1]))
+
+
+def test_compacted_prefix_is_stable_until_the_next_compaction():
+    big = "print('z' * 3000)"
+    responses = [_tool_response(turn, big) for turn in range(1, 6)] + [
+        _tool_response(6, "set_answer('done')"),
+    ]
+
+    _, captured = _run(responses, compact_threshold_tokens=2_000, compact_keep_recent_turns=1)
+
+    # Each compaction digests everything but the latest output, so once an
+    # output is compacted it is never rewritten again.
+    last = _tool_results(captured[-1])
+    assert [r.startswith(COMPACTED_MARKER) for r in last] == [True, True, True, True, False]
+    for earlier, later in zip(captured, captured[1:]):
+        for before, after in zip(_tool_results(earlier), _tool_results(later)):
+            if before.startswith(COMPACTED_MARKER):
+                assert after == before
@@ -0,0 +1,136 @@
+"""Tests for the loader's precomputed import graph."""
+
+from unittest.mock import MagicMock
+
+from deeprepo import import_graph
+from deeprepo.codebase_loader import format_metadata_for_prompt, load_codebase
+from deeprepo.import_graph import (
+    ImportGraph,
+    build_import_graph,
+    extract_import_specs,
+    make_graph_helpers,
+    strongly_connected_components,
+)
+from deeprepo.llm_clients import TokenUsage
+from deeprepo.rlm_scaffold import RLMEngine
+
+
+def test_go_imports_resolve_to_package_files():
+    codebase = {
+        "cmd/server/main.go": (
+            'package main\n\nimport (\n    "fmt"\n    db "example.com/app/internal/db"\n)\n'
+            'import "example.com/app/internal/api"\n'
+        ),
+        "internal/db/db.go": "package db\n",
+        "internal/db/pool.go": "package db\n",
+        "internal/db/db_test.go": "package db\n",
+        "internal/api/api.go": 'package api\n\nimport "github.com/other/lib/db"\n',
+    }
+
+    graph = build_import_graph(codebase, go_module="example.com/app")
+    assert graph["cmd/server/main.go"] == [
+        "internal/api/api.go", "internal/db/db.go", "internal/db/pool.go",
+    ]
+    assert graph["internal/api/api.go"] == []
+
+    # Without go.mod, fall back to matching a path suffix (never a bare stdlib name).
+    guessed = build_import_graph(codebase)
+    assert guessed["cmd/server/main.go"] == graph["cmd/server/main.go"]
+    assert guessed["internal/api/api.go"] == []
+
+
+def test_rust_mod_and_use_paths_resolve_to_module_files():
+    codebase = {
+        "src/lib.rs": "pub mod config;\nmod net;\nuse crate::net::{client::Client, server as srv};\n",
+        "src/config.rs": "use serde::Deserialize;\nuse super::net::client;\n",
+        "src/net/mod.rs": "pub mod client;\npub mod server;\nuse self::client::*;\n",
+        "src/net/client.rs": "use crate::config::Config;\n",
+        "src/net/server.rs": "use super::super::config;\n",
+    }
+
+    assert extract_import_specs("src/lib.rs", codebase["src/lib.rs"]) == [
+        "mod:config", "mod:net", "use:crate::net::client::Client", "use:crate::net::server",
+    ]
+    graph = build_import_graph(codebase)
+    assert graph == {
+        "src/lib.rs": ["src/config.rs", "src/net/client.rs", "src/net/mod.rs", "src/net/server.rs"],
+        "src/config.rs": ["src/net/client.rs"],
+        "src/net/mod.rs": ["src/net/client.rs", "src/net/server.rs"],
+        "src/net/client.rs": ["src/config.rs"],
+        "src/net/server.rs": ["src/config.rs"],
+    }
+
+
+def test_cycles_and_fan_helpers():
+    graph = {
+        "a.py": ["b.py"],
+        "b.py": ["c.py"],
+        "c.py": ["a.py", "d.py"],
+        "d.py": [],
+        "e.py": ["f.py", "d.py"],
+        "f.py": ["e.py"],
+    }
+
+    assert strongly_connected_components(graph) == [["a.py", "b.py", "c.py"], ["e.py", "f.py"]]
+    helpers = make_graph_helpers(graph)
+    assert helpers["fan_in"]("d.py") == ["c.py", "e.py"]
+    assert helpers["fan_out"]("e.py") == ["f.py", "d.py"]
+    assert helpers["fan_in"]("missing.py") == []
+    assert make_graph_helpers(None)["import_cycles"]() == []
+
+
+def test_deep_chains_do_not_hit_the_recursion_limit():
+    graph = {f"m{i}.py": [f"m{i + 1}.py"] for i in range(5000)}
+    graph["m5000.py"] = ["m0.py"]
+    assert len(strongly_connected_components(graph)[0]) == 5001
+
+
+def test_load_codebase_exposes_graph_and_reuses_cached_specs(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    (repo / "pkg").mkdir(parents=True)
+    (repo / "pkg" / "__init__.py").write_text("")
+    (repo / "pkg" / "core.py").write_text("from .util import helper\n")
+    (repo / "pkg" / "util.py").write_text("from pkg import core\n")
+    (repo / "README.md").write_text("# Demo\n")
+
+    metadata = load_codebase(str(repo))["metadata"]
+    graph = metadata["import_graph"]
+    assert isinstance(graph, ImportGraph)
+    assert graph == {
+        "pkg/__init__.py": [],
+        "pkg/core.py": ["pkg/util.py"],
+        "pkg/util.py": ["pkg/core.py"],
+    }
+    assert repr(graph).startswith("<import graph: 3 files, 2 edges")
+    prompt = format_metadata_for_prompt(metadata)
+    assert "Most imported files (fan-in):\n  pkg/core.py: 1\n  pkg/util.py: 1" in prompt
+    assert "Import cycles: 1 (largest: 2 files)" in prompt
+
+    # Unchanged files come from the cache; only the edited one is re-parsed.
+    extracted = []
+    original = import_graph.extract_import_specs
+
+    def _tracking(path, content):
+        extracted.append(path)
+        return original(path, content)
+
+    monkeypatch.setattr(import_graph, "extract_import_specs", _tracking)
+    (repo / "pkg" / "util.py").write_text("def helper():\n    pass\n")
+    graph = load_codebase(str(repo))["metadata"]["import_graph"]
+    assert extracted == ["pkg/util.py"]
+    assert graph["pkg/util.py"] == [] and graph["pkg/core.py"] == ["pkg/util.py"]
+
+
+def test_engine_namespace_exposes_graph_helpers():
+    engine = RLMEngine(root_client=MagicMock(), sub_client=MagicMock(), usage=TokenUsage(), verbose=False)
+    metadata = {"import_graph": ImportGraph({"a.py": ["b.py"], "b.py": ["a.py"]})}
+    namespace = engine._build_namespace({"a.py": "", "b.py": ""}, "", metadata, {"content": "", "ready": False})
+
+    output = engine._execute_code(
+        "print(fan_in('a.py'), fan_out('a.py'), import_cycles())\nprint(metadata)", namespace
+    )
+    assert output == (
+        "['b.py'] ['b.py'] [['a.py', 'b.py']]\n"
+        "{'import_graph': <import graph: 2 files, 2 edges; use fan_in(path), fan_out(path), "
+        "import_cycles()>}\n"
+    )
@@ -0,0 +1,47 @@
+"""Tests for incremental refresh helpers."""
+
+from deeprepo.import_graph import build_import_graph
+from deeprepo.incremental import find_neighbours, import_edges, merge_sections
+
+
+def test_import_edges_resolve_python_and_js():
+    codebase = {
+        "pkg/__init__.py": "",
+        "pkg/core.py": "import os\nfrom .util import helper\n",
+        "pkg/util.py": "def helper():\n    pass\n",
+        "pkg/sub/deep.py": "from .. import core\nfrom pkg.util import helper as h\n",
+        "web/app.ts": "import { x } from './lib';\nconst y = require('../web/other');\n",
+        "web/lib/index.ts": "export const x = 1;\n",
+        "web/other.js": "module.exports = {};\n",
+    }
+
+    edges = import_edges(build_import_graph(codebase))
+
+    assert edges["pkg/core.py"] == {"pkg/util.py"}
+    assert edges["pkg/sub/deep.py"] == {"pkg/core.py", "pkg/util.py"}
+    assert edges["web/app.ts"] == {"web/lib/index.ts", "web/other.js"}
+
+
+def test_find_neighbours_includes_importers_and_imports():
+    edges = {
+        "a.py": {"b.py"},
+        "b.py": {"c.py"},
+        "c.py": set(),
+        "d.py": {"a.py"},
+    }
+
+    assert find_neighbours(edges, ["b.py"]) == {"a.py", "c.py"}
+    assert find_neighbours(edges, ["a.py", "b.py"]) == {"c.py", "d.py"}
+
+
+def test_merge_sections_replaces_in_place_and_appends_new():
+    document = "Intro\n\n## Identity\nOld id\n\n## Architecture\nOld arch\n"
+    patch = "Some chatter\n## Architecture\nNew arch\n## Tech Debt & Known Issues\nNone\n"
+
+    merged, updated = merge_sections(document, patch)
+
+    assert merged == (
+        "Intro\n\n## Identity\nOld id\n\n## Architecture\nNew arch\n\n"
+        "## Tech Debt & Known Issues\nNone\n"
+    )
+    assert updated == ["Architecture", "Tech Debt & Known Issues"]
@@ -0,0 +1,172 @@
+"""Tests for concurrent execution of independent execute_python blocks."""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from deeprepo.domains.base import DomainConfig
+from deeprepo.llm_clients import TokenUsage
+from deeprepo.repl_deps import analyze_block, plan_waves
+from deeprepo.rlm_scaffold import (
+    REPL_HELPER_NAMES,
+    REPL_MODULE_NAMES,
+    SAFE_BUILTIN_NAMES,
+    AsyncRLMEngine,
+    RLMEngine,
+)
+
+SAFE = SAFE_BUILTIN_NAMES | REPL_HELPER_NAMES
+
+
+def _access(code: str):
+    return analyze_block(code, SAFE, REPL_MODULE_NAMES)
+
+
+def test_analyze_block_tracks_module_level_names_only():
+    access = _access(
+        "auth = [f for f in codebase if 'auth' in f]\n"
+        "notes = llm_batch([codebase[f] for f in auth])\n"
+        "for path in auth:\n"
+        "    summary[path] = re.sub('x', '', path)\n"
+    )
+
+    assert access.writes == {"auth", "notes", "path", "summary"}
+    assert {"codebase", "auth", "summary"} <= access.reads
+    assert "f" not in access.writes and "re" not in access.writes
+    assert not access.barrier
+
+
+def test_mutating_methods_and_unknown_calls_are_conservative():
+    assert _access("results.append(1)").writes == {"results"}
+    assert _access("x = codebase.get('a', '').splitlines()").writes == {"x"}
+    assert _access("helper(codebase)").barrier  # defined in an earlier turn
+    assert not _access("def helper(x):\n    return x\nhelper(1)").barrier
+    assert _access("def bump():\n    global n\n    n = 1").writes == {"bump", "n"}
+    assert _access("def broken(:").barrier
+    assert _access("set_answer('done')").sets_answer
+    assert _access("answer['ready'] = True").sets_answer
+
+
+def test_plan_waves_keeps_program_order():
+    codes = [
+        "a = llm_batch(['x'])",
+        "b = llm_batch(['y'])",
+        "print(a, b)",
+        "c = 1",
+        "set_answer('done')",
+        "d = 2",
+    ]
+
+    assert plan_waves([_access(code) for code in codes]) == [[0, 1], [2, 3, 4], [5]]
+
+
+def _domain() -> DomainConfig:
+    return DomainConfig(
+        name="test",
+        label="Test",
+        description="test",
+        loader=lambda _path: {
+            "codebase": {"a.py": "A", "b.py": "B"},
+            "file_tree": "a.py\nb.py",
+            "metadata": {"total_files": 2, "total_chars": 2},
+        },
+        format_metadata=lambda _metadata: "meta",
+        root_system_prompt="system",
+        sub_system_prompt="sub",
+        user_prompt_template="{metadata_str}\n{file_tree}",
+        baseline_system_prompt="baseline",
+        data_variable_name="codebase",
+    )
+
+
+def _multi_tool_response(*codes: str):
+    return SimpleNamespace(
+        content=[
+            SimpleNamespace(type="tool_use", id=f"toolu_{i}", name="execute_python", input={"code": code})
+            for i, code in enumerate(codes)
+        ]
+    )
+
+
+RESPONSES = [
+    _multi_tool_response(
+        "a = llm_batch([codebase['a.py']])\nprint('a', a)",
+        "b = llm_batch([codebase['b.py']])\nprint('b', b)",
+        "set_answer(a[0] + b[0])",
+        "print('never runs')",
+    ),
+]
+
+
+def test_independent_blocks_run_concurrently_and_share_sub_calls():
+    # Both batches must be in flight at once to get past the barrier.
+    barrier = threading.Barrier(2, timeout=5)
+
+    def _batch(prompts, system):
+        barrier.wait()
+        return [p.lower() for p in prompts]
+
+    root = MagicMock()
+    root.complete.side_effect = list(RESPONSES)
+    sub = MagicMock()
+    sub.batch.side_effect = _batch
+
+    engine = RLMEngine(
+        root_client=root,
+        sub_client=sub,
+        usage=TokenUsage(),
+        max_turns=3,
+        verbose=False,
+        parallel_tool_calls=True,
+    )
+    result = engine.analyze("/unused", _domain())
+
+    assert result["analysis"] == "ab"
+    outputs = result["trajectory"][0]["repl_output"]
+    assert outputs.index("a ['a']") < outputs.index("b ['b']")
+    assert "never runs" not in outputs
+
+
+def test_async_engine_runs_waves_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    async def _abatch(prompts, system):
+        await asyncio.to_thread(barrier.wait)
+        return [p.lower() for p in prompts]
+
+    root = MagicMock()
+    root.complete = AsyncMock(side_effect=list(RESPONSES))
+    sub = MagicMock()
+    sub.abatch.side_effect = _abatch
+
+    engine = AsyncRLMEngine(
+        root_client=root,
+        sub_client=sub,
+        usage=TokenUsage(),
+        max_turns=3,
+        verbose=False,
+        parallel_tool_calls=True,
+    )
+    result = asyncio.run(engine.analyze("/unused", _domain()))
+
+    assert result["analysis"] == "ab"
+
+
+def test_blocks_stay_sequential_by_default():
+    order = []
+
+    def _batch(prompts, system):
+        order.append(prompts[0])
+        return prompts
+
+    root = MagicMock()
+    root.complete.side_effect = list(RESPONSES)
+    sub = MagicMock()
+    sub.batch.side_effect = _batch
+
+    engine = RLMEngine(root_client=root, sub_client=sub, usage=TokenUsage(), max_turns=3, verbose=False)
+    result = engine.analyze("/unused", _domain())
+
+    assert result["analysis"] == "AB"
+    assert order == ["A", "B"]
@@ -0,0 +1,94 @@
+"""Tests for Anthropic prompt caching on the root model conversation."""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from deeprepo.llm_clients import RootModelClient, TokenUsage
+
+TOOLS = [
+    {"name": "first", "description": "a", "input_schema": {"type": "object"}},
+    {"name": "execute_python", "description": "run code", "input_schema": {"type": "object"}},
+]
+
+
+def _client(usage: TokenUsage, **usage_fields) -> RootModelClient:
+    client = RootModelClient.__new__(RootModelClient)
+    client.client = MagicMock()
+    client.model = "claude-sonnet-4-6"
+    client.usage = usage
+    client.client.messages.create.return_value = SimpleNamespace(
+        usage=SimpleNamespace(input_tokens=100, output_tokens=10, **usage_fields),
+        content=[SimpleNamespace(type="text", text="ok")],
+    )
+    return client
+
+
+def test_cache_prompt_marks_tools_system_and_latest_message():
+    client = _client(TokenUsage())
+    messages = [
+        {"role": "user", "content": "first prompt"},
+        {"role": "assistant", "content": [SimpleNamespace(type="tool_use")]},
+        {
+            "role": "user",
+            "content": [
+                {"type": "tool_result", "tool_use_id": "t1", "content": "out"},
+                {"type": "text", "text": "[Turn 2/20]"},
+            ],
+        },
+    ]
+
+    client.complete(messages=messages, system="sys", tools=TOOLS, cache_prompt=True)
+
+    kwargs = client.client.messages.create.call_args.kwargs
+    assert kwargs["system"] == [
+        {"type": "text", "text": "sys", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert "cache_control" not in kwargs["tools"][0]
+    assert kwargs["tools"][1]["cache_control"] == {"type": "ephemeral"}
+    assert kwargs["messages"][0] == {"role": "user", "content": "first prompt"}
+    assert kwargs["messages"][2]["content"][1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in kwargs["messages"][2]["content"][0]
+
+    # The engine's own history is never modified.
+    assert "cache_control" not in messages[2]["content"][1]
+    assert "cache_control" not in TOOLS[1]
+
+
+def test_string_content_becomes_cacheable_text_block():
+    client = _client(TokenUsage())
+
+    client.complete(messages=[{"role": "user", "content": "hello"}], cache_prompt=True)
+
+    kwargs = client.client.messages.create.call_args.kwargs
+    assert kwargs["messages"][0]["content"] == [
+        {"type": "text", "text": "hello", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert "system" not in kwargs
+
+
+def test_without_cache_prompt_request_is_unchanged():
+    client = _client(TokenUsage())
+
+    client.complete(messages=[{"role": "user", "content": "hello"}], system="sys", tools=TOOLS)
+
+    kwargs = client.client.messages.create.call_args.kwargs
+    assert kwargs["system"] == "sys"
+    assert kwargs["messages"] == [{"role": "user", "content": "hello"}]
+    assert kwargs["tools"] is TOOLS
+
+
+def test_cache_tokens_are_recorded_and_priced():
+    usage = TokenUsage()
+    usage.set_root_pricing("claude-sonnet-4-6")
+    client = _client(usage, cache_read_input_tokens=1_000_000, cache_creation_input_tokens=100_000)
+
+    client.complete(messages=[{"role": "user", "content": "hi"}], cache_prompt=True)
+
+    assert usage.root_cache_read_tokens == 1_000_000
+    assert usage.root_cache_write_tokens == 100_000
+    # $3/M input: 100 fresh + 1M reads at 0.1x + 100k writes at 1.25x; $15/M output.
+    expected = (100 + 100_000 + 125_000) / 1_000_000 * 3.0 + 10 / 1_000_000 * 15.0
+    assert usage.root_cost == pytest.approx(expected)
+    assert "cache 1,000,000 read / 100,000 written" in usage.summary()
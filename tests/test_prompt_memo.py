@@ -0,0 +1,163 @@
+"""Tests for per-run memoization and coalescing of sub-LLM prompts."""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from deeprepo.llm_clients import SubModelClient, TokenUsage
+from deeprepo.memo import FOLLOW, HIT, LEAD, PromptMemo, memo_key, normalize_prompt
+
+
+def _fake_response(content: str):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=11, completion_tokens=7),
+    )
+
+
+def _build_client(fake_create):
+    create_mock = AsyncMock(side_effect=fake_create)
+    async_client = MagicMock()
+    async_client.chat.completions.create = create_mock
+
+    usage = TokenUsage()
+    with patch.dict(os.environ, {"OPENROUTER_API_KEY": "test-key"}, clear=False), patch(
+        "deeprepo.llm_clients.openai.OpenAI", return_value=MagicMock()
+    ), patch("deeprepo.llm_clients.openai.AsyncOpenAI", return_value=async_client):
+        client = SubModelClient(usage=usage, use_cache=False)
+
+    return client, usage, create_mock
+
+
+async def _echo(*, model, messages, max_tokens, temperature):
+    await asyncio.sleep(0.01)
+    return _fake_response(f"ok:{messages[-1]['content'].strip()}")
+
+
+def test_normalize_prompt_ignores_insignificant_whitespace():
+    assert normalize_prompt("  Review a.py:  \r\n\n\n\ndef f():\n    pass \n") == (
+        "Review a.py:\n\ndef f():\n    pass"
+    )
+    assert memo_key("x ", "sys") == memo_key("x", "sys") != memo_key("x", "other")
+
+
+def test_prompt_memo_single_flight_and_errors_are_not_remembered():
+    memo = PromptMemo()
+    key = memo_key("p", "s")
+
+    state, leader = memo.claim(key)
+    assert state == LEAD
+    state, follower = memo.claim(key)
+    assert state == FOLLOW and follower is leader
+
+    memo.settle(key, error=ValueError("boom"))
+    with pytest.raises(ValueError):
+        follower.result()
+    assert memo.claim(key)[0] == LEAD
+
+    memo.settle(key, "[ERROR: RuntimeError: nope]")
+    assert memo.claim(key)[0] == LEAD
+    memo.settle(key, "answer")
+    assert memo.claim(key) == (HIT, "answer")
+    assert len(memo) == 1
+
+
+def test_duplicates_in_a_batch_and_across_turns_are_sent_once():
+    client, usage, create_mock = _build_client(_echo)
+
+    results = client.batch(["a", "b", "a  ", "a"], system="sys")
+
+    assert results == ["ok:a", "ok:b", "ok:a", "ok:a"]
+    assert create_mock.await_count == 2
+    assert usage.sub_coalesced == 2
+
+    # A later turn re-sending the same prompts is answered from the memo.
+    assert client.batch(["b", "a"], system="sys") == ["ok:b", "ok:a"]
+    assert client.query("a", system="sys") == "ok:a"
+    assert create_mock.await_count == 2
+    assert usage.sub_memo_hits == 3
+    assert usage.sub_cache_misses == 2
+    assert "Sub dedup: 3 memo hits, 2 coalesced, 0 cache hits, 2 misses" in usage.summary()
+
+    # A different system prompt is a different question.
+    client.batch(["a"], system="other")
+    assert create_mock.await_count == 3
+
+
+def test_concurrent_batches_coalesce_onto_one_request():
+    release = threading.Event()
+
+    async def _slow(*, model, messages, max_tokens, temperature):
+        await asyncio.to_thread(release.wait, 5)
+        return _fake_response(f"ok:{messages[-1]['content']}")
+
+    client, usage, create_mock = _build_client(_slow)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(client.batch, ["shared", "own-1"], "sys")
+        while create_mock.await_count < 2:
+            threading.Event().wait(0.01)
+        second = executor.submit(client.batch, ["shared", "own-2"], "sys")
+        while create_mock.await_count < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        assert first.result() == ["ok:shared", "ok:own-1"]
+        assert second.result() == ["ok:shared", "ok:own-2"]
+
+    assert create_mock.await_count == 3
+    assert usage.sub_coalesced == 1
+
+
+def test_failed_prompts_are_retried_on_the_next_batch():
+    calls = []
+
+    async def _flaky(*, model, messages, max_tokens, temperature):
+        calls.append(messages[-1]["content"])
+        if len(calls) == 1:
+            raise ValueError("bad request")
+        return _fake_response("ok")
+
+    client, _, _ = _build_client(_flaky)
+
+    assert client.batch(["p"], system="sys")[0].startswith("[ERROR: RuntimeError")
+    assert client.batch(["p"], system="sys") == ["ok"]
+    assert calls == ["p", "p"]
+
+
+def test_a_follower_giving_up_does_not_fail_the_other_waiters():
+    release = threading.Event()
+
+    async def _slow(*, model, messages, max_tokens, temperature):
+        await asyncio.to_thread(release.wait, 5)
+        return _fake_response(f"ok:{messages[-1]['content']}")
+
+    client, usage, create_mock = _build_client(_slow)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        leader = executor.submit(client.batch, ["p"], "sys")
+        while create_mock.await_count < 1:
+            threading.Event().wait(0.01)
+        impatient = executor.submit(client.batch, ["p"], "sys", deadline=0.2)
+        patient = executor.submit(client.query, "p", "sys")
+        assert impatient.result()[0].startswith("[ERROR: TimeoutError")
+        release.set()
+        assert leader.result() == ["ok:p"]
+        assert patient.result() == "ok:p"
+
+    assert create_mock.await_count == 1
+    assert usage.sub_coalesced == 2
+
+
+def test_followers_of_a_cancelled_request_take_over():
+    client, _, create_mock = _build_client(_echo)
+    key = memo_key("p", "sys")
+    _, orphaned = client.memo.claim(key)
+    orphaned.cancel()
+
+    assert asyncio.run(client.aquery("p", system="sys")) == "ok:p"
+    assert create_mock.await_count == 1
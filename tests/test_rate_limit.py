@@ -0,0 +1,141 @@
+"""Tests for the per-provider token-bucket rate limiter."""
+
+import asyncio
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from deeprepo.llm_clients import SubModelClient, TokenUsage
+from deeprepo.rate_limit import (
+    ProviderRateLimiter,
+    estimate_request_tokens,
+    get_rate_limiter,
+    reset_rate_limiters,
+)
+from deeprepo.tokens import HEURISTIC, use_tokenizer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_unlimited_by_default_never_waits():
+    limiter = ProviderRateLimiter("test")
+
+    delays = [limiter.reserve(10_000)[1] for _ in range(100)]
+
+    assert not limiter.enabled
+    assert delays == [0.0] * 100
+
+
+def test_requests_per_minute_spaces_out_bursts():
+    clock = _Clock()
+    limiter = ProviderRateLimiter("test", rpm=60, clock=clock)
+
+    delays = [limiter.reserve(0)[1] for _ in range(62)]
+
+    assert delays[:60] == [0.0] * 60  # a full minute's allowance up front
+    assert delays[60:] == [1.0, 2.0]  # then one request per second, queued in order
+
+    clock.now += 2.0
+    assert limiter.reserve(0)[1] == 1.0
+
+
+def test_settle_returns_unused_tokens_and_charges_overruns():
+    clock = _Clock()
+    limiter = ProviderRateLimiter("test", tpm=600, clock=clock)
+
+    reservation, delay = limiter.reserve(600)
+    assert delay == 0.0
+    assert limiter.reserve(60)[1] == 6.0  # 10 tokens/s refill
+
+    reservation.settle(300)
+    reservation.settle(0)  # settling twice is a no-op
+    assert limiter.reserve(0)[1] == 0.0
+
+    overrun, _ = limiter.reserve(10)
+    overrun.settle(610)
+    assert limiter.reserve(0)[1] == 37.0
+
+
+def test_async_acquire_waits_for_refill():
+    clock = _Clock()
+    limiter = ProviderRateLimiter("test", rpm=6000, clock=clock)
+    for _ in range(6000):
+        limiter.reserve(0)
+
+    async def _run():
+        await limiter.aacquire(0)
+
+    asyncio.run(_run())
+    assert abs(limiter.waited_seconds - 0.01) < 1e-9
+
+
+def test_get_rate_limiter_reads_environment():
+    reset_rate_limiters()
+    env = {"DEEPREPO_OPENROUTER_RPM": "120", "DEEPREPO_OPENROUTER_TPM": ""}
+    try:
+        with patch.dict(os.environ, env, clear=False):
+            limiter = get_rate_limiter("openrouter")
+        assert limiter.rpm == 120
+        assert limiter.tpm is None
+        assert get_rate_limiter("openrouter") is limiter
+        assert not get_rate_limiter("anthropic").enabled
+    finally:
+        reset_rate_limiters()
+
+
+def test_estimate_request_tokens_counts_text_and_structures():
+    messages = [{"role": "user", "content": "x" * 400}]
+
+    use_tokenizer(HEURISTIC)
+    try:
+        assert estimate_request_tokens("y" * 40, max_tokens=0) == 10
+        assert estimate_request_tokens(messages, max_tokens=50) > 100 + 50 - 1
+    finally:
+        use_tokenizer(None)
+
+
+def test_sub_client_reserves_before_calling_and_settles_actual_usage():
+    limiter = ProviderRateLimiter("openrouter", tpm=100_000, clock=_Clock())
+    response = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+        usage=SimpleNamespace(prompt_tokens=11, completion_tokens=7),
+    )
+    sync_client = MagicMock()
+    sync_client.chat.completions.create.return_value = response
+
+    with patch.dict(os.environ, {"OPENROUTER_API_KEY": "test-key"}, clear=False), patch(
+        "deeprepo.llm_clients.openai.OpenAI", return_value=sync_client
+    ), patch("deeprepo.llm_clients.openai.AsyncOpenAI", return_value=MagicMock()):
+        client = SubModelClient(usage=TokenUsage(), use_cache=False)
+
+    with patch("deeprepo.llm_clients.get_rate_limiter", return_value=limiter):
+        assert client.query("hello", system="sys", max_tokens=64) == "ok"
+
+    assert limiter._tokens.level == 100_000 - 18
+
+
+def test_requests_are_not_tokenized_while_the_limiter_is_off():
+    response = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+        usage=SimpleNamespace(prompt_tokens=11, completion_tokens=7),
+    )
+    sync_client = MagicMock()
+    sync_client.chat.completions.create.return_value = response
+
+    with patch.dict(os.environ, {"OPENROUTER_API_KEY": "test-key"}, clear=False), patch(
+        "deeprepo.llm_clients.openai.OpenAI", return_value=sync_client
+    ), patch("deeprepo.llm_clients.openai.AsyncOpenAI", return_value=MagicMock()):
+        client = SubModelClient(usage=TokenUsage(), use_cache=False)
+
+    with patch(
+        "deeprepo.llm_clients.get_rate_limiter", return_value=ProviderRateLimiter("openrouter")
+    ), patch("deeprepo.llm_clients.estimate_request_tokens") as estimate:
+        assert client.query("hello", system="sys", max_tokens=64) == "ok"
+
+    estimate.assert_not_called()
@@ -1,6 +1,7 @@
 """Tests for RefreshEngine and cmd_refresh."""
 
 import argparse
+import json
 import shutil
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -111,7 +112,7 @@ def test_refresh_with_changes(initialized_project: Path) -> None:
     engine = RefreshEngine(str(initialized_project), config, state)
 
     with patch("deeprepo.rlm_scaffold.run_analysis", return_value=mock_result):
-        result = engine.refresh(full=False)
+        result = engine.refresh(full=False, incremental=False)
 
     assert result["status"] == "refreshed"
     assert result["changed_files"] > 0
@@ -187,7 +188,7 @@ def test_refresh_with_changes_propagates_failed_status(initialized_project: Path
     engine = RefreshEngine(str(initialized_project), config, state)
 
     with patch("deeprepo.rlm_scaffold.run_analysis", return_value=mock_result):
-        result = engine.refresh(full=False)
+        result = engine.refresh(full=False, incremental=False)
 
     assert result["status"] == "failed"
 
@@ -210,7 +211,7 @@ def test_refresh_updates_state_hashes(initialized_project: Path) -> None:
     engine = RefreshEngine(str(initialized_project), config, state)
 
     with patch("deeprepo.rlm_scaffold.run_analysis", return_value=mock_result):
-        engine.refresh(full=False)
+        engine.refresh(full=False, incremental=False)
 
     assert "new_module.py" in state.file_hashes
     assert state.last_refresh != "2026-02-22T00:00:00+00:00"
@@ -236,3 +237,171 @@ def test_cmd_refresh_not_initialized(tmp_path: Path) -> None:
     args = argparse.Namespace(path=str(tmp_path), full=False, quiet=False)
     with pytest.raises(SystemExit):
         cmd_refresh(args)
+
+
+def _mock_incremental_clients(patch_response: str):
+    sub_client = MagicMock()
+    sub_client.batch.side_effect = lambda prompts, system="": [
+        f"finding {i}" for i, _ in enumerate(prompts)
+    ]
+    root_client = MagicMock()
+    root_client.complete.return_value = patch_response
+    return sub_client, root_client
+
+
+def test_refresh_incremental_patches_affected_sections(initialized_project: Path) -> None:
+    from deeprepo.refresh import RefreshEngine
+
+    cm = ConfigManager(str(initialized_project))
+    config = cm.load_config()
+    state = cm.load_state()
+
+    (initialized_project / "src" / "utils.py").write_text(
+        "def add(a, b):\n    return a + b + 0\n", encoding="utf-8"
+    )
+    (initialized_project / "src" / "app.py").write_text(
+        "from .utils import add\n", encoding="utf-8"
+    )
+    sub_client, root_client = _mock_incremental_clients("## Architecture\nPatched\n")
+
+    engine = RefreshEngine(str(initialized_project), config, state)
+    with patch("deeprepo.incremental.SubModelClient", return_value=sub_client), patch(
+        "deeprepo.incremental.create_root_client", return_value=root_client
+    ), patch("deeprepo.rlm_scaffold.run_analysis") as run_analysis:
+        result = engine.refresh(full=False)
+
+    run_analysis.assert_not_called()
+    assert result["status"] == "refreshed"
+    assert result["mode"] == "incremental"
+    assert result["changed_files"] == 2
+
+    prompts = sub_client.batch.call_args.args[0]
+    assert len(prompts) == 2
+    assert any("src/utils.py" in prompt for prompt in prompts)
+
+    project_md = (initialized_project / ".deeprepo" / "PROJECT.md").read_text(
+        encoding="utf-8"
+    )
+    assert "## Identity\nTest" in project_md
+    assert "## Architecture\nPatched" in project_md
+    assert "Simple" not in project_md
+
+    findings = json.loads(
+        (initialized_project / ".deeprepo" / "findings.json").read_text(encoding="utf-8")
+    )
+    assert set(findings["files"]) == {"src/app.py", "src/utils.py"}
+    assert findings["files"]["src/utils.py"]["hash"] == state.file_hashes["src/utils.py"]
+
+
+def test_refresh_incremental_reuses_neighbour_findings(initialized_project: Path) -> None:
+    from deeprepo.incremental import FindingsStore
+    from deeprepo.refresh import RefreshEngine
+
+    cm = ConfigManager(str(initialized_project))
+    config = cm.load_config()
+    state = cm.load_state()
+
+    (initialized_project / "src" / "main.py").write_text(
+        "from src.utils import add\n", encoding="utf-8"
+    )
+    store = FindingsStore(initialized_project / ".deeprepo")
+    store.put("src/utils.py", state.file_hashes["src/utils.py"], "utils finding")
+    store.save()
+    sub_client, root_client = _mock_incremental_clients("NO_CHANGES")
+
+    engine = RefreshEngine(str(initialized_project), config, state)
+    with patch("deeprepo.incremental.SubModelClient", return_value=sub_client), patch(
+        "deeprepo.incremental.create_root_client", return_value=root_client
+    ):
+        result = engine.refresh(full=False)
+
+    assert result["mode"] == "incremental"
+    prompts = sub_client.batch.call_args.args[0]
+    assert len(prompts) == 1 and "src/main.py" in prompts[0]
+    root_prompt = root_client.complete.call_args.kwargs["messages"][0]["content"]
+    assert "utils finding" in root_prompt
+
+    project_md = (initialized_project / ".deeprepo" / "PROJECT.md").read_text(
+        encoding="utf-8"
+    )
+    assert "## Architecture\nSimple" in project_md
+
+
+def test_refresh_full_seeds_findings_for_imported_files(initialized_project: Path) -> None:
+    from deeprepo.incremental import FindingsStore
+    from deeprepo.refresh import RefreshEngine
+
+    cm = ConfigManager(str(initialized_project))
+    config = cm.load_config()
+    state = cm.load_state()
+
+    (initialized_project / "src" / "main.py").write_text(
+        "from src.utils import add\n", encoding="utf-8"
+    )
+    sub_client, _ = _mock_incremental_clients("")
+    mock_result = {"analysis": "## Identity\nFull\n", "turns": 2, "usage": _make_mock_usage()}
+
+    engine = RefreshEngine(str(initialized_project), config, state)
+    with patch("deeprepo.incremental.SubModelClient", return_value=sub_client), patch(
+        "deeprepo.rlm_scaffold.run_analysis", return_value=mock_result
+    ):
+        engine.refresh(full=True)
+        engine.refresh(full=True)
+
+    # Only the imported file is seeded, and only once while its hash holds.
+    assert sub_client.batch.call_count == 1
+    [prompts] = sub_client.batch.call_args.args
+    assert len(prompts) == 1 and "src/utils.py" in prompts[0]
+    store = FindingsStore(initialized_project / ".deeprepo").load()
+    assert store.get("src/utils.py", state.file_hashes["src/utils.py"]) == "finding 0"
+
+
+def test_refresh_full_keeps_the_analysis_when_seeding_fails(initialized_project: Path) -> None:
+    from deeprepo.refresh import RefreshEngine
+
+    cm = ConfigManager(str(initialized_project))
+    config = cm.load_config()
+    state = cm.load_state()
+
+    (initialized_project / "src" / "main.py").write_text(
+        "from src.utils import add\n", encoding="utf-8"
+    )
+    sub_client = MagicMock()
+    sub_client.batch.side_effect = OSError("disk full")
+    mock_result = {"analysis": "## Identity\nFull\n", "turns": 2, "usage": _make_mock_usage()}
+
+    engine = RefreshEngine(str(initialized_project), config, state)
+    with patch("deeprepo.incremental.SubModelClient", return_value=sub_client), patch(
+        "deeprepo.rlm_scaffold.run_analysis", return_value=mock_result
+    ):
+        result = engine.refresh(full=True)
+
+    assert sub_client.batch.called
+    assert result["status"] == "refreshed"
+    assert result["cost"] == 0.15 and result["seed_cost"] == 0.0
+    project_md = (initialized_project / ".deeprepo" / "PROJECT.md").read_text(encoding="utf-8")
+    assert "Full" in project_md
+
+
+def test_refresh_falls_back_to_full_without_project_md(initialized_project: Path) -> None:
+    from deeprepo.refresh import RefreshEngine
+
+    cm = ConfigManager(str(initialized_project))
+    config = cm.load_config()
+    state = cm.load_state()
+
+    (initialized_project / ".deeprepo" / "PROJECT.md").unlink()
+    (initialized_project / "src" / "main.py").write_text("# changed\n", encoding="utf-8")
+
+    mock_result = {
+        "analysis": "## Identity\nRegenerated\n",
+        "turns": 3,
+        "usage": _make_mock_usage(),
+    }
+
+    engine = RefreshEngine(str(initialized_project), config, state)
+    with patch("deeprepo.rlm_scaffold.run_analysis", return_value=mock_result):
+        result = engine.refresh(full=False)
+
+    assert result["mode"] == "full"
+    assert result["turns"] == 3
@@ -0,0 +1,192 @@
+"""Tests for the out-of-process REPL sandbox."""
+
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from deeprepo.domains.base import DomainConfig
+from deeprepo.llm_clients import TokenUsage
+from deeprepo.repl_sandbox import (
+    SandboxLimits,
+    SandboxPool,
+    SandboxSession,
+    SharedDocuments,
+    write_shared_documents,
+)
+from deeprepo.rlm_scaffold import SAFE_BUILTIN_NAMES, RLMEngine
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX resource limits")
+
+DOCUMENTS = {"a.py": "x = 1\n", "pkg/ü.py": "héllo\n"}
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SandboxPool(size=1).start()
+    yield pool
+    pool.shutdown()
+
+
+def _session(pool, limits=None, sub_query=None, sub_batch=None, sub_stream=None) -> SandboxSession:
+    return SandboxSession(
+        DOCUMENTS,
+        file_tree="a.py\npkg/ü.py",
+        metadata={"total_files": 2},
+        data_var_name="codebase",
+        builtin_names=sorted(SAFE_BUILTIN_NAMES),
+        sub_query=sub_query or (lambda prompt: f"q:{prompt}"),
+        sub_batch=sub_batch or (lambda prompts: [p.upper() for p in prompts]),
+        sub_stream=sub_stream,
+        pool=pool,
+        limits=limits,
+    )
+
+
+def test_shared_documents_round_trip():
+    shm = write_shared_documents(DOCUMENTS)
+    try:
+        view = SharedDocuments(shm)
+        assert dict(view) == DOCUMENTS
+        assert "a.py" in view and "b.py" not in view
+        assert len(view) == 2
+        del view
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_namespace_persists_and_sub_calls_go_through_host(pool):
+    with _session(pool) as session:
+        output, answer = session.execute("n = len(codebase)\nprint(n, codebase['pkg/ü.py'].strip())")
+        assert output == "2 héllo\n"
+        assert answer == {"content": "", "ready": False}
+
+        output, _ = session.execute("print(n, llm_query('hi'), llm_batch(['a', 'b']))")
+        assert output == "2 q:hi ['A', 'B']\n"
+
+        output, answer = session.execute("print(repl_history[1])\nset_answer('done')", {1: "earlier"})
+        assert output == "earlier\n"
+        assert answer == {"content": "done", "ready": True}
+
+
+def test_llm_stream_is_proxied_item_by_item(pool):
+    closed = []
+
+    def _stream(prompts):
+        try:
+            for index in reversed(range(len(prompts))):
+                yield index, prompts[index] * 2
+        finally:
+            closed.append(prompts)
+
+    with _session(pool, sub_stream=_stream) as session:
+        output, _ = session.execute("print(list(llm_stream(['a', 'b', 'c'])))")
+        assert output == "[(2, 'cc'), (1, 'bb'), (0, 'aa')]\n"
+
+        output, _ = session.execute("for i, r in llm_stream(['x', 'y']):\n    print(i, r)\n    break")
+        assert output == "1 yy\n"
+        assert closed == [["a", "b", "c"], ["x", "y"]]
+
+    # Without a streaming callable the batch is delivered in index order.
+    with _session(pool) as session:
+        assert session.execute("print(list(llm_stream(['a'])))")[0] == "[(0, 'A')]\n"
+
+
+def test_search_helpers_run_in_the_worker(pool):
+    with _session(pool) as session:
+        output, _ = session.execute("print(search('h.llo'), grep('x = ', glob='*.py'))")
+        assert output == "['pkg/ü.py'] [Hit(path='a.py', line=1, text='x = 1')]\n"
+
+
+def test_imports_and_errors_are_reported_not_fatal(pool):
+    with _session(pool) as session:
+        assert "Import statements are blocked" in session.execute("import os")[0]
+        assert "ZeroDivisionError" in session.execute("1 / 0")[0]
+        assert session.execute("print('still alive')")[0] == "still alive\n"
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RLIMIT_CPU/RLIMIT_AS semantics")
+def test_cpu_budget_interrupts_runaway_loop_and_keeps_state(pool):
+    with _session(pool, limits=SandboxLimits(cpu_seconds=1, wall_seconds=30)) as session:
+        session.execute("kept = 42")
+        t0 = time.monotonic()
+        output, _ = session.execute("while True:\n    pass")
+        assert "CPU budget of 1 seconds" in output
+        assert time.monotonic() - t0 < 10
+        assert session.execute("print(kept)")[0] == "42\n"
+        assert session.restarts == 0
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RLIMIT_AS semantics")
+def test_memory_limit_raises_memory_error(pool):
+    limits = SandboxLimits(memory_bytes=1024**3)
+    with _session(pool, limits=limits) as session:
+        output, _ = session.execute("big = 'a' * (2 * 1024**3)")
+        assert "MemoryError" in output
+        assert session.execute("print('ok')")[0] == "ok\n"
+
+
+def test_wall_timeout_kills_and_restarts_worker(pool):
+    limits = SandboxLimits(cpu_seconds=600, wall_seconds=1)
+    with _session(pool, limits=limits) as session:
+        session.execute("lost = 1")
+        output, _ = session.execute("while True:\n    pass")
+        assert "timed out after 1 seconds" in output
+        assert session.restarts == 1
+
+        output, _ = session.execute("print(len(codebase), repl_history)", {1: "h"})
+        assert output == "2 {1: 'h'}\n"
+        assert "NameError" in session.execute("print(lost)")[0]
+
+
+def _tool_response(turn: int, code: str):
+    return SimpleNamespace(
+        content=[
+            SimpleNamespace(type="tool_use", id=f"toolu_{turn}", name="execute_python", input={"code": code})
+        ]
+    )
+
+
+def test_engine_runs_repl_code_in_sandbox(pool):
+    domain = DomainConfig(
+        name="test",
+        label="Test",
+        description="test",
+        loader=lambda _path: {
+            "codebase": dict(DOCUMENTS),
+            "file_tree": "a.py",
+            "metadata": {"total_files": 2, "total_chars": 12},
+        },
+        format_metadata=lambda _metadata: "meta",
+        root_system_prompt="system",
+        sub_system_prompt="sub-system",
+        user_prompt_template="{metadata_str}\n{file_tree}",
+        baseline_system_prompt="baseline",
+        data_variable_name="codebase",
+    )
+    root = MagicMock()
+    root.complete.side_effect = [
+        _tool_response(1, "import os\nprint(os.getpid())"),
+        _tool_response(2, "files = sorted(codebase)\nprint(llm_batch(files))"),
+        _tool_response(3, "set_answer(', '.join(files))"),
+    ]
+    sub = MagicMock()
+    sub.batch.side_effect = lambda prompts, system: [f"{system}:{p}" for p in prompts]
+
+    engine = RLMEngine(
+        root_client=root,
+        sub_client=sub,
+        usage=TokenUsage(),
+        max_turns=5,
+        verbose=False,
+        sandbox=pool,
+    )
+    result = engine.analyze("/unused", domain)
+
+    assert result["status"] == "completed"
+    assert result["analysis"] == "a.py, pkg/ü.py"
+    assert "Import statements are blocked" in result["trajectory"][0]["repl_output"]
+    assert "['sub-system:a.py', 'sub-system:pkg/ü.py']" in result["trajectory"][1]["repl_output"]
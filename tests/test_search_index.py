@@ -0,0 +1,142 @@
+"""Tests for the trigram search index and the REPL's search/grep helpers."""
+
+import re
+from unittest.mock import MagicMock
+
+import pytest
+
+from deeprepo.llm_clients import TokenUsage
+from deeprepo.rlm_scaffold import RLMEngine
+from deeprepo.search_index import (
+    Hit,
+    TrigramIndex,
+    make_search_helpers,
+    required_trigrams,
+)
+
+DOCUMENTS = {
+    "src/app.py": "import os\n\ndef handle_request(req):\n    return os.getenv('MODE')\n",
+    "src/db.py": "class Database:\n    def connect(self):\n        pass  # TODO: pool\n",
+    "src/util.js": "export function colourScheme() {\n  return 'dark';\n}\n",
+    "README.md": "# Demo\n\nHandle_Request is documented here.\nColor scheme notes.\n",
+    "tests/test_app.py": "from src.app import handle_request\n\nassert handle_request(None)\n",
+}
+
+PATTERNS = [
+    r"handle_request",
+    r"def\s+\w+\(",
+    r"colou?r",
+    r"class (Database|Cache)",
+    r"import os|export function",
+    r"TODO:?\s*pool",
+    r"^\s+return",
+    r"\w+",
+    r"[Hh]andle_[Rr]equest",
+    r"notes\.$",
+    r"missing_everywhere",
+]
+
+
+@pytest.fixture
+def index():
+    index = TrigramIndex(DOCUMENTS).start()
+    assert index.wait(5)
+    return index
+
+
+def test_required_trigrams_only_use_literals_every_match_contains():
+    assert required_trigrams(r"def\s+foo") == [{"def", "foo"}]
+    assert required_trigrams(r"colou?rs") == [{"col", "olo"}]
+    assert required_trigrams(r"Foo|Bar") == [{"foo"}, {"bar"}]
+    assert required_trigrams(r"get_\d+_item") == [{"get", "et_", "_it", "ite", "tem"}]
+    assert required_trigrams(r"(abc)+") is None
+    assert required_trigrams(r"\w+|abc") is None
+    assert required_trigrams(r"\x41BCD") is None
+    assert required_trigrams("a b c", re.VERBOSE) is None
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+@pytest.mark.parametrize("flags", [0, re.IGNORECASE])
+def test_indexed_results_match_a_full_scan(index, pattern, flags):
+    helpers = make_search_helpers(DOCUMENTS, index)
+    regex = re.compile(pattern, flags | re.MULTILINE)
+
+    expected = [path for path, text in DOCUMENTS.items() if regex.search(text)]
+    assert helpers["search"](pattern, flags=flags) == expected
+    assert set(expected) <= set(index.candidates(pattern, flags))
+
+
+def test_index_narrows_candidates(index):
+    assert index.candidates("handle_request") == ["src/app.py", "README.md", "tests/test_app.py"]
+    assert index.candidates("Database") == ["src/db.py"]
+    assert index.candidates("missing_everywhere") == []
+    assert index.candidates(r"\w+") == list(DOCUMENTS)
+
+
+def test_grep_reports_lines_with_glob_and_limit(index):
+    grep = make_search_helpers(DOCUMENTS, index)["grep"]
+
+    assert grep(r"handle_request", glob="src/*") == [
+        Hit("src/app.py", 3, "def handle_request(req):"),
+    ]
+    assert grep(r"handle_request\(", glob="tests/*.py") == [
+        Hit("tests/test_app.py", 3, "assert handle_request(None)"),
+    ]
+    assert [hit.path for hit in grep("handle_request", flags=re.I)] == [
+        "src/app.py", "README.md", "tests/test_app.py", "tests/test_app.py",
+    ]
+    assert len(grep(r"\w", limit=3)) == 3
+    assert grep(r"^\s+return", glob="*.js")[0].line == 2
+
+
+def test_queries_scan_until_the_index_is_ready():
+    index = TrigramIndex(DOCUMENTS)
+    # Unstarted: the first query starts the build and scans everything meanwhile.
+    helpers = make_search_helpers(DOCUMENTS, index)
+    assert helpers["search"]("Database") == ["src/db.py"]
+    assert index.wait(5)
+    assert index.candidates("Database") == ["src/db.py"]
+
+    too_big = TrigramIndex(DOCUMENTS, max_chars=10).start()
+    assert too_big.wait(5)
+    assert too_big.candidates("Database") == list(DOCUMENTS)
+
+
+def test_engine_namespace_exposes_search_and_grep():
+    engine = RLMEngine(root_client=MagicMock(), sub_client=MagicMock(), usage=TokenUsage(), verbose=False)
+    namespace = engine._build_namespace(
+        dict(DOCUMENTS), "", {}, {"content": "", "ready": False}
+    )
+
+    output = engine._execute_code(
+        "print(search('handle_request', glob='tests/*'))\nprint(grep('TODO')[0])", namespace
+    )
+    assert output == (
+        "['tests/test_app.py']\n"
+        "Hit(path='src/db.py', line=3, text='        pass  # TODO: pool')\n"
+    )
+
+
+@pytest.mark.parametrize(
+    ("text", "pattern"),
+    [('x = "İstanbul"', "istanbul"), ("ıstanbul", "istanbul"), ("class Parser", "ſer"), ("Kelvin", "kelvin")],
+)
+def test_ignorecase_matches_agree_with_re_on_non_ascii_text(text, pattern):
+    documents = {"a.py": text, "b.py": "nothing to see"}
+    index = TrigramIndex(documents).start()
+    assert index.wait(5)
+
+    assert re.search(pattern, text, re.IGNORECASE)
+    assert make_search_helpers(documents, index)["search"](pattern, flags=re.IGNORECASE) == ["a.py"]
+
+
+def test_paths_added_after_the_build_are_searched():
+    documents = dict(DOCUMENTS)
+    index = TrigramIndex(documents).start()
+    assert index.wait(5)
+    search = make_search_helpers(documents, index)["search"]
+
+    documents["src/new.py"] = "class Database:\n    pass\n"
+    assert search("Database") == ["src/db.py", "src/new.py"]
+    del documents["src/new.py"]
+    assert index.candidates("Database") == ["src/db.py"]
@@ -0,0 +1,144 @@
+"""Tests for persistent loader snapshots."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from deeprepo import codebase_loader, snapshot
+from deeprepo.codebase_loader import load_codebase
+
+_PAST_NS = time.time_ns() - 3600 * 10**9  # Outside the racy window
+
+
+def _write(root, rel_path, text, mtime_ns=_PAST_NS):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    _write(root, "app/main.py", "from app import util\n\nif __name__ == '__main__':\n    util.run()\n")
+    _write(root, "app/util.py", "def run():\n    pass\n")
+    _write(root, "app/copy.py", "def run():\n    pass\n")  # Same content: one blob
+    _write(root, "README.md", "# Demo\n")
+    return root
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Relative paths the loader actually opened."""
+    opened = []
+
+    def _tracking_open(path, *args, **kwargs):
+        opened.append(os.path.basename(path))
+        return open(path, *args, **kwargs)
+
+    monkeypatch.setattr(codebase_loader, "open", _tracking_open, raising=False)
+    return opened
+
+
+def _load(root, **kwargs):
+    data = load_codebase(str(root), **kwargs)
+    snapshot.wait_for_writes()
+    return data
+
+
+def test_unchanged_repo_is_served_from_the_snapshot(repo, reads):
+    first = _load(repo)
+    assert sorted(reads) == ["README.md", "copy.py", "main.py", "util.py"]
+
+    reads.clear()
+    second = _load(repo)
+    assert reads == []
+    assert second == first
+    assert second["metadata"]["largest_files"][0] == ("app/main.py", 64)
+    assert second["metadata"]["import_graph"] == {
+        "app/copy.py": [], "app/main.py": ["app/util.py"], "app/util.py": [],
+    }
+    assert repr(second["metadata"]["import_graph"]).startswith("<import graph")
+
+
+def test_only_changed_files_are_reread(repo, reads):
+    _load(repo)
+    _write(repo, "app/util.py", "import os\n\ndef run():\n    return os.getcwd()\n", _PAST_NS + 10**9)
+    _write(repo, "app/new.py", "from app import main\n", time.time_ns())
+    (repo / "README.md").unlink()
+
+    reads.clear()
+    updated = _load(repo)
+    assert sorted(reads) == ["new.py", "util.py"]
+    assert updated == load_codebase(str(repo), snapshot=False)
+    assert "README.md" not in updated["file_tree"]
+
+    # The rewritten snapshot trusts util.py again but not the just-written new.py.
+    reads.clear()
+    assert _load(repo) == updated
+    assert reads == ["new.py"]
+
+
+def test_recently_modified_files_are_not_trusted(repo, reads):
+    _write(repo, "app/util.py", "def run():\n    return 1\n", time.time_ns())
+    _load(repo)
+
+    reads.clear()
+    _load(repo)
+    assert reads == ["util.py"]
+
+
+def test_damaged_or_stale_snapshots_are_ignored(repo, reads, monkeypatch):
+    expected = _load(repo)
+    path = snapshot.snapshot_path(repo.resolve())
+    assert path.read_bytes().startswith(snapshot.MAGIC)
+
+    path.write_bytes(path.read_bytes()[:40])
+    reads.clear()
+    assert _load(repo) == expected
+    assert len(reads) == 4
+
+    # Loader settings that change what a file loads as invalidate the snapshot.
+    monkeypatch.setattr("deeprepo.codebase_loader.MAX_FILE_SIZE", 30)
+    reads.clear()
+    small = _load(repo)
+    assert sorted(reads) == ["README.md", "copy.py", "util.py"]
+    assert small["codebase"]["app/main.py"].startswith("[FILE TOO LARGE")
+
+
+def test_snapshots_can_be_disabled(repo, reads):
+    load_codebase(str(repo), snapshot=False)
+    load_codebase(str(repo), lazy=True)
+    snapshot.wait_for_writes()
+    assert not snapshot.snapshot_path(repo.resolve()).exists()
+
+
+def test_unchanged_loads_keep_the_snapshot_from_expiring(repo):
+    _load(repo)
+    path = snapshot.snapshot_path(repo.resolve())
+    stale = time.time() - (snapshot.SNAPSHOT_EXPIRY_DAYS + 1) * 86400
+    os.utime(path, (stale, stale))
+
+    _load(repo)
+    assert path.stat().st_mtime > time.time() - 60
+
+
+def test_background_writes_go_to_the_cache_dir_of_the_load(repo, tmp_path, monkeypatch):
+    release = threading.Event()
+    write = snapshot.write_snapshot
+
+    def _delayed_write(*args, **kwargs):
+        release.wait(5)
+        return write(*args, **kwargs)
+
+    monkeypatch.setattr(snapshot, "write_snapshot", _delayed_write)
+    load_codebase(str(repo))
+    expected = snapshot.snapshot_path(repo.resolve())
+    monkeypatch.setattr("deeprepo.cache.CACHE_DIR", str(tmp_path / "elsewhere"))
+    release.set()
+    snapshot.wait_for_writes()
+
+    assert expected.exists()
+    assert not (tmp_path / "elsewhere").exists()
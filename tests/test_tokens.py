@@ -0,0 +1,77 @@
+"""Tests for shared token counting."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from deeprepo import tokens
+from deeprepo.tokens import (
+    HEURISTIC,
+    chars_for_tokens,
+    count_structure_tokens,
+    count_tokens,
+    truncate_to_tokens,
+    use_tokenizer,
+)
+
+PROSE = "The cache is cleared when the project is refreshed, so stale notes never leak. " * 20
+CODE = "if (x[i] != y[j]) { total += w_0 * (a->b); }\n" * 20
+
+
+@pytest.fixture(autouse=True)
+def heuristic_tokenizer():
+    use_tokenizer(HEURISTIC)
+    yield
+    use_tokenizer(None)
+
+
+def test_heuristic_counts_code_denser_than_prose():
+    assert count_tokens("") == 0
+    assert count_tokens("a" * 400) == 100
+    assert count_tokens("The quick brown fox jumps over the lazy dog.") == 10
+    # Symbol-heavy code packs fewer characters into a token than prose.
+    assert len(CODE) / count_tokens(CODE) < 4 < len(PROSE) / count_tokens(PROSE)
+    assert count_tokens("数据库连接") == 5
+
+
+def test_counts_are_memoized_per_string(monkeypatch):
+    text = PROSE + "unique tail"
+    first = count_tokens(text)
+
+    def _fail(_text):
+        raise AssertionError("recounted a cached string")
+
+    monkeypatch.setattr(tokens, "_heuristic_count", _fail)
+    assert count_tokens(text) == first
+    with pytest.raises(AssertionError):
+        count_tokens(text + ".")
+
+
+def test_truncate_to_tokens_respects_budget():
+    assert truncate_to_tokens("short text", 10) == "short text"
+
+    cut = truncate_to_tokens(CODE, 50)
+    assert CODE.startswith(cut)
+    assert count_tokens(cut) <= 50 < count_tokens(cut + CODE[len(cut):len(cut) + 8])
+    assert truncate_to_tokens("x" * 100, 5) == "x" * 20
+    assert truncate_to_tokens(PROSE, 0) == ""
+
+
+def test_structures_count_strings_and_framing():
+    messages = [
+        {"role": "user", "content": "a" * 400},
+        {"role": "assistant", "content": [SimpleNamespace(type="text")]},
+    ]
+    assert count_structure_tokens(None) == 0
+    assert count_structure_tokens(messages) > 100
+    assert count_structure_tokens(messages[:1]) == 1 + (1 + 1 + 1) + (1 + 1 + 100)
+
+
+def test_chars_for_tokens_follows_text_density():
+    assert chars_for_tokens(CODE, 100) < chars_for_tokens(PROSE, 100)
+    assert chars_for_tokens("", 10) == 40
+
+
+def test_unavailable_encoding_falls_back_to_heuristic():
+    assert use_tokenizer("no-such-encoding") == HEURISTIC
+    assert count_tokens("a" * 400) == 100
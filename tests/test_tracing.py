@@ -0,0 +1,179 @@
+"""Tests for per-phase performance tracing."""
+
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from deeprepo import tracing
+from deeprepo.cli import _write_analysis_outputs
+from deeprepo.domains.base import DomainConfig
+from deeprepo.llm_clients import SubModelClient, TokenUsage
+from deeprepo.rlm_scaffold import RLMEngine
+from deeprepo.tracing import Tracer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _timed_span(tracer, clock, name, cat, start, end, **args):
+    clock.now = start
+    with tracer.span(name, cat, **args):
+        clock.now = end
+
+
+def test_phase_seconds_and_turn_breakdown_count_overlap_once(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(tracing.time, "perf_counter", clock)
+    tracer = Tracer()
+
+    _timed_span(tracer, clock, "root", tracing.ROOT, 0.0, 2.0)
+    _timed_span(tracer, clock, "exec", tracing.REPL, 2.0, 7.0)
+    # Three concurrent sub-calls and a cache write inside the REPL block.
+    _timed_span(tracer, clock, "sub-llm", tracing.SUB, 3.0, 5.0)
+    _timed_span(tracer, clock, "sub-llm", tracing.SUB, 3.0, 6.0)
+    _timed_span(tracer, clock, "sub-llm", tracing.SUB, 4.0, 5.0)
+    _timed_span(tracer, clock, "cache.set", tracing.CACHE, 5.5, 6.5)
+    _timed_span(tracer, clock, "turn 1", tracing.TURN, 0.0, 8.0, turn=1)
+
+    assert tracer.phase_seconds() == {
+        "load": 0.0, "root": 2.0, "repl": 5.0, "sub": 3.0, "cache": 1.0,
+    }
+    assert tracer.turn_breakdown() == [{
+        "turn": 1,
+        "wall_s": 8.0,
+        "root_s": 2.0,
+        "repl_s": 5.0,
+        "repl_exclusive_s": 1.5,  # 2-3 and 6.5-7
+        "sub_wait_s": 3.0,
+        "cache_s": 1.0,
+        "sub_calls": 3,
+        "slowest_sub_call_s": 3.0,
+    }]
+
+
+def test_span_is_a_noop_without_an_active_tracer():
+    assert tracing.current_tracer() is None
+    with tracing.span("x", tracing.SUB, n=1) as args:
+        args["extra"] = True
+
+    tracer = Tracer()
+    with tracer.activate():
+        assert tracing.current_tracer() is tracer
+        with tracing.span("x", tracing.SUB, n=1) as args:
+            args["extra"] = True
+    assert tracing.current_tracer() is None
+    assert [(s["name"], s["args"]) for s in tracer.spans()] == [("x", {"n": 1, "extra": True})]
+
+
+def test_concurrent_tasks_and_threads_get_their_own_lanes(tmp_path):
+    async def _call(i):
+        with tracing.span(f"task {i}", tracing.SUB):
+            await asyncio.sleep(0.01)
+
+    def _blocking():
+        with tracing.span("thread", tracing.CACHE):
+            pass
+
+    async def _main():
+        await asyncio.gather(*(_call(i) for i in range(3)), asyncio.to_thread(_blocking))
+
+    tracer = Tracer()
+    with tracer.activate():
+        asyncio.run(_main())
+
+    lanes = {s["name"]: s["lane"] for s in tracer.spans()}
+    assert len(set(lanes.values())) == 4
+
+    trace = json.loads(tracer.write(tmp_path / "t.json", repo="r").read_text())
+    complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    names = [e for e in trace["traceEvents"] if e["ph"] == "M"]
+    assert len(complete) == 4 and len(names) == 4
+    assert all(e["dur"] >= 0 and e["pid"] == 1 for e in complete)
+    assert trace["otherData"]["repo"] == "r"
+    assert trace["otherData"]["phase_seconds"]["sub"] > 0
+
+
+def _fake_response(content: str):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=11, completion_tokens=7),
+    )
+
+
+def _tool_response(turn: int, code: str):
+    return SimpleNamespace(
+        content=[
+            SimpleNamespace(type="tool_use", id=f"toolu_{turn}", name="execute_python", input={"code": code})
+        ]
+    )
+
+
+def test_engine_run_records_every_phase(tmp_path, monkeypatch):
+    monkeypatch.setattr("deeprepo.cache.CACHE_DIR", str(tmp_path / "cache"))
+
+    async def _fake_create(*, model, messages, max_tokens, temperature):
+        await asyncio.sleep(0.01)
+        return _fake_response(f"ok:{messages[-1]['content']}")
+
+    async_client = MagicMock()
+    async_client.chat.completions.create = AsyncMock(side_effect=_fake_create)
+    with patch.dict(os.environ, {"OPENROUTER_API_KEY": "test-key"}, clear=False), patch(
+        "deeprepo.llm_clients.openai.OpenAI", return_value=MagicMock()
+    ), patch("deeprepo.llm_clients.openai.AsyncOpenAI", return_value=async_client):
+        sub = SubModelClient(usage=TokenUsage(), use_cache=True)
+
+    domain = DomainConfig(
+        name="test",
+        label="Test",
+        description="test",
+        loader=lambda _path: {
+            "codebase": {"a.py": "x = 1\n", "b.py": "y = 2\n"},
+            "file_tree": "a.py\nb.py",
+            "metadata": {"total_files": 2, "total_chars": 12},
+        },
+        format_metadata=lambda _metadata: "meta",
+        root_system_prompt="system",
+        sub_system_prompt="sub-system",
+        user_prompt_template="{metadata_str}\n{file_tree}",
+        baseline_system_prompt="baseline",
+        data_variable_name="codebase",
+    )
+    root = MagicMock()
+    root.complete.side_effect = [
+        _tool_response(1, "notes = llm_batch(sorted(codebase))\nprint(notes)"),
+        _tool_response(2, "set_answer(' '.join(notes))"),
+    ]
+    engine = RLMEngine(root_client=root, sub_client=sub, usage=sub.usage, max_turns=5, verbose=False)
+
+    tracer = Tracer()
+    with tracer.activate():
+        result = engine.analyze("/unused", domain)
+
+    assert result["analysis"] == "ok:a.py ok:b.py"
+    counts = {cat: len(tracer.spans(cat)) for cat in tracing.PHASES + (tracing.TURN,)}
+    assert counts == {"load": 1, "root": 2, "repl": 2, "sub": 2, "cache": 2, "turn": 2}
+    first, second = tracer.turn_breakdown()
+    assert first["turn"] == 1 and first["sub_calls"] == 2 and first["sub_wait_s"] > 0
+    assert second["sub_calls"] == 0
+
+    _, metrics_path = _write_analysis_outputs(
+        result,
+        repo="/tmp/demo",
+        domain="code",
+        root_model="root",
+        sub_model="sub",
+        output_dir=str(tmp_path / "out"),
+        quiet=True,
+        tracer=tracer,
+    )
+    metrics = json.loads(metrics_path.read_text())
+    assert set(metrics["phase_seconds"]) == set(tracing.PHASES)
+    trace_path = metrics_path.with_name(metrics_path.name.replace("_metrics.json", "_trace.json"))
+    assert json.loads(trace_path.read_text())["otherData"]["turns"][0]["turn"] == 1